@@ -126,10 +126,9 @@ function setupIPC(handlers) {
   ipcMain.handle('runtime:start', async (event, options = {}) => {
     try {
       await processManager.startLLMProcess();
-      await processManager.startSTTProcess('auto', 8765);
-      if (options.dualAudio === true) {
-        await processManager.startSTTProcess('microphone', 8764);
-      }
+      // Микрофон обслуживает тот же STT процесс на порту 8764 - одна модель на оба источника
+      const extraSources = options.dualAudio === true ? [{ mode: 'microphone', port: 8764 }] : [];
+      await processManager.startSTTProcess('auto', 8765, extraSources);
       return { success: true };
     } catch (error) {
       processManager.stopAllProcesses();
@@ -153,10 +152,9 @@ function setupIPC(handlers) {
 
   ipcMain.handle('stt:start', async (event, options = {}) => {
     try {
-      await processManager.startSTTProcess('auto', 8765);
-      if (options.dualAudio === true) {
-        await processManager.startSTTProcess('microphone', 8764);
-      }
+      // Микрофон обслуживает тот же STT процесс на порту 8764 - одна модель на оба источника
+      const extraSources = options.dualAudio === true ? [{ mode: 'microphone', port: 8764 }] : [];
+      await processManager.startSTTProcess('auto', 8765, extraSources);
       return { success: true };
     } catch (error) {
       return { success: false, error: error.message };
@@ -39,6 +39,18 @@ function stopProcess(process) {
   }
 }
 
+function stopProcessAndWait(process, timeoutMs = 5000) {
+  if (!isRunning(process)) return Promise.resolve();
+  return new Promise((resolve) => {
+    const timer = setTimeout(resolve, timeoutMs);
+    process.once('exit', () => {
+      clearTimeout(timer);
+      resolve();
+    });
+    process.kill();
+  });
+}
+
 function waitForPort(
   port,
   host = '127.0.0.1',
@@ -132,9 +144,30 @@ function stopAllProcesses() {
   stopAudioCaptureProcesses();
 }
 
-async function startSTTProcess(mode = 'auto', port = 8765) {
+function buildSTTArgs(mode, port, extraSources) {
+  const args = ['--mode', mode, '--port', String(port)];
+  for (const source of extraSources) {
+    args.push('--extra-source', `${source.mode}:${source.port}`);
+  }
+  return args;
+}
+
+/**
+ * Запуск STT процесса.
+ * extraSources - дополнительные источники [{ mode, port }], которые обслуживает
+ * тот же процесс на своих портах: модель Whisper загружается один раз.
+ * Процесс, запущенный с другим набором источников, перезапускается.
+ */
+async function startSTTProcess(mode = 'auto', port = 8765, extraSources = []) {
   const isMicrophone = port === 8764;
-  const currentProcess = isMicrophone ? micSttProcess : sttProcess;
+  const sttArgs = buildSTTArgs(mode, port, extraSources);
+  let currentProcess = isMicrophone ? micSttProcess : sttProcess;
+  if (isRunning(currentProcess) && currentProcess.sttArgs !== sttArgs.join(' ')) {
+    // Например, включили dualAudio: нужного порта у запущенного процесса нет
+    console.log(`STT перезапускается с новыми источниками: ${sttArgs.join(' ')}`);
+    await stopProcessAndWait(currentProcess);
+    currentProcess = isMicrophone ? micSttProcess : sttProcess;
+  }
   if (isRunning(currentProcess)) {
     await waitForPort(
       port,
@@ -143,20 +176,27 @@ async function startSTTProcess(mode = 'auto', port = 8765) {
       currentProcess,
       isMicrophone ? 'Микрофонный STT' : 'STT'
     );
+    for (const source of extraSources) {
+      await waitForPort(source.port, '127.0.0.1', 5000, currentProcess, 'Микрофонный STT');
+    }
     return currentProcess;
   }
 
   const rootDir = getRuntimeRoot();
   await assertPortAvailable(port, '127.0.0.1', 500, isMicrophone ? 'Микрофонный STT' : 'STT');
+  for (const source of extraSources) {
+    await assertPortAvailable(source.port, '127.0.0.1', 500, 'Микрофонный STT');
+  }
   const venvPython = path.join(rootDir, 'venv', 'Scripts', 'python.exe');
   const pythonPath = require('fs').existsSync(venvPython) ? venvPython : 'python';
   const scriptPath = path.join(rootDir, 'python', 'stt_server.py');
 
-  const process = spawn(pythonPath, [scriptPath, '--mode', mode, '--port', String(port)], {
+  const process = spawn(pythonPath, [scriptPath, ...sttArgs], {
     cwd: rootDir,
     env: getRuntimeEnv(),
     stdio: ['pipe', 'pipe', 'pipe'],
   });
+  process.sttArgs = sttArgs.join(' ');
   if (isMicrophone) micSttProcess = process;
   else sttProcess = process;
 
@@ -188,6 +228,9 @@ async function startSTTProcess(mode = 'auto', port = 8765) {
 
   try {
     await waitForPort(port, '127.0.0.1', 60000, process, isMicrophone ? 'Микрофонный STT' : 'STT');
+    for (const source of extraSources) {
+      await waitForPort(source.port, '127.0.0.1', 5000, process, 'Микрофонный STT');
+    }
     return process;
   } catch (error) {
     stopProcess(process);
@@ -336,6 +336,14 @@ class AdvancedRAG:
         Returns:
             Улучшенный системный промпт
         """
+        return base_prompt + '\n\n' + self.build_request_notes(question, context, question_type)
+
+    def build_request_notes(self, question: str, context: List[str], question_type: str) -> str:
+        """
+        Материал конкретного запроса: чанки резюме, темы сессии и акцент на
+        последний вопрос. Меняется от запроса к запросу, поэтому ставится
+        после статичного префикса промпта.
+        """
         # Определяем сложность и размер контекста
         complexity = self._classify_complexity(question, context)
         context_size = self._get_context_window_size(complexity)
@@ -345,32 +353,29 @@ class AdvancedRAG:
         # Получаем релевантные чанки из резюме
         relevant_chunks = self.retrieve(question, top_k=3)
         
-        # Строим промпт
-        enhanced_prompt = base_prompt
+        notes = []
         
         # Добавляем релевантную информацию из резюме
         if relevant_chunks and question_type in ['experience', 'general']:
-            enhanced_prompt += '\n\n─── РЕЛЕВАНТНАЯ ИНФОРМАЦИЯ ИЗ РЕЗЮМЕ ───\n'
+            block = '─── РЕЛЕВАНТНАЯ ИНФОРМАЦИЯ ИЗ РЕЗЮМЕ ───\n'
             for chunk in relevant_chunks:
-                enhanced_prompt += f'• {chunk.text}\n'
-            enhanced_prompt += '─── КОНЕЦ ИНФОРМАЦИИ ───'
+                block += f'• {chunk.text}\n'
+            notes.append(block + '─── КОНЕЦ ИНФОРМАЦИИ ───')
         
         # Добавляем память сессии если есть
         if self.session_memory.discussed_topics:
-            enhanced_prompt += f'\n\nОбсуждённые темы в этой сессии: {", ".join(self.session_memory.discussed_topics[-5:])}'
+            notes.append(f'Обсуждённые темы в этой сессии: {", ".join(self.session_memory.discussed_topics[-5:])}')
         
         # КРИТИЧНО: Акцент на текущий вопрос
-        enhanced_prompt += '''
-
-═══════════════════════════════════════════════════════════════
+        notes.append('''═══════════════════════════════════════════════════════════════
 КРИТИЧЕСКИ ВАЖНО:
 1. Отвечай ТОЛЬКО на ПОСЛЕДНИЙ вопрос в диалоге
 2. Предыдущие вопросы даны ТОЛЬКО для контекста - НЕ отвечай на них
 3. Если вопрос связан с предыдущим обсуждением, учитывай контекст
 4. Ответ должен быть чётким, структурированным и по делу
-═══════════════════════════════════════════════════════════════'''
+═══════════════════════════════════════════════════════════════''')
         
-        return enhanced_prompt
+        return '\n\n'.join(notes)
     
     def get_adaptive_context(self, context: List[str], question: str) -> List[str]:
         """
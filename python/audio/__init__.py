@@ -0,0 +1,30 @@
+"""
+Audio модуль - общая обработка сигнала для путей захвата
+
+Не зависит от STT и Whisper: импортируется процессами захвата,
+которые должны стартовать быстро.
+"""
+
+from .resample import Resampler, design_filter
+from .ring import SPSCRingBuffer
+from .shm import SharedAudioWriter, SharedAudioReader
+from .sources import (
+    AudioSource, SourceReader, PyAudioSource, SoundDeviceSource, FileSource,
+    SyntheticSource, SyntheticDevice, create_audio_source,
+)
+
+__all__ = [
+    'Resampler',
+    'design_filter',
+    'SPSCRingBuffer',
+    'SharedAudioWriter',
+    'SharedAudioReader',
+    'AudioSource',
+    'SourceReader',
+    'PyAudioSource',
+    'SoundDeviceSource',
+    'FileSource',
+    'SyntheticSource',
+    'SyntheticDevice',
+    'create_audio_source',
+]
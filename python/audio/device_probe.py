@@ -0,0 +1,168 @@
+"""
+Device Probe - свежий список аудиоустройств из отдельного процесса
+
+PortAudio перечитывает устройства только в Pa_Initialize, а Pa_Terminate
+закрывает открытые потоки. Поэтому процесс, который сейчас захватывает
+звук, не может пересканировать устройства сам. Зонд - дочерний процесс
+без потоков, отвечающий строкой JSON на команды из stdin:
+
+    fingerprint - переинициализация бэкенда, число устройств и устройства
+                  по умолчанию (без обхода списка)
+    scan        - полный список устройств из той же инициализации
+
+Монитор спрашивает отпечаток на каждом опросе, а список - только когда
+отпечаток изменился.
+
+    python -m audio.device_probe pyaudio
+"""
+
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+from typing import Optional
+
+logger = logging.getLogger('DeviceProbe')
+
+# Сколько ждать ответа зонда, с
+PROBE_TIMEOUT = 5.0
+# Режимы захвата, для которых зонд сообщает устройство по умолчанию (и ещё вывод)
+PROBE_MODES = ('microphone', 'loopback')
+# Каталог python/ - рабочий каталог зонда, откуда импортируется пакет audio
+_PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def scan_devices(source) -> dict:
+    """Список устройств источника; безопасно только там, где нет открытых потоков"""
+    devices = source.list_devices()
+    defaults = {mode: source.default_device(mode, devices)[1] for mode in PROBE_MODES}
+    defaults['output'] = source.default_output(devices)[1]
+    return {'devices': devices, 'defaults': defaults}
+
+
+class DeviceProbe:
+    """Долгоживущий процесс-зонд; перезапускается, если завершился или завис"""
+
+    def __init__(self, kind: str, timeout: float = PROBE_TIMEOUT):
+        self.kind = kind
+        self.timeout = timeout
+        self._proc: Optional[subprocess.Popen] = None
+        self._lines: queue.Queue = queue.Queue()
+        self.fingerprints = 0
+        self.scans = 0
+        self.starts = 0
+        self.failures = 0
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            [sys.executable, '-m', 'audio.device_probe', self.kind],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=_PYTHON_DIR,
+            text=True,
+            bufsize=1,
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0),
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read_lines, args=(self._proc, self._lines), daemon=True).start()
+        self.starts += 1
+
+    @staticmethod
+    def _read_lines(proc: subprocess.Popen, lines: queue.Queue):
+        # Pipe без таймаута на Windows: ответы читает отдельный поток
+        for line in proc.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    def fingerprint(self):
+        """Дешёвый отпечаток устройств свежей инициализации; None - зонд не ответил"""
+        result = self._request('fingerprint')
+        if result is None:
+            return None
+        self.fingerprints += 1
+        return result['fingerprint']
+
+    def scan(self) -> Optional[dict]:
+        """Полный список устройств той же инициализации, что и последний отпечаток"""
+        result = self._request('scan')
+        if result is not None:
+            self.scans += 1
+        return result
+
+    def _request(self, command: str) -> Optional[dict]:
+        try:
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+            self._proc.stdin.write(command + '\n')
+            self._proc.stdin.flush()
+            line = self._lines.get(timeout=self.timeout)
+        except queue.Empty:
+            self._kill()
+            line = ''
+            logger.warning(f'[PROBE] Зонд устройств не ответил за {self.timeout:.0f} с')
+        except OSError as e:
+            self._kill()
+            line = ''
+            logger.warning(f'[PROBE] Зонд устройств недоступен: {e}')
+
+        try:
+            result = json.loads(line) if line else {'error': 'зонд завершился'}
+        except ValueError:
+            result = {'error': f'неожиданный ответ: {line[:100]!r}'}
+        if 'error' in result:
+            self.failures += 1
+            logger.warning(f'[PROBE] Ошибка опроса устройств ({command}): {result["error"]}')
+            return None
+        return result
+
+    def _kill(self):
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.wait()
+            self._proc = None
+
+    def close(self):
+        """Закрытие stdin завершает цикл зонда"""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=1.0)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+            proc.wait()
+
+    def get_stats(self) -> dict:
+        return {'kind': self.kind, 'fingerprints': self.fingerprints, 'scans': self.scans,
+                'starts': self.starts, 'failures': self.failures}
+
+
+def main():
+    from .sources import create_audio_source
+
+    kind = sys.argv[1] if len(sys.argv) > 1 else 'auto'
+    source = None
+    for line in sys.stdin:
+        try:
+            if source is None:
+                source = create_audio_source(kind)
+            if line.strip() == 'fingerprint':
+                # Без открытых потоков переинициализация безопасна и видит новые устройства
+                source.rescan()
+                result = {'fingerprint': source.local_fingerprint()}
+            else:
+                result = scan_devices(source)
+        except Exception as e:
+            result = {'error': str(e)}
+        sys.stdout.write(json.dumps(result) + '\n')
+        sys.stdout.flush()
+    if source is not None:
+        source.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Audio Ring - кольцевой буфер между потоком захвата и потребителем STT
+
+Один писатель (поток устройства) и один читатель (стадия захвата
+конвейера). Индексы записи и чтения монотонно растут, и каждый меняет
+только свой поток; присваивание атрибута под GIL атомарно, поэтому
+блокировка на запись и чтение не нужна. Писатель сначала кладёт
+сэмплы, потом публикует индекс, читатель видит только опубликованное.
+
+Память выделяется один раз: массив удвоенной длины хранит каждый
+сэмпл в обеих половинах, так что всё непрочитанное - непрерывный срез.
+Если читатель отстал и места нет, новые сэмплы отбрасываются
+(переполнение) - объём памяти не растёт, а писатель не трогает
+индекс читателя.
+"""
+
+import threading
+from typing import Optional
+
+import numpy as np
+
+
+class SPSCRingBuffer:
+    """Кольцевой буфер один писатель / один читатель без блокировок на данных"""
+
+    def __init__(self, capacity: int, dtype=np.float32):
+        if capacity <= 0:
+            raise ValueError('Ёмкость буфера должна быть положительной')
+
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros(self.capacity * 2, dtype=self.dtype)
+        # Всего записано / прочитано сэмплов; меняет только свой поток
+        self._write_index = 0
+        self._read_index = 0
+        # Будит читателя, ждущего данных; писатель взводит его, только если сброшен
+        self._ready = threading.Event()
+
+        self.overruns = 0
+        self.dropped_samples = 0
+        self.high_water = 0
+
+    def __len__(self) -> int:
+        return self._write_index - self._read_index
+
+    @property
+    def free_space(self) -> int:
+        return self.capacity - len(self)
+
+    @property
+    def written_samples(self) -> int:
+        return self._write_index
+
+    # ---------- писатель ----------
+
+    def write(self, chunk: np.ndarray) -> int:
+        """
+        Копирует чанк в буфер; возвращает число принятых сэмплов.
+        Не поместившийся хвост отбрасывается и считается переполнением.
+        """
+        n = len(chunk)
+        if n == 0:
+            return 0
+
+        w = self._write_index
+        free = self.capacity - (w - self._read_index)
+        if n > free:
+            self.overruns += 1
+            self.dropped_samples += n - free
+            chunk = chunk[:free]
+            n = free
+            if n == 0:
+                return 0
+
+        cap = self.capacity
+        pos = w % cap
+        first = min(n, cap - pos)
+        rest = n - first
+        self._data[pos:pos + first] = chunk[:first]
+        self._data[pos + cap:pos + cap + first] = chunk[:first]
+        if rest:
+            self._data[:rest] = chunk[first:]
+            self._data[cap:cap + rest] = chunk[first:]
+
+        self._write_index = w + n
+        self.high_water = max(self.high_water, w + n - self._read_index)
+        if not self._ready.is_set():
+            self._ready.set()
+        return n
+
+    # ---------- читатель ----------
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Ждёт непрочитанных сэмплов; False - таймаут"""
+        if len(self):
+            return True
+        self._ready.clear()
+        # Писатель мог опубликовать данные до сброса события
+        if len(self):
+            return True
+        return self._ready.wait(timeout) and len(self) > 0
+
+    def peek(self, max_samples: Optional[int] = None) -> np.ndarray:
+        """
+        Все непрочитанные сэмплы (не больше max_samples) одним непрерывным
+        срезом без копирования. Срез валиден до advance().
+        """
+        r = self._read_index
+        n = self._write_index - r
+        if max_samples is not None:
+            n = min(n, max_samples)
+        pos = r % self.capacity
+        return self._data[pos:pos + n]
+
+    def advance(self, n: int):
+        """Отмечает n сэмплов прочитанными и освобождает место писателю"""
+        self._read_index += max(0, min(int(n), len(self)))
+
+    def read(self, max_samples: Optional[int] = None, timeout: Optional[float] = None,
+             out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        Копия всех доступных сэмплов (не больше max_samples) с ожиданием
+        до timeout; None - данных нет. С out копирует в него (чтение
+        ограничено его длиной) и возвращает заполненный срез.
+        """
+        if timeout is not None and not self.wait(timeout):
+            return None
+        if out is not None:
+            max_samples = len(out) if max_samples is None else min(max_samples, len(out))
+        view = self.peek(max_samples)
+        if not len(view):
+            return None
+        if out is None:
+            result = view.copy()
+        else:
+            result = out[:len(view)]
+            result[:] = view
+        self.advance(len(view))
+        return result
+
+    def discard(self):
+        """Читатель пропускает всё накопленное"""
+        self._read_index = self._write_index
+
+    def get_stats(self) -> dict:
+        return {
+            'samples': len(self),
+            'capacity': self.capacity,
+            'high_water': self.high_water,
+            'overruns': self.overruns,
+            'dropped_samples': self.dropped_samples,
+            'written_samples': self._write_index,
+        }
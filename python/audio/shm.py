@@ -0,0 +1,334 @@
+"""
+Audio SHM - транспорт аудио между процессами через разделяемую память
+
+Процесс захвата (audio_capture.py --transport=shm) пишет моно 16 кГц
+в кольцо в multiprocessing.shared_memory, процесс STT читает блоки
+прямо из этой памяти. По сравнению с pipe в stdout нет системного
+вызова на каждый блок, а заголовок несёт частоту, время захвата и
+счётчики потерь.
+
+Раскладка сегмента (little-endian):
+    0   4s  magic b'LHAR'
+    4   B   version
+    5   B   dtype (1 float32, 2 int16)
+    6   B   closed - писатель завершился
+    8   I   sample_rate
+    12  I   capacity, сэмплов
+    16  Q   seq - чётный, когда write_index и capture_time согласованы
+    24  Q   write_index - всего записано сэмплов (пишет только писатель)
+    32  Q   read_index - всего прочитано (пишет только читатель)
+    40  Q   overruns - записей, не поместившихся целиком
+    48  Q   dropped_samples
+    56  d   capture_time - unix-время последнего записанного сэмпла
+    64  Q   epoch - случайный номер писателя, создавшего сегмент
+    72      данные: 2 × capacity сэмплов, каждый пишется в обе половины,
+            поэтому непрочитанное - всегда один непрерывный срез
+Как и в SPSCRingBuffer, писатель не трогает индекс читателя: если
+читатель отстал, новые сэмплы отбрасываются и считаются в overruns.
+Упавший писатель не выставляет closed, а новый пересоздаёт сегмент под
+тем же именем; читатель замечает это по смене epoch.
+"""
+
+import logging
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger('AudioSHM')
+
+SHM_MAGIC = b'LHAR'
+SHM_VERSION = 2
+SHM_DTYPES = {1: np.dtype('<f4'), 2: np.dtype('<i2')}
+# Имя сегмента по умолчанию: live_hints_<режим захвата>
+SHM_NAME_PREFIX = 'live_hints_'
+# Ёмкость кольца по умолчанию, секунд
+SHM_RING_SECONDS = 10.0
+# Период опроса читателем, ждущим данных, с
+SHM_POLL_INTERVAL = 0.005
+# Максимум сэмплов за одно чтение get_audio_chunk, секунд
+SHM_READ_SECONDS = 0.2
+
+_STATIC = struct.Struct('<4sBBBxII')
+_EPOCH = struct.Struct('<Q')
+HEADER_SIZE = 72
+_COUNTERS_OFFSET = 16
+_TIME_OFFSET = 56
+_EPOCH_OFFSET = 64
+# Индексы счётчиков в заголовке
+_SEQ, _WRITE, _READ, _OVERRUNS, _DROPPED = range(5)
+
+
+def default_shm_name(mode: str) -> str:
+    return f'{SHM_NAME_PREFIX}{mode}'
+
+
+class _SharedAudioRing:
+    """Представления заголовка и данных поверх сегмента"""
+
+    def _map(self, shm: shared_memory.SharedMemory):
+        magic, version, code, _, sample_rate, capacity = _STATIC.unpack_from(shm.buf, 0)
+        if magic != SHM_MAGIC:
+            raise ValueError(f'Сегмент {shm.name} не является аудио-кольцом')
+        if version != SHM_VERSION:
+            raise ValueError(f'Версия кольца {version} не поддерживается')
+        self._shm = shm
+        self.name = shm.name
+        self.sample_rate = sample_rate
+        self.capacity = capacity
+        self.dtype = SHM_DTYPES[code]
+        self.epoch = _EPOCH.unpack_from(shm.buf, _EPOCH_OFFSET)[0]
+        self._counters = np.ndarray(5, dtype='<u8', buffer=shm.buf, offset=_COUNTERS_OFFSET)
+        self._time = np.ndarray(1, dtype='<f8', buffer=shm.buf, offset=_TIME_OFFSET)
+        self._data = np.ndarray(2 * capacity, dtype=self.dtype, buffer=shm.buf, offset=HEADER_SIZE)
+
+    @property
+    def writer_closed(self) -> bool:
+        return bool(self._shm.buf[6])
+
+    def __len__(self) -> int:
+        return int(self._counters[_WRITE]) - int(self._counters[_READ])
+
+    def get_stats(self) -> dict:
+        return {
+            'name': self.name,
+            'sample_rate': self.sample_rate,
+            'capacity': self.capacity,
+            'samples': len(self),
+            'written_samples': int(self._counters[_WRITE]),
+            'overruns': int(self._counters[_OVERRUNS]),
+            'dropped_samples': int(self._counters[_DROPPED]),
+            'capture_time': float(self._time[0]),
+        }
+
+    def _release(self):
+        # Сегмент нельзя закрыть, пока на его память ссылаются массивы
+        self._counters = self._time = self._data = None
+        try:
+            self._shm.close()
+        except BufferError:
+            logger.warning(f'[SHM] {self.name}: память ещё используется, сегмент закрыт не полностью')
+
+
+class SharedAudioWriter(_SharedAudioRing):
+    """Писатель кольца: создаёт сегмент и удаляет его при закрытии"""
+
+    def __init__(self, name: str, sample_rate: int, seconds: float = SHM_RING_SECONDS,
+                 dtype=np.float32):
+        dtype = np.dtype(dtype).newbyteorder('<')
+        code = next((c for c, d in SHM_DTYPES.items() if d == dtype), None)
+        if code is None:
+            raise ValueError(f'Неподдерживаемый dtype кольца: {dtype}')
+        capacity = int(sample_rate * seconds)
+        if capacity <= 0:
+            raise ValueError('Ёмкость кольца должна быть положительной')
+
+        size = HEADER_SIZE + 2 * capacity * dtype.itemsize
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Сегмент упавшего прежнего процесса захвата
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        shm.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        # epoch пишется раньше magic: читатель с magic в заголовке видит и epoch
+        _EPOCH.pack_into(shm.buf, _EPOCH_OFFSET, int.from_bytes(os.urandom(8), 'little'))
+        _STATIC.pack_into(shm.buf, 0, SHM_MAGIC, SHM_VERSION, code, 0, int(sample_rate), capacity)
+        self._map(shm)
+
+    def write(self, chunk: np.ndarray, capture_time: Optional[float] = None) -> int:
+        """Копирует блок в кольцо; возвращает число принятых сэмплов"""
+        n = len(chunk)
+        if n == 0:
+            return 0
+        counters = self._counters
+        w = int(counters[_WRITE])
+        free = self.capacity - (w - int(counters[_READ]))
+        if n > free:
+            counters[_OVERRUNS] += 1
+            counters[_DROPPED] += n - free
+            chunk = chunk[:free]
+            n = free
+            if n == 0:
+                return 0
+
+        cap = self.capacity
+        pos = w % cap
+        first = min(n, cap - pos)
+        rest = n - first
+        self._data[pos:pos + first] = chunk[:first]
+        self._data[pos + cap:pos + cap + first] = chunk[:first]
+        if rest:
+            self._data[:rest] = chunk[first:]
+            self._data[cap:cap + rest] = chunk[first:]
+
+        # Время и индекс публикуются вместе: нечётный seq - идёт обновление
+        counters[_SEQ] += 1
+        self._time[0] = time.time() if capture_time is None else capture_time
+        counters[_WRITE] = w + n
+        counters[_SEQ] += 1
+        return n
+
+    def close(self):
+        if self._data is None:
+            return
+        self._shm.buf[6] = 1
+        shm = self._shm
+        self._release()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedAudioReader(_SharedAudioRing):
+    """
+    Читатель кольца в процессе STT.
+
+    Подключается к сегменту лениво и переподключается, если процесс
+    захвата перезапустился, поэтому порядок запуска процессов не важен.
+    Умеет то же, что нужно STTPipeline от захвата (get_audio_chunk).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._shm = None
+        self._data = None
+        self.attaches = 0
+        # unix-время последнего сэмпла чанка, отданного get_audio_chunk
+        self.last_chunk_time: Optional[float] = None
+
+    @property
+    def attached(self) -> bool:
+        return self._data is not None
+
+    def attach(self) -> bool:
+        """Подключение к сегменту; False - писатель ещё не создал его"""
+        if self.attached and not self.writer_closed:
+            return True
+        if self.attached:
+            self._release()
+        try:
+            shm = _open_segment(self.name)
+        except FileNotFoundError:
+            return False
+        self._map(shm)
+        # Накопленное до подключения не нужно: читаем с текущего места
+        self._counters[_READ] = self._counters[_WRITE]
+        self.attaches += 1
+        logger.info(f'[SHM] {self.name}: подключено, {self.sample_rate} Гц')
+        return True
+
+    def __len__(self) -> int:
+        return super().__len__() if self.attached else 0
+
+    def start(self):
+        self.attach()
+
+    def stop(self):
+        if self.attached:
+            self._release()
+
+    def wait(self, timeout: float) -> bool:
+        """Ждёт непрочитанных сэмплов опросом; False - таймаут"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.attach() and len(self):
+                return True
+            if time.monotonic() >= deadline:
+                # Тишина может означать, что писатель упал и сегмент пересоздан
+                if self.attached and self._writer_replaced():
+                    logger.info(f'[SHM] {self.name}: сегмент пересоздан новым писателем')
+                    self._release()
+                    self.attach()
+                return False
+            time.sleep(SHM_POLL_INTERVAL)
+
+    def _writer_replaced(self) -> bool:
+        """Под именем сегмента теперь другой писатель (прежний завершился, не выставив closed)"""
+        try:
+            shm = _open_segment(self.name)
+        except FileNotFoundError:
+            return False
+        try:
+            # Без magic новый писатель ещё заполняет заголовок: проверим на следующем таймауте
+            if bytes(shm.buf[:4]) != SHM_MAGIC:
+                return False
+            return _EPOCH.unpack_from(shm.buf, _EPOCH_OFFSET)[0] != self.epoch
+        finally:
+            shm.close()
+
+    def peek(self, max_samples: Optional[int] = None) -> np.ndarray:
+        """Непрочитанные сэмплы срезом разделяемой памяти без копирования (до advance)"""
+        if not self.attached:
+            return np.zeros(0, dtype=np.float32)
+        r = int(self._counters[_READ])
+        n = int(self._counters[_WRITE]) - r
+        if max_samples is not None:
+            n = min(n, max_samples)
+        pos = r % self.capacity
+        return self._data[pos:pos + n]
+
+    def advance(self, n: int):
+        if self.attached:
+            self._counters[_READ] += max(0, min(int(n), len(self)))
+
+    def capture_time(self) -> Tuple[int, float]:
+        """Согласованная пара (write_index, время захвата последнего сэмпла)"""
+        counters = self._counters
+        while True:
+            seq = int(counters[_SEQ])
+            if seq % 2 == 0:
+                index, t = int(counters[_WRITE]), float(self._time[0])
+                if int(counters[_SEQ]) == seq:
+                    return index, t
+            time.sleep(0)
+
+    def read_block(self, max_samples: Optional[int] = None,
+                   timeout: float = 0.1) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Блок без копирования и unix-время его последнего сэмпла; после
+        обработки блок освобождается через advance(len(block)).
+        """
+        if not self.wait(timeout):
+            return None
+        index, t = self.capture_time()
+        r = int(self._counters[_READ])
+        n = index - r if max_samples is None else min(index - r, max_samples)
+        pos = r % self.capacity
+        return self._data[pos:pos + n], t - (index - r - n) / self.sample_rate
+
+    def get_audio_chunk(self, timeout: float = 0.1) -> Optional[np.ndarray]:
+        """Копия накопленных сэмплов (не больше SHM_READ_SECONDS) для конвейера"""
+        if not self.wait(timeout):
+            return None
+        block, self.last_chunk_time = self.read_block(int(self.sample_rate * SHM_READ_SECONDS), timeout=0)
+        chunk = block.copy()
+        self.advance(len(block))
+        return chunk
+
+    def get_stats(self) -> dict:
+        if not self.attached:
+            return {'name': self.name, 'attached': False}
+        return {**super().get_stats(), 'attached': True, 'attaches': self.attaches}
+
+
+def _open_segment(name: str) -> shared_memory.SharedMemory:
+    """Подключение без регистрации в resource_tracker: сегментом владеет писатель"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: tracker удалил бы чужой сегмент при выходе читателя
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        return shm
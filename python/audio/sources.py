@@ -0,0 +1,852 @@
+"""
+Audio Sources - источники аудио для всех путей захвата
+
+AudioSource знает устройства (список и устройство по умолчанию для
+режима захвата) и открывает поток устройства. Поток отдаёт блоки int16
+формы (frames, channels) и закрывается вызовом close(); SourceReader
+приводит любой поток к моно 16 кГц.
+
+Бэкенды:
+    PyAudioSource     - pyaudiowpatch (WASAPI loopback и микрофоны)
+    SoundDeviceSource - sounddevice (PortAudio без патчей WASAPI)
+    FileSource        - WAV/FLAC в реальном времени или без пауз
+    SyntheticSource   - виртуальные устройства с синтетическим сигналом
+
+Звуковые библиотеки импортируются только при открытии устройства,
+поэтому файловый и синтетический источники работают на машине без
+звуковой карты и без pyaudiowpatch.
+"""
+
+import importlib.util
+import logging
+import threading
+import time
+import wave
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .device_probe import DeviceProbe
+from .resample import Resampler
+
+logger = logging.getLogger('AudioSources')
+
+# Кадров за одно чтение устройства
+DEVICE_BLOCK_FRAMES = 1024
+# Частота, к которой SourceReader приводит поток
+TARGET_SAMPLE_RATE = 16000
+# Масштаб int16 → float [-1, 1)
+INT16_SCALE = 1.0 / 32768
+# Виды источников для create_audio_source (file задаётся как file:<путь>)
+SOURCE_KINDS = ('auto', 'pyaudio', 'sounddevice', 'synthetic', 'file')
+# Признаки loopback-устройства в имени, когда бэкенд не помечает его явно
+LOOPBACK_NAME_HINTS = ('loopback', 'stereo mix', 'what u hear')
+# Вес центра и тыловых каналов при сведении 5.1/7.1 в стерео (-3 дБ, ITU-R BS.775)
+SURROUND_GAIN = 0.7071
+
+
+class AudioSource:
+    """
+    Источник аудио. Описание устройства - словарь в формате pyaudio
+    (index, name, defaultSampleRate, maxInputChannels, isLoopbackDevice).
+    """
+
+    kind = ''
+    # Устройство по умолчанию может смениться на ходу (нужен монитор)
+    hot_swap = False
+
+    def list_devices(self) -> List[dict]:
+        return []
+
+    def fingerprint(self):
+        """
+        Дешёвый отпечаток списка устройств: пока он не изменился,
+        AudioDeviceMonitor не перечитывает устройства целиком.
+        """
+        return tuple((d['index'], d['name']) for d in self.list_devices())
+
+    def local_fingerprint(self):
+        """Отпечаток устройств, которые видит этот процесс; его отдаёт зонд устройств"""
+        return self.fingerprint()
+
+    def rescan(self) -> bool:
+        """Перечитать устройства в этом процессе; False - нельзя, пока открыты потоки"""
+        return True
+
+    def default_device(self, mode: str,
+                       devices: Optional[List[dict]] = None) -> Tuple[Optional[int], Optional[dict]]:
+        """Устройство по умолчанию для режима; devices - уже прочитанный список устройств"""
+        raise NotImplementedError
+
+    def default_output(self, devices: Optional[List[dict]] = None) -> Tuple[Optional[int], Optional[dict]]:
+        """Устройство вывода по умолчанию (его звук слышит loopback)"""
+        return None, None
+
+    def open_stream(self, device_index: int, mode: str):
+        raise NotImplementedError
+
+    def close(self):
+        """Освобождает ресурсы перечисления устройств; открытые потоки не трогает"""
+
+    def probe_stats(self) -> Optional[dict]:
+        """Счётчики зонда устройств; None - источник перечисляет устройства сам"""
+        return None
+
+
+class SourceReader:
+    """Поток источника с приведением к моно TARGET_SAMPLE_RATE в заданном dtype"""
+
+    def __init__(self, stream, device_index: Optional[int] = None,
+                 sample_rate: int = TARGET_SAMPLE_RATE, dtype=np.int16,
+                 block_frames: int = DEVICE_BLOCK_FRAMES):
+        self.stream = stream
+        self.device_index = device_index
+        self.name = stream.name
+        self.block_frames = block_frames
+        # Источник без пауз: писатель должен ждать потребителя, а не терять блоки
+        self.paced = getattr(stream, 'paced', True)
+        self._scale = 1.0 if np.dtype(dtype) == np.int16 else INT16_SCALE
+        # Сведение каналов пишется на месте в один float32 буфер на блок
+        self._mono = np.empty(block_frames, dtype=np.float32)
+        # Фильтр и фаза ресемплера переносятся между блоками устройства
+        self.resampler = Resampler(stream.sample_rate, sample_rate, dtype=dtype)
+
+    def read(self):
+        """
+        Блок моно (до следующего чтения) и monotonic-время его конца.
+        EOFError - источник закончился (файл без повтора).
+        """
+        block = self.stream.read(self.block_frames)
+        t_end = time.monotonic()
+        return self.resampler.process(self.downmix(block)), t_end
+
+    def downmix(self, block: np.ndarray) -> np.ndarray:
+        """
+        Каналы int16 (frames, ch) → моно без промежуточных массивов:
+        сумма каналов сразу в float32 буфер, деление на число каналов
+        и масштаб к [-1, 1) одним умножением на месте. Моно int16 при
+        int16 на выходе идёт в ресемплер как есть.
+        """
+        n, channels = block.shape
+        if channels == 1 and self._scale == 1.0:
+            return block[:, 0]
+        if n > len(self._mono):
+            self._mono = np.empty(n, dtype=np.float32)
+        mono = self._mono[:n]
+        if channels == 1:
+            np.multiply(block[:, 0], np.float32(self._scale), out=mono)
+        else:
+            # Сложение столбцов быстрее свёртки sum(axis=1) по короткой оси
+            np.add(block[:, 0], block[:, 1], out=mono, dtype=np.float32)
+            for c in range(2, channels):
+                np.add(mono, block[:, c], out=mono)
+            mono *= np.float32(self._scale / channels)
+        return mono
+
+    def close(self):
+        try:
+            self.stream.close()
+        except Exception as e:
+            logger.warning(f'Ошибка закрытия устройства {self.name}: {e}')
+
+
+class _Pacer:
+    """Выдерживает темп воспроизведения: speed 1 - реальное время, 0 - без пауз"""
+
+    def __init__(self, sample_rate: int, speed: float):
+        self.sample_rate = sample_rate
+        self.speed = speed
+        self.frames = 0
+        self._start = time.monotonic()
+
+    def advance(self, frames: int):
+        self.frames += frames
+        if self.speed <= 0:
+            return
+        delay = self._start + self.frames / (self.sample_rate * self.speed) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# ---------- PortAudio ----------
+
+# Открытые потоки бэкендов PortAudio: пока они есть, Pa_Terminate закрыл бы их
+_open_streams: Dict[str, int] = {}
+# Открытие потока и переинициализация PortAudio не должны пересекаться
+_streams_lock = threading.Lock()
+
+
+def _stream_opened(kind: str):
+    with _streams_lock:
+        _open_streams[kind] = _open_streams.get(kind, 0) + 1
+
+
+def _stream_closed(kind: str):
+    with _streams_lock:
+        _open_streams[kind] = max(0, _open_streams.get(kind, 0) - 1)
+
+
+def open_stream_count(kind: str) -> int:
+    return _open_streams.get(kind, 0)
+
+
+def device_identity(info: dict) -> tuple:
+    """Устройство в разных перечислениях: индексы PortAudio у процессов различаются"""
+    return info['name'], info.get('hostApi'), bool(info.get('isLoopbackDevice'))
+
+
+class _PortAudioSource(AudioSource):
+    """
+    Общее для бэкендов PortAudio. Процесс видит устройства на момент
+    Pa_Initialize, а переинициализация закрыла бы открытые потоки, поэтому
+    об изменениях сообщает зонд в отдельном процессе (audio.device_probe):
+    на каждом опросе - отпечаток, полный список - когда отпечаток изменился.
+    Устройство по умолчанию из ответа зонда открывается по индексу этого
+    процесса, найденному по имени. Подключённое после открытия потоков
+    устройство процесс увидит после переинициализации, когда потоков не
+    останется.
+    """
+
+    hot_swap = True
+
+    def __init__(self):
+        self._probe: Optional[DeviceProbe] = None
+        # Последний отпечаток зонда; None - зонд не ответил
+        self._probed = None
+        # Список зонда и отпечаток, при котором он получен; None - устройства по умолчанию
+        # берутся у этого процесса
+        self._fresh: Optional[dict] = None
+        self._fresh_fingerprint = None
+        # Устройства из ответа зонда, которых этот процесс ещё не видит
+        self._unresolved = set()
+
+    def _local_devices(self) -> List[dict]:
+        raise NotImplementedError
+
+    def _local_default(self, mode: str, devices: Optional[List[dict]]) -> Tuple[Optional[int], Optional[dict]]:
+        raise NotImplementedError
+
+    def _local_output(self, devices: Optional[List[dict]]) -> Tuple[Optional[int], Optional[dict]]:
+        raise NotImplementedError
+
+    def local_fingerprint(self):
+        """Число устройств и устройства по умолчанию без обхода списка; значения для JSON"""
+        raise NotImplementedError
+
+    def _reinit(self):
+        """Pa_Terminate и Pa_Initialize; вызывается только без открытых потоков"""
+        raise NotImplementedError
+
+    def rescan(self) -> bool:
+        with _streams_lock:
+            if _open_streams.get(self.kind, 0):
+                return False
+            self._reinit()
+            return True
+
+    def fingerprint(self):
+        """Отпечаток свежей инициализации от зонда; PortAudio этого процесса не переинициализируется"""
+        if self._probe is None:
+            self._probe = DeviceProbe(self.kind)
+        self._probed = self._probe.fingerprint()
+        if self._probed is None:
+            # Без зонда изменения видны, только пока нет открытых потоков
+            self._fresh = self._fresh_fingerprint = None
+            self.rescan()
+            return self.local_fingerprint()
+        # Невидимое процессу устройство ищется снова, когда переинициализация станет возможна
+        retry = bool(self._unresolved) and open_stream_count(self.kind) == 0
+        return self._probed, retry
+
+    def list_devices(self) -> List[dict]:
+        if self._probed is not None and self._probed != self._fresh_fingerprint:
+            # Полный список у зонда - только после изменения отпечатка
+            self._fresh = self._probe.scan()
+            self._fresh_fingerprint = self._probed if self._fresh is not None else None
+        devices = self._local_devices()
+        if self._fresh is None:
+            return devices
+        wanted = {device_identity(info) for info in self._fresh['defaults'].values() if info}
+        self._unresolved &= wanted
+        if not wanted <= {device_identity(d) for d in devices} and self.rescan():
+            devices = self._local_devices()
+        return devices
+
+    def default_device(self, mode: str,
+                       devices: Optional[List[dict]] = None) -> Tuple[Optional[int], Optional[dict]]:
+        if devices is None:
+            devices = self.list_devices()
+        if self._fresh is None:
+            return self._local_default(mode, devices)
+        return self._resolve(self._fresh['defaults'].get(mode), devices)
+
+    def default_output(self, devices: Optional[List[dict]] = None) -> Tuple[Optional[int], Optional[dict]]:
+        if devices is None:
+            devices = self.list_devices()
+        if self._fresh is None:
+            return self._local_output(devices)
+        return self._resolve(self._fresh['defaults'].get('output'), devices)
+
+    def _resolve(self, info: Optional[dict],
+                 devices: Optional[List[dict]]) -> Tuple[Optional[int], Optional[dict]]:
+        """Устройство из ответа зонда → индекс и описание в этом процессе"""
+        if info is None:
+            return None, None
+        key = device_identity(info)
+        for local in devices:
+            if device_identity(local) == key:
+                self._unresolved.discard(key)
+                return local['index'], local
+        if key not in self._unresolved:
+            self._unresolved.add(key)
+            logger.warning(f'Устройство "{info["name"]}" подключено после открытия потоков: '
+                           f'захват перейдёт на него, когда потоки закроются')
+        return None, None
+
+    def close(self):
+        """Освобождает ресурсы перечисления устройств и зонд; открытые потоки не трогает"""
+        if self._probe is not None:
+            self._probe.close()
+            self._probe = None
+        self._probed = self._fresh = self._fresh_fingerprint = None
+
+    def probe_stats(self) -> Optional[dict]:
+        return self._probe.get_stats() if self._probe is not None else None
+
+
+# ---------- pyaudiowpatch ----------
+
+def stereo_downmix_matrix(channels: int) -> np.ndarray:
+    """
+    Матрица (channels, 2) сведения многоканального потока в стерео.
+    Порядок каналов WASAPI: FL FR FC LFE BL BR SL SR; у 5.1 и 7.1 центр
+    идёт в обе стороны, LFE отбрасывается, тылы и боковые - в свою сторону.
+    """
+    matrix = np.zeros((channels, 2), dtype=np.float32)
+    matrix[0, 0] = matrix[1, 1] = 1.0
+    rest = range(2, channels)
+    if channels >= 6:
+        matrix[2, :] = SURROUND_GAIN
+        rest = range(4, channels)
+    for c in rest:
+        matrix[c, c % 2] = SURROUND_GAIN
+    return matrix
+
+
+class PyAudioStream:
+    """Блокирующий поток pyaudiowpatch со своим экземпляром PyAudio"""
+
+    paced = True
+
+    def __init__(self, device_index: int, mode: str):
+        import pyaudiowpatch as pyaudio
+
+        _stream_opened(PyAudioSource.kind)
+        try:
+            self._pa = pyaudio.PyAudio()
+        except Exception:
+            _stream_closed(PyAudioSource.kind)
+            raise
+        try:
+            info = self._pa.get_device_info_by_index(device_index)
+            self.name = info['name']
+            self.sample_rate = int(info['defaultSampleRate'])
+            device_channels = int(info['maxInputChannels'])
+            if mode == 'loopback':
+                # Loopback открывается с каналами устройства вывода (5.1/7.1 не откроется как стерео)
+                self._device_channels = device_channels if device_channels > 0 else 2
+            else:
+                self._device_channels = max(1, min(device_channels, 2))
+            self.channels = min(self._device_channels, 2)
+            self._mix = stereo_downmix_matrix(self._device_channels) if self._device_channels > 2 else None
+            self._mixed = np.empty((0, 2), dtype=np.float32)
+            self._stereo = np.empty((0, 2), dtype=np.int16)
+            self._stream = self._pa.open(
+                format=pyaudio.paInt16,
+                channels=self._device_channels,
+                rate=self.sample_rate,
+                input=True,
+                input_device_index=device_index,
+                frames_per_buffer=DEVICE_BLOCK_FRAMES,
+            )
+        except Exception:
+            self._pa.terminate()
+            _stream_closed(PyAudioSource.kind)
+            raise
+
+    def read(self, frames: int) -> np.ndarray:
+        data = self._stream.read(frames, exception_on_overflow=False)
+        block = np.frombuffer(data, dtype=np.int16).reshape(-1, self._device_channels)
+        if self._mix is None:
+            return block
+        return self._downmix(block)
+
+    def _downmix(self, block: np.ndarray) -> np.ndarray:
+        """Многоканальный блок → стерео int16 в переиспользуемых буферах (до следующего чтения)"""
+        n = len(block)
+        if n > len(self._mixed):
+            self._mixed = np.empty((n, 2), dtype=np.float32)
+            self._stereo = np.empty((n, 2), dtype=np.int16)
+        mixed, stereo = self._mixed[:n], self._stereo[:n]
+        np.matmul(block, self._mix, out=mixed)
+        np.clip(mixed, -32768, 32767, out=mixed)
+        np.copyto(stereo, mixed, casting='unsafe')
+        return stereo
+
+    def close(self):
+        try:
+            self._stream.stop_stream()
+            self._stream.close()
+        finally:
+            self._pa.terminate()
+            _stream_closed(PyAudioSource.kind)
+
+
+class PyAudioSource(_PortAudioSource):
+    """Устройства Windows через pyaudiowpatch"""
+
+    kind = 'pyaudio'
+
+    def __init__(self):
+        super().__init__()
+        # Экземпляр для перечисления устройств; потоки открывают свои
+        self._pa = None
+
+    def _pyaudio(self):
+        if self._pa is None:
+            import pyaudiowpatch as pyaudio
+            self._pa = pyaudio.PyAudio()
+        return self._pa
+
+    def _local_devices(self) -> List[dict]:
+        p = self._pyaudio()
+        return [p.get_device_info_by_index(i) for i in range(p.get_device_count())]
+
+    def local_fingerprint(self):
+        """Число устройств и устройства по умолчанию без обхода всего списка"""
+        p = self._pyaudio()
+        return (p.get_device_count(),
+                _device_key(p.get_default_input_device_info),
+                _device_key(p.get_default_output_device_info),
+                _device_key(p.get_default_wasapi_loopback))
+
+    def _reinit(self):
+        # Последний экземпляр PyAudio вызывает настоящий Pa_Terminate, следующий - Pa_Initialize
+        self._terminate()
+
+    def _local_default(self, mode: str,
+                       devices: Optional[List[dict]] = None) -> Tuple[Optional[int], Optional[dict]]:
+        if mode == 'loopback':
+            return self._default_loopback(devices)
+        try:
+            info = self._pyaudio().get_default_input_device_info()
+            return info['index'], info
+        except Exception as e:
+            logger.error(f'Ошибка получения устройства по умолчанию: {e}')
+            return None, None
+
+    def _local_output(self, devices: Optional[List[dict]] = None) -> Tuple[Optional[int], Optional[dict]]:
+        try:
+            info = self._pyaudio().get_default_output_device_info()
+            return info['index'], info
+        except Exception as e:
+            logger.error(f'Ошибка получения устройства вывода: {e}')
+            return None, None
+
+    def _default_loopback(self, devices: Optional[List[dict]] = None) -> Tuple[Optional[int], Optional[dict]]:
+        # Только явные loopback устройства: имена вроде 'Microsoft Sound Mapper - Input'
+        # и 'Default...' - входы MME, то есть микрофон вместо системного звука
+        try:
+            info = self._pyaudio().get_default_wasapi_loopback()
+            return info['index'], info
+        except Exception as e:
+            logger.warning(f'Loopback устройства вывода по умолчанию нет: {e}')
+        try:
+            if devices is None:
+                devices = self._local_devices()
+            for info in devices:
+                if info.get('isLoopbackDevice'):
+                    return info['index'], info
+        except Exception as e:
+            logger.error(f'Ошибка получения loopback устройства: {e}')
+        return None, None
+
+    def open_stream(self, device_index: int, mode: str) -> PyAudioStream:
+        return PyAudioStream(device_index, mode)
+
+    def _terminate(self):
+        if self._pa is not None:
+            self._pa.terminate()
+            self._pa = None
+
+    def close(self):
+        self._terminate()
+        super().close()
+
+
+def _device_key(get_info) -> Optional[Tuple[int, str]]:
+    try:
+        info = get_info()
+    except Exception:
+        # Устройства по умолчанию нет
+        return None
+    return info['index'], info['name']
+
+
+# ---------- sounddevice ----------
+
+class SoundDeviceStream:
+    """Блокирующий InputStream sounddevice в int16"""
+
+    paced = True
+
+    def __init__(self, device_index: int, info: dict):
+        import sounddevice as sd
+
+        self.name = info['name']
+        self.sample_rate = int(info['defaultSampleRate'])
+        self.channels = max(1, min(int(info['maxInputChannels']), 2))
+        # Поток учитывается до открытия: переинициализация не закроет его на полпути
+        _stream_opened(SoundDeviceSource.kind)
+        try:
+            self._stream = sd.InputStream(
+                device=device_index,
+                samplerate=self.sample_rate,
+                channels=self.channels,
+                dtype='int16',
+                blocksize=DEVICE_BLOCK_FRAMES,
+            )
+            self._stream.start()
+        except Exception:
+            _stream_closed(SoundDeviceSource.kind)
+            raise
+
+    def read(self, frames: int) -> np.ndarray:
+        data, overflowed = self._stream.read(frames)
+        if overflowed:
+            logger.warning(f'Переполнение входного буфера {self.name}')
+        return data
+
+    def close(self):
+        try:
+            self._stream.stop()
+        finally:
+            self._stream.close()
+            _stream_closed(SoundDeviceSource.kind)
+
+
+class SoundDeviceSource(_PortAudioSource):
+    """
+    Устройства через sounddevice. Loopback здесь - устройство записи
+    вроде Stereo Mix, найденное по имени.
+    """
+
+    kind = 'sounddevice'
+
+    def _local_devices(self) -> List[dict]:
+        import sounddevice as sd
+        return [_sounddevice_info(i, dev) for i, dev in enumerate(sd.query_devices())]
+
+    def local_fingerprint(self):
+        """Число устройств и устройства по умолчанию без обхода всего списка"""
+        import sounddevice as sd
+        # query_devices() собрал бы описания всех устройств; Pa_GetDeviceCount - только число
+        defaults = [(index, sd.query_devices(index)['name']) if index is not None and index >= 0 else None
+                    for index in sd.default.device]
+        return sd._lib.Pa_GetDeviceCount(), defaults
+
+    def _reinit(self):
+        import sounddevice as sd
+        # Способ из FAQ sounddevice; его _initialized не учитывает открытые потоки
+        sd._terminate()
+        sd._initialize()
+
+    def _local_default(self, mode: str,
+                       devices: Optional[List[dict]] = None) -> Tuple[Optional[int], Optional[dict]]:
+        try:
+            if devices is None:
+                devices = self._local_devices()
+            if mode == 'loopback':
+                for info in devices:
+                    if info['isLoopbackDevice']:
+                        return info['index'], info
+                logger.warning('Loopback устройство не найдено, использую устройство ввода по умолчанию')
+            import sounddevice as sd
+            index = sd.default.device[0]
+            if index is None or index < 0:
+                return None, None
+            return index, devices[index]
+        except Exception as e:
+            logger.error(f'Ошибка получения устройства по умолчанию: {e}')
+            return None, None
+
+    def _local_output(self, devices: Optional[List[dict]] = None) -> Tuple[Optional[int], Optional[dict]]:
+        try:
+            import sounddevice as sd
+            index = sd.default.device[1]
+            if index is None or index < 0:
+                return None, None
+            return index, (devices or self._local_devices())[index]
+        except Exception as e:
+            logger.error(f'Ошибка получения устройства вывода: {e}')
+            return None, None
+
+    def open_stream(self, device_index: int, mode: str) -> SoundDeviceStream:
+        return SoundDeviceStream(device_index, self._local_devices()[device_index])
+
+
+def _sounddevice_info(index: int, device: dict) -> dict:
+    name = device['name']
+    return {
+        'index': index,
+        'name': name,
+        'defaultSampleRate': float(device['default_samplerate']),
+        'maxInputChannels': device['max_input_channels'],
+        'maxOutputChannels': device['max_output_channels'],
+        'isLoopbackDevice': any(hint in name.lower() for hint in LOOPBACK_NAME_HINTS),
+    }
+
+
+# ---------- файл ----------
+
+class FileStream:
+    """Воспроизведение файла блоками int16 в темпе speed"""
+
+    def __init__(self, name: str, audio: np.ndarray, sample_rate: int,
+                 speed: float = 1.0, loop: bool = False):
+        self.name = name
+        self.sample_rate = sample_rate
+        self.channels = audio.shape[1]
+        self.paced = speed > 0
+        self.loop = loop
+        self.closed = False
+        self._audio = audio
+        self._pos = 0
+        self._pacer = _Pacer(sample_rate, speed)
+
+    def read(self, frames: int) -> np.ndarray:
+        if self.closed:
+            raise OSError(f'Поток {self.name} закрыт')
+        if self._pos >= len(self._audio):
+            if not self.loop or not len(self._audio):
+                raise EOFError(f'Файл {self.name} закончился')
+            self._pos = 0
+        block = self._audio[self._pos:self._pos + frames]
+        self._pos += len(block)
+        self._pacer.advance(len(block))
+        return block
+
+    def close(self):
+        self.closed = True
+
+
+class FileSource(AudioSource):
+    """
+    Одно «устройство» - аудиофайл. WAV PCM читается модулем wave,
+    остальное (FLAC и др.) - через PyAV из faster-whisper.
+    """
+
+    kind = 'file'
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = False):
+        self.path = str(path)
+        self.speed = speed
+        self.loop = loop
+        self._audio = None
+        self._sample_rate = None
+
+    def _load(self):
+        if self._audio is None:
+            self._audio, self._sample_rate = load_audio_file(self.path)
+        return self._audio, self._sample_rate
+
+    def list_devices(self) -> List[dict]:
+        audio, sample_rate = self._load()
+        return [{
+            'index': 0,
+            'name': self.path,
+            'defaultSampleRate': float(sample_rate),
+            'maxInputChannels': audio.shape[1],
+            'isLoopbackDevice': False,
+        }]
+
+    def default_device(self, mode: str,
+                       devices: Optional[List[dict]] = None) -> Tuple[Optional[int], Optional[dict]]:
+        info = self.list_devices()[0]
+        return 0, info
+
+    def open_stream(self, device_index: int, mode: str) -> FileStream:
+        audio, sample_rate = self._load()
+        return FileStream(self.path, audio, sample_rate, self.speed, self.loop)
+
+
+def load_audio_file(path: str) -> Tuple[np.ndarray, int]:
+    """int16 формы (frames, channels) и частота файла"""
+    if path.lower().endswith('.wav'):
+        try:
+            return _load_wav(path)
+        except (wave.Error, ValueError):
+            pass  # float WAV и прочее читает PyAV
+    from faster_whisper.audio import decode_audio
+    audio = decode_audio(path, sampling_rate=TARGET_SAMPLE_RATE)
+    pcm = np.clip(np.round(audio * 32767), -32768, 32767).astype(np.int16)
+    return pcm.reshape(-1, 1), TARGET_SAMPLE_RATE
+
+
+def _load_wav(path: str) -> Tuple[np.ndarray, int]:
+    with wave.open(path, 'rb') as f:
+        channels = f.getnchannels()
+        width = f.getsampwidth()
+        rate = f.getframerate()
+        raw = f.readframes(f.getnframes())
+
+    if width == 2:
+        audio = np.frombuffer(raw, dtype='<i2')
+    elif width == 4:
+        audio = (np.frombuffer(raw, dtype='<i4') >> 16).astype(np.int16)
+    else:
+        raise ValueError(f'Неподдерживаемая разрядность WAV: {width * 8} бит')
+    return audio.reshape(-1, channels), rate
+
+
+# ---------- синтетический сигнал ----------
+
+@dataclass
+class SyntheticDevice:
+    """
+    Виртуальное устройство: параметры потока и сигнал.
+    signal: 'sine', 'noise' (белый шум с амплитудой amplitude) или 'silence'.
+    """
+    name: str
+    sample_rate: int = 48000
+    channels: int = 2
+    frequency: float = 440.0
+    amplitude: float = 0.3
+    signal: str = 'sine'
+
+
+class SyntheticStream:
+    """
+    Поток виртуального устройства. Время сигнала начинается с
+    time.monotonic() при открытии и идёт вместе со сэмплами, поэтому
+    у двух устройств с одной частотой синус в реальном темпе совпадает
+    по фазе в одни и те же моменты.
+    """
+
+    def __init__(self, device: SyntheticDevice, speed: float = 1.0):
+        self.device = device
+        self.name = device.name
+        self.sample_rate = device.sample_rate
+        self.channels = device.channels
+        self.paced = speed > 0
+        self.closed = False
+        self.blocks_read = 0
+        self._t = time.monotonic()
+        self._pacer = _Pacer(device.sample_rate, speed)
+        self._rng = np.random.default_rng()
+
+    def read(self, frames: int) -> np.ndarray:
+        if self.closed:
+            raise OSError(f'Поток {self.name} закрыт')
+        self._pacer.advance(frames)
+        t = self._t + np.arange(frames) / self.sample_rate
+        self._t += frames / self.sample_rate
+        device = self.device
+        if device.signal == 'noise':
+            wave_ = self._rng.uniform(-device.amplitude, device.amplitude, frames)
+        elif device.signal == 'silence':
+            wave_ = np.zeros(frames)
+        else:
+            wave_ = device.amplitude * np.sin(2 * np.pi * device.frequency * t)
+        block = np.round(wave_ * 32767).astype(np.int16)
+        self.blocks_read += 1
+        return np.repeat(block[:, None], self.channels, axis=1)
+
+    def close(self):
+        self.closed = True
+
+
+class SyntheticSource(AudioSource):
+    """
+    Набор виртуальных устройств для тестов и нагрузочных прогонов без
+    звуковой карты.
+
+    set_default() имитирует подключение гарнитуры: устройство по
+    умолчанию меняется, а open_delay - время открытия потока драйвером.
+    """
+
+    kind = 'synthetic'
+
+    def __init__(self, devices: Optional[Dict[int, SyntheticDevice]] = None,
+                 default: int = 0, open_delay: float = 0.0, speed: float = 1.0):
+        self.devices = devices or {0: SyntheticDevice('Synthetic Speakers')}
+        self.default = default
+        self.open_delay = open_delay
+        self.speed = speed
+        self.opened = []
+
+    def set_default(self, device_index: int):
+        if device_index not in self.devices:
+            raise ValueError(f'Нет виртуального устройства {device_index}')
+        self.default = device_index
+
+    def list_devices(self) -> List[dict]:
+        return [self._info(index, 'loopback') for index in self.devices]
+
+    def fingerprint(self):
+        return tuple((index, d.name) for index, d in self.devices.items()), self.default
+
+    def _info(self, index: int, mode: str) -> dict:
+        device = self.devices[index]
+        return {
+            'index': index,
+            'name': device.name,
+            'defaultSampleRate': float(device.sample_rate),
+            'maxInputChannels': device.channels,
+            'isLoopbackDevice': mode == 'loopback',
+        }
+
+    def default_device(self, mode: str,
+                       devices: Optional[List[dict]] = None) -> Tuple[Optional[int], Optional[dict]]:
+        if self.default not in self.devices:
+            return None, None
+        return self.default, self._info(self.default, mode)
+
+    def open_stream(self, device_index: int, mode: str) -> SyntheticStream:
+        if self.open_delay:
+            time.sleep(self.open_delay)
+        device = self.devices.get(device_index)
+        if device is None:
+            raise OSError(f'Нет виртуального устройства {device_index}')
+        stream = SyntheticStream(device, self.speed)
+        self.opened.append(stream)
+        return stream
+
+
+def create_audio_source(spec: str = 'auto', speed: float = 1.0, loop: bool = False) -> AudioSource:
+    """
+    Источник по описанию из командной строки:
+    auto | pyaudio | sounddevice | synthetic | file:<путь к WAV/FLAC>.
+
+    auto - pyaudiowpatch, если установлен, иначе sounddevice.
+    speed и loop относятся к файлу и синтетике (speed 0 - без пауз).
+    """
+    kind, _, arg = spec.partition(':')
+    if kind == 'auto':
+        if importlib.util.find_spec('pyaudiowpatch') is not None:
+            return PyAudioSource()
+        if importlib.util.find_spec('sounddevice') is not None:
+            return SoundDeviceSource()
+        raise RuntimeError('Нет бэкенда аудиоустройств: установите pyaudiowpatch или sounddevice '
+                           'либо используйте источник file:<путь> или synthetic')
+    if kind == 'pyaudio':
+        return PyAudioSource()
+    if kind == 'sounddevice':
+        return SoundDeviceSource()
+    if kind == 'synthetic':
+        return SyntheticSource(speed=speed)
+    if kind == 'file' and arg:
+        return FileSource(arg, speed=speed, loop=loop)
+    raise ValueError(f'Неизвестный источник аудио: {spec} '
+                     f'(ожидается auto, pyaudio, sounddevice, synthetic или file:<путь>)')
@@ -7,16 +7,24 @@ Audio Capture - Захват аудио через WASAPI
 Использование:
   python audio_capture.py --mode=loopback
   python audio_capture.py --mode=microphone --device-index=1
+  python audio_capture.py --mode=loopback --transport=shm
+  python audio_capture.py --source=file:interview.wav --source-speed=0
+
+Устройства и файлы открываются через источники python/audio/sources.py.
+Транспорт stdout - сырые float32 в pipe (по умолчанию), shm - кольцо
+в разделяемой памяти для процесса STT (см. python/audio/shm.py).
 """
 
 import sys
 import time
 import logging
 import argparse
-from threading import Thread, Event
 
 import numpy as np
 
+from audio.shm import SharedAudioWriter, default_shm_name, SHM_RING_SECONDS
+from audio.sources import AudioSource, SoundDeviceSource, SourceReader, create_audio_source
+
 # Настройка логирования в stderr (stdout используется для данных)
 logging.basicConfig(
     level=logging.INFO,
@@ -41,342 +49,148 @@ def parse_args():
                         help='Индекс устройства (для microphone режима)')
     parser.add_argument('--list-devices', action='store_true',
                         help='Показать список устройств и выйти')
+    parser.add_argument('--transport', choices=['stdout', 'shm'], default='stdout',
+                        help='Куда отдавать аудио: pipe stdout или кольцо в разделяемой памяти')
+    parser.add_argument('--shm-name', default=None,
+                        help='Имя сегмента разделяемой памяти (по умолчанию live_hints_<mode>)')
+    parser.add_argument('--shm-seconds', type=float, default=SHM_RING_SECONDS,
+                        help='Ёмкость кольца в секундах')
+    parser.add_argument('--source', default='auto',
+                        help='Источник: auto, pyaudio, sounddevice, synthetic или file:<путь к WAV/FLAC>')
+    parser.add_argument('--source-speed', type=float, default=1.0,
+                        help='Темп файла и синтетики: 1 - реальное время, 0 - без пауз')
+    parser.add_argument('--loop', action='store_true',
+                        help='Повторять файл по кругу')
     return parser.parse_args()
 
 
-def capture_wasapi_loopback():
-    """
-    Захват системного аудио через WASAPI loopback
-    Использует pyaudiowpatch для Windows
-    """
-    try:
-        import pyaudiowpatch as pyaudio
-    except ImportError:
-        logger.error('pyaudiowpatch не установлен. Установите: pip install pyaudiowpatch')
-        sys.exit(1)
-    
-    p = pyaudio.PyAudio()
+class StdoutOutput:
+    """Сырые float32 без префикса длины в stdout"""
     
-    # Ищем loopback устройство
-    wasapi_info = None
-    for i in range(p.get_device_count()):
-        device_info = p.get_device_info_by_index(i)
-        if device_info.get('isLoopbackDevice', False):
-            wasapi_info = device_info
-            break
-    
-    if wasapi_info is None:
-        # Пробуем найти default loopback
+    def write(self, audio_data: np.ndarray) -> bool:
+        """False - потребитель закрыл pipe"""
         try:
-            wasapi_info = p.get_default_wasapi_loopback()
-        except Exception as e:
-            logger.error(f'Не удалось найти loopback устройство: {e}')
-            # Пробуем использовать стандартный output как loopback
-            try:
-                default_speakers = p.get_default_output_device_info()
-                wasapi_info = p.get_device_info_by_index(default_speakers['index'])
-                wasapi_info['isLoopbackDevice'] = True
-            except Exception as e2:
-                logger.error(f'Не удалось получить устройство вывода: {e2}')
-                p.terminate()
-                sys.exit(1)
-    
-    logger.info(f'Используем устройство: {wasapi_info["name"]}')
-    logger.info(f'Частота: {wasapi_info["defaultSampleRate"]} Hz, Каналы: {wasapi_info["maxInputChannels"]}')
-    
-    # Открываем поток
-    device_sample_rate = int(wasapi_info['defaultSampleRate'])
-    device_channels = int(wasapi_info['maxInputChannels'])
+            sys.stdout.buffer.write(audio_data.tobytes())
+            sys.stdout.buffer.flush()
+        except BrokenPipeError:
+            return False
+        return True
     
-    if device_channels < 1:
-        device_channels = 2  # Стерео по умолчанию
+    def close(self):
+        pass
+
+
+class SharedMemoryOutput:
+    """Кольцо в разделяемой памяти: запись без системного вызова, с временем захвата"""
     
-    stop_event = Event()
+    def __init__(self, name: str, seconds: float = SHM_RING_SECONDS):
+        self.writer = SharedAudioWriter(name, SAMPLE_RATE, seconds)
+        logger.info(f'Аудио пишется в разделяемую память: {name} ({seconds:g} с)')
     
-    def audio_callback(in_data, frame_count, time_info, status):
-        """Callback для обработки аудио"""
-        if status:
-            logger.warning(f'Статус: {status}')
-        
-        if in_data:
-            # Конвертируем в numpy
-            audio_data = np.frombuffer(in_data, dtype=np.float32)
-            
-            # Если стерео - конвертируем в моно
-            if device_channels > 1:
-                audio_data = audio_data.reshape(-1, device_channels)
-                audio_data = np.mean(audio_data, axis=1)
-            
-            # Ресемплинг если нужно
-            if device_sample_rate != SAMPLE_RATE:
-                # Простой ресемплинг через интерполяцию
-                ratio = SAMPLE_RATE / device_sample_rate
-                new_length = int(len(audio_data) * ratio)
-                indices = np.linspace(0, len(audio_data) - 1, new_length)
-                audio_data = np.interp(indices, np.arange(len(audio_data)), audio_data)
-            
-            # Конвертируем в float32 и отправляем в stdout
-            audio_data = audio_data.astype(np.float32)
-            
-            # Пишем только данные (без префикса длины)
-            data_bytes = audio_data.tobytes()
-            
-            try:
-                sys.stdout.buffer.write(data_bytes)
-                sys.stdout.buffer.flush()
-            except BrokenPipeError:
-                stop_event.set()
-                return (None, pyaudio.paComplete)
-        
-        return (None, pyaudio.paContinue)
+    def write(self, audio_data: np.ndarray) -> bool:
+        # Читатель отстал - хвост отбрасывается и считается в заголовке кольца
+        self.writer.write(audio_data, time.time())
+        return True
     
-    try:
-        stream = p.open(
-            format=pyaudio.paFloat32,
-            channels=device_channels,
-            rate=device_sample_rate,
-            input=True,
-            input_device_index=wasapi_info['index'],
-            frames_per_buffer=CHUNK_SIZE,
-            stream_callback=audio_callback
-        )
-        
-        logger.info('Начинаю захват аудио...')
-        stream.start_stream()
-        
-        # Ждём пока поток активен
-        while stream.is_active() and not stop_event.is_set():
-            time.sleep(0.1)
-        
-    except Exception as e:
-        logger.error(f'Ошибка при захвате: {e}')
-    finally:
-        if 'stream' in locals():
-            stream.stop_stream()
-            stream.close()
-        p.terminate()
-        logger.info('Захват аудио остановлен')
+    def close(self):
+        self.writer.close()
+
 
+def create_output(args):
+    if args.transport == 'shm':
+        return SharedMemoryOutput(args.shm_name or default_shm_name(args.mode), args.shm_seconds)
+    return StdoutOutput()
 
-def capture_microphone(device_index=None):
+
+def capture(output, source: AudioSource, mode='loopback', device_index=None):
     """
-    Захват аудио с микрофона через pyaudiowpatch
+    Захват из источника до закрытия потребителя или конца файла.
+    Ошибки открытия устройства пробрасываются: main решает про fallback.
     """
-    try:
-        import pyaudiowpatch as pyaudio
-    except ImportError:
-        logger.error('pyaudiowpatch не установлен')
-        sys.exit(1)
-    
-    p = pyaudio.PyAudio()
-    
-    # Определяем устройство
-    if device_index is not None:
-        try:
-            mic_info = p.get_device_info_by_index(device_index)
-            logger.info(f'Используем указанный микрофон: {mic_info["name"]}')
-        except Exception as e:
-            logger.error(f'Устройство с индексом {device_index} не найдено: {e}')
-            p.terminate()
-            sys.exit(1)
-    else:
-        # Ищем default input device
-        try:
-            mic_info = p.get_default_input_device_info()
-            logger.info(f'Используем микрофон по умолчанию: {mic_info["name"]}')
-        except Exception as e:
-            logger.error(f'Не удалось найти микрофон: {e}')
-            p.terminate()
-            sys.exit(1)
-    
-    logger.info(f'Частота: {mic_info["defaultSampleRate"]} Hz, Каналы: {mic_info["maxInputChannels"]}')
-    
-    device_sample_rate = int(mic_info['defaultSampleRate'])
-    device_channels = int(mic_info['maxInputChannels'])
-    
-    if device_channels < 1:
-        device_channels = 1
-    
-    stop_event = Event()
-    
-    def audio_callback(in_data, frame_count, time_info, status):
-        if status:
-            logger.warning(f'Статус: {status}')
-        
-        if in_data:
-            audio_data = np.frombuffer(in_data, dtype=np.float32)
-            
-            # Если стерео - конвертируем в моно
-            if device_channels > 1:
-                audio_data = audio_data.reshape(-1, device_channels)
-                audio_data = np.mean(audio_data, axis=1)
-            
-            # Ресемплинг если нужно
-            if device_sample_rate != SAMPLE_RATE:
-                ratio = SAMPLE_RATE / device_sample_rate
-                new_length = int(len(audio_data) * ratio)
-                indices = np.linspace(0, len(audio_data) - 1, new_length)
-                audio_data = np.interp(indices, np.arange(len(audio_data)), audio_data)
-            
-            audio_data = audio_data.astype(np.float32)
-            data_bytes = audio_data.tobytes()
-            
-            try:
-                sys.stdout.buffer.write(data_bytes)
-                sys.stdout.buffer.flush()
-            except BrokenPipeError:
-                stop_event.set()
-                return (None, pyaudio.paComplete)
-        
-        return (None, pyaudio.paContinue)
+    if device_index is None:
+        device_index, device_info = source.default_device(mode)
+        if device_index is None:
+            raise RuntimeError(f'Устройство для режима {mode} не найдено')
+    
+    reader = SourceReader(source.open_stream(device_index, mode), device_index,
+                          SAMPLE_RATE, DTYPE, CHUNK_SIZE)
+    stream = reader.stream
+    logger.info(f'Используем устройство: {reader.name} ({source.kind})')
+    logger.info(f'Частота: {stream.sample_rate} Hz, Каналы: {stream.channels}')
+    logger.info(f'Начинаю захват аудио ({mode})...')
     
     try:
-        stream = p.open(
-            format=pyaudio.paFloat32,
-            channels=device_channels,
-            rate=device_sample_rate,
-            input=True,
-            input_device_index=mic_info['index'],
-            frames_per_buffer=CHUNK_SIZE,
-            stream_callback=audio_callback
-        )
-        
-        logger.info('Начинаю захват с микрофона...')
-        stream.start_stream()
-        
-        while stream.is_active() and not stop_event.is_set():
-            time.sleep(0.1)
-        
-    except Exception as e:
-        logger.error(f'Ошибка при захвате микрофона: {e}')
+        while True:
+            try:
+                audio_data, _ = reader.read()
+            except EOFError:
+                logger.info('Источник закончился')
+                break
+            if not output.write(audio_data):
+                break
     finally:
-        if 'stream' in locals():
-            stream.stop_stream()
-            stream.close()
-        p.terminate()
-        logger.info('Захват микрофона остановлен')
+        reader.close()
+        logger.info('Захват аудио остановлен')
 
 
-def list_audio_devices():
+def list_audio_devices(source: AudioSource):
     """Вывод списка аудио устройств"""
-    try:
-        import pyaudiowpatch as pyaudio
-    except ImportError:
-        logger.error('pyaudiowpatch не установлен')
-        sys.exit(1)
-    
-    p = pyaudio.PyAudio()
+    devices = source.list_devices()
     
     print('\n=== АУДИО УСТРОЙСТВА ===\n', file=sys.stderr)
     print('INPUT (микрофоны):', file=sys.stderr)
     print('-' * 50, file=sys.stderr)
     
-    for i in range(p.get_device_count()):
-        info = p.get_device_info_by_index(i)
+    for info in devices:
         if info['maxInputChannels'] > 0:
-            is_loopback = info.get('isLoopbackDevice', False)
-            marker = ' [LOOPBACK]' if is_loopback else ''
-            print(f"  [{i}] {info['name']}{marker}", file=sys.stderr)
+            marker = ' [LOOPBACK]' if info.get('isLoopbackDevice', False) else ''
+            print(f"  [{info['index']}] {info['name']}{marker}", file=sys.stderr)
             print(f"      Каналы: {info['maxInputChannels']}, Частота: {info['defaultSampleRate']} Hz", file=sys.stderr)
     
     print('\nOUTPUT (динамики):', file=sys.stderr)
     print('-' * 50, file=sys.stderr)
     
-    for i in range(p.get_device_count()):
-        info = p.get_device_info_by_index(i)
-        if info['maxOutputChannels'] > 0:
-            print(f"  [{i}] {info['name']}", file=sys.stderr)
-    
-    p.terminate()
-
-
-def capture_fallback(mode='loopback', device_index=None):
-    """
-    Fallback метод захвата через sounddevice
-    """
-    try:
-        import sounddevice as sd
-    except ImportError:
-        logger.error('sounddevice не установлен')
-        sys.exit(1)
-    
-    logger.info(f'Использую fallback метод через sounddevice (mode={mode})')
-    
-    if mode == 'loopback':
-        # Ищем loopback устройство
-        devices = sd.query_devices()
-        target_device = None
-        
-        for i, device in enumerate(devices):
-            name = device['name'].lower()
-            if 'loopback' in name or 'stereo mix' in name or 'what u hear' in name:
-                target_device = i
-                break
-        
-        if target_device is None:
-            logger.warning('Loopback устройство не найдено, использую default input')
-            target_device = sd.default.device[0]
-    else:
-        # Микрофон
-        target_device = device_index if device_index is not None else sd.default.device[0]
-    
-    device_info = sd.query_devices(target_device)
-    logger.info(f'Используем устройство: {device_info["name"]}')
-    
-    def callback(indata, frames, time_info, status):
-        if status:
-            logger.warning(f'Статус: {status}')
-        
-        audio_data = indata[:, 0] if indata.ndim > 1 else indata.flatten()
-        audio_data = audio_data.astype(np.float32)
-        
-        data_bytes = audio_data.tobytes()
-        
-        try:
-            sys.stdout.buffer.write(data_bytes)
-            sys.stdout.buffer.flush()
-        except BrokenPipeError:
-            raise sd.CallbackAbort()
-    
-    try:
-        with sd.InputStream(
-            device=target_device,
-            samplerate=SAMPLE_RATE,
-            channels=1,
-            dtype='float32',
-            blocksize=CHUNK_SIZE,
-            callback=callback
-        ):
-            logger.info(f'Начинаю захват аудио (fallback, {mode})...')
-            while True:
-                time.sleep(0.1)
-    except Exception as e:
-        logger.error(f'Ошибка: {e}')
+    for info in devices:
+        if info.get('maxOutputChannels', 0) > 0:
+            print(f"  [{info['index']}] {info['name']}", file=sys.stderr)
 
 
 def main():
     """Главная функция с поддержкой режимов"""
     args = parse_args()
+    try:
+        source = create_audio_source(args.source, speed=args.source_speed, loop=args.loop)
+    except (RuntimeError, ValueError) as e:
+        logger.error(str(e))
+        sys.exit(1)
     
     # Список устройств
     if args.list_devices:
-        list_audio_devices()
+        list_audio_devices(source)
         sys.exit(0)
     
     mode = args.mode
     device_index = args.device_index
     
-    logger.info(f'Запуск захвата аудио (mode={mode}, device={device_index})...')
+    logger.info(f'Запуск захвата аудио (mode={mode}, device={device_index}, '
+                f'source={source.kind}, transport={args.transport})...')
+    output = create_output(args)
     
     try:
-        if mode == 'loopback':
-            capture_wasapi_loopback()
-        else:
-            capture_microphone(device_index)
+        try:
+            capture(output, source, mode, device_index)
+        except Exception as e:
+            # Fallback только при автовыборе: явно заданный источник не подменяется
+            if args.source != 'auto' or source.kind == 'sounddevice':
+                raise
+            logger.warning(f'WASAPI недоступен: {e}')
+            logger.info('Переключаюсь на fallback метод через sounddevice...')
+            capture(output, SoundDeviceSource(), mode, device_index)
     except Exception as e:
-        logger.warning(f'WASAPI недоступен: {e}')
-        logger.info('Переключаюсь на fallback метод...')
-        capture_fallback(mode, device_index)
+        logger.error(f'Ошибка при захвате: {e}')
+    finally:
+        output.close()
+        source.close()
 
 
 if __name__ == '__main__':
@@ -1,124 +1,102 @@
 """
 Автоматическое определение режима аудио (loopback/microphone)
+
+Решение принимается по снимку устройств AudioDeviceMonitor: тот же
+снимок потом использует захват, поэтому своего PyAudio здесь нет.
 """
 
 import logging
-import sys
+from typing import Optional
 
-try:
-    import pyaudiowpatch as pyaudio
-except ImportError:
-    logging.error('pyaudiowpatch не установлен')
-    sys.exit(1)
+from device_monitor import AudioDeviceMonitor, DeviceSnapshot, get_device_monitor
 
 logger = logging.getLogger('AudioModeDetector')
 
 
-def get_audio_mode() -> str:
+def _snapshot(monitor: Optional[AudioDeviceMonitor]) -> Optional[DeviceSnapshot]:
+    try:
+        return (monitor or get_device_monitor()).snapshot()
+    except Exception as e:
+        logger.warning(f'Аудиоустройства недоступны: {e}')
+        return None
+
+
+def get_audio_mode(monitor: Optional[AudioDeviceMonitor] = None) -> str:
     """
     Определяет режим аудио на основе активного устройства
     Returns:
         'loopback' - если активно системное устройство (WASAPI Loopback)
         'microphone' - если активно микрофонное устройство
     """
-    try:
-        p = pyaudio.PyAudio()
-        
-        # Получаем информацию об устройстве по умолчанию
-        try:
-            # Проверяем устройство вывода по умолчанию (для loopback)
-            default_output = p.get_default_output_device_info()
-            logger.info(f'Default output device: {default_output["name"]}')
-            
-            # Ищем WASAPI loopback для этого устройства
-            for i in range(p.get_device_count()):
-                info = p.get_device_info_by_index(i)
-                
-                # WASAPI loopback устройства обычно содержат имя устройства вывода
-                if (info.get('isLoopbackDevice', False) and 
-                    default_output['name'] in info['name']):
-                    
-                    logger.info(f'Found loopback device: {info["name"]}')
-                    p.terminate()
-                    return 'loopback'
-            
-            # Если loopback не найден, проверяем микрофон по умолчанию
-            default_input = p.get_default_input_device_info()
-            logger.info(f'Default input device: {default_input["name"]}')
-            
-            # Если устройство ввода - это не loopback, используем микрофон
-            if not default_input.get('isLoopbackDevice', False):
-                logger.info('Using microphone mode')
-                p.terminate()
-                return 'microphone'
-                
-        except Exception as e:
-            logger.error(f'Error getting default device: {e}')
-        
-        # Fallback - проверяем первое доступное устройство
-        for i in range(p.get_device_count()):
-            info = p.get_device_info_by_index(i)
-            if info.get('isLoopbackDevice', False):
-                logger.info(f'Fallback: found loopback device {info["name"]}')
-                p.terminate()
+    snapshot = _snapshot(monitor)
+    if snapshot is None:
+        return 'loopback'  # Безопасный режим по умолчанию
+    
+    default_output = snapshot.default('output')[1]
+    if default_output:
+        logger.info(f'Default output device: {default_output["name"]}')
+        # WASAPI loopback устройства обычно содержат имя устройства вывода
+        for info in snapshot.devices:
+            if info.get('isLoopbackDevice', False) and default_output['name'] in info['name']:
+                logger.info(f'Found loopback device: {info["name"]}')
                 return 'loopback'
-            elif info['maxInputChannels'] > 0:
-                logger.info(f'Fallback: found microphone {info["name"]}')
-                p.terminate()
-                return 'microphone'
-        
-        p.terminate()
-        logger.warning('No audio devices found, defaulting to loopback')
-        return 'loopback'
         
-    except Exception as e:
-        logger.error(f'Error detecting audio mode: {e}')
-        return 'loopback'  # Безопасный режим по умолчанию
+        # Если loopback не найден, проверяем микрофон по умолчанию
+        default_input = snapshot.default('microphone')[1]
+        if default_input and not default_input.get('isLoopbackDevice', False):
+            logger.info(f'Default input device: {default_input["name"]}')
+            logger.info('Using microphone mode')
+            return 'microphone'
+    
+    # Fallback - проверяем первое доступное устройство
+    for info in snapshot.devices:
+        if info.get('isLoopbackDevice', False):
+            logger.info(f'Fallback: found loopback device {info["name"]}')
+            return 'loopback'
+        elif info['maxInputChannels'] > 0:
+            logger.info(f'Fallback: found microphone {info["name"]}')
+            return 'microphone'
+    
+    logger.warning('No audio devices found, defaulting to loopback')
+    return 'loopback'
 
 
-def list_audio_devices():
+def list_audio_devices(monitor: Optional[AudioDeviceMonitor] = None):
     """Выводит список всех аудиоустройств с их типами"""
-    try:
-        p = pyaudio.PyAudio()
-        
-        print("\n=== АУДИОУСТРОЙСТВА ===")
-        print("\nLoopback устройства (системный звук):")
-        print("-" * 50)
-        
-        loopback_devices = []
-        mic_devices = []
-        
-        for i in range(p.get_device_count()):
-            info = p.get_device_info_by_index(i)
-            
-            if info.get('isLoopbackDevice', False):
-                loopback_devices.append((i, info))
-                print(f"  [{i}] {info['name']}")
-                print(f"      Каналов: {info['maxInputChannels']}, Частота: {info['defaultSampleRate']}")
-            elif info['maxInputChannels'] > 0:
-                mic_devices.append((i, info))
-        
-        print("\nМикрофоны:")
-        print("-" * 50)
-        for i, info in mic_devices:
+    snapshot = _snapshot(monitor)
+    if snapshot is None:
+        return [], []
+    
+    print("\n=== АУДИОУСТРОЙСТВА ===")
+    print("\nLoopback устройства (системный звук):")
+    print("-" * 50)
+    
+    loopback_devices = []
+    mic_devices = []
+    
+    for info in snapshot.devices:
+        i = info['index']
+        if info.get('isLoopbackDevice', False):
+            loopback_devices.append((i, info))
             print(f"  [{i}] {info['name']}")
             print(f"      Каналов: {info['maxInputChannels']}, Частота: {info['defaultSampleRate']}")
-        
-        print("\nУстройства вывода:")
-        print("-" * 50)
-        for i in range(p.get_device_count()):
-            info = p.get_device_info_by_index(i)
-            if info['maxOutputChannels'] > 0:
-                print(f"  [{i}] {info['name']}")
-                print(f"      Каналов: {info['maxOutputChannels']}, Частота: {info['defaultSampleRate']}")
-        
-        p.terminate()
-        
-        return loopback_devices, mic_devices
-        
-    except Exception as e:
-        logger.error(f'Error listing devices: {e}')
-        return [], []
+        elif info['maxInputChannels'] > 0:
+            mic_devices.append((i, info))
+    
+    print("\nМикрофоны:")
+    print("-" * 50)
+    for i, info in mic_devices:
+        print(f"  [{i}] {info['name']}")
+        print(f"      Каналов: {info['maxInputChannels']}, Частота: {info['defaultSampleRate']}")
+    
+    print("\nУстройства вывода:")
+    print("-" * 50)
+    for info in snapshot.devices:
+        if info.get('maxOutputChannels', 0) > 0:
+            print(f"  [{info['index']}] {info['name']}")
+            print(f"      Каналов: {info['maxOutputChannels']}, Частота: {info['defaultSampleRate']}")
+    
+    return loopback_devices, mic_devices
 
 
 if __name__ == '__main__':
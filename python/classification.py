@@ -52,82 +52,67 @@ def get_temperature_for_type(question_type: str) -> float:
     }.get(question_type, 0.7)
 
 
-def build_contextual_prompt(question_type: str, user_context: str, profile: str = 'job_interview_ru') -> str:
+# Профили, у которых системный промпт не зависит от типа вопроса
+STATIC_PROFILES = ('business_meeting', 'daily_sync', 'presentation', 'custom')
+
+
+def _split_resume(user_context: str) -> tuple:
+    """Резюме и вакансия из объединённого контекста"""
+    if '## Вакансия:' in user_context:
+        resume_part, vacancy_part = user_context.split('## Вакансия:', 1)
+        return resume_part.strip(), vacancy_part.strip()
+    return user_context, ''
+
+
+def build_profile_prefix(user_context: str, profile: str = 'job_interview_ru') -> str:
     """
-    Строит развёрнутый промпт в зависимости от типа вопроса и профиля.
-    Для собеседований использует STAR формат, для других - системный промпт из профиля.
+    Статичная часть системного промпта: роль, общие правила, резюме и вакансия.
+    Не зависит от вопроса, поэтому одинакова байт в байт во всех запросах
+    профиля; формат ответа по типу вопроса идёт после неё.
     """
-    # Для профилей не собеседований используем системный промпт из prompts.py
-    if profile in ['business_meeting', 'daily_sync', 'presentation', 'custom']:
+    if profile in STATIC_PROFILES:
         from prompts import get_system_prompt
         return get_system_prompt(profile, user_context)
-    
-    # Для собеседований используем STAR формат (старая логика)
-    # Разделяем резюме и вакансию если они объединены
-    resume_part = user_context
-    vacancy_part = ''
-    if '## Вакансия:' in user_context:
-        parts = user_context.split('## Вакансия:', 1)
-        resume_part = parts[0].strip()
-        vacancy_part = parts[1].strip() if len(parts) > 1 else ''
-    
+
+    resume_part, vacancy_part = _split_resume(user_context or '')
+    vacancy_info = f'\n\n## Вакансия (подчёркивай релевантный опыт):\n{vacancy_part[:500]}' if vacancy_part else ''
+    return (
+        'Ты AI-ассистент для технических собеседований. Помогаешь кандидату отвечать уверенно и профессионально.\n\n'
+        '## ВАЖНО: Отвечай на ПОСЛЕДНИЙ вопрос интервьюера!\n\n'
+        '## Общие требования:\n'
+        '- Формат: markdown (жирный для ключевых терминов, списки, `код`)\n'
+        '- Тон: уверенный, профессиональный\n'
+        '- Опирайся на резюме кандидата, не придумывай факты\n'
+        '- Если в резюме есть релевантный опыт — ОБЯЗАТЕЛЬНО упомяни\n'
+        '- Формат ответа для конкретного вопроса дан вместе с вопросом\n\n'
+        f'## Резюме кандидата:\n{resume_part[:2000]}'
+        f'{vacancy_info}'
+    )
+
+
+def build_type_instructions(question_type: str, profile: str = 'job_interview_ru') -> str:
+    """Формат ответа по типу вопроса; у профилей не собеседований он в системном промпте"""
+    if profile in STATIC_PROFILES:
+        return ''
     if question_type == 'experience':
-        # STAR формат для вопросов про опыт — развёрнутый ответ на 1-2 минуты
-        context_full = resume_part[:2000] if resume_part else ''
-        vacancy_info = f'\n\n## Вакансия (подчёркивай релевантный опыт):\n{vacancy_part[:500]}' if vacancy_part else ''
         return (
-            'Ты AI-ассистент для технических собеседований. Помогаешь кандидату отвечать уверенно и профессионально.\n\n'
-            '## ВАЖНО: Отвечай на ПОСЛЕДНИЙ вопрос интервьюера!\n\n'
-            '## Формат ответа (STAR) — 200-300 слов (1.5-2 минуты речи):\n\n'
+            '## Формат ответа (STAR) — 200-300 слов (1.5-2 минуты речи):\n'
             '1. **Краткий тезис** — что делал, где, в какой роли (1-2 предложения)\n'
             '2. **Ситуация** — контекст проекта, проблему которую решал\n'
             '3. **Действия** — конкретные шаги, технологии, твоя роль в команде\n'
-            '4. **Результат** — метрики (%, время, деньги), чему научился\n\n'
-            '## Требования к стилю:\n'
-            '- Тон: уверенный, заинтересованный, демонстрирующий экспертность\n'
-            '- **ОБЯЗАТЕЛЬНО** используй проекты и технологии из резюме\n'
-            '- Конкретные цифры и факты, не общие фразы\n'
-            '- Показывай личностные качества: инициативность, ответственность\n'
-            '- Формат: markdown (жирный для ключевых терминов)\n\n'
-            f'## Резюме кандидата (ИСПОЛЬЗУЙ ЭТУ ИНФОРМАЦИЮ):\n{context_full}'
-            f'{vacancy_info}'
+            '4. **Результат** — метрики (%, время, деньги), чему научился'
         )
-    elif question_type == 'technical':
-        # Структурированный технический ответ
-        context_short = resume_part[:500] if resume_part else ''
+    if question_type == 'technical':
         return (
-            'Ты AI-ассистент для технических собеседований. Даёшь экспертные ответы.\n\n'
-            '## ВАЖНО: Отвечай на ПОСЛЕДНИЙ вопрос интервьюера!\n\n'
-            '## Формат ответа — 150-250 слов:\n\n'
-            '**Краткий ответ** (5-7 пунктов по 1 предложению):\n'
-            '- Главная идея концепции\n'
-            '- Ключевое отличие от аналогов\n'
-            '- Основное применение\n'
-            '- Важная техническая деталь\n'
-            '- Преимущество использования\n\n'
-            '**Подробный ответ** (3 раздела):\n'
+            '## Формат ответа — 150-250 слов:\n'
+            '**Краткий ответ** (5-7 пунктов по 1 предложению), затем **подробный ответ**:\n'
             '1. **Основной ответ** — развёрнутое объяснение (2-3 предложения)\n'
             '2. **Ключевые моменты** — технические детали (3-5 пунктов)\n'
-            '3. **Практический контекст** — пример из проекта или pet-проекта\n\n'
-            '## Требования:\n'
-            '- Используй markdown: **жирный**, `код`, списки\n'
-            '- Код оформляй в ```python блоках\n'
-            '- Если в резюме есть релевантный опыт — ОБЯЗАТЕЛЬНО упомяни\n'
-            '- Тон: уверенный, технический, понятный\n\n'
-            f'## Контекст кандидата:\n{context_short}'
-        )
-    else:
-        # General — сбалансированный ответ
-        context_short = resume_part[:800] if resume_part else ''
-        return (
-            'Ты AI-ассистент для технических собеседований.\n\n'
-            '## ВАЖНО: Отвечай на ПОСЛЕДНИЙ вопрос интервьюера!\n\n'
-            '## Требования:\n'
-            '- Длина: 100-200 слов\n'
-            '- Формат: markdown\n'
-            '- Тон: уверенный, профессиональный\n'
-            '- Опирайся на контекст кандидата\n'
-            '- Если вопрос технический — давай конкретику\n'
-            '- Если вопрос про опыт — используй примеры из резюме\n\n'
-            f'## Контекст кандидата:\n{context_short}'
+            '3. **Практический контекст** — пример из проекта или pet-проекта\n'
+            'Код оформляй в ```python блоках.'
         )
+    return (
+        '## Формат ответа — 100-200 слов:\n'
+        '- Если вопрос технический — давай конкретику\n'
+        '- Если вопрос про опыт — используй примеры из резюме'
+    )
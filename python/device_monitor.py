@@ -1,113 +1,202 @@
 """
 Мониторинг аудиоустройств и автоматическое переключение
+
+Монитор держит снимок устройств (список и устройства по умолчанию для
+микрофона, loopback и вывода). Каждый опрос берёт у источника дешёвый
+отпечаток; полный обход устройств - только когда отпечаток изменился.
+Пока ничего не меняется, интервал опроса растёт до max_interval, после
+изменения или poke() возвращается к check_interval.
 """
 
 import logging
 import time
 import threading
-from typing import Optional, Callable
-import sys
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
 
-try:
-    import pyaudiowpatch as pyaudio
-except ImportError:
-    logging.error('pyaudiowpatch не установлен')
-    sys.exit(1)
+from audio.sources import AudioSource, create_audio_source
 
 logger = logging.getLogger('DeviceMonitor')
 
+# Режимы, для которых отслеживается устройство по умолчанию
+MONITORED_MODES = ('microphone', 'loopback')
+# Предельный интервал опроса, когда устройства не меняются, с
+MONITOR_MAX_INTERVAL = 8.0
+# Во сколько раз растёт интервал после опроса без изменений
+MONITOR_BACKOFF = 1.5
+
+
+@dataclass
+class DeviceSnapshot:
+    """Результат полного обхода устройств"""
+    fingerprint: object
+    devices: List[dict] = field(default_factory=list)
+    # Режим ('microphone', 'loopback', 'output') -> (индекс, описание)
+    defaults: Dict[str, Tuple[Optional[int], Optional[dict]]] = field(default_factory=dict)
+    scanned_at: float = 0.0
+
+    def default(self, mode: str) -> Tuple[Optional[int], Optional[dict]]:
+        return self.defaults.get(mode, (None, None))
+
 
 class AudioDeviceMonitor:
     """Мониторинг изменений аудиоустройств по умолчанию"""
     
-    def __init__(self, callback: Optional[Callable] = None, check_interval: float = 1.0):
+    def __init__(self, callback: Optional[Callable] = None, check_interval: float = 1.0,
+                 source: Optional[AudioSource] = None,
+                 max_interval: float = MONITOR_MAX_INTERVAL, backoff: float = MONITOR_BACKOFF):
         """
         Args:
-            callback: функция, вызываемая при изменении устройства (device_index, device_info)
-            check_interval: интервал проверки в секундах
+            callback: функция, вызываемая при изменении микрофона (device_index, device_info);
+                на другие режимы подписываются через subscribe()
+            check_interval: интервал проверки в секундах (сразу после изменения)
+            source: источник устройств (по умолчанию pyaudiowpatch или sounddevice,
+                выбирается при первом обращении)
+            max_interval: предельный интервал, до которого растёт опрос без изменений
+            backoff: множитель интервала после опроса без изменений
         """
         self.callback = callback
         self.check_interval = check_interval
+        self.max_interval = max(max_interval, check_interval)
+        self.backoff = backoff
+        self.interval = check_interval
         self.running = False
         self.thread = None
         
-        # Текущее устройство
-        self.current_device_index = None
-        self.current_device_info = None
+        # Текущие устройства по режимам
+        self.current: Dict[str, Tuple[Optional[int], Optional[dict]]] = {
+            mode: (None, None) for mode in MONITORED_MODES
+        }
+        self._listeners: Dict[str, List[Callable]] = {mode: [] for mode in MONITORED_MODES}
+        
+        self._source = source
+        self._snapshot: Optional[DeviceSnapshot] = None
+        # Опрос источника и снимок - из потока монитора и потоков захвата
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        
+        # Статистика опросов
+        self.polls = 0
+        self.scans = 0
+        self.fingerprint_hits = 0
+        self.changes = 0
+        self.last_fingerprint_ms = 0.0
+        self.last_scan_ms = 0.0
+        self.max_scan_ms = 0.0
+    
+    @property
+    def source(self) -> AudioSource:
+        if self._source is None:
+            self._source = create_audio_source('auto')
+        return self._source
+    
+    @property
+    def current_device_index(self):
+        return self.current['microphone'][0]
+    
+    @property
+    def current_device_info(self):
+        return self.current['microphone'][1]
+    
+    def subscribe(self, mode: str, callback: Callable):
+        """callback(device_index, device_info) при смене устройства по умолчанию для режима"""
+        self._listeners[mode].append(callback)
+    
+    def unsubscribe(self, mode: str, callback: Callable) -> int:
+        """Отписка; возвращает, сколько подписчиков осталось во всех режимах"""
+        if callback in self._listeners[mode]:
+            self._listeners[mode].remove(callback)
+        return sum(len(listeners) for listeners in self._listeners.values())
+    
+    # ---------- снимок устройств ----------
+    
+    def snapshot(self) -> DeviceSnapshot:
+        """Последний снимок устройств; при первом обращении - обход"""
+        with self._lock:
+            if self._snapshot is None:
+                self._poll()
+            return self._snapshot
+    
+    def refresh(self) -> bool:
+        """Опрос отпечатка и обход при его изменении; True - снимок обновлён"""
+        with self._lock:
+            return self._poll()
+    
+    def _poll(self) -> bool:
+        source = self.source
+        t0 = time.perf_counter()
+        fingerprint = source.fingerprint()
+        t1 = time.perf_counter()
+        self.polls += 1
+        self.last_fingerprint_ms = (t1 - t0) * 1000
+        if self._snapshot is not None and fingerprint == self._snapshot.fingerprint:
+            self.fingerprint_hits += 1
+            return False
         
-        # pyaudio экземпляр
-        self.p = None
+        devices = source.list_devices()
+        snapshot = DeviceSnapshot(fingerprint, devices, scanned_at=time.time())
+        for mode in MONITORED_MODES:
+            snapshot.defaults[mode] = source.default_device(mode, devices)
+        snapshot.defaults['output'] = source.default_output(devices)
+        self._snapshot = snapshot
         
+        self.scans += 1
+        self.last_scan_ms = (time.perf_counter() - t1) * 1000
+        self.max_scan_ms = max(self.max_scan_ms, self.last_scan_ms)
+        logger.debug(f'Обход устройств: {len(devices)} за {self.last_scan_ms:.1f} мс')
+        return True
+    
+    def get_default_device(self, mode: str) -> Tuple[Optional[int], Optional[dict]]:
+        """Устройство по умолчанию для режима из снимка, без обращения к драйверу"""
+        return self.snapshot().default(mode)
+    
     def get_default_input_device(self):
         """Получить устройство ввода по умолчанию"""
-        try:
-            if not self.p:
-                self.p = pyaudio.PyAudio()
-                
-            device_info = self.p.get_default_input_device_info()
-            device_index = device_info['index']
-            
-            return device_index, device_info
-        except Exception as e:
-            logger.error(f'Ошибка получения устройства по умолчанию: {e}')
-            return None, None
+        return self.get_default_device('microphone')
     
     def get_default_loopback_device(self):
         """Получить loopback устройство по умолчанию (для системного звука)"""
-        try:
-            if not self.p:
-                self.p = pyaudio.PyAudio()
-                
-            # Ищем WASAPI loopback устройство по умолчанию
-            default_wasapi_info = None
-            for i in range(self.p.get_device_count()):
-                info = self.p.get_device_info_by_index(i)
-                if (info['name'].startswith('Microsoft Sound Mapper - Input') or 
-                    info['name'].startswith('Default') or
-                    (info['isLoopbackDevice'] and 'default' in info['name'].lower())):
-                    default_wasapi_info = info
-                    break
-            
-            if default_wasapi_info:
-                return default_wasapi_info['index'], default_wasapi_info
-            
-            # Если не нашли, возвращаем первое loopback устройство
-            for i in range(self.p.get_device_count()):
-                info = self.p.get_device_info_by_index(i)
-                if info['isLoopbackDevice']:
-                    return info['index'], info
-                    
-        except Exception as e:
-            logger.error(f'Ошибка получения loopback устройства: {e}')
-            
-        return None, None
+        return self.get_default_device('loopback')
+    
+    # ---------- изменения ----------
     
     def check_device_change(self):
-        """Проверить, изменилось ли устройство"""
-        # Пока реализуем только для микрофона
-        new_index, new_info = self.get_default_input_device()
+        """Проверить, изменились ли устройства микрофона и loopback"""
+        with self._lock:
+            self._poll()
+            snapshot = self._snapshot
         
-        if new_index is None:
-            return False
-            
-        if (self.current_device_index != new_index or 
-            self.current_device_info is None or
-            self.current_device_info['name'] != new_info['name']):
-            
-            old_name = self.current_device_info['name'] if self.current_device_info else 'None'
-            new_name = new_info['name']
+        changed = False
+        for mode in MONITORED_MODES:
+            new_index, new_info = snapshot.default(mode)
+            if new_index is None:
+                continue
+            old_index, old_info = self.current[mode]
+            if old_index == new_index and old_info is not None and old_info['name'] == new_info['name']:
+                continue
             
-            logger.info(f'Изменение устройства: "{old_name}" -> "{new_name}"')
-            
-            self.current_device_index = new_index
-            self.current_device_info = new_info
-            
-            if self.callback:
-                self.callback(new_index, new_info)
-                
-            return True
-            
-        return False
+            old_name = old_info['name'] if old_info else 'None'
+            logger.info(f'Изменение устройства ({mode}): "{old_name}" -> "{new_info["name"]}"')
+            self.current[mode] = (new_index, new_info)
+            self.changes += 1
+            changed = True
+            self._notify(mode, new_index, new_info)
+        return changed
+    
+    def _notify(self, mode: str, device_index: int, device_info: dict):
+        callbacks = list(self._listeners[mode])
+        if mode == 'microphone' and self.callback:
+            callbacks.append(self.callback)
+        for callback in callbacks:
+            try:
+                callback(device_index, device_info)
+            except Exception as e:
+                logger.error(f'Ошибка обработчика смены устройства: {e}')
+    
+    def poke(self):
+        """Внеочередной опрос (например, устройство перестало читаться)"""
+        self.interval = self.check_interval
+        self._wake.set()
     
     def start_monitoring(self):
         """Начать мониторинг устройств"""
@@ -116,12 +205,14 @@ class AudioDeviceMonitor:
             return
             
         self.running = True
+        self.interval = self.check_interval
         
-        # Инициализируем текущее устройство
-        self.current_device_index, self.current_device_info = self.get_default_input_device()
-        
-        if self.current_device_info:
-            logger.info(f'Начальное устройство: {self.current_device_info["name"]}')
+        # Инициализируем текущие устройства
+        snapshot = self.snapshot()
+        for mode in MONITORED_MODES:
+            self.current[mode] = snapshot.default(mode)
+            if self.current[mode][1]:
+                logger.info(f'Начальное устройство ({mode}): {self.current[mode][1]["name"]}')
         
         self.thread = threading.Thread(target=self._monitor_loop, daemon=True)
         self.thread.start()
@@ -130,22 +221,44 @@ class AudioDeviceMonitor:
     def stop_monitoring(self):
         """Остановить мониторинг"""
         self.running = False
+        self._wake.set()
         if self.thread:
             self.thread.join(timeout=2)
-        if self.p:
-            self.p.terminate()
-            self.p = None
+        if self._source is not None:
+            with self._lock:
+                self._source.close()
         logger.info('Мониторинг аудиоустройств остановлен')
     
     def _monitor_loop(self):
         """Основной цикл мониторинга"""
         while self.running:
             try:
-                self.check_device_change()
-                time.sleep(self.check_interval)
+                changed = self.check_device_change()
             except Exception as e:
                 logger.error(f'Ошибка в цикле мониторинга: {e}')
-                time.sleep(self.check_interval)
+                changed = False
+            if changed:
+                self.interval = self.check_interval
+            else:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+    
+    def get_stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            'polls': self.polls,
+            'scans': self.scans,
+            'fingerprint_hits': self.fingerprint_hits,
+            'changes': self.changes,
+            'devices': len(snapshot.devices) if snapshot else 0,
+            'interval': round(self.interval, 2),
+            'last_fingerprint_ms': round(self.last_fingerprint_ms, 2),
+            'last_scan_ms': round(self.last_scan_ms, 2),
+            'max_scan_ms': round(self.max_scan_ms, 2),
+            # Опросы зонда устройств в отдельном процессе (бэкенды PortAudio)
+            'probe': self._source.probe_stats() if self._source is not None else None,
+        }
 
 
 # Глобальный экземпляр для использования в приложении
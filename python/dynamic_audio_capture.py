@@ -5,273 +5,387 @@
 import logging
 import threading
 import time
-from typing import Optional, Callable
-import queue
+from collections import deque
+from typing import Optional
 import numpy as np
 
+from audio.ring import SPSCRingBuffer
+from audio.sources import AudioSource, SourceReader
 from device_monitor import AudioDeviceMonitor, get_device_monitor
+from metrics import log_metric
 
 logger = logging.getLogger('DynamicAudioCapture')
 
+SAMPLE_RATE = 16000
+# Ёмкость кольцевого буфера захвата, секунд при 16kHz
+CAPTURE_RING_SECONDS = 30.0
+# Максимум сэмплов за одно чтение потребителем, секунд
+CAPTURE_READ_SECONDS = 0.2
+# Кроссфейд старого и нового устройства при переключении, мс
+SWITCH_CROSSFADE_MS = 20
+# Сколько новое устройство может копить блоки до переключения, секунд
+SWITCH_PRIME_SECONDS = 0.5
+# Сколько ждать открытия нового устройства, если старое уже отвалилось
+SWITCH_OPEN_TIMEOUT = 5.0
+# Опрос места в буфере, когда источник без пауз обгоняет потребителя, с
+BACKPRESSURE_POLL = 0.005
+
+
+class _PendingSwitch:
+    """Новое устройство, которое открывается и копит блоки, пока пишет старое"""
+
+    def __init__(self, device_index: int, device_info: dict):
+        self.device_index = device_index
+        self.device_info = device_info
+        self.requested_at = time.monotonic()
+        self.reader: Optional[SourceReader] = None
+        self.error: Optional[Exception] = None
+        self.blocks = deque()
+        self.ready = threading.Event()
+        self.taken = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
 
 class DynamicAudioCapture:
-    """Аудиозахват с автоматическим переключением устройств"""
-    
-    def __init__(self, mode='loopback', audio_queue: Optional[queue.Queue] = None):
+    """
+    Аудиозахват с автоматическим переключением устройств.
+
+    При смене устройства новый поток открывается и наполняется в
+    отдельном потоке, пока старый продолжает писать в буфер; переход
+    делается кроссфейдом SWITCH_CROSSFADE_MS по совпадающему времени,
+    и только потом старый поток закрывается.
+    """
+
+    def __init__(self, mode='loopback', ring_seconds: float = CAPTURE_RING_SECONDS,
+                 source: Optional[AudioSource] = None):
         """
         Args:
             mode: 'loopback' для системного звука, 'microphone' для микрофона
-            audio_queue: очередь для аудиоданных
+            ring_seconds: ёмкость буфера между захватом и потребителем
+            source: источник аудио (по умолчанию устройства глобального монитора;
+                FileSource и SyntheticSource работают без звуковой карты)
         """
         self.mode = mode
-        self.audio_queue = audio_queue or queue.Queue()
+        # Один писатель (поток устройства) и один читатель (get_audio_chunk)
+        self.ring = SPSCRingBuffer(int(SAMPLE_RATE * ring_seconds), dtype=np.int16)
         self.running = False
-        
+
         # Текущий захват
-        self.current_capture_thread = None
         self.current_device_index = None
+        self.current_device_name = None
         self.should_restart = threading.Event()
-        
-        # Мониторинг устройств
-        self.device_monitor = get_device_monitor()
-        self.device_monitor.callback = self.on_device_changed
-        
+        self._pending: Optional[_PendingSwitch] = None
+        self._last_block_end = None
+        # unix-время последнего сэмпла чанка, отданного get_audio_chunk
+        self.last_chunk_time: Optional[float] = None
+
+        # Переключения устройств
+        self.switches = 0
+        self.reopens = 0
+        # Источник закончился (файл без повтора)
+        self.finished = False
+        self.last_switch_gap_ms = 0.0
+        self.max_switch_gap_ms = 0.0
+        self.last_switch_ms = 0.0
+
+        # Мониторинг устройств нужен только источнику, где устройство меняется на ходу
+        if source is None:
+            self.device_monitor = get_device_monitor()
+            source = self.device_monitor.source
+        elif source.hot_swap:
+            self.device_monitor = AudioDeviceMonitor(source=source)
+        else:
+            self.device_monitor = None
+        self.source = source
+
     def on_device_changed(self, device_index: int, device_info: dict):
         """Обработчик изменения устройства"""
         logger.info(f'Обнаружено изменение устройства: {device_info["name"]}')
         self.should_restart.set()
-    
+
     def get_current_device(self):
-        """Получить текущее устройство для захвата"""
-        if self.mode == 'loopback':
-            device_index, device_info = self.device_monitor.get_default_loopback_device()
-        else:
-            device_index, device_info = self.device_monitor.get_default_input_device()
-            
-        return device_index, device_info
-    
+        """Получить текущее устройство для захвата (из снимка монитора, если он есть)"""
+        if self.device_monitor is not None:
+            return self.device_monitor.get_default_device(self.mode)
+        return self.source.default_device(self.mode)
+
     def capture_worker(self):
-        """Рабочий поток захвата аудио"""
+        """Рабочий поток захвата аудио: единственный писатель в кольцевой буфер"""
+        reader = None
         while self.running:
             try:
-                # Получаем текущее устройство
-                device_index, device_info = self.get_current_device()
-                
-                if device_index is None:
-                    logger.error('Устройство не найдено, ожидание...')
-                    time.sleep(1)
+                if reader is None:
+                    reader = self._open_current()
+                    if reader is None:
+                        time.sleep(1)
+                    continue
+
+                if self.should_restart.is_set() and self._pending is None:
+                    self.should_restart.clear()
+                    self._begin_switch()
+
+                try:
+                    block, t_end = reader.read()
+                except EOFError:
+                    logger.info(f'Источник {reader.name} закончился')
+                    self.finished = True
+                    break
+                except Exception as e:
+                    logger.error(f'Ошибка чтения устройства {reader.name}: {e}')
+                    self._poke_monitor()
+                    reader = self._recover(reader)
                     continue
-                
-                # Если устройство изменилось, перезапускаем захват
-                if (self.current_device_index != device_index or 
-                    self.should_restart.is_set()):
-                    
-                    if self.current_capture_thread and self.current_capture_thread.is_alive():
-                        logger.info('Остановка текущего захвата...')
-                        # Останавливаем поток (устанавливаем флаг)
-                        self.should_restart.clear()
-                        time.sleep(0.5)  # Даём время на остановку
-                    
-                    self.current_device_index = device_index
-                    logger.info(f'Начало захвата с устройства: {device_info["name"]}')
-                    
-                    # Создаём новый поток захвата
-                    self.current_capture_thread = threading.Thread(
-                        target=self._capture_with_device,
-                        args=(device_index,),
-                        daemon=True
-                    )
-                    self.current_capture_thread.start()
-                
-                # Проверяем, нужно ли перезапустить
-                if self.should_restart.wait(timeout=0.1):
+
+                pending = self._pending
+                if pending is not None and pending.ready.is_set():
+                    reader = self._complete_switch(reader, block, t_end)
                     continue
-                    
-                time.sleep(0.1)
-                
+
+                if not reader.paced:
+                    self._wait_space(len(block))
+                self._write(block, t_end)
+
             except Exception as e:
                 logger.error(f'Ошибка в capture_worker: {e}')
                 time.sleep(1)
-    
-    def _capture_with_device(self, device_index: int):
-        """Захват с указанного устройства"""
+
+        self._cancel_pending()
+        if reader is not None:
+            reader.close()
+
+    # ---------- устройства ----------
+
+    def _open_current(self) -> Optional[SourceReader]:
+        device_index, device_info = self.get_current_device()
+        if device_index is None:
+            logger.error('Устройство не найдено, ожидание...')
+            return None
         try:
-            if self.mode == 'loopback':
-                # Для loopback используем capture_loopback с адаптером
-                for chunk in self._loopback_generator(device_index):
-                    if not self.running or self.should_restart.is_set():
-                        break
-                    self.audio_queue.put(chunk)
-            else:
-                # Для микрофона используем capture_microphone с адаптером
-                for chunk in self._microphone_generator(device_index):
-                    if not self.running or self.should_restart.is_set():
-                        break
-                    self.audio_queue.put(chunk)
-                    
+            reader = SourceReader(self.source.open_stream(device_index, self.mode), device_index)
         except Exception as e:
             logger.error(f'Ошибка захвата с устройства {device_index}: {e}')
-    
-    def _loopback_generator(self, device_index: int):
-        """Генератор для loopback захвата"""
+            self._poke_monitor()
+            return None
+
+        if self._last_block_end is not None:
+            # Устройство пропало без предупреждения монитора: переоткрытие с разрывом
+            self.reopens += 1
+        self.current_device_index = device_index
+        self.current_device_name = reader.name
+        logger.info(f'Начало захвата с устройства: {reader.name}')
+        return reader
+
+    def _poke_monitor(self):
+        """Устройство пропало: монитор опрашивает драйвер сразу, не дожидаясь интервала"""
+        if self.device_monitor is not None:
+            self.device_monitor.poke()
+
+    def _begin_switch(self):
+        device_index, device_info = self.get_current_device()
+        if device_index is None:
+            return
+        pending = _PendingSwitch(device_index, device_info)
+        pending.thread = threading.Thread(target=self._prime, args=(pending,), daemon=True)
+        self._pending = pending
+        logger.info(f'Подготовка переключения на устройство: {device_info["name"]}')
+        pending.thread.start()
+
+    def _prime(self, pending: _PendingSwitch):
+        """Открывает новое устройство и копит его блоки, пока рабочий поток не заберёт их"""
         try:
-            import pyaudiowpatch as pyaudio
-            p = pyaudio.PyAudio()
-            
-            device_info = p.get_device_info_by_index(device_index)
-            sample_rate = int(device_info['defaultSampleRate'])
-            channels = 2  # Loopback обычно стерео
-            
-            stream = p.open(
-                format=pyaudio.paInt16,
-                channels=channels,
-                rate=sample_rate,
-                input=True,
-                input_device_index=device_index,
-                frames_per_buffer=1024
-            )
-            
-            logger.info(f'Loopback захват запущен: {device_info["name"]}')
-            
-            while self.running and not self.should_restart.is_set():
-                try:
-                    data = stream.read(1024, exception_on_overflow=False)
-                    audio_data = np.frombuffer(data, dtype=np.int16)
-                    
-                    # Конвертируем в моно если нужно
-                    if channels > 1:
-                        audio_data = audio_data.reshape(-1, channels)
-                        audio_data = audio_data.mean(axis=1).astype(np.int16)
-                    
-                    # Ресемплируем в 16kHz если нужно
-                    if sample_rate != 16000:
-                        # Простая линейная интерполяция
-                        audio_data = self._resample(audio_data, sample_rate, 16000)
-                    
-                    yield audio_data
-                    
-                except Exception as e:
-                    logger.error(f'Ошибка чтения loopback: {e}')
-                    break
-            
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
-            
+            pending.reader = SourceReader(self.source.open_stream(pending.device_index, self.mode),
+                                          pending.device_index)
+            limit = int(SAMPLE_RATE * SWITCH_PRIME_SECONDS)
+            buffered = 0
+            while self.running and not pending.taken.is_set():
+                block, t_end = pending.reader.read()
+                pending.blocks.append((block.copy(), t_end))
+                buffered += len(block)
+                while buffered > limit and len(pending.blocks) > 1:
+                    buffered -= len(pending.blocks.popleft()[0])
+                pending.ready.set()
         except Exception as e:
-            logger.error(f'Ошибка в loopback генераторе: {e}')
-    
-    def _microphone_generator(self, device_index: int):
-        """Генератор для захвата с микрофона"""
+            pending.error = e
+            pending.ready.set()
+
+    def _take_pending(self) -> Optional[_PendingSwitch]:
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return None
+        pending.taken.set()
+        if pending.thread is not None:
+            pending.thread.join(timeout=1.0)
+        if pending.error is not None or pending.reader is None or not pending.blocks:
+            logger.error(f'Не удалось открыть устройство {pending.device_index}: {pending.error}')
+            if pending.reader is not None:
+                pending.reader.close()
+            return None
+        return pending
+
+    def _cancel_pending(self):
+        pending = self._take_pending()
+        if pending is not None:
+            pending.reader.close()
+
+    def _recover(self, reader: SourceReader) -> Optional[SourceReader]:
+        """Старое устройство отвалилось: переход на подготовленное, если оно есть"""
+        pending = self._pending
+        if pending is not None and pending.ready.wait(timeout=SWITCH_OPEN_TIMEOUT):
+            return self._complete_switch(reader, None, None)
+        reader.close()
+        return None
+
+    def _complete_switch(self, old: SourceReader, block: Optional[np.ndarray],
+                         t_end: Optional[float]) -> Optional[SourceReader]:
+        """
+        Дописывает последний блок старого устройства, склеивает его с
+        блоками нового по времени и закрывает старое.
+        """
+        pending = self._take_pending()
+        if pending is None:
+            if block is not None:
+                self._write(block, t_end)
+                return old
+            old.close()
+            return None
+
+        audio = np.concatenate([b for b, _ in pending.blocks])
+        new_end = pending.blocks[-1][1]
+        new_start = new_end - len(audio) / SAMPLE_RATE
+
+        if block is None:
+            # Старое устройство замолчало раньше: всё накопленное новым идёт целиком
+            gap = new_start - self._last_block_end if self._last_block_end is not None else 0.0
+            self._write(audio, new_end)
+        else:
+            # Склейка в момент cut, до которого есть данные обоих устройств:
+            # старое пишется до cut, новое - с cut, последние fade сэмплов смешиваются
+            fade = int(SAMPLE_RATE * SWITCH_CROSSFADE_MS / 1000)
+            block_start = t_end - len(block) / SAMPLE_RATE
+            cut = min(t_end, new_end)
+            old_cut = min(max(int(round((cut - block_start) * SAMPLE_RATE)), 0), len(block))
+            new_cut = min(int(round((cut - new_start) * SAMPLE_RATE)), len(audio))
+            n = max(0, min(fade, old_cut, new_cut))
+            gap = max(0.0, new_start - t_end)
+            if n:
+                ramp = np.linspace(0.0, 1.0, n + 2, dtype=np.float32)[1:-1]
+                mixed = block[old_cut - n:old_cut] * (1.0 - ramp) + audio[new_cut - n:new_cut] * ramp
+                self._write(block[:old_cut - n], None)
+                self._write(np.round(mixed).astype(np.int16), None)
+            else:
+                self._write(block[:old_cut], None)
+            self._write(audio[max(new_cut, 0):], new_end)
+
+        old.close()
+        self._record_switch(pending, gap)
+        self.current_device_index = pending.device_index
+        self.current_device_name = pending.reader.name
+        return pending.reader
+
+    def _record_switch(self, pending: _PendingSwitch, gap_sec: float):
+        self.switches += 1
+        self.last_switch_gap_ms = gap_sec * 1000
+        self.max_switch_gap_ms = max(self.max_switch_gap_ms, self.last_switch_gap_ms)
+        self.last_switch_ms = (time.monotonic() - pending.requested_at) * 1000
+        logger.info(f'Переключено на {pending.reader.name}: разрыв {self.last_switch_gap_ms:.0f} мс, '
+                    f'переключение {self.last_switch_ms:.0f} мс')
         try:
-            import pyaudiowpatch as pyaudio
-            p = pyaudio.PyAudio()
-            
-            device_info = p.get_device_info_by_index(device_index)
-            sample_rate = int(device_info['defaultSampleRate'])
-            channels = min(int(device_info['maxInputChannels']), 2)
-            
-            stream = p.open(
-                format=pyaudio.paInt16,
-                channels=channels,
-                rate=sample_rate,
-                input=True,
-                input_device_index=device_index,
-                frames_per_buffer=1024
-            )
-            
-            logger.info(f'Захват микрофона запущен: {device_info["name"]}')
-            
-            while self.running and not self.should_restart.is_set():
-                try:
-                    data = stream.read(1024, exception_on_overflow=False)
-                    audio_data = np.frombuffer(data, dtype=np.int16)
-                    
-                    # Конвертируем в моно если нужно
-                    if channels > 1:
-                        audio_data = audio_data.reshape(-1, channels)
-                        audio_data = audio_data.mean(axis=1).astype(np.int16)
-                    
-                    # Ресемплируем в 16kHz если нужно
-                    if sample_rate != 16000:
-                        audio_data = self._resample(audio_data, sample_rate, 16000)
-                    
-                    yield audio_data
-                    
-                except Exception as e:
-                    logger.error(f'Ошибка чтения микрофона: {e}')
-                    break
-            
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
-            
-        except Exception as e:
-            logger.error(f'Ошибка в microphone генераторе: {e}')
-    
-    def _resample(self, audio_data: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
-        """Простой ресемплинг аудио"""
-        if from_rate == to_rate:
-            return audio_data
-            
-        # Вычисляем коэффициент
-        ratio = to_rate / from_rate
-        new_length = int(len(audio_data) * ratio)
-        
-        # Простая линейная интерполяция
-        indices = np.linspace(0, len(audio_data) - 1, new_length)
-        return np.interp(indices, np.arange(len(audio_data)), audio_data).astype(np.int16)
-    
+            log_metric('device_switch', 'audio', device=pending.reader.name, mode=self.mode,
+                       gap_ms=round(self.last_switch_gap_ms, 1), switch_ms=round(self.last_switch_ms, 1))
+        except OSError as e:
+            logger.warning(f'Метрика переключения не записана: {e}')
+
+    def _wait_space(self, samples: int):
+        """Источник без пауз ждёт потребителя вместо потери блоков"""
+        while self.running and self.ring.free_space < samples:
+            time.sleep(BACKPRESSURE_POLL)
+
+    def _write(self, audio: np.ndarray, t_end: Optional[float]):
+        self.ring.write(audio)
+        if t_end is not None:
+            self._last_block_end = t_end
+
+    # ---------- управление ----------
+
     def start(self):
         """Запустить захват аудио"""
         if self.running:
             logger.warning('Захват уже запущен')
             return
-            
+
         self.running = True
         self.should_restart.clear()
-        
-        # Запускаем мониторинг устройств
-        self.device_monitor.start_monitoring()
-        
+
+        # Запускаем мониторинг устройств (глобальный монитор может уже работать для другого режима)
+        if self.device_monitor is not None:
+            self.device_monitor.subscribe(self.mode, self.on_device_changed)
+            if not self.device_monitor.running:
+                self.device_monitor.start_monitoring()
+
         # Запускаем рабочий поток
         self.capture_thread = threading.Thread(target=self.capture_worker, daemon=True)
         self.capture_thread.start()
-        
+
         logger.info(f'Динамический захват аудио запущен (mode={self.mode})')
-    
+
     def stop(self):
         """Остановить захват аудио"""
         self.running = False
         self.should_restart.set()
-        
-        # Останавливаем мониторинг
-        self.device_monitor.stop_monitoring()
-        
+
+        # Останавливаем мониторинг, если он больше никому не нужен
+        if self.device_monitor is not None:
+            if not self.device_monitor.unsubscribe(self.mode, self.on_device_changed):
+                self.device_monitor.stop_monitoring()
+
         # Ждём завершения потоков
         if hasattr(self, 'capture_thread'):
             self.capture_thread.join(timeout=2)
-            
+
         logger.info('Динамический захват аудио остановлен')
-    
+
     def get_audio_chunk(self, timeout: float = 0.1) -> Optional[np.ndarray]:
-        """Получить чанк аудио из очереди"""
-        try:
-            return self.audio_queue.get(timeout=timeout)
-        except queue.Empty:
+        """Получить все накопленные сэмплы (не больше CAPTURE_READ_SECONDS) одним чанком"""
+        chunk = self.ring.read(int(SAMPLE_RATE * CAPTURE_READ_SECONDS), timeout=timeout)
+        if chunk is not None:
+            self.last_chunk_time = self._chunk_end_time()
+        return chunk
+
+    def _chunk_end_time(self) -> Optional[float]:
+        """Время захвата конца прочитанного чанка: непрочитанное в кольце записано после него"""
+        t_end = self._last_block_end
+        if t_end is None:
             return None
+        t_end -= len(self.ring) / SAMPLE_RATE
+        # monotonic устройства → unix-время, в котором считается тайминг слов
+        return time.time() - (time.monotonic() - t_end)
+
+    def get_stats(self) -> dict:
+        stats = {
+            'device': self.current_device_name,
+            'switches': self.switches,
+            'reopens': self.reopens,
+            'source': self.source.kind,
+            'finished': self.finished,
+            'last_switch_gap_ms': round(self.last_switch_gap_ms, 1),
+            'max_switch_gap_ms': round(self.max_switch_gap_ms, 1),
+            'last_switch_ms': round(self.last_switch_ms, 1),
+        }
+        if self.device_monitor is not None:
+            stats['monitor'] = self.device_monitor.get_stats()
+        return stats
 
 
 # Тестирование
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
-    
+
     print("Тест динамического захвата аудио...")
     print("Переключайте аудиоустройства для теста")
-    
+
     capture = DynamicAudioCapture(mode='microphone')
     capture.start()
-    
+
     try:
         chunk_count = 0
         while True:
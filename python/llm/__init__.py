@@ -2,14 +2,21 @@
 LLM модуль - Ollama клиент, Vision AI, GPU утилиты
 """
 
-from .ollama_client import OllamaClient, HintMetrics, build_messages
+from .ollama_client import OllamaClient, HintMetrics, GenerationParams, build_messages
+from .concurrency import ModelSlots
+from .cancellation import GenerationRegistry
+from .speculation import Speculator
 from .vision import get_available_vision_model, analyze_image, VISION_MODELS
 from .gpu import check_gpu_status, get_gpu_info
 
 __all__ = [
     'OllamaClient',
     'HintMetrics', 
+    'GenerationParams',
     'build_messages',
+    'ModelSlots',
+    'GenerationRegistry',
+    'Speculator',
     'get_available_vision_model',
     'analyze_image',
     'VISION_MODELS',
@@ -0,0 +1,172 @@
+"""
+LLM Cancellation - отмена генераций, которые уже никто не прочитает
+
+Генерация идёт в отдельной задаче, SSE-ответ только читает её очередь.
+Задача отменяется, если клиент оборвал соединение или если для той же
+сессии пришёл новый запрос (политика latest-wins). Отмена закрывает
+ответ aiohttp, Ollama видит обрыв соединения и прекращает декодирование.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from metrics import log_hint_cancelled
+
+logger = logging.getLogger('LLM')
+
+# Период проверки обрыва SSE-клиента, с
+DISCONNECT_POLL_SECONDS = 0.25
+# Причины отмены
+CANCEL_DISCONNECT = 'disconnect'
+CANCEL_SUPERSEDED = 'superseded'
+
+_END = object()
+
+
+class GenerationHandle:
+    """Генерация в полёте: сессия, задача и причина отмены"""
+
+    def __init__(self, session_id: Optional[str] = None):
+        self.session_id = session_id
+        self.reason: Optional[str] = None
+        self.chunks = 0
+        self.started = time.perf_counter()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def cancel(self, reason: str) -> bool:
+        """Отменяет задачу генерации; повторная отмена ничего не меняет"""
+        if self.reason is not None:
+            return False
+        self.reason = reason
+        task = self._task
+        if task is not None and not task.done():
+            # Вытесняющий запрос может прийти из другого event loop
+            try:
+                task.get_loop().call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass
+        return True
+
+
+class GenerationRegistry:
+    """Генерации в полёте по сессиям и счётчики отмен"""
+
+    def __init__(self, poll_interval: float = DISCONNECT_POLL_SECONDS):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, List[GenerationHandle]] = {}
+        self.started = 0
+        self.completed = 0
+        self.cancelled = {CANCEL_DISCONNECT: 0, CANCEL_SUPERSEDED: 0}
+        # Время от старта до отмены и чанки, отданные до неё
+        self.cancelled_ms = 0.0
+        self.cancelled_chunks = 0
+
+    def begin(self, session_id: Optional[str] = None, latest_wins: bool = True) -> GenerationHandle:
+        """Регистрирует генерацию; при latest_wins отменяет прежние генерации сессии"""
+        handle = GenerationHandle(session_id)
+        superseded: List[GenerationHandle] = []
+        with self._lock:
+            self.started += 1
+            if session_id is not None:
+                handles = self._sessions.setdefault(session_id, [])
+                if latest_wins:
+                    superseded = list(handles)
+                handles.append(handle)
+        for old in superseded:
+            if old.cancel(CANCEL_SUPERSEDED):
+                logger.info(f'[LLM] Генерация сессии {session_id} вытеснена новым запросом')
+        return handle
+
+    def finish(self, handle: GenerationHandle):
+        """Снимает генерацию с учёта и считает её завершённой или отменённой"""
+        elapsed_ms = int((time.perf_counter() - handle.started) * 1000)
+        with self._lock:
+            handles = self._sessions.get(handle.session_id)
+            if handles is not None and handle in handles:
+                handles.remove(handle)
+                if not handles:
+                    del self._sessions[handle.session_id]
+            if handle.reason is None:
+                self.completed += 1
+                return
+            self.cancelled[handle.reason] = self.cancelled.get(handle.reason, 0) + 1
+            self.cancelled_ms += elapsed_ms
+            self.cancelled_chunks += handle.chunks
+        log_hint_cancelled(handle.reason, elapsed_ms, handle.chunks)
+
+    def in_flight(self, session_id: str) -> int:
+        with self._lock:
+            return len(self._sessions.get(session_id, ()))
+
+    async def _watch(self, handle: GenerationHandle, is_disconnected: Callable[[], Awaitable[bool]]):
+        while not handle.cancelled:
+            try:
+                disconnected = await is_disconnected()
+            except Exception:
+                return
+            if disconnected:
+                if handle.cancel(CANCEL_DISCONNECT):
+                    logger.info('[LLM] Клиент отключился, генерация остановлена')
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    async def run(self, handle: GenerationHandle, source: AsyncIterator,
+                  is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None) -> AsyncIterator:
+        """
+        Отдаёт элементы source, пока генерацию не отменили.
+
+        source читается в отдельной задаче: её отмена прерывает ожидание
+        очередного токена сразу, а не после него. Закрытие самого
+        итератора раньше конца генерации считается обрывом клиента.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def produce():
+            async for item in source:
+                queue.put_nowait(item)
+
+        task = asyncio.create_task(produce())
+        # Конец очереди ставит колбэк: задача, отменённая до старта, тела не выполнит
+        task.add_done_callback(lambda _: queue.put_nowait(_END))
+        handle._task = task
+        if handle.cancelled:
+            task.cancel()
+        watcher = asyncio.create_task(self._watch(handle, is_disconnected)) if is_disconnected else None
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    break
+                handle.chunks += 1
+                yield item
+            await asyncio.wait([task])
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            if not task.done():
+                handle.cancel(CANCEL_DISCONNECT)
+            self.finish(handle)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            in_flight = self.started - self.completed - sum(self.cancelled.values())
+            sessions = len(self._sessions)
+        return {
+            'started': self.started,
+            'completed': self.completed,
+            'cancelled': dict(self.cancelled),
+            'cancelled_ms': round(self.cancelled_ms),
+            'cancelled_chunks': self.cancelled_chunks,
+            'in_flight': in_flight,
+            'sessions': sessions,
+        }
@@ -0,0 +1,108 @@
+"""
+LLM Concurrency - ограничение параллельных генераций по моделям
+
+Каждая модель бэкенда получает свой семафор: запросы к одной модели
+ждут свободный слот, а запросы к разным моделям не ждут друг друга.
+Слот берётся в event loop без блокировки потока, освобождать его
+можно из любого потока.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Tuple
+
+# Параллельных генераций одной модели по умолчанию
+DEFAULT_MODEL_CONCURRENCY = 2
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class ModelSlots:
+    """Семафор на модель с очередью ожидающих в порядке прихода"""
+
+    def __init__(self, limit: int = DEFAULT_MODEL_CONCURRENCY):
+        if limit <= 0:
+            raise ValueError('Лимит параллельных генераций должен быть положительным')
+        self.limit = int(limit)
+        self._lock = threading.Lock()
+        self._active: Dict[str, int] = {}
+        self._waiters: Dict[str, Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self.acquired = 0
+        self.waited = 0
+        self.max_wait_ms = 0.0
+
+    def active(self, model: str) -> int:
+        return self._active.get(model, 0)
+
+    def waiting(self, model: str) -> int:
+        return len(self._waiters.get(model, ()))
+
+    async def acquire(self, model: str):
+        """Ждёт свободный слот модели; отмена во время ожидания слот не занимает"""
+        t0 = time.perf_counter()
+        with self._lock:
+            queue = self._waiters.setdefault(model, deque())
+            if self._active.get(model, 0) < self.limit and not queue:
+                self._active[model] = self._active.get(model, 0) + 1
+                self.acquired += 1
+                return
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            queue.append((loop, future))
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if (loop, future) in queue:
+                    queue.remove((loop, future))
+                    raise
+            # Слот уже передан этому ожиданию - отдаём следующему
+            self.release(model)
+            raise
+
+        with self._lock:
+            self.acquired += 1
+            self.waited += 1
+            self.max_wait_ms = max(self.max_wait_ms, (time.perf_counter() - t0) * 1000)
+
+    def release(self, model: str):
+        """Освобождает слот: он переходит первому ожидающему, счётчик занятых не меняется"""
+        with self._lock:
+            queue = self._waiters.get(model)
+            while queue:
+                loop, future = queue.popleft()
+                if loop.is_closed():
+                    continue
+                # Отменённое ожидание получит слот и само передаст его дальше
+                loop.call_soon_threadsafe(_wake, future)
+                return
+            self._active[model] = max(0, self._active.get(model, 0) - 1)
+
+    @asynccontextmanager
+    async def hold(self, model: str):
+        await self.acquire(model)
+        try:
+            yield
+        finally:
+            self.release(model)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            models = {
+                model: {'active': self._active.get(model, 0), 'waiting': len(self._waiters.get(model, ()))}
+                for model in set(self._active) | set(self._waiters)
+            }
+        return {
+            'limit': self.limit,
+            'acquired': self.acquired,
+            'waited': self.waited,
+            'max_wait_ms': round(self.max_wait_ms, 1),
+            'models': models,
+        }
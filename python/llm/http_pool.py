@@ -0,0 +1,177 @@
+"""
+LLM HTTP Pool - долгоживущие соединения к Ollama
+
+Один aiohttp-пул на процесс для стримов и один requests.Session для
+синхронных вызовов: соединения переиспользуются через keep-alive, а не
+открываются заново на каждую подсказку. Таймауты заданы по фазам
+запроса; счётчики показывают, сколько соединений открыто и сколько
+запросов ушло по уже открытым.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger('LLM')
+
+# Соединений в пуле всего и на один хост
+HTTP_POOL_LIMIT = 32
+HTTP_POOL_PER_HOST = 16
+# Сколько простаивающее соединение остаётся открытым, с
+HTTP_KEEPALIVE_SECONDS = 60
+# Установка TCP-соединения, с
+CONNECT_TIMEOUT = 3.0
+# До первого байта ответа: включает загрузку модели и prompt eval, с
+FIRST_BYTE_TIMEOUT = 60.0
+# Между строками стрима (токенами), с
+INTER_TOKEN_TIMEOUT = 15.0
+# Верхний предел всего стрима, с
+STREAM_TOTAL_TIMEOUT = 120.0
+
+
+@dataclass(frozen=True)
+class PhaseTimeouts:
+    """Таймауты по фазам запроса к Ollama"""
+
+    connect: float = CONNECT_TIMEOUT
+    first_byte: float = FIRST_BYTE_TIMEOUT
+    inter_token: float = INTER_TOKEN_TIMEOUT
+    total: float = STREAM_TOTAL_TIMEOUT
+
+    def client_timeout(self) -> aiohttp.ClientTimeout:
+        # sock_read ограничивает ожидание заголовков и каждое чтение; паузу
+        # между токенами короче first_byte стрим проверяет сам
+        return aiohttp.ClientTimeout(total=self.total, connect=self.connect,
+                                     sock_connect=self.connect, sock_read=self.first_byte)
+
+    def sync(self, read: Optional[float] = None) -> tuple:
+        """(connect, read) для requests"""
+        return self.connect, read if read is not None else self.first_byte
+
+
+class OllamaHTTP:
+    """
+    Пулы соединений клиента Ollama.
+
+    aiohttp-сессия привязана к event loop: открывается в open() при старте
+    приложения или при первом стриме и пересоздаётся, если стрим пришёл из
+    другого loop (тесты, отдельные asyncio.run). requests.Session
+    потокобезопасен для вызовов из threadpool.
+    """
+
+    def __init__(self, timeouts: Optional[PhaseTimeouts] = None,
+                 pool_limit: int = HTTP_POOL_LIMIT, per_host: int = HTTP_POOL_PER_HOST,
+                 keepalive: float = HTTP_KEEPALIVE_SECONDS):
+        self.timeouts = timeouts or PhaseTimeouts()
+        self.pool_limit = pool_limit
+        self.per_host = per_host
+        self.keepalive = keepalive
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync: Optional[requests.Session] = None
+        self.async_requests = 0
+        self.async_connections = 0
+        self.async_reused = 0
+        self.sessions_opened = 0
+
+    # ---------- async ----------
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_request(session, ctx, params):
+            self.async_requests += 1
+
+        async def on_create(session, ctx, params):
+            self.async_connections += 1
+
+        async def on_reuse(session, ctx, params):
+            self.async_reused += 1
+
+        trace.on_request_start.append(on_request)
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    async def open(self) -> aiohttp.ClientSession:
+        """Пул для текущего event loop; существующий переиспользуется"""
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._loop is loop:
+            return self._session
+        if self._session is not None and not self._session.closed:
+            # Сессия чужого loop не может быть ни использована, ни закрыта из этого
+            logger.debug('[HTTP] Пул Ollama пересоздан для нового event loop')
+        connector = aiohttp.TCPConnector(limit=self.pool_limit, limit_per_host=self.per_host,
+                                         keepalive_timeout=self.keepalive)
+        self._session = aiohttp.ClientSession(connector=connector,
+                                              timeout=self.timeouts.client_timeout(),
+                                              trace_configs=[self._trace_config()])
+        self._loop = loop
+        self.sessions_opened += 1
+        return self._session
+
+    async def close(self):
+        """Закрытие пулов при остановке приложения"""
+        session, self._session = self._session, None
+        if session is not None and not session.closed and self._loop is asyncio.get_running_loop():
+            await session.close()
+        self._loop = None
+        self.close_sync()
+
+    # ---------- sync ----------
+
+    @property
+    def sync(self) -> requests.Session:
+        if self._sync is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.per_host, pool_maxsize=self.per_host)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._sync = session
+        return self._sync
+
+    def close_sync(self):
+        session, self._sync = self._sync, None
+        if session is not None:
+            session.close()
+
+    def _sync_counts(self) -> tuple:
+        connections = requests_sent = 0
+        if self._sync is None:
+            return 0, 0
+        for adapter in set(self._sync.adapters.values()):
+            pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+            if pools is None:
+                continue
+            for key in pools.keys():
+                pool = pools.get(key)
+                connections += getattr(pool, 'num_connections', 0)
+                requests_sent += getattr(pool, 'num_requests', 0)
+        return connections, requests_sent
+
+    def get_stats(self) -> dict:
+        sync_connections, sync_requests = self._sync_counts()
+        return {
+            'async': {
+                'requests': self.async_requests,
+                'connections': self.async_connections,
+                'reused': self.async_reused,
+                'sessions': self.sessions_opened,
+            },
+            'sync': {
+                'requests': sync_requests,
+                'connections': sync_connections,
+                'reused': max(0, sync_requests - sync_connections),
+            },
+            'timeouts': {
+                'connect': self.timeouts.connect,
+                'first_byte': self.timeouts.first_byte,
+                'inter_token': self.timeouts.inter_token,
+                'total': self.timeouts.total,
+            },
+        }
@@ -6,6 +6,7 @@ import asyncio
 import json
 import logging
 import time
+from dataclasses import dataclass, field
 from typing import Optional
 
 import aiohttp
@@ -14,11 +15,14 @@ import requests
 from prompts import get_few_shot_examples
 from classification import (
     classify_question,
-    build_contextual_prompt,
+    build_profile_prefix,
+    build_type_instructions,
     get_max_tokens_for_type,
     get_temperature_for_type,
 )
 from cache import HintCache
+from .http_pool import OllamaHTTP
+from .prompt_layout import PrefixCacheStats, build_prompt_layout
 from metrics import log_llm_request, log_llm_response, log_error
 from semantic_cache import get_semantic_cache
 from advanced_rag import get_advanced_rag
@@ -58,6 +62,29 @@ class HintMetrics:
         return {"ttft_ms": ttft, "total_ms": total}
 
 
+@dataclass
+class GenerationParams:
+    """
+    Параметры одного запроса генерации. Живут только в запросе, поэтому
+    параллельные запросы с разными моделями и профилями не мешают друг другу
+    через общий OllamaClient.
+    """
+
+    model: str
+    profile: str
+    metrics: HintMetrics = field(default_factory=HintMetrics)
+    question_type: str = "general"
+    similarity: float = 0.0
+    # Статичный префикс промпта и сколько токенов Ollama пересчитала
+    prefix_hash: str = ""
+    prefix_reused: bool = False
+    prompt_eval_count: Optional[int] = None
+    # Писать ответ в кэши и память сессии; спекуляция пишет его под финальным вопросом
+    remember: bool = True
+    # Ответ Ollama, дошедший до done
+    answer: Optional[str] = None
+
+
 def build_messages(
     system_prompt: str, context: list, question: str, few_shot: list = None
 ) -> list:
@@ -89,19 +116,85 @@ class OllamaClient:
         hint_cache: HintCache,
         user_context: str = "",
         profile: str = "job_interview_ru",
+        http: Optional[OllamaHTTP] = None,
     ):
         self.base_url = base_url
+        # Долгоживущие пулы соединений: keep-alive вместо нового соединения на подсказку
+        self.http = http or OllamaHTTP()
+        # Модель и профиль по умолчанию; запрос может задать свои в GenerationParams
         self.model = model
-        self.metrics = HintMetrics()
         self.hint_cache = hint_cache
         self.user_context = user_context
-        self.profile = profile  # Сохраняем профиль
-        self._last_question_type = "general"
-        self._last_similarity = 0.0
+        self.profile = profile
+        # Метрики последнего запроса без явных параметров
+        self.metrics = HintMetrics()
+        # Переиспользование статичного префикса промпта по моделям
+        self.prompt_cache = PrefixCacheStats()
+
+    def request_params(
+        self, model: Optional[str] = None, profile: Optional[str] = None
+    ) -> GenerationParams:
+        """Параметры запроса: не заданные поля берутся из настроек клиента"""
+        return GenerationParams(model=model or self.model, profile=profile or self.profile)
+
+    def _resolve_params(
+        self, params: Optional[GenerationParams], profile: Optional[str]
+    ) -> GenerationParams:
+        if params is not None:
+            return params
+        params = self.request_params(profile=profile)
+        self.metrics = params.metrics
+        return params
+
+    def _build_messages(
+        self,
+        params: GenerationParams,
+        text: str,
+        context: list,
+        question_type: str,
+        user_context: str,
+        custom_system_prompt: Optional[str] = None,
+        notes: str = "",
+    ) -> list:
+        """Сообщения со статичным префиксом профиля; хэш префикса пишется в params"""
+        system_prompt = build_profile_prefix(user_context, params.profile)
+        if custom_system_prompt:
+            system_prompt = custom_system_prompt + "\n\n" + system_prompt
+        layout = build_prompt_layout(
+            system_prompt,
+            get_few_shot_examples(params.profile),
+            context,
+            text,
+            instructions=build_type_instructions(question_type, params.profile),
+            notes=notes,
+        )
+        params.prefix_hash = layout.prefix_hash
+        params.prefix_reused = self.prompt_cache.observe(params.model, layout.prefix_hash)
+        return layout.messages
+
+    def _record_prompt_eval(self, params: GenerationParams, data: dict):
+        """prompt_eval_count из финального ответа Ollama: мало токенов - префикс взят из KV-кэша"""
+        count = data.get("prompt_eval_count")
+        duration = data.get("prompt_eval_duration")
+        params.prompt_eval_count = count
+        self.prompt_cache.record(
+            params.model,
+            params.profile,
+            params.prefix_hash,
+            params.prefix_reused,
+            count,
+            int(duration / 1e6) if duration is not None else None,
+        )
+        logger.info(
+            f"[LLM] prompt_eval_count={count}, префикс {params.prefix_hash} "
+            f"{'повторный' if params.prefix_reused else 'новый'}"
+        )
 
     def _check_available(self) -> bool:
         try:
-            resp = requests.get(f"{self.base_url}/api/tags", timeout=2)
+            resp = self.http.sync.get(
+                f"{self.base_url}/api/tags", timeout=self.http.timeouts.sync(2)
+            )
             return resp.status_code == 200
         except (requests.RequestException, OSError):
             return False
@@ -109,7 +202,9 @@ class OllamaClient:
     def list_models(self) -> list:
         """Получить список доступных моделей от Ollama"""
         try:
-            resp = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            resp = self.http.sync.get(
+                f"{self.base_url}/api/tags", timeout=self.http.timeouts.sync(5)
+            )
             if resp.status_code == 200:
                 data = resp.json()
                 models = []
@@ -138,39 +233,41 @@ class OllamaClient:
         text: str,
         context: list = None,
         system_prompt: str = None,
-        profile: str = "interview",
+        profile: str = None,
         max_tokens: int = 500,
         temperature: float = 0.8,
+        params: Optional[GenerationParams] = None,
     ) -> str:
-        """Синхронная генерация подсказки"""
-        self.metrics.reset()
-        self.metrics.request_started()
+        """Синхронная генерация подсказки; params - модель, профиль и метрики запроса"""
+        params = self._resolve_params(params, profile)
+        metrics = params.metrics
+        metrics.reset()
+        metrics.request_started()
 
         cached = self.hint_cache.get(text, context or [])
         if cached:
-            self.metrics.first_token()
-            self.metrics.done()
+            metrics.first_token()
+            metrics.done()
             return cached
 
         max_tokens = max(50, min(1000, max_tokens or 800))
         temperature = max(0.0, min(1.0, temperature or 0.8))
 
         question_type = classify_question(text)
+        params.question_type = question_type
         logger.info(f"[CLASSIFY] Type: {question_type}")
 
-        system_prompt = build_contextual_prompt(
-            question_type, self.user_context, self.profile
+        messages = self._build_messages(
+            params, text, context or [], question_type, self.user_context
         )
-        few_shot = get_few_shot_examples(self.profile)
-        messages = build_messages(system_prompt, context or [], text, few_shot)
 
         logger.info(f"[LLM] Type: {question_type}, messages: {len(messages)}")
 
         try:
-            resp = requests.post(
+            resp = self.http.sync.post(
                 f"{self.base_url}/api/chat",
                 json={
-                    "model": self.model,
+                    "model": params.model,
                     "messages": messages,
                     "stream": False,
                     "keep_alive": -1,
@@ -180,16 +277,17 @@ class OllamaClient:
                         "top_p": 0.9,
                     },
                 },
-                timeout=60,
+                timeout=self.http.timeouts.sync(),
             )
 
-            self.metrics.first_token()
-            self.metrics.done()
+            metrics.first_token()
+            metrics.done()
 
             if resp.status_code == 200:
                 data = resp.json()
+                self._record_prompt_eval(params, data)
                 hint = self._extract_hint(data)
-                stats = self.metrics.get_stats()
+                stats = metrics.get_stats()
                 logger.info(
                     f"[LLM] Подсказка за {stats['total_ms']}ms, len={len(hint)}"
                 )
@@ -246,40 +344,52 @@ class OllamaClient:
 
         return hint
 
+    def remember(self, text: str, context: list, hint: str, question_type: str):
+        """Ответ в LRU и семантический кэши и в память сессии RAG"""
+        self.hint_cache.set(text, context or [], hint)
+        get_semantic_cache().set(text, context or [], hint)
+        get_advanced_rag().consolidate_memory(text, hint, question_type)
+
     async def generate_stream(
         self,
         text: str,
         context: list = None,
-        profile: str = "interview",
+        profile: str = None,
         max_tokens: int = 500,
         temperature: float = 0.8,
         custom_system_prompt: str = None,
         custom_user_context: str = None,
+        params: Optional[GenerationParams] = None,
     ):
-        """Async streaming генерация подсказки"""
-        self.metrics.reset()
-        self.metrics.request_started()
-        self._last_question_type = "general"
+        """
+        Async streaming генерация подсказки. Тип вопроса, сходство из
+        семантического кэша и метрики пишутся в params запроса.
+        """
+        params = self._resolve_params(params, profile)
+        metrics = params.metrics
+        metrics.reset()
+        metrics.request_started()
+        params.question_type = "general"
 
         semantic_cache = get_semantic_cache()
         cached, similarity = semantic_cache.get(text, context or [])
         if cached:
-            self.metrics.first_token()
-            self.metrics.done()
-            self._last_similarity = similarity
+            metrics.first_token()
+            metrics.done()
+            params.similarity = similarity
             logger.info(f"[SemanticCache] HIT: similarity={similarity:.3f}")
             yield cached
             return
 
         cached_lru = self.hint_cache.get(text, context or [])
         if cached_lru:
-            self.metrics.first_token()
-            self.metrics.done()
+            metrics.first_token()
+            metrics.done()
             yield cached_lru
             return
 
         question_type = classify_question(text)
-        self._last_question_type = question_type
+        params.question_type = question_type
         logger.info(f"[CLASSIFY Stream] Type: {question_type}")
 
         recommended_tokens = get_max_tokens_for_type(question_type)
@@ -294,7 +404,7 @@ class OllamaClient:
 
         temperature = max(0.0, min(1.0, temperature or recommended_temp))
 
-        log_llm_request(text, len(context or []), question_type, self.profile)
+        log_llm_request(text, len(context or []), question_type, params.profile)
 
         effective_user_context = (
             custom_user_context if custom_user_context else self.user_context
@@ -302,91 +412,98 @@ class OllamaClient:
 
         rag = get_advanced_rag()
 
-        if custom_system_prompt:
-            base_prompt = (
-                custom_system_prompt
-                + "\n\n"
-                + build_contextual_prompt(
-                    question_type, effective_user_context, self.profile
-                )
-            )
-        else:
-            base_prompt = build_contextual_prompt(
-                question_type, effective_user_context, self.profile
-            )
-
-        system_prompt = rag.build_enhanced_prompt(
-            text, context or [], question_type, base_prompt
-        )
+        # RAG, темы сессии и история меняются от запроса к запросу - после префикса
+        notes = rag.build_request_notes(text, context or [], question_type)
         adaptive_context = rag.get_adaptive_context(context or [], text)
-        few_shot = get_few_shot_examples(self.profile)
-        messages = build_messages(system_prompt, adaptive_context, text, few_shot)
+        messages = self._build_messages(
+            params,
+            text,
+            adaptive_context,
+            question_type,
+            effective_user_context,
+            custom_system_prompt,
+            notes,
+        )
 
         logger.info(f"[LLM Stream] Type: {question_type}, messages: {len(messages)}")
 
         accumulated_hint = ""
 
-        try:
-            timeout = aiohttp.ClientTimeout(total=120)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                payload = {
-                    "model": self.model,
-                    "messages": messages,
-                    "stream": True,
-                    "keep_alive": -1,
-                    "options": {
-                        "temperature": temperature,
-                        "num_predict": max_tokens,
-                        "top_p": 0.9,
-                    },
-                }
-                async with session.post(
-                    f"{self.base_url}/api/chat", json=payload
-                ) as resp:
-                    if resp.status == 200:
-                        async for line in resp.content:
-                            if line:
-                                try:
-                                    data = json.loads(line.decode("utf-8"))
-                                    content = data.get("message", {}).get("content", "")
-                                    if content:
-                                        self.metrics.first_token()
-                                        accumulated_hint += content
-                                        yield content
-                                    if data.get("done"):
-                                        self.metrics.done()
-                                        if accumulated_hint.strip():
-                                            self.hint_cache.set(
-                                                text, context or [], accumulated_hint
-                                            )
-                                            semantic_cache.set(
-                                                text, context or [], accumulated_hint
-                                            )
-                                            rag.consolidate_memory(
-                                                text, accumulated_hint, question_type
-                                            )
-                                        stats = self.metrics.get_stats()
-                                        log_llm_response(
-                                            stats["ttft_ms"],
-                                            stats["total_ms"],
-                                            len(accumulated_hint),
-                                            cached=False,
-                                            question_type=question_type,
-                                        )
-                                        break
-                                except json.JSONDecodeError:
-                                    pass
-                    else:
-                        error_msg = f"Ollama ошибка: {resp.status}"
-                        log_error("llm", "ollama_error", error_msg)
-                        yield error_msg
+        timeouts = self.http.timeouts
+        phase = "first_byte"
+        done = False
 
+        try:
+            session = await self.http.open()
+            payload = {
+                "model": params.model,
+                "messages": messages,
+                "stream": True,
+                "keep_alive": -1,
+                "options": {
+                    "temperature": temperature,
+                    "num_predict": max_tokens,
+                    "top_p": 0.9,
+                },
+            }
+            async with session.post(f"{self.base_url}/api/chat", json=payload) as resp:
+                if resp.status != 200:
+                    error_msg = f"Ollama ошибка: {resp.status}"
+                    log_error("llm", "ollama_error", error_msg)
+                    yield error_msg
+                    return
+
+                while True:
+                    # Первая строка ждёт prompt eval, дальше - пауза между токенами
+                    wait = timeouts.first_byte if phase == "first_byte" else timeouts.inter_token
+                    line = await asyncio.wait_for(resp.content.readline(), timeout=wait)
+                    if not line:
+                        # Ответ дочитан до конца - соединение возвращается в пул
+                        break
+                    phase = "inter_token"
+                    if done:
+                        continue
+                    try:
+                        data = json.loads(line.decode("utf-8"))
+                    except json.JSONDecodeError:
+                        continue
+                    content = data.get("message", {}).get("content", "")
+                    if content:
+                        metrics.first_token()
+                        accumulated_hint += content
+                        yield content
+                    if data.get("done"):
+                        done = True
+                        metrics.done()
+                        self._record_prompt_eval(params, data)
+                        if accumulated_hint.strip():
+                            params.answer = accumulated_hint
+                            if params.remember:
+                                self.remember(text, context, accumulated_hint, question_type)
+                        stats = metrics.get_stats()
+                        log_llm_response(
+                            stats["ttft_ms"],
+                            stats["total_ms"],
+                            len(accumulated_hint),
+                            cached=False,
+                            question_type=question_type,
+                        )
+
+        except aiohttp.ConnectionTimeoutError:
+            error_msg = f"Таймаут подключения к Ollama ({timeouts.connect:g} сек)"
+            log_error("llm", "timeout", error_msg)
+            yield error_msg
         except aiohttp.ClientConnectorError:
             error_msg = "Ollama не запущен. Запустите: ollama serve"
             log_error("llm", "connection_error", error_msg)
             yield error_msg
         except asyncio.TimeoutError:
-            error_msg = "Таймаут запроса к Ollama (120 сек)"
+            if done:
+                return
+            if phase == "first_byte":
+                error_msg = f"Таймаут ожидания ответа Ollama ({timeouts.first_byte:g} сек)"
+            else:
+                error_msg = f"Ollama перестала присылать токены ({timeouts.inter_token:g} сек)"
             log_error("llm", "timeout", error_msg)
             yield error_msg
         except Exception as e:
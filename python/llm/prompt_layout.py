@@ -0,0 +1,118 @@
+"""
+LLM Prompt Layout - промпт со стабильным префиксом для KV-кэша Ollama
+
+Ollama не пересчитывает начало промпта, совпадающее с предыдущим запросом
+к той же модели. Поэтому сообщения собираются в два слоя: статичный
+префикс профиля (системный промпт с резюме и few-shot) одинаков байт в
+байт от запроса к запросу, а всё, что меняется (формат ответа по типу
+вопроса, чанки RAG, темы сессии, история), идёт после него.
+"""
+
+import hashlib
+import json
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+# Сколько последних запросов хранит диагностика префикса
+PROMPT_HISTORY = 50
+# Сколько реплик истории попадает в промпт (как в build_messages)
+HISTORY_LIMIT = 10
+
+
+@dataclass
+class PromptLayout:
+    """Сообщения для /api/chat и хэш их статичного префикса"""
+
+    messages: list
+    prefix_hash: str
+    prefix_messages: int
+
+
+def prefix_hash(messages: list) -> str:
+    """Короткий хэш сообщений префикса"""
+    raw = json.dumps(messages, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+
+def build_prompt_layout(system_prompt: str, few_shot: list, context: list, question: str,
+                        instructions: str = '', notes: str = '') -> PromptLayout:
+    """
+    Собирает сообщения: system и few-shot образуют префикс, история и
+    материал запроса - хвост. Вопрос идёт последним, после инструкций.
+    """
+    prefix = [{'role': 'system', 'content': system_prompt}]
+    for example in few_shot or []:
+        prefix.append({'role': 'user', 'content': example['user']})
+        prefix.append({'role': 'assistant', 'content': example['assistant']})
+
+    tail = []
+    if context:
+        context_text = '\n'.join(context[-HISTORY_LIMIT:])
+        tail.append({'role': 'user', 'content': f'Контекст разговора:\n{context_text}'})
+
+    parts = [part for part in (instructions, notes) if part]
+    question_block = '\n\n'.join(parts + [f'## Вопрос:\n{question}']) if parts else question
+    tail.append({'role': 'user', 'content': question_block})
+
+    return PromptLayout(messages=prefix + tail, prefix_hash=prefix_hash(prefix),
+                        prefix_messages=len(prefix))
+
+
+class PrefixCacheStats:
+    """
+    Диагностика переиспользования префикса: совпал ли хэш префикса с
+    предыдущим запросом к той же модели и сколько токенов промпта Ollama
+    пересчитала (prompt_eval_count).
+    """
+
+    def __init__(self, history: int = PROMPT_HISTORY):
+        self._lock = threading.Lock()
+        self._last: Dict[str, str] = {}
+        self.requests = 0
+        self.reused = 0
+        self.recent: Deque[dict] = deque(maxlen=history)
+
+    def observe(self, model: str, prefix: str) -> bool:
+        """Отмечает отправку промпта; True, если префикс совпал с прошлым запросом модели"""
+        with self._lock:
+            reused = self._last.get(model) == prefix
+            self._last[model] = prefix
+            self.requests += 1
+            if reused:
+                self.reused += 1
+        return reused
+
+    def record(self, model: str, profile: str, prefix: str, reused: bool,
+               prompt_eval_count: Optional[int], prompt_eval_ms: Optional[int]):
+        """Запоминает итог запроса из финального ответа Ollama"""
+        with self._lock:
+            self.recent.append({
+                'model': model,
+                'profile': profile,
+                'prefix_hash': prefix,
+                'prefix_reused': reused,
+                'prompt_eval_count': prompt_eval_count,
+                'prompt_eval_ms': prompt_eval_ms,
+            })
+
+    @staticmethod
+    def _avg(values: List[int]) -> Optional[int]:
+        return round(sum(values) / len(values)) if values else None
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            recent = list(self.recent)
+            requests, reused = self.requests, self.reused
+        evals = [r for r in recent if r['prompt_eval_count'] is not None]
+        return {
+            'requests': requests,
+            'prefix_reused': reused,
+            'reuse_rate': round(reused / requests, 3) if requests else 0.0,
+            'prompt_eval_count': {
+                'avg_reused': self._avg([r['prompt_eval_count'] for r in evals if r['prefix_reused']]),
+                'avg_changed': self._avg([r['prompt_eval_count'] for r in evals if not r['prefix_reused']]),
+            },
+            'recent': recent,
+        }
@@ -0,0 +1,208 @@
+"""
+LLM Speculation - подсказка, начатая по промежуточному тексту вопроса
+
+Пока вопрос ещё звучит, клиент присылает промежуточный транскрипт, и
+генерация стартует заранее. Когда приходит финальный текст той же сессии,
+спекуляция продвигается, если текст совпал или близок по смыслу
+(embeddings из semantic_cache), и отбрасывается вместе с генерацией иначе.
+Продвинутый стрим сначала отдаёт уже готовые токены, затем догоняет живые.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from metrics import log_hint_speculation
+from semantic_cache import get_semantic_cache
+
+logger = logging.getLogger('LLM')
+
+# Минимальное сходство финального текста с промежуточным для продвижения
+SPECULATION_SIMILARITY = 0.85
+# Сколько спекуляция ждёт финальный текст, с
+SPECULATION_TTL_SECONDS = 15.0
+# Сколько последних реплик контекста должно совпасть (как в semantic_cache)
+CONTEXT_TAIL = 3
+
+
+def text_similarity(a: str, b: str) -> float:
+    """Сходство текстов по embeddings; без модели совпадает только одинаковый текст"""
+    similarity = get_semantic_cache().similarity(a, b)
+    return 0.0 if similarity is None else similarity
+
+
+class Speculation:
+    """Генерация по промежуточному тексту: буфер токенов и тайминги"""
+
+    def __init__(self, text: str, context: list, key: tuple, params=None):
+        self.text = text
+        self.context_tail = list(context or [])[-CONTEXT_TAIL:]
+        self.key = key
+        self.params = params
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.started = time.perf_counter()
+        self.first_token: Optional[float] = None
+        self.claimed: Optional[float] = None
+        self.similarity = 0.0
+        self._updated = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, source: AsyncIterator):
+        self._task = asyncio.create_task(self._produce(source))
+
+    async def _produce(self, source: AsyncIterator):
+        try:
+            async for chunk in source:
+                if self.first_token is None:
+                    self.first_token = time.perf_counter()
+                self.chunks.append(chunk)
+                self._updated.set()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._updated.set()
+
+    def cancel(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    @property
+    def saved_ttft_ms(self) -> int:
+        """Насколько раньше финального запроса генерация начала отдавать ответ"""
+        if self.claimed is None:
+            return 0
+        ready = self.first_token if self.first_token is not None and self.first_token < self.claimed else self.claimed
+        return int((ready - self.started) * 1000)
+
+    def stats_since_claim(self) -> dict:
+        """TTFT и латентность с точки зрения финального запроса"""
+        claimed = self.claimed if self.claimed is not None else self.started
+        now = time.perf_counter()
+        first = self.first_token if self.first_token is not None else now
+        return {
+            'ttft_ms': int(max(0.0, first - claimed) * 1000),
+            'latency_ms': int((now - claimed) * 1000),
+        }
+
+    async def follow(self) -> AsyncIterator[str]:
+        """Готовые токены, затем новые до конца генерации; закрытие отменяет генерацию"""
+        sent = 0
+        try:
+            while True:
+                while sent < len(self.chunks):
+                    yield self.chunks[sent]
+                    sent += 1
+                if self.done:
+                    break
+                self._updated.clear()
+                await self._updated.wait()
+        finally:
+            if not self.done:
+                self.cancel()
+        if self.error is not None:
+            raise self.error
+
+
+class Speculator:
+    """Спекуляции по сессиям: одна на сессию, продвижение или отбрасывание"""
+
+    def __init__(self, threshold: float = SPECULATION_SIMILARITY, ttl: float = SPECULATION_TTL_SECONDS,
+                 similarity: Callable[[str, str], float] = text_similarity):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Speculation] = {}
+        self.started = 0
+        self.promoted = 0
+        self.discarded = 0
+        self.replaced = 0
+        self.expired = 0
+        self.saved_ttft_ms = 0
+
+    def start(self, session_id: str, text: str, context: list, key: tuple,
+              source: AsyncIterator, params=None) -> Speculation:
+        """Запускает генерацию; прежняя спекуляция сессии отменяется"""
+        speculation = Speculation(text, context, key, params)
+        with self._lock:
+            old = self._pending.pop(session_id, None)
+            self._pending[session_id] = speculation
+            self.started += 1
+            if old is not None:
+                self.replaced += 1
+        if old is not None:
+            old.cancel()
+        speculation.start(source)
+        asyncio.get_running_loop().call_later(self.ttl, self._expire, session_id, speculation)
+        return speculation
+
+    def _expire(self, session_id: str, speculation: Speculation):
+        with self._lock:
+            if self._pending.get(session_id) is not speculation:
+                return
+            del self._pending[session_id]
+            self.expired += 1
+        speculation.cancel()
+        log_hint_speculation('expired', 0.0)
+
+    def drop(self, session_id: Optional[str]):
+        """Отменяет спекуляцию сессии, не считая её промахом (ответ взят из кэша)"""
+        with self._lock:
+            speculation = self._pending.pop(session_id, None)
+        if speculation is not None:
+            speculation.cancel()
+
+    async def claim(self, session_id: Optional[str], text: str, context: list,
+                    key: tuple) -> Optional[Speculation]:
+        """Спекуляция для финального текста или None; неподходящая отменяется"""
+        arrived = time.perf_counter()
+        with self._lock:
+            speculation = self._pending.pop(session_id, None)
+        if speculation is None:
+            return None
+
+        similarity = 0.0
+        if speculation.key == key and speculation.context_tail == list(context or [])[-CONTEXT_TAIL:]:
+            # Embedding считается на CPU: не держим event loop
+            similarity = await asyncio.to_thread(self.similarity, speculation.text, text)
+        speculation.similarity = similarity
+
+        if similarity < self.threshold:
+            speculation.cancel()
+            with self._lock:
+                self.discarded += 1
+            log_hint_speculation('discarded', similarity)
+            logger.info(f'[LLM] Спекуляция отброшена: similarity={similarity:.3f}')
+            return None
+
+        speculation.claimed = arrived
+        saved = speculation.saved_ttft_ms
+        with self._lock:
+            self.promoted += 1
+            self.saved_ttft_ms += saved
+        log_hint_speculation('promoted', similarity, saved)
+        logger.info(f'[LLM] Спекуляция продвинута: similarity={similarity:.3f}, выигрыш TTFT {saved} мс')
+        return speculation
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            decided = self.promoted + self.discarded
+            return {
+                'started': self.started,
+                'promoted': self.promoted,
+                'discarded': self.discarded,
+                'replaced': self.replaced,
+                'expired': self.expired,
+                'pending': len(self._pending),
+                'hit_rate': round(self.promoted / decided, 3) if decided else 0.0,
+                'saved_ttft_ms': {
+                    'total': self.saved_ttft_ms,
+                    'avg': round(self.saved_ttft_ms / self.promoted) if self.promoted else 0,
+                },
+                'threshold': self.threshold,
+            }
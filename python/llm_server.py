@@ -10,17 +10,18 @@ import logging
 import os
 import sys
 import time
-import threading
+from contextlib import asynccontextmanager
 from typing import Annotated, Optional
 
 import requests
 from functools import wraps
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, ConfigDict, Field, StringConstraints
 import uvicorn
 
-from llm import OllamaClient
+from llm import OllamaClient, ModelSlots, GenerationRegistry, Speculator
+from llm.cancellation import CANCEL_SUPERSEDED
 from cache import HintCache
 
 # Настройка логирования
@@ -37,6 +38,8 @@ HTTP_PORT = 8766
 
 OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434')
 DEFAULT_MODEL = os.getenv('OLLAMA_MODEL', 'qwen3:8b')
+# Параллельных генераций на одну модель Ollama (выше OLLAMA_NUM_PARALLEL запросы всё равно ждут в Ollama)
+MODEL_CONCURRENCY = int(os.getenv('LLM_MODEL_CONCURRENCY', '2'))
 
 MAX_RETRIES = 3
 RETRY_DELAY_BASE = 1.0
@@ -107,7 +110,7 @@ def preload_model(model: str = DEFAULT_MODEL):
     """Предзагрузка модели в память Ollama"""
     try:
         logger.info(f'[PRELOAD] Загрузка модели {model}...')
-        resp = requests.post(
+        resp = ollama.http.sync.post(
             f'{OLLAMA_URL}/api/generate',
             json={'model': model, 'prompt': '', 'keep_alive': -1},
             timeout=120
@@ -135,6 +138,9 @@ class HintRequest(BaseModel):
     temperature: float = Field(default=0.8, ge=0.0, le=2.0)
     system_prompt: Optional[str] = Field(default=None, max_length=20_000)
     user_context: Optional[str] = Field(default=None, max_length=100_000)
+    # Сессия клиента: новый запрос той же сессии отменяет незавершённые (latest-wins)
+    session_id: Optional[str] = Field(default=None, min_length=1, max_length=128)
+    latest_wins: bool = True
 
 
 class VisionRequest(BaseModel):
@@ -157,9 +163,26 @@ if VACANCY_CONTEXT:
 
 hint_cache = HintCache(maxsize=100)
 ollama = OllamaClient(OLLAMA_URL, DEFAULT_MODEL, hint_cache, FULL_CONTEXT, USER_PROFILE)
+# Слоты генерации по моделям: запрос к одной модели не ждёт генерацию другой
+model_slots = ModelSlots(MODEL_CONCURRENCY)
+# Стримы в полёте: отмена при обрыве клиента и вытеснении новым запросом сессии
+generations = GenerationRegistry()
+# Генерации по промежуточному тексту вопроса, ждущие финальный текст сессии
+speculator = Speculator()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Пул соединений к Ollama живёт всё время работы сервера"""
+    await ollama.http.open()
+    try:
+        yield
+    finally:
+        await ollama.http.close()
+
 
 # FastAPI app
-app = FastAPI(title='Live Hints LLM Server')
+app = FastAPI(title='Live Hints LLM Server', lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origin_regex=r'^(https?://(localhost|127\.0\.0\.1)(:\d+)?|null)$',
@@ -203,8 +226,6 @@ async def health():
     }
 
 
-_ollama_lock = threading.Lock()
-
 @app.post('/hint')
 async def generate_hint(hint_request: HintRequest):
     """Генерация подсказки (неблокирующий вызов через threadpool)"""
@@ -212,32 +233,62 @@ async def generate_hint(hint_request: HintRequest):
     if not request.text or len(request.text.strip()) < 5:
         raise HTTPException(400, 'Текст слишком короткий')
 
-    def _generate_sync():
-        with _ollama_lock:
-            original_model = ollama.model
-            original_profile = ollama.profile
-            if request.model:
-                ollama.model = request.model
-            if request.profile and request.profile != ollama.profile:
-                ollama.profile = request.profile
-            try:
-                hint = ollama.generate(
-                    text=request.text,
-                    context=request.context,
-                    max_tokens=request.max_tokens,
-                    temperature=request.temperature
-                )
-                stats = ollama.metrics.get_stats()
-                return {'hint': hint, 'latency_ms': stats['total_ms'], 'ttft_ms': stats['ttft_ms']}
-            finally:
-                ollama.model = original_model
-                ollama.profile = original_profile
-
-    return await asyncio.to_thread(_generate_sync)
+    # Модель и профиль запроса не пишутся в общий клиент
+    params = ollama.request_params(request.model, request.profile)
+    async with model_slots.hold(params.model):
+        hint = await asyncio.to_thread(
+            ollama.generate,
+            text=request.text,
+            context=request.context,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            params=params,
+        )
+    stats = params.metrics.get_stats()
+    return {'hint': hint, 'latency_ms': stats['total_ms'], 'ttft_ms': stats['ttft_ms']}
+
+
+async def _generate(request: HintRequest, params):
+    """Токены Ollama; слот модели держится только на время генерации и освобождается при её отмене"""
+    async with model_slots.hold(params.model):
+        async for chunk in ollama.generate_stream(
+            request.text, request.context,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            custom_system_prompt=request.system_prompt,
+            custom_user_context=request.user_context,
+            params=params,
+        ):
+            yield chunk
+
+
+def _speculation_key(request: HintRequest, params) -> tuple:
+    """Параметры, при которых спекуляция годится для финального запроса"""
+    return (params.model, params.profile, request.max_tokens, request.temperature,
+            request.system_prompt, request.user_context)
+
+
+@app.post('/hint/speculate')
+async def speculate_hint(hint_request: HintRequest):
+    """Спекулятивная генерация по промежуточному тексту вопроса"""
+    request = hint_request
+    if not request.session_id:
+        raise HTTPException(400, 'Для спекуляции нужен session_id')
+    if len(request.text.strip()) < 5:
+        raise HTTPException(400, 'Текст слишком короткий')
+    if hint_cache.get(request.text, request.context or []):
+        return {'status': 'cached', 'session_id': request.session_id}
+
+    params = ollama.request_params(request.model, request.profile)
+    # Ответ на недослушанный вопрос не пишется в кэши и память: при продвижении его запишут под финальным
+    params.remember = False
+    speculator.start(request.session_id, request.text, request.context,
+                     _speculation_key(request, params), _generate(request, params), params)
+    return {'status': 'started', 'session_id': request.session_id}
 
 
 @app.post('/hint/stream')
-async def generate_hint_stream(hint_request: HintRequest):
+async def generate_hint_stream(hint_request: HintRequest, http_request: Request):
     """Streaming генерация подсказки"""
     request = hint_request
     if not request.text or len(request.text.strip()) < 5:
@@ -247,39 +298,79 @@ async def generate_hint_stream(hint_request: HintRequest):
     instant_answer = vector_db.get_instant_answer(request.text)
     cached = instant_answer or hint_cache.get(request.text, request.context or [])
     question_type = classify_question(request.text)
-    
+    params = ollama.request_params(request.model, request.profile)
+    speculation = None
+    if cached:
+        speculator.drop(request.session_id)
+    elif request.session_id:
+        speculation = await speculator.claim(request.session_id, request.text, request.context,
+                                             _speculation_key(request, params))
+
     async def stream():
-        with _ollama_lock:
-            original_model = ollama.model
-            original_profile = ollama.profile
-            if request.model:
-                ollama.model = request.model
-            if request.profile and request.profile != ollama.profile:
-                ollama.profile = request.profile
-            try:
-                if cached:
-                    log_cache_hit(request.text)
-                    log_llm_response(0, 0, len(cached), cached=True, question_type=question_type)
-                    yield f"data: {json.dumps({'chunk': cached, 'cached': True, 'question_type': question_type}, ensure_ascii=False)}\n\n"
-                    yield f"data: {json.dumps({'done': True, 'cached': True, 'question_type': question_type, 'latency_ms': 0, 'ttft_ms': 0}, ensure_ascii=False)}\n\n"
-                else:
-                    async for chunk in ollama.generate_stream(
-                        request.text, request.context,
-                        request.max_tokens, request.temperature,
-                        request.system_prompt, request.user_context
-                    ):
-                        yield f"data: {json.dumps({'chunk': chunk}, ensure_ascii=False)}\n\n"
-                    
-                    stats = ollama.metrics.get_stats()
-                    q_type = getattr(ollama, '_last_question_type', question_type)
-                    yield f"data: {json.dumps({'done': True, 'question_type': q_type, 'latency_ms': stats['total_ms'], 'ttft_ms': stats['ttft_ms']}, ensure_ascii=False)}\n\n"
-            finally:
-                ollama.model = original_model
-                ollama.profile = original_profile
+        # Новый запрос сессии вытесняет прежние, даже если сам отвечает из кэша
+        handle = generations.begin(request.session_id, request.latest_wins)
+        if cached:
+            generations.finish(handle)
+            log_cache_hit(request.text)
+            log_llm_response(0, 0, len(cached), cached=True, question_type=question_type)
+            yield f"data: {json.dumps({'chunk': cached, 'cached': True, 'question_type': question_type}, ensure_ascii=False)}\n\n"
+            yield f"data: {json.dumps({'done': True, 'cached': True, 'question_type': question_type, 'latency_ms': 0, 'ttft_ms': 0}, ensure_ascii=False)}\n\n"
+            return
+
+        source = speculation.follow() if speculation else _generate(request, params)
+        async for chunk in generations.run(handle, source, http_request.is_disconnected):
+            yield f"data: {json.dumps({'chunk': chunk}, ensure_ascii=False)}\n\n"
+
+        if handle.reason == CANCEL_SUPERSEDED:
+            yield f"data: {json.dumps({'done': True, 'cancelled': handle.reason}, ensure_ascii=False)}\n\n"
+            return
+        if handle.cancelled:
+            return
+
+        if speculation:
+            if speculation.params.answer:
+                ollama.remember(request.text, request.context, speculation.params.answer, question_type)
+            # TTFT и латентность считаются от прихода финального текста
+            stats = speculation.stats_since_claim()
+            yield f"data: {json.dumps({'done': True, 'question_type': speculation.params.question_type, 'latency_ms': stats['latency_ms'], 'ttft_ms': stats['ttft_ms'], 'speculative': True, 'saved_ttft_ms': speculation.saved_ttft_ms, 'prompt_eval_count': speculation.params.prompt_eval_count}, ensure_ascii=False)}\n\n"
+            return
+
+        stats = params.metrics.get_stats()
+        yield f"data: {json.dumps({'done': True, 'question_type': params.question_type, 'latency_ms': stats['total_ms'], 'ttft_ms': stats['ttft_ms'], 'prompt_eval_count': params.prompt_eval_count, 'prefix_reused': params.prefix_reused}, ensure_ascii=False)}\n\n"
     
     return StreamingResponse(stream(), media_type='text/event-stream')
 
 
+@app.get('/hint/concurrency')
+async def hint_concurrency():
+    """Занятые и ожидающие слоты генерации по моделям"""
+    return model_slots.get_stats()
+
+
+@app.get('/hint/cancellations')
+async def hint_cancellations():
+    """Генерации в полёте и отменённые: обрыв клиента и вытеснение новым запросом"""
+    return generations.get_stats()
+
+
+@app.get('/hint/speculation')
+async def hint_speculation():
+    """Спекулятивные генерации: доля продвинутых и сэкономленный TTFT"""
+    return speculator.get_stats()
+
+
+@app.get('/hint/prompt-cache')
+async def hint_prompt_cache():
+    """Переиспользование статичного префикса промпта и prompt_eval_count по запросам"""
+    return ollama.prompt_cache.get_stats()
+
+
+@app.get('/http/stats')
+async def http_stats():
+    """Соединения к Ollama: открытые и переиспользованные через keep-alive"""
+    return ollama.http.get_stats()
+
+
 @app.post('/cache/clear')
 async def clear_cache():
     """Очистка кэша"""
@@ -115,6 +115,28 @@ def log_cache_hit(text: str, similarity: float = 1.0):
     )
 
 
+def log_hint_cancelled(reason: str, elapsed_ms: int, chunks: int):
+    """Логирует отменённую генерацию (обрыв клиента или вытеснение новым запросом)"""
+    log_metric(
+        'hint_cancelled',
+        'llm',
+        reason=reason,
+        elapsed_ms=elapsed_ms,
+        chunks=chunks
+    )
+
+
+def log_hint_speculation(outcome: str, similarity: float, saved_ttft_ms: int = 0):
+    """Логирует исход спекулятивной генерации (promoted, discarded, expired)"""
+    log_metric(
+        'hint_speculation',
+        'llm',
+        outcome=outcome,
+        similarity=round(similarity, 3),
+        saved_ttft_ms=saved_ttft_ms
+    )
+
+
 def log_error(component: str, error_type: str, message: str):
     """Логирует ошибку"""
     log_metric(
@@ -165,6 +187,19 @@ def get_metrics_stats() -> Dict[str, Any]:
             qt = e['data'].get('question_type', 'unknown')
             question_types[qt] = question_types.get(qt, 0) + 1
     
+    # Отменённые генерации по причинам
+    cancelled = {}
+    for e in events:
+        if e['event_type'] == 'hint_cancelled':
+            reason = e['data'].get('reason', 'unknown')
+            cancelled[reason] = cancelled.get(reason, 0) + 1
+
+    # Спекулятивные генерации: доля продвинутых и сэкономленный TTFT
+    speculations = [e for e in events if e['event_type'] == 'hint_speculation']
+    promoted = [e for e in speculations if e['data'].get('outcome') == 'promoted']
+    discarded = sum(1 for e in speculations if e['data'].get('outcome') == 'discarded')
+    saved_ttft = [e['data'].get('saved_ttft_ms', 0) for e in promoted]
+
     # Ошибки
     errors = [e for e in events if e['event_type'] == 'error']
     
@@ -198,7 +233,14 @@ def get_metrics_stats() -> Dict[str, Any]:
             'cache_hits': cache_hits,
             'cache_hit_rate': round(cache_hits / len(llm_responses) * 100, 1) if llm_responses else 0,
             'ttft_ms': calc_stats(llm_ttft),
-            'total_ms': calc_stats(llm_total)
+            'total_ms': calc_stats(llm_total),
+            'cancelled': cancelled,
+            'speculation': {
+                'promoted': len(promoted),
+                'discarded': discarded,
+                'hit_rate': round(len(promoted) / (len(promoted) + discarded) * 100, 1) if promoted or discarded else 0,
+                'saved_ttft_ms': calc_stats(saved_ttft)
+            }
         },
         'question_types': question_types,
         'errors': {
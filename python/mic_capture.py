@@ -4,11 +4,16 @@ Microphone Capture - Захват аудио с микрофона
 """
 
 import sys
+import json
 import time
 import logging
 import asyncio
+from typing import Optional
+
 import numpy as np
 
+from audio.sources import AudioSource, SourceReader, create_audio_source
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -20,144 +25,113 @@ SAMPLE_RATE = 16000
 CHANNELS = 1
 CHUNK_SIZE = 1024
 WS_URL = 'ws://localhost:8764'
+# Сколько ждать подтверждения формата от STT сервера
+HANDSHAKE_TIMEOUT = 5.0
 
 
 class MicrophoneCapture:
-    def __init__(self, device_index=None):
+    def __init__(self, device_index=None, source: Optional[AudioSource] = None):
         self.device_index = device_index
-        self.stream = None
-        self.p = None
+        # Источник выбирается при первом обращении: pyaudiowpatch, иначе sounddevice
+        self._source = source
         self.running = False
         self.ws = None
         self.muted = False
     
+    @property
+    def source(self) -> AudioSource:
+        if self._source is None:
+            self._source = create_audio_source('auto')
+        return self._source
+    
     def list_devices(self):
         """Список доступных микрофонов"""
         devices = []
         try:
-            import pyaudiowpatch as pyaudio
-            p = pyaudio.PyAudio()
-            for i in range(p.get_device_count()):
-                info = p.get_device_info_by_index(i)
+            for info in self.source.list_devices():
                 if info['maxInputChannels'] > 0:
                     devices.append({
-                        'index': i,
+                        'index': info['index'],
                         'name': info['name'],
                         'channels': info['maxInputChannels'],
                         'sampleRate': int(info['defaultSampleRate'])
                     })
-            p.terminate()
-        except ImportError:
-            try:
-                import sounddevice as sd
-                for i, dev in enumerate(sd.query_devices()):
-                    if dev['max_input_channels'] > 0:
-                        devices.append({
-                            'index': i,
-                            'name': dev['name'],
-                            'channels': dev['max_input_channels'],
-                            'sampleRate': int(dev['default_samplerate'])
-                        })
-            except:
-                pass
+        except Exception as e:
+            logger.warning(f'[MIC] Список устройств недоступен: {e}')
         return devices
     
     async def start_capture(self, ws_url=WS_URL):
         """Запуск захвата и отправки в WebSocket"""
         import websockets
         
-        try:
-            import pyaudiowpatch as pyaudio
-            use_pyaudio = True
-        except ImportError:
-            import sounddevice as sd
-            use_pyaudio = False
-        
         self.running = True
         
         async with websockets.connect(ws_url) as ws:
-            self.ws = ws
             logger.info(f'[MIC] Подключено к {ws_url}')
+            await self._handshake(ws)
+            self.ws = ws
+            # Сервер может прислать статус или ошибку - читаем, чтобы не переполнить входную очередь
+            reader = asyncio.create_task(self._read_server_messages(ws))
             
-            if use_pyaudio:
-                await self._capture_pyaudio(pyaudio)
-            else:
-                await self._capture_sounddevice(sd)
+            try:
+                await self._capture_source()
+            finally:
+                reader.cancel()
     
-    async def _capture_pyaudio(self, pyaudio):
-        """Захват через pyaudiowpatch"""
-        p = pyaudio.PyAudio()
+    async def _handshake(self, ws):
+        """Согласование формата кадров: float32, моно, 16 кГц"""
+        await ws.send(json.dumps({
+            'type': 'audio_start',
+            'sample_rate': SAMPLE_RATE,
+            'dtype': 'float32',
+            'channels': CHANNELS,
+            'source': 'microphone',
+        }))
         
+        deadline = time.monotonic() + HANDSHAKE_TIMEOUT
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RuntimeError('STT сервер не подтвердил формат аудио')
+            message = json.loads(await asyncio.wait_for(ws.recv(), timeout=remaining))
+            if message.get('type') == 'audio_ack':
+                logger.info(f'[MIC] Формат подтверждён: {message}')
+                return
+            if message.get('type') == 'error':
+                raise RuntimeError(f'STT сервер отклонил формат: {message.get("message")}')
+    
+    async def _read_server_messages(self, ws):
+        async for message in ws:
+            if isinstance(message, str) and '"error"' in message:
+                logger.warning(f'[MIC] Сервер: {message}')
+    
+    async def _capture_source(self):
+        """Захват через источник аудио: блоки моно float32 16 кГц"""
         device_index = self.device_index
         if device_index is None:
-            device_index = p.get_default_input_device_info()['index']
-        
-        device_info = p.get_device_info_by_index(device_index)
-        logger.info(f'[MIC] Устройство: {device_info["name"]}')
-        
-        stream = p.open(
-            format=pyaudio.paFloat32,
-            channels=1,
-            rate=SAMPLE_RATE,
-            input=True,
-            input_device_index=device_index,
-            frames_per_buffer=CHUNK_SIZE
-        )
+            device_index, _ = self.source.default_device('microphone')
+            if device_index is None:
+                raise RuntimeError('Микрофон не найден')
         
+        stream = await asyncio.to_thread(self.source.open_stream, device_index, 'microphone')
+        reader = SourceReader(stream, device_index, SAMPLE_RATE, np.float32, CHUNK_SIZE)
+        logger.info(f'[MIC] Устройство: {reader.name}')
         logger.info('[MIC] Захват запущен')
         
         try:
             while self.running:
-                if self.muted:
-                    await asyncio.sleep(0.1)
-                    continue
-                
-                data = stream.read(CHUNK_SIZE, exception_on_overflow=False)
-                audio = np.frombuffer(data, dtype=np.float32)
-                
-                # Отправляем через WebSocket
-                if self.ws:
-                    await self.ws.send(audio.tobytes())
+                try:
+                    audio, _ = await asyncio.to_thread(reader.read)
+                except EOFError:
+                    logger.info('[MIC] Источник закончился')
+                    break
                 
-                await asyncio.sleep(0.01)
+                # В режиме mute устройство читается, чтобы не копить задержку, но не отправляется
+                if self.muted or not self.ws:
+                    continue
+                await self.ws.send(audio.tobytes())
         finally:
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
-    
-    async def _capture_sounddevice(self, sd):
-        """Захват через sounddevice"""
-        device_index = self.device_index or sd.default.device[0]
-        device_info = sd.query_devices(device_index)
-        logger.info(f'[MIC] Устройство: {device_info["name"]}')
-        
-        queue = asyncio.Queue()
-        
-        def callback(indata, frames, time_info, status):
-            if status:
-                logger.warning(f'[MIC] Status: {status}')
-            if not self.muted:
-                audio = indata[:, 0].astype(np.float32)
-                asyncio.get_event_loop().call_soon_threadsafe(
-                    queue.put_nowait, audio.tobytes()
-                )
-        
-        with sd.InputStream(
-            device=device_index,
-            samplerate=SAMPLE_RATE,
-            channels=1,
-            dtype='float32',
-            blocksize=CHUNK_SIZE,
-            callback=callback
-        ):
-            logger.info('[MIC] Захват запущен')
-            while self.running:
-                try:
-                    data = await asyncio.wait_for(queue.get(), timeout=0.1)
-                    if self.ws:
-                        await self.ws.send(data)
-                except asyncio.TimeoutError:
-                    pass
+            reader.close()
     
     def stop(self):
         self.running = False
@@ -177,9 +151,14 @@ async def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--device', type=int, default=None, help='Device index')
     parser.add_argument('--list', action='store_true', help='List devices')
+    parser.add_argument('--url', default=WS_URL, help='STT server WebSocket URL (may be remote)')
+    parser.add_argument('--source', default='auto',
+                        help='Audio source: auto, pyaudio, sounddevice, synthetic or file:<path>')
+    parser.add_argument('--source-speed', type=float, default=1.0,
+                        help='Playback speed for file/synthetic sources (0 = as fast as possible)')
     args = parser.parse_args()
     
-    mic = MicrophoneCapture(args.device)
+    mic = MicrophoneCapture(args.device, create_audio_source(args.source, speed=args.source_speed))
     
     if args.list:
         devices = mic.list_devices()
@@ -189,7 +168,7 @@ async def main():
         return
     
     try:
-        await mic.start_capture()
+        await mic.start_capture(args.url)
     except KeyboardInterrupt:
         mic.stop()
         logger.info('[MIC] Остановлен')
@@ -76,6 +76,16 @@ class SemanticCache:
             return 0.0
         return float(np.dot(a, b) / (norm_a * norm_b))
     
+    def similarity(self, a: str, b: str) -> Optional[float]:
+        """Косинусное сходство двух текстов; None, если embeddings недоступны"""
+        if a.lower().strip() == b.lower().strip():
+            return 1.0
+        emb_a = self._get_embedding(a)
+        emb_b = self._get_embedding(b) if emb_a is not None else None
+        if emb_a is None or emb_b is None:
+            return None
+        return self._cosine_similarity(emb_a, emb_b)
+
     def _context_hash(self, context: list) -> str:
         """Хэш контекста для учёта при поиске"""
         return str(hash(tuple(context[-3:])))  # Последние 3 элемента контекста
@@ -3,6 +3,37 @@ STT модуль - Streaming транскрипция с Whisper
 """
 
 from .transcriber import StreamingTranscriber
+from .buffer import AudioRingBuffer
+from .partial import PartialStabilizer
+from .vad import FrameVAD, EnergyVAD, SileroVAD, create_vad
+from .pipeline import STTPipeline, StageQueue, Segment, OVERFLOW_POLICIES
+from .batching import BatchedDecoder, SharedInferenceWorker
+from .ingest import IngestFormat
+from .fanout import ClientFanout, ClientSender, SEND_POLICIES
+from .protocol import MessageEncoder, decode_message, PROTOCOLS
 from .latency import LatencyMetrics, filter_banned_phrases
 
-__all__ = ['StreamingTranscriber', 'LatencyMetrics', 'filter_banned_phrases']
+__all__ = [
+    'StreamingTranscriber',
+    'AudioRingBuffer',
+    'PartialStabilizer',
+    'FrameVAD',
+    'EnergyVAD',
+    'SileroVAD',
+    'create_vad',
+    'STTPipeline',
+    'StageQueue',
+    'Segment',
+    'OVERFLOW_POLICIES',
+    'BatchedDecoder',
+    'SharedInferenceWorker',
+    'IngestFormat',
+    'ClientFanout',
+    'ClientSender',
+    'SEND_POLICIES',
+    'MessageEncoder',
+    'decode_message',
+    'PROTOCOLS',
+    'LatencyMetrics',
+    'filter_banned_phrases',
+]
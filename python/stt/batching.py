@@ -0,0 +1,204 @@
+"""
+STT Batching - одна модель на несколько источников
+
+Сегменты loopback и микрофона, готовые к декодированию одновременно,
+склеиваются в один вызов BatchedInferencePipeline: энкодер и декодер
+Whisper проходят батчем, а текст раскладывается обратно по источникам.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from .buffer import ModelInputBuffer
+from .transcriber import SAMPLE_RATE, DecodeResult, StreamingTranscriber
+from metrics import log_error
+
+logger = logging.getLogger('STT')
+
+# Сегментов в одном батче (по одному-два на источник с запасом)
+MAX_BATCH_SIZE = 8
+# Допуск при сопоставлении начала сегмента модели с началом клипа, с
+CLIP_MATCH_TOLERANCE = 0.01
+
+
+class BatchedDecoder:
+    """
+    Декодирование нескольких сегментов одним батч-вызовом модели.
+    Одиночный сегмент идёт обычным путём transcriber._decode.
+    """
+
+    def __init__(self, transcriber, batch_pipeline=None):
+        self.transcriber = transcriber
+        if batch_pipeline is None:
+            from faster_whisper import BatchedInferencePipeline
+            batch_pipeline = BatchedInferencePipeline(transcriber.model)
+        self.batch_pipeline = batch_pipeline
+        # Общий вход батча: клипы пишутся в него подряд, буфер живёт между батчами
+        self.model_input = ModelInputBuffer()
+
+    @property
+    def word_timestamps(self) -> bool:
+        return getattr(self.transcriber, 'word_timestamps', False)
+
+    def decode(self, audios: List[np.ndarray]) -> List[str]:
+        """Тексты в порядке входных сегментов"""
+        if len(audios) == 1:
+            return [self.transcriber._decode(audios[0])]
+        return [r.text for r in self.decode_results(audios)]
+
+    def decode_results(self, audios: List[np.ndarray]) -> List[DecodeResult]:
+        """DecodeResult в порядке входных сегментов; тайминг слов - от начала каждого клипа"""
+        if len(audios) == 1:
+            return [self.transcriber._decode_result(audios[0])]
+
+        # Клипы лежат подряд в общем таймлайне, границы передаются в секундах
+        starts = np.cumsum([0] + [len(a) for a in audios])
+        clips = [
+            {'start': starts[i] / SAMPLE_RATE, 'end': starts[i + 1] / SAMPLE_RATE}
+            for i in range(len(audios))
+        ]
+        segments, info = self.batch_pipeline.transcribe(
+            # int16 клипы масштабируются сразу в общий вход модели, без промежуточной склейки
+            self.model_input.concat(audios),
+            language='ru',
+            clip_timestamps=clips,
+            batch_size=len(audios),
+            beam_size=1,
+            best_of=1,
+            temperature=0.0,
+            vad_filter=False,
+            without_timestamps=True,
+            word_timestamps=self.word_timestamps,
+            no_speech_threshold=0.6,
+            compression_ratio_threshold=2.4,
+        )
+
+        clip_starts = [c['start'] for c in clips]
+        parts = [[] for _ in audios]
+        for seg in segments:
+            idx = bisect.bisect_right(clip_starts, seg.start + CLIP_MATCH_TOLERANCE) - 1
+            parts[max(idx, 0)].append(seg)
+
+        return [StreamingTranscriber._collect_result(p, offset=start)
+                for p, start in zip(parts, clip_starts)]
+
+
+class SharedInferenceWorker:
+    """
+    Общая стадия инференса для нескольких STTPipeline.
+
+    Конвейеры по-прежнему сами захватывают и режут аудио, но вместо
+    собственного потока инференса отдают сегменты сюда. Воркер собирает
+    всё, что ждёт во входных очередях всех источников, декодирует одним
+    батчем и возвращает результаты в post_queue каждого конвейера.
+    """
+
+    def __init__(self, decoder: BatchedDecoder, max_batch_size: int = MAX_BATCH_SIZE):
+        if max_batch_size <= 0:
+            raise ValueError('Размер батча должен быть положительным')
+        self.decoder = decoder
+        self.max_batch_size = max_batch_size
+        self.pipelines = []
+        self.running = False
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.batches = 0
+        self.segments = 0
+        self.max_batch = 0
+
+    def register(self, pipeline):
+        """Подключить конвейер: его очередь инференса будит воркер"""
+        pipeline.inference_queue.listener = self._ready
+        self.pipelines = self.pipelines + [pipeline]
+
+    def unregister(self, pipeline):
+        """Отключить конвейер (клиент приёма ушёл); список заменяется, а не правится на месте"""
+        self.pipelines = [p for p in self.pipelines if p is not pipeline]
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        logger.info(f'[BATCH] Общий инференс для {len(self.pipelines)} источников')
+
+    def stop(self, timeout: float = 2.0):
+        self.running = False
+        self._ready.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def get_stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'segments': self.segments,
+            'max_batch': self.max_batch,
+            'avg_batch': round(self.segments / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _loop(self):
+        while self.running:
+            self._ready.wait(0.1)
+            self._ready.clear()
+            batch = self._collect()
+            if batch:
+                self._run(batch)
+                # В очередях могло накопиться, пока шёл декод
+                self._ready.set()
+
+    def _collect(self) -> list:
+        """По кругу забирает ожидающие сегменты всех источников"""
+        batch = []
+        pending = True
+        while pending and len(batch) < self.max_batch_size:
+            pending = False
+            for pipeline in self.pipelines:
+                if len(batch) >= self.max_batch_size:
+                    break
+                segment = pipeline.inference_queue.get(timeout=0)
+                if segment is None:
+                    continue
+                pending = True
+                if segment.kind == 'partial' and len(pipeline.inference_queue):
+                    # Устаревшая гипотеза - за ней уже ждёт финальный сегмент
+                    pipeline.stats['inference'].dropped += 1
+                    continue
+                batch.append((pipeline, segment))
+        return batch
+
+    def _run(self, batch: list):
+        t_start = time.time()
+        audios = [segment.audio for _, segment in batch]
+        try:
+            if getattr(self.decoder, 'word_timestamps', False):
+                results = self.decoder.decode_results(audios)
+                for (_, segment), result in zip(batch, results):
+                    segment.result = result
+                texts = [r.text for r in results]
+            else:
+                texts = self.decoder.decode(audios)
+        except Exception as e:
+            logger.error(f'[BATCH] Ошибка декодирования батча из {len(batch)}: {e}')
+            log_error('stt', 'batch_transcription_error', str(e))
+            texts = [None] * len(batch)
+        t_done = time.time()
+
+        self.batches += 1
+        self.segments += len(batch)
+        self.max_batch = max(self.max_batch, len(batch))
+
+        for (pipeline, segment), text in zip(batch, texts):
+            if segment.kind == 'final':
+                text = pipeline.transcriber.report_segment(text, segment.audio, segment.t_end)
+            stats = pipeline.stats['inference']
+            stats.processed += 1
+            stats.busy_sec += (t_done - t_start) / len(batch)
+            pipeline.post_queue.put((segment, text or None, t_start, t_done), timeout=1.0)
@@ -0,0 +1,155 @@
+"""
+STT Buffer - предвыделенный кольцевой буфер аудио и вход модели
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+from audio.sources import INT16_SCALE
+
+# Сэмплы сегментатора: от захвата до входа модели аудио остаётся int16
+SEGMENT_DTYPE = np.dtype(np.int16)
+
+
+class AudioRingBuffer:
+    """
+    Кольцевой буфер фиксированной ёмкости без аллокаций на запись.
+
+    Данные хранятся в зеркальном массиве удвоенной длины: каждый сэмпл
+    пишется в обе половины, поэтому последние N сэмплов всегда доступны
+    как непрерывный срез без копирования (view).
+    """
+
+    def __init__(self, capacity: int, dtype=np.float32):
+        if capacity <= 0:
+            raise ValueError('Ёмкость буфера должна быть положительной')
+
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros(self.capacity * 2, dtype=self.dtype)
+        self._write_pos = 0
+        self._size = 0
+        self.dropped_samples = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def fill_level(self) -> float:
+        """Заполненность буфера от 0.0 до 1.0"""
+        return self._size / self.capacity
+
+    @property
+    def free_space(self) -> int:
+        return self.capacity - self._size
+
+    def write(self, chunk: np.ndarray) -> int:
+        """
+        Записывает чанк, при переполнении вытесняет самые старые сэмплы.
+        Возвращает количество вытесненных сэмплов.
+        """
+        n = len(chunk)
+        if n == 0:
+            return 0
+
+        dropped = 0
+        if n > self.capacity:
+            dropped += n - self.capacity
+            chunk = chunk[-self.capacity:]
+            n = self.capacity
+
+        cap = self.capacity
+        pos = self._write_pos
+        first = min(n, cap - pos)
+        rest = n - first
+
+        self._data[pos:pos + first] = chunk[:first]
+        self._data[pos + cap:pos + cap + first] = chunk[:first]
+        if rest:
+            self._data[:rest] = chunk[first:]
+            self._data[cap:cap + rest] = chunk[first:]
+
+        self._write_pos = (pos + n) % cap
+
+        overflow = self._size + n - cap
+        if overflow > 0:
+            dropped += overflow
+        self._size = min(self._size + n, cap)
+
+        self.dropped_samples += dropped
+        return dropped
+
+    def view(self, n: Optional[int] = None) -> np.ndarray:
+        """
+        Непрерывное представление последних n сэмплов (по умолчанию всех).
+        Срез ссылается на внутреннюю память и валиден до следующей записи.
+        """
+        if n is None or n > self._size:
+            n = self._size
+        if n <= 0:
+            return self._data[:0]
+
+        start = (self._write_pos - n) % self.capacity
+        return self._data[start:start + n]
+
+    def consume(self, n: int):
+        """Отбрасывает n самых старых сэмплов"""
+        self._size = max(0, self._size - int(n))
+
+    def clear(self):
+        """Очистка без освобождения памяти"""
+        self._size = 0
+
+    def get_stats(self) -> dict:
+        return {
+            'samples': self._size,
+            'capacity': self.capacity,
+            'fill_level': round(self.fill_level, 3),
+            'dropped_samples': self.dropped_samples,
+        }
+
+
+class ModelInputBuffer:
+    """
+    Переиспользуемый float32 вход модели.
+
+    Сегмент хранится в int16 и масштабируется к [-1, 1) один раз -
+    векторно, прямо в этот буфер, перед декодированием. Результат
+    валиден до следующего вызова; буфер растёт только вверх.
+    """
+
+    def __init__(self, capacity: int = 0):
+        self._data = np.empty(max(int(capacity), 0), dtype=np.float32)
+        self.conversions = 0
+
+    def _reserve(self, n: int) -> np.ndarray:
+        if n > len(self._data):
+            self._data = np.empty(max(n, 2 * len(self._data)), dtype=np.float32)
+        return self._data[:n]
+
+    @staticmethod
+    def _scale_into(audio: np.ndarray, out: np.ndarray):
+        if audio.dtype == np.int16:
+            np.multiply(audio, np.float32(INT16_SCALE), out=out)
+        else:
+            out[:] = audio
+
+    def convert(self, audio: np.ndarray) -> np.ndarray:
+        """Сегмент → float32 для модели; float32 передаётся без копии"""
+        if audio.dtype == np.float32:
+            return audio
+        out = self._reserve(len(audio))
+        self._scale_into(audio, out)
+        self.conversions += 1
+        return out
+
+    def concat(self, audios: List[np.ndarray]) -> np.ndarray:
+        """Клипы батча подряд в одном буфере, каждый масштабируется на месте"""
+        out = self._reserve(sum(len(a) for a in audios))
+        pos = 0
+        for audio in audios:
+            self._scale_into(audio, out[pos:pos + len(audio)])
+            pos += len(audio)
+        self.conversions += 1
+        return out
@@ -0,0 +1,242 @@
+"""
+STT Fanout - рассылка сообщений клиентам через личные очереди
+
+Сообщение сериализуется один раз на каждый формат (JSON или бинарный
+протокол нужной версии, см. protocol.py) и кладётся в ограниченную очередь каждого
+клиента; очередь разбирает отдельная задача-писатель. Медленный или
+зависший клиент копит собственную очередь и не задерживает остальных
+(UI, запись, мост к LLM).
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from .protocol import MessageEncoder
+
+logger = logging.getLogger('STT')
+
+# Политики переполнения очереди клиента
+SEND_POLICIES = ('coalesce', 'drop_oldest', 'drop_newest')
+DEFAULT_SEND_POLICY = 'coalesce'
+# Сообщений в очереди одного клиента
+CLIENT_QUEUE_SIZE = 64
+# Задержка доставки, после которой клиент считается отстающим, мс
+SLOW_CLIENT_LAG_MS = 1000
+
+
+class ClientSender:
+    """
+    Очередь и писатель одного клиента.
+
+    coalesce    - устаревшее сообщение с тем же ключом (partial источника)
+                  заменяется новым в конце очереди; при переполнении
+                  вытесняется самое старое заменяемое, а если таких нет -
+                  самое старое вообще
+    drop_oldest - вытеснить самое старое сообщение
+    drop_newest - отбросить новое сообщение
+    """
+
+    def __init__(self, websocket, maxsize: int = CLIENT_QUEUE_SIZE,
+                 policy: str = DEFAULT_SEND_POLICY, name: Optional[str] = None):
+        if policy not in SEND_POLICIES:
+            raise ValueError(f'Неизвестная политика очереди клиента: {policy}')
+        if maxsize <= 0:
+            raise ValueError('Размер очереди клиента должен быть положительным')
+        self.websocket = websocket
+        self.maxsize = maxsize
+        self.policy = policy
+        self.name = name or _client_name(websocket)
+        # Формат кадров, согласованный в hello
+        self.encoder = MessageEncoder()
+        # Элементы: [ключ склейки, сообщение, время постановки]
+        self._items = deque()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self._lag_total_ms = 0.0
+        self._slow = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        self.closed = True
+        self._ready.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    def push(self, message, key: Optional[str] = None) -> bool:
+        """
+        Постановка из потока цикла событий; False - сообщение отброшено.
+        message - готовый кадр или словарь {формат: кадр}.
+        """
+        if self.closed:
+            return False
+        if isinstance(message, dict):
+            message = message.get(self.encoder.key)
+            if message is None:
+                # Клиент сменил формат, пока сообщение кодировалось
+                self._count_drop()
+                return False
+        now = time.time()
+        if key is not None and self.policy == 'coalesce':
+            stale = next((item for item in self._items if item[0] == key), None)
+            if stale is not None:
+                # Новое сообщение встаёт в конец (после финалов, пришедших между ними),
+                # а лаг считается от постановки заменённого
+                self._items.remove(stale)
+                self._items.append([key, message, stale[2]])
+                self.coalesced += 1
+                return True
+
+        if len(self._items) >= self.maxsize:
+            if self.policy == 'drop_newest':
+                self._count_drop()
+                return False
+            self._evict()
+
+        self._items.append([key, message, now])
+        self.max_depth = max(self.max_depth, len(self._items))
+        self._ready.set()
+        return True
+
+    def _evict(self):
+        victim = None
+        if self.policy == 'coalesce':
+            victim = next((item for item in self._items if item[0] is not None), None)
+        if victim is None:
+            victim = self._items[0]
+        self._items.remove(victim)
+        self._count_drop()
+
+    def _count_drop(self):
+        self.dropped += 1
+        if self.dropped == 1 or not self.dropped % 100:
+            logger.warning(f'[FANOUT] {self.name}: очередь переполнена, отброшено {self.dropped}')
+
+    async def _run(self):
+        while not self.closed:
+            if not self._items:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            _, message, t_enqueued = self._items.popleft()
+            try:
+                await self.websocket.send(message)
+            except Exception as e:
+                # Соединение закрыто - обработчик клиента сам снимет его с рассылки
+                logger.debug(f'[FANOUT] {self.name}: отправка прервана: {e}')
+                self.closed = True
+                break
+            self._record_lag((time.time() - t_enqueued) * 1000)
+
+    def _record_lag(self, lag_ms: float):
+        self.sent += 1
+        self.last_lag_ms = lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        self._lag_total_ms += lag_ms
+        slow = lag_ms > SLOW_CLIENT_LAG_MS
+        if slow and not self._slow:
+            logger.warning(f'[FANOUT] {self.name}: клиент отстаёт на {lag_ms:.0f} мс')
+        self._slow = slow
+
+    def get_stats(self) -> dict:
+        return {
+            'client': self.name,
+            'depth': len(self._items),
+            'max_depth': self.max_depth,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'lag_ms': round(self.last_lag_ms, 1),
+            'max_lag_ms': round(self.max_lag_ms, 1),
+            'avg_lag_ms': round(self._lag_total_ms / self.sent, 1) if self.sent else 0.0,
+        }
+
+
+class ClientFanout:
+    """Реестр писателей клиентов; все методы вызываются в потоке цикла событий"""
+
+    def __init__(self, maxsize: int = CLIENT_QUEUE_SIZE, policy: str = DEFAULT_SEND_POLICY):
+        if policy not in SEND_POLICIES:
+            raise ValueError(f'Неизвестная политика очереди клиента: {policy}')
+        self.maxsize = maxsize
+        self.policy = policy
+        self.senders: Dict[object, ClientSender] = {}
+
+    def add(self, websocket) -> ClientSender:
+        sender = self.senders.get(websocket)
+        if sender is None:
+            sender = ClientSender(websocket, self.maxsize, self.policy)
+            self.senders[websocket] = sender
+            sender.start()
+        return sender
+
+    async def remove(self, websocket):
+        sender = self.senders.pop(websocket, None)
+        if sender is not None:
+            await sender.stop()
+
+    async def close(self):
+        for websocket in list(self.senders):
+            await self.remove(websocket)
+
+    def set_encoder(self, websocket, encoder: MessageEncoder):
+        self.add(websocket).encoder = encoder
+
+    def encoders(self, clients) -> Dict[str, MessageEncoder]:
+        """Форматы, в которых нужно закодировать сообщение для этих клиентов"""
+        result = {}
+        for websocket in list(clients):
+            sender = self.senders.get(websocket)
+            if sender is not None:
+                result.setdefault(sender.encoder.key, sender.encoder)
+        return result
+
+    def publish(self, message, clients, key: Optional[str] = None) -> int:
+        """
+        Сериализованное сообщение (кадр или {формат: кадр}) в очереди клиентов;
+        возвращает число принявших
+        """
+        accepted = 0
+        for websocket in list(clients):
+            sender = self.senders.get(websocket)
+            if sender is not None and sender.push(message, key):
+                accepted += 1
+        return accepted
+
+    def get_stats(self) -> list:
+        return [sender.get_stats() for sender in self.senders.values()]
+
+
+def message_key(payload: dict) -> Optional[str]:
+    """Ключ склейки: новая гипотеза partial делает прежнюю ненужной, финалы не склеиваются"""
+    if payload.get('type') == 'partial':
+        return f"partial:{payload.get('source')}"
+    return None
+
+
+def _client_name(websocket) -> str:
+    address = getattr(websocket, 'remote_address', None)
+    if isinstance(address, tuple) and len(address) >= 2:
+        return f'{address[0]}:{address[1]}'
+    return f'client-{id(websocket):x}'
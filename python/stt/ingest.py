@@ -0,0 +1,90 @@
+"""
+STT Ingest - приём сырого PCM от внешних процессов захвата
+
+Клиент сначала присылает JSON-рукопожатие
+    {"type": "audio_start", "sample_rate": 16000, "dtype": "float32", "channels": 1}
+а затем бинарные кадры с интерливированными сэмплами в этом формате.
+Сервер принимает поток, только если у него есть общий инференс: источник
+ingest или несколько источников.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from audio.resample import Resampler
+
+from .transcriber import SAMPLE_RATE
+
+INGEST_DTYPES = {
+    'float32': np.dtype('<f4'),
+    'int16': np.dtype('<i2'),
+}
+MAX_INGEST_CHANNELS = 8
+MIN_INGEST_RATE = 8000
+MAX_INGEST_RATE = 192000
+
+
+@dataclass(frozen=True)
+class IngestFormat:
+    """Формат бинарных кадров, согласованный в рукопожатии"""
+    sample_rate: int = SAMPLE_RATE
+    dtype: str = 'float32'
+    channels: int = 1
+
+    @classmethod
+    def from_handshake(cls, data: dict) -> 'IngestFormat':
+        """Проверка рукопожатия; ValueError с понятным текстом для клиента"""
+        dtype = data.get('dtype', 'float32')
+        if dtype not in INGEST_DTYPES:
+            raise ValueError(f'Неподдерживаемый dtype: {dtype} (ожидается {", ".join(INGEST_DTYPES)})')
+
+        try:
+            sample_rate = int(data.get('sample_rate', SAMPLE_RATE))
+            channels = int(data.get('channels', 1))
+        except (TypeError, ValueError):
+            raise ValueError('sample_rate и channels должны быть целыми числами')
+
+        if not MIN_INGEST_RATE <= sample_rate <= MAX_INGEST_RATE:
+            raise ValueError(f'sample_rate вне диапазона {MIN_INGEST_RATE}-{MAX_INGEST_RATE}')
+        if not 1 <= channels <= MAX_INGEST_CHANNELS:
+            raise ValueError(f'channels вне диапазона 1-{MAX_INGEST_CHANNELS}')
+        return cls(sample_rate=sample_rate, dtype=dtype, channels=channels)
+
+    @property
+    def frame_bytes(self) -> int:
+        """Байт на один многоканальный сэмпл"""
+        return INGEST_DTYPES[self.dtype].itemsize * self.channels
+
+    def create_resampler(self) -> Optional[Resampler]:
+        """Ресемплер на соединение: фильтр и фаза переносятся между кадрами"""
+        if self.sample_rate == SAMPLE_RATE:
+            return None
+        return Resampler(self.sample_rate, SAMPLE_RATE)
+
+    def decode(self, payload: bytes, resampler: Optional[Resampler] = None) -> np.ndarray:
+        """
+        Бинарный кадр → моно 16 кГц. Для моно 16 кГц это представление
+        np.frombuffer поверх полученных байт без копирования; int16
+        остаётся int16 до входа модели. Для другой частоты нужен
+        ресемплер соединения (create_resampler), без него кадр
+        ресемплируется сам по себе.
+        """
+        if len(payload) % self.frame_bytes:
+            raise ValueError(f'Длина кадра {len(payload)} не кратна {self.frame_bytes} байтам')
+
+        audio = np.frombuffer(payload, dtype=INGEST_DTYPES[self.dtype])
+        if self.channels == 1 and self.sample_rate == SAMPLE_RATE:
+            return audio
+
+        if self.dtype == 'int16':
+            audio = audio.astype(np.float32) / 32768.0
+        if self.channels > 1:
+            audio = audio.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+        if self.sample_rate != SAMPLE_RATE:
+            resampler = resampler or self.create_resampler()
+            # Свой массив на кадр: конвейер держит его после возврата
+            out = np.empty(resampler.output_length(len(audio)), dtype=np.float32)
+            audio = resampler.process(audio, out)
+        return audio
@@ -0,0 +1,69 @@
+"""
+STT Model Cache - запоминание выбранной модели Whisper для машины
+"""
+
+import json
+import logging
+import os
+import platform
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger('STT')
+
+RUNTIME_ROOT = Path(os.getenv('LIVE_HINTS_DATA_DIR', Path(__file__).parent.parent.parent))
+MODEL_CACHE_PATH = RUNTIME_ROOT / 'data' / 'stt_model_cache.json'
+
+
+def host_key(device: str) -> str:
+    """Ключ записи: машина + запрошенный бэкенд (каталог данных может быть общим)"""
+    return f'{platform.node()}|{platform.machine()}|{device}'
+
+
+def _read(path: Path) -> dict:
+    try:
+        data = json.loads(path.read_text(encoding='utf-8'))
+        return data if isinstance(data, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f'[STT] Кэш выбора модели повреждён: {e}')
+        return {}
+
+
+def load_model_choice(device: str, path: Optional[Path] = None) -> Optional[dict]:
+    """Сохранённый выбор {'model', 'device', 'compute_type', 'rtf'} или None"""
+    entry = _read(path or MODEL_CACHE_PATH).get(host_key(device))
+    if not isinstance(entry, dict) or not entry.get('model') or not entry.get('device'):
+        return None
+    return entry
+
+
+def save_model_choice(device: str, model: str, device_used: str, compute_type: str,
+                      rtf: Optional[float] = None, path: Optional[Path] = None):
+    """Запоминает модель, которая загрузилась на этой машине"""
+    path = path or MODEL_CACHE_PATH
+    data = _read(path)
+    data[host_key(device)] = {
+        'model': model,
+        'device': device_used,
+        'compute_type': compute_type,
+        'rtf': round(rtf, 3) if rtf is not None else None,
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+    except Exception as e:
+        logger.warning(f'[STT] Не удалось сохранить выбор модели: {e}')
+
+
+def forget_model_choice(device: str, path: Optional[Path] = None):
+    """Удаляет запись, если сохранённая модель больше не загружается"""
+    path = path or MODEL_CACHE_PATH
+    data = _read(path)
+    if data.pop(host_key(device), None) is None:
+        return
+    try:
+        path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+    except Exception as e:
+        logger.warning(f'[STT] Не удалось обновить кэш выбора модели: {e}')
@@ -0,0 +1,51 @@
+"""
+STT Overlap - удаление повторов на стыке принудительно разрезанных сегментов
+
+Когда сегмент режется по пределу длины, его хвост (OVERLAP_SECONDS)
+повторно попадает в начало следующего, чтобы слово на границе не
+декодировалось обрубком. Слова этого хвоста Whisper выдаёт дважды:
+в конце предыдущего сегмента и в начале следующего.
+"""
+
+import math
+from typing import List, Optional, Sequence, Tuple
+
+from .partial import _normalize
+
+# Верхняя оценка темпа речи, слов в секунду (когда нет тайминга слов)
+MAX_WORDS_PER_SECOND = 4.0
+# Допуск на начало слова за пределом перекрытия, с
+OVERLAP_WORD_TOLERANCE = 0.15
+
+
+def overlap_word_limit(overlap_sec: float, words: Optional[Sequence[tuple]] = None) -> int:
+    """Сколько первых слов сегмента могут лежать в перекрытии"""
+    if overlap_sec <= 0:
+        return 0
+    if words:
+        return sum(1 for start, *_ in words if start < overlap_sec + OVERLAP_WORD_TOLERANCE)
+    return math.ceil(overlap_sec * MAX_WORDS_PER_SECOND)
+
+
+def dedupe_overlap(previous: str, text: str, overlap_sec: float,
+                   words: Optional[List[tuple]] = None) -> Tuple[str, int]:
+    """
+    Убирает из начала text слова, повторяющие конец previous.
+
+    Совпадение ищется по тексту (самый длинный суффикс previous, равный
+    префиксу text без учёта регистра и пунктуации), а тайминг слов
+    ограничивает поиск словами, начавшимися внутри перекрытия.
+    Возвращает (текст без повтора, число удалённых слов).
+    """
+    limit = overlap_word_limit(overlap_sec, words)
+    if not limit or not previous or not text:
+        return text, 0
+
+    prev = [_normalize(w) for w in previous.split()]
+    cur_words = text.split()
+    cur = [_normalize(w) for w in cur_words]
+
+    for k in range(min(limit, len(prev), len(cur)), 0, -1):
+        if prev[-k:] == cur[:k]:
+            return ' '.join(cur_words[k:]), k
+    return text, 0
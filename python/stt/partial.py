@@ -0,0 +1,62 @@
+"""
+STT Partial - стабилизация промежуточных гипотез
+"""
+
+import re
+from typing import List, Tuple
+
+_PUNCT_RE = re.compile(r'[^\w]+', re.UNICODE)
+
+
+def _normalize(word: str) -> str:
+    """Слово для сравнения гипотез: без регистра и пунктуации"""
+    return _PUNCT_RE.sub('', word.lower())
+
+
+class PartialStabilizer:
+    """
+    Подтверждение префикса по совпадению соседних декодов (local agreement).
+
+    Слово считается стабильным, когда две последовательные гипотезы
+    для одного и того же сегмента совпадают до него включительно.
+    Стабильный префикс только растёт и не переписывается до reset().
+    """
+
+    def __init__(self, min_agreement: int = 2):
+        self.min_agreement = max(2, int(min_agreement))
+        self._history: List[List[str]] = []
+        self._stable: List[str] = []
+
+    @property
+    def stable_text(self) -> str:
+        return ' '.join(self._stable)
+
+    def update(self, hypothesis: str) -> Tuple[str, str]:
+        """
+        Принимает новую гипотезу, возвращает (stable, unstable).
+        unstable - хвост текущей гипотезы после стабильного префикса.
+        """
+        words = hypothesis.split()
+        self._history.append(words)
+        self._history = self._history[-self.min_agreement:]
+
+        if len(self._history) >= self.min_agreement:
+            agreed = self._common_prefix_len(self._history)
+            if agreed > len(self._stable):
+                self._stable = words[:agreed]
+
+        unstable = words[len(self._stable):]
+        return self.stable_text, ' '.join(unstable)
+
+    def reset(self):
+        """Сброс при финализации сегмента"""
+        self._history = []
+        self._stable = []
+
+    def _common_prefix_len(self, hypotheses: List[List[str]]) -> int:
+        length = min(len(h) for h in hypotheses)
+        for i in range(length):
+            word = _normalize(hypotheses[0][i])
+            if any(_normalize(h[i]) != word for h in hypotheses[1:]):
+                return i
+        return length
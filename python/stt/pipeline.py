@@ -0,0 +1,460 @@
+"""
+STT Pipeline - конвейер захват → сегментация → инференс → постобработка → рассылка
+
+Каждая стадия работает в своём потоке и связана со следующей ограниченной
+очередью. Пока Whisper декодирует сегмент, захват и сегментация продолжают
+работать, поэтому очередь устройства не растёт, а паузы меряются вовремя.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from audio.ring import SPSCRingBuffer
+from audio.shm import SharedAudioReader
+
+from .overlap import dedupe_overlap
+from .partial import PartialStabilizer
+from .transcriber import SAMPLE_RATE, MIN_CHUNK_SECONDS, timeline_time
+
+logger = logging.getLogger('STT')
+
+# Политики переполнения очереди инференса
+OVERFLOW_POLICIES = ('merge', 'drop_oldest', 'drop_newest', 'block')
+DEFAULT_OVERFLOW_POLICY = 'merge'
+# Сегментов, ожидающих декодирования
+INFERENCE_QUEUE_SIZE = 4
+# Чанков захвата (~16 с при чанке 64 мс)
+CAPTURE_QUEUE_SIZE = 256
+# Предел длины склеенного сегмента при политике merge
+MAX_MERGED_SECONDS = 8.0
+
+
+@dataclass
+class Segment:
+    """Сегмент аудио для инференса"""
+    audio: np.ndarray
+    source: str
+    t_end: float
+    kind: str = 'final'  # 'final' | 'partial'
+    merged: int = 1
+    t_enqueued: float = field(default_factory=time.time)
+    # Опорные точки (смещение в сэмплах, время захвата) для тайминга слов
+    timeline: Optional[List[Tuple[int, float]]] = None
+    # DecodeResult, если декодирование шло с таймингом слов
+    result: object = None
+    # Секунды в начале сегмента, повторяющие хвост предыдущего (разрез по пределу длины)
+    overlap: float = 0.0
+
+
+@dataclass
+class StageStats:
+    """Метрики стадии конвейера"""
+    name: str
+    enqueued: int = 0
+    processed: int = 0
+    dropped: int = 0
+    merged: int = 0
+    depth: int = 0
+    max_depth: int = 0
+    busy_sec: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'enqueued': self.enqueued,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'merged': self.merged,
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'busy_ms': int(self.busy_sec * 1000),
+        }
+
+
+class StageQueue:
+    """
+    Ограниченная очередь между стадиями с политикой переполнения:
+      merge       - склеить с последним ожидающим сегментом того же источника
+      drop_oldest - вытеснить самый старый элемент
+      drop_newest - отбросить новый элемент
+      block       - ждать освобождения места (backpressure на предыдущую стадию)
+    """
+
+    def __init__(self, maxsize: int, policy: str, stats: StageStats,
+                 max_merged_samples: int = int(SAMPLE_RATE * MAX_MERGED_SECONDS)):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f'Неизвестная политика переполнения: {policy}')
+        if maxsize <= 0:
+            raise ValueError('Размер очереди должен быть положительным')
+
+        self.maxsize = maxsize
+        self.policy = policy
+        self.stats = stats
+        self.max_merged_samples = max_merged_samples
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        # Событие внешнего потребителя (общий инференс), взводится при каждом put
+        self.listener: Optional[threading.Event] = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, item, timeout: Optional[float] = None) -> bool:
+        """Возвращает False, если элемент отброшен"""
+        with self._cond:
+            self.stats.enqueued += 1
+            if len(self._items) >= self.maxsize:
+                if self.policy == 'merge' and self._try_merge(item):
+                    self._notify_listener()
+                    return True
+                if not self._make_room(timeout):
+                    return False
+            self._items.append(item)
+            self._update_depth()
+            self._cond.notify_all()
+        self._notify_listener()
+        return True
+
+    def _notify_listener(self):
+        if self.listener is not None:
+            self.listener.set()
+
+    def _make_room(self, timeout: Optional[float]) -> bool:
+        if self.policy == 'block':
+            deadline = None if timeout is None else time.time() + timeout
+            while len(self._items) >= self.maxsize and not self._closed:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    self.stats.dropped += 1
+                    return False
+                self._cond.wait(remaining)
+            return not self._closed
+
+        if self.policy == 'drop_newest':
+            self.stats.dropped += 1
+            return False
+
+        # drop_oldest, а также merge без подходящего соседа
+        self._items.popleft()
+        self.stats.dropped += 1
+        return True
+
+    def _try_merge(self, item) -> bool:
+        """Склейка с последним ожидающим финальным сегментом того же источника"""
+        if not isinstance(item, Segment) or item.kind != 'final' or not self._items:
+            return False
+        last = self._items[-1]
+        if (not isinstance(last, Segment) or last.kind != 'final' or last.source != item.source
+                or len(last.audio) + len(item.audio) > self.max_merged_samples):
+            return False
+
+        # Перекрытие уже есть в конце склеиваемого сегмента
+        skip = int(round(item.overlap * SAMPLE_RATE))
+        if last.timeline and item.timeline:
+            shift = len(last.audio) - skip
+            head = [(skip, timeline_time(item.timeline, skip / SAMPLE_RATE))] if skip else []
+            last.timeline = last.timeline + [(o + shift, t) for o, t in head + item.timeline if o >= skip]
+        else:
+            last.timeline = None
+        last.audio = np.concatenate((last.audio, item.audio[skip:]))
+        last.t_end = item.t_end
+        last.merged += item.merged
+        self.stats.merged += 1
+        return True
+
+    def get(self, timeout: Optional[float] = None):
+        with self._cond:
+            deadline = None if timeout is None else time.time() + timeout
+            while not self._items:
+                if self._closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            item = self._items.popleft()
+            self._update_depth()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _update_depth(self):
+        self.stats.depth = len(self._items)
+        self.stats.max_depth = max(self.stats.max_depth, self.stats.depth)
+
+
+class STTPipeline:
+    """
+    Конвейер STT для одного источника.
+
+    Стадии и их потоки:
+      capture    - забирает чанки у устройства (или из push_audio) в исходном dtype
+      segmenter  - VAD и нарезка сегментов в StreamingTranscriber
+      inference  - декодирование Whisper (или общий SharedInferenceWorker на несколько источников)
+      postprocess - стабилизация partial, формирование сообщений и вызов on_message
+    """
+
+    STAGES = ('capture', 'segmenter', 'inference', 'postprocess')
+
+    def __init__(self, transcriber, source: str, on_message: Callable[[dict], None],
+                 capture=None, partial_interval_ms: int = 0,
+                 inference_queue_size: int = INFERENCE_QUEUE_SIZE,
+                 overflow_policy: str = DEFAULT_OVERFLOW_POLICY,
+                 shared_inference=None):
+        self.transcriber = transcriber
+        self.source = source
+        self.on_message = on_message
+        self.capture = capture
+        self.partial_interval = partial_interval_ms / 1000.0
+
+        self.stats = {name: StageStats(name) for name in self.STAGES}
+        self.segment_queue = StageQueue(CAPTURE_QUEUE_SIZE, 'drop_oldest', self.stats['segmenter'])
+        self.inference_queue = StageQueue(inference_queue_size, overflow_policy, self.stats['inference'])
+        self.post_queue = StageQueue(CAPTURE_QUEUE_SIZE, 'block', self.stats['postprocess'])
+
+        self.stabilizer = PartialStabilizer()
+        self._last_partial_time = 0.0
+        self._last_partial_text = ''
+        # Текст последнего финала - для удаления повтора на стыке сегментов
+        self._last_final_text = ''
+        self.deduped_words = 0
+        self.running = False
+        self._threads = []
+
+        # Общий инференс забирает сегменты из inference_queue сам, свой поток не нужен
+        self.shared_inference = shared_inference
+        if shared_inference is not None:
+            shared_inference.register(self)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        workers = [self._segment_loop, self._post_loop]
+        if self.shared_inference is None:
+            workers.insert(1, self._inference_loop)
+        if self.capture is not None:
+            workers.insert(0, self._capture_loop)
+        self._threads = [threading.Thread(target=w, daemon=True) for w in workers]
+        for t in self._threads:
+            t.start()
+        logger.info(f'[PIPELINE] Запущен для {self.source} ({len(self._threads)} потоков)')
+
+    def stop(self, timeout: float = 2.0):
+        self.running = False
+        for q in (self.segment_queue, self.inference_queue, self.post_queue):
+            q.close()
+        for t in self._threads:
+            if t.is_alive() and t is not threading.current_thread():
+                t.join(timeout=timeout)
+        self._threads = []
+
+    def push_audio(self, chunk: np.ndarray, capture_time: Optional[float] = None) -> bool:
+        """Подать чанк напрямую, минуя стадию захвата; capture_time - unix-время его конца"""
+        self.stats['capture'].processed += 1
+        return self.segment_queue.put((chunk, capture_time))
+
+    def is_idle(self) -> bool:
+        """Все поданные чанки разобраны, сегменты декодированы и разосланы"""
+        segmenter = self.stats['segmenter']
+        inference = self.stats['inference']
+        settled = inference.processed + inference.dropped + inference.merged
+        return (segmenter.processed + segmenter.dropped >= segmenter.enqueued
+                and settled >= inference.enqueued
+                and self.stats['postprocess'].processed >= inference.processed)
+
+    def get_stats(self) -> dict:
+        stats = {name: s.to_dict() for name, s in self.stats.items()}
+        stats['overlap'] = {
+            'forced_cuts': getattr(self.transcriber, 'forced_cuts', 0),
+            'deduped_words': self.deduped_words,
+        }
+        ring = getattr(self.capture, 'ring', None)
+        if isinstance(ring, SPSCRingBuffer):
+            # Глубина захвата - непрочитанные сэмплы буфера устройства
+            stats['capture']['depth'] = len(ring)
+            stats['capture']['max_depth'] = ring.high_water
+            stats['capture']['ring'] = ring.get_stats()
+            if callable(getattr(self.capture, 'get_stats', None)):
+                stats['capture']['device'] = self.capture.get_stats()
+        elif isinstance(self.capture, SharedAudioReader):
+            stats['capture']['shm'] = self.capture.get_stats()
+            stats['capture']['depth'] = len(self.capture)
+        return stats
+
+    # ---------- стадии ----------
+
+    def _capture_loop(self):
+        stats = self.stats['capture']
+        while self.running:
+            chunk = self.capture.get_audio_chunk(timeout=0.1)
+            if chunk is None:
+                continue
+            stats.processed += 1
+            # int16 захвата идёт дальше без приведения: во float32 сегмент переводится на входе модели.
+            # Время захвата едет вместе с чанком: в сегментатор он попадает позже на время в очередях
+            self.segment_queue.put((chunk, getattr(self.capture, 'last_chunk_time', None)))
+
+    def _segment_loop(self):
+        stats = self.stats['segmenter']
+        min_samples = int(SAMPLE_RATE * MIN_CHUNK_SECONDS)
+        while self.running:
+            item = self.segment_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            chunk, capture_time = item
+
+            t0 = time.perf_counter()
+            if self.transcriber.add_audio(chunk, capture_time):
+                audio = self.transcriber.take_segment()
+                if audio is not None:
+                    timeline = getattr(self.transcriber, 'last_segment_timeline', None)
+                    overlap = getattr(self.transcriber, 'last_segment_overlap', 0.0)
+                    self.inference_queue.put(Segment(audio, self.source, time.time(),
+                                                     timeline=timeline or None, overlap=overlap))
+            elif (self.partial_interval and self.transcriber.is_speaking
+                  and self.transcriber.total_samples >= min_samples):
+                self._maybe_enqueue_partial()
+            stats.processed += 1
+            stats.busy_sec += time.perf_counter() - t0
+
+    def _maybe_enqueue_partial(self):
+        now = time.time()
+        # Partial не ставится в очередь, пока инференс не разобрал финальные сегменты
+        if now - self._last_partial_time < self.partial_interval or len(self.inference_queue):
+            return
+        self._last_partial_time = now
+        audio = self.transcriber.audio_buffer.view().copy()
+        overlap = getattr(self.transcriber, 'current_overlap', 0.0)
+        self.inference_queue.put(Segment(audio, self.source, now, kind='partial', overlap=overlap))
+
+    def _inference_loop(self):
+        stats = self.stats['inference']
+        while self.running:
+            segment = self.inference_queue.get(timeout=0.1)
+            if segment is None:
+                continue
+            if segment.kind == 'partial' and len(self.inference_queue):
+                # Устаревшая гипотеза - за ней уже ждёт финальный сегмент
+                stats.dropped += 1
+                continue
+
+            t_start = time.time()
+            if segment.kind == 'partial':
+                text = self.transcriber.transcribe_partial(segment.audio)
+            elif getattr(self.transcriber, 'word_timestamps', False):
+                segment.result = self.transcriber.transcribe_segment_result(segment.audio, segment.t_end)
+                text = segment.result.text if segment.result else None
+            else:
+                text = self.transcriber.transcribe_segment(segment.audio, segment.t_end)
+            t_done = time.time()
+
+            stats.processed += 1
+            stats.busy_sec += t_done - t_start
+            self.post_queue.put((segment, text, t_start, t_done), timeout=1.0)
+
+    def _post_loop(self):
+        stats = self.stats['postprocess']
+        while self.running:
+            item = self.post_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            t0 = time.perf_counter()
+            payload = self._build_message(*item)
+            if payload:
+                try:
+                    self.on_message(payload)
+                except Exception as e:
+                    logger.error(f'[PIPELINE] Ошибка рассылки: {e}')
+            stats.processed += 1
+            stats.busy_sec += time.perf_counter() - t0
+
+    def _build_message(self, segment: Segment, text: Optional[str],
+                       t_start: float, t_done: float) -> Optional[dict]:
+        if segment.kind == 'final':
+            self.stabilizer.reset()
+            self._last_partial_text = ''
+            if text and segment.overlap:
+                text = self._dedupe(segment, text)
+            if not text:
+                return None
+            self._last_final_text = text
+            message = {
+                'type': 'transcript',
+                'final': True,
+                'text': text,
+                'source': segment.source,
+                'timestamp': t_done,
+                'latency_ms': int((t_done - segment.t_end) * 1000),
+                'queue_ms': int((t_start - segment.t_enqueued) * 1000),
+                'decode_ms': int((t_done - t_start) * 1000),
+                'audio_ms': int(len(segment.audio) * 1000 / SAMPLE_RATE),
+            }
+            if segment.timeline:
+                message.update(self._timing_fields(segment, t_done))
+            return message
+
+        if text and segment.overlap:
+            text, _ = dedupe_overlap(self._last_final_text, text, segment.overlap)
+        if not text:
+            return None
+        stable, unstable = self.stabilizer.update(text)
+        merged_text = f'{stable} {unstable}'.strip()
+        if merged_text == self._last_partial_text:
+            return None
+        self._last_partial_text = merged_text
+        return {
+            'type': 'partial',
+            'text': merged_text,
+            'stable': stable,
+            'unstable': unstable,
+            'source': segment.source,
+            'timestamp': t_done,
+        }
+
+    def _dedupe(self, segment: Segment, text: str) -> str:
+        """Удаляет слова перекрытия, уже отправленные в предыдущем финале"""
+        words = segment.result.words if segment.result is not None else None
+        text, dropped = dedupe_overlap(self._last_final_text, text, segment.overlap, words)
+        if dropped:
+            self.deduped_words += dropped
+            if words:
+                segment.result.words = words[dropped:]
+            logger.debug(f'[PIPELINE] {segment.source}: убрано {dropped} повторных слов на стыке')
+        return text
+    
+    @staticmethod
+    def _timing_fields(segment: Segment, t_done: float) -> dict:
+        """
+        Время сегмента и слов по часам захвата (unix-секунды, до мс).
+        e2e_ms - от захвата последнего сэмпла сегмента до готового текста.
+        Слова - компактные [начало, конец, слово, вероятность].
+        """
+        timeline = segment.timeline
+        audio_start = timeline[0][1]
+        audio_end = timeline_time(timeline, len(segment.audio) / SAMPLE_RATE)
+        fields = {
+            'audio_start': round(audio_start, 3),
+            'audio_end': round(audio_end, 3),
+            'e2e_ms': int((t_done - audio_end) * 1000),
+        }
+        result = segment.result
+        if result is not None:
+            fields['avg_logprob'] = None if result.avg_logprob is None else round(result.avg_logprob, 3)
+            fields['no_speech_prob'] = None if result.no_speech_prob is None else round(result.no_speech_prob, 3)
+            fields['words'] = [
+                [round(timeline_time(timeline, start), 3), round(timeline_time(timeline, end), 3),
+                 word, round(prob, 3)]
+                for start, end, word, prob in result.words
+            ]
+        return fields
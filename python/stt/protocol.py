@@ -0,0 +1,216 @@
+"""
+STT Protocol - формат сообщений сервер → клиент
+
+По умолчанию сообщения уходят JSON текстовыми кадрами. Клиент может первым
+сообщением запросить компактный бинарный формат:
+    {"type": "hello", "protocol": "binary", "version": 1}
+и получить {"type": "hello_ack", "protocol": ..., "version": ...}.
+
+Бинарный кадр v1 (little-endian) - только для transcript и partial,
+остальные сообщения (status, error, ...) по-прежнему JSON:
+    B version, B kind (1 transcript, 2 partial), B flags, B reserved, d timestamp
+    transcript: i latency_ms, i queue_ms, i decode_ms, i audio_ms
+    str8 source
+    transcript: str16 text; partial: str16 stable, str16 unstable
+    FLAG_TIMING: d audio_start, d audio_end, i e2e_ms
+    FLAG_WORDS:  f avg_logprob, f no_speech_prob, H count,
+                 count × (I start_ms, I end_ms от audio_start, H prob×1000),
+                 str16 слова через перевод строки
+    FLAG_EXTRA:  str32 JSON с полями, которых нет в схеме
+str8/str16/str32 - длина (B/H/I) и UTF-8 байты.
+"""
+
+import json
+import math
+import struct
+from typing import Optional, Tuple, Union
+
+PROTOCOLS = ('json', 'binary')
+# Последняя версия бинарной схемы, которую умеет сервер
+PROTOCOL_VERSION = 1
+
+KIND_TRANSCRIPT = 1
+KIND_PARTIAL = 2
+FLAG_TIMING = 0x01
+FLAG_WORDS = 0x02
+FLAG_EXTRA = 0x04
+
+_HEADER = struct.Struct('<BBBxd')
+_DURATIONS = struct.Struct('<iiii')
+_TIMING = struct.Struct('<ddi')
+_QUALITY = struct.Struct('<ffH')
+
+_DURATION_KEYS = ('latency_ms', 'queue_ms', 'decode_ms', 'audio_ms')
+_TIMING_KEYS = ('audio_start', 'audio_end', 'e2e_ms')
+_WORDS_KEYS = ('words', 'avg_logprob', 'no_speech_prob')
+_TRANSCRIPT_KEYS = frozenset(('type', 'final', 'text', 'source', 'timestamp') + _DURATION_KEYS)
+_PARTIAL_KEYS = frozenset(('type', 'text', 'stable', 'unstable', 'source', 'timestamp'))
+
+
+def negotiate(hello: dict) -> Tuple[str, int]:
+    """Протокол и версия по сообщению hello клиента; ValueError - запрос не поддерживается"""
+    protocol = hello.get('protocol', 'json')
+    if protocol not in PROTOCOLS:
+        raise ValueError(f'Неизвестный протокол: {protocol} (ожидается {", ".join(PROTOCOLS)})')
+    if protocol == 'json':
+        return 'json', PROTOCOL_VERSION
+    try:
+        version = int(hello.get('version', PROTOCOL_VERSION))
+    except (TypeError, ValueError):
+        raise ValueError('version должна быть целым числом')
+    if version < 1:
+        raise ValueError(f'Версия протокола {version} не поддерживается')
+    # Клиент называет максимальную версию, которую понимает
+    return protocol, min(version, PROTOCOL_VERSION)
+
+
+class MessageEncoder:
+    """Кодирование сообщений для клиентов одного протокола и версии схемы"""
+
+    def __init__(self, protocol: str = 'json', version: int = PROTOCOL_VERSION):
+        if protocol not in PROTOCOLS:
+            raise ValueError(f'Неизвестный протокол: {protocol}')
+        if not 1 <= version <= PROTOCOL_VERSION:
+            raise ValueError(f'Версия протокола {version} не поддерживается')
+        self.protocol = protocol
+        self.version = version
+
+    @property
+    def key(self) -> str:
+        """Идентификатор формата кадра: клиенты с одинаковым ключом получают один и тот же кадр"""
+        return self.protocol if self.protocol == 'json' else f'{self.protocol}/{self.version}'
+
+    def encode(self, payload: dict) -> Union[str, bytes]:
+        if self.protocol == 'binary':
+            kind = payload.get('type')
+            if kind == 'transcript':
+                return self._encode_binary(payload, KIND_TRANSCRIPT)
+            if kind == 'partial':
+                return self._encode_binary(payload, KIND_PARTIAL)
+        return json.dumps(payload, ensure_ascii=False)
+
+    def _encode_binary(self, payload: dict, kind: int) -> bytes:
+        known = _TRANSCRIPT_KEYS if kind == KIND_TRANSCRIPT else _PARTIAL_KEYS
+        flags = 0
+        body = []
+
+        if kind == KIND_TRANSCRIPT:
+            body.append(_DURATIONS.pack(*(int(payload.get(k, 0)) for k in _DURATION_KEYS)))
+        body.append(_str(payload.get('source', ''), 'B'))
+        if kind == KIND_TRANSCRIPT:
+            body.append(_str(payload.get('text', ''), 'H'))
+        else:
+            body.append(_str(payload.get('stable', ''), 'H'))
+            body.append(_str(payload.get('unstable', ''), 'H'))
+
+        if kind == KIND_TRANSCRIPT and 'audio_start' in payload:
+            flags |= FLAG_TIMING
+            known = known | frozenset(_TIMING_KEYS)
+            body.append(_TIMING.pack(payload['audio_start'], payload['audio_end'], int(payload['e2e_ms'])))
+
+            if 'words' in payload:
+                flags |= FLAG_WORDS
+                known = known | frozenset(_WORDS_KEYS)
+                body.append(self._encode_words(payload))
+
+        extra = {k: v for k, v in payload.items() if k not in known}
+        if extra:
+            flags |= FLAG_EXTRA
+            body.append(_str(json.dumps(extra, ensure_ascii=False), 'I'))
+
+        header = _HEADER.pack(self.version, kind, flags, float(payload.get('timestamp', 0.0)))
+        return header + b''.join(body)
+
+    @staticmethod
+    def _encode_words(payload: dict) -> bytes:
+        # Числа всех слов одним pack, тексты одной строкой - без вызова на каждое слово
+        start = payload['audio_start']
+        words = payload['words']
+        numbers = []
+        for w_start, w_end, _, prob in words:
+            numbers += (max(0, round((w_start - start) * 1000)), max(0, round((w_end - start) * 1000)),
+                        round(prob * 1000))
+        return (_QUALITY.pack(_nan_if_none(payload.get('avg_logprob')),
+                              _nan_if_none(payload.get('no_speech_prob')), len(words))
+                + struct.pack(f'<{"IIH" * len(words)}', *numbers)
+                + _str('\n'.join(w[2] for w in words), 'H'))
+
+
+def decode_message(frame: Union[str, bytes]) -> dict:
+    """Обратное преобразование кадра сервера в словарь (для клиентов и тестов)"""
+    if isinstance(frame, str):
+        return json.loads(frame)
+
+    version, kind, flags, timestamp = _HEADER.unpack_from(frame, 0)
+    if version > PROTOCOL_VERSION:
+        raise ValueError(f'Кадр версии {version}, поддерживается до {PROTOCOL_VERSION}')
+    pos = _HEADER.size
+    payload = {}
+
+    if kind == KIND_TRANSCRIPT:
+        payload.update(type='transcript', final=True)
+        durations = _DURATIONS.unpack_from(frame, pos)
+        pos += _DURATIONS.size
+    elif kind == KIND_PARTIAL:
+        payload['type'] = 'partial'
+    else:
+        raise ValueError(f'Неизвестный тип кадра: {kind}')
+
+    source, pos = _read_str(frame, pos, 'B')
+    if kind == KIND_TRANSCRIPT:
+        text, pos = _read_str(frame, pos, 'H')
+        payload.update(text=text, source=source, timestamp=timestamp)
+        payload.update(zip(_DURATION_KEYS, durations))
+    else:
+        stable, pos = _read_str(frame, pos, 'H')
+        unstable, pos = _read_str(frame, pos, 'H')
+        payload.update(text=f'{stable} {unstable}'.strip(), stable=stable, unstable=unstable,
+                       source=source, timestamp=timestamp)
+
+    if flags & FLAG_TIMING:
+        audio_start, audio_end, e2e_ms = _TIMING.unpack_from(frame, pos)
+        pos += _TIMING.size
+        payload.update(audio_start=audio_start, audio_end=audio_end, e2e_ms=e2e_ms)
+
+        if flags & FLAG_WORDS:
+            avg_logprob, no_speech_prob, count = _QUALITY.unpack_from(frame, pos)
+            pos += _QUALITY.size
+            numbers_format = f'<{"IIH" * count}'
+            numbers = struct.unpack_from(numbers_format, frame, pos)
+            pos += struct.calcsize(numbers_format)
+            text, pos = _read_str(frame, pos, 'H')
+            words = [
+                [round(audio_start + numbers[i] / 1000, 3), round(audio_start + numbers[i + 1] / 1000, 3),
+                 word, numbers[i + 2] / 1000]
+                for i, word in zip(range(0, 3 * count, 3), text.split('\n') if count else [])
+            ]
+            payload.update(avg_logprob=_none_if_nan(avg_logprob),
+                           no_speech_prob=_none_if_nan(no_speech_prob), words=words)
+
+    if flags & FLAG_EXTRA:
+        extra, pos = _read_str(frame, pos, 'I')
+        payload.update(json.loads(extra))
+    return payload
+
+
+def _str(value: str, length_format: str) -> bytes:
+    data = str(value).encode('utf-8')
+    limit = 1 << (8 * struct.calcsize(length_format))
+    if len(data) >= limit:
+        data = data[:limit - 1].decode('utf-8', 'ignore').encode('utf-8')
+    return struct.pack('<' + length_format, len(data)) + data
+
+
+def _read_str(frame: bytes, pos: int, length_format: str) -> Tuple[str, int]:
+    fmt = '<' + length_format
+    (length,) = struct.unpack_from(fmt, frame, pos)
+    pos += struct.calcsize(fmt)
+    return bytes(frame[pos:pos + length]).decode('utf-8'), pos + length
+
+
+def _nan_if_none(value: Optional[float]) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _none_if_nan(value: float) -> Optional[float]:
+    return None if math.isnan(value) else round(value, 3)
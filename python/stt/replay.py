@@ -0,0 +1,281 @@
+"""
+STT Replay - прогон аудиофайлов через конвейер STT без аудиоустройств
+
+Файл режется на чанки как при захвате и подаётся в STTPipeline
+в реальном времени или с ускорением. Сегментация, очередь и декодирование
+те же, что в сервере, поэтому задержки сопоставимы с живым режимом.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+import wave
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .pipeline import STTPipeline
+from .transcriber import SAMPLE_RATE, SILENCE_TRIGGER_SEC, SPEECH_PAD_SECONDS
+
+logger = logging.getLogger('STT')
+
+# Размер чанка при подаче (как у DynamicAudioCapture)
+REPLAY_CHUNK_MS = 64
+# Период опроса памяти процесса
+RSS_SAMPLE_INTERVAL = 0.1
+# Сколько ждать декодирования хвоста файла
+DRAIN_TIMEOUT_SEC = 120.0
+
+_WORD_RE = re.compile(r'[^\w]+', re.UNICODE)
+
+
+def load_audio(path: str) -> np.ndarray:
+    """Моно float32 16 кГц из WAV (PCM) или любого формата, который читает PyAV (FLAC и др.)"""
+    if str(path).lower().endswith('.wav'):
+        try:
+            return _load_wav(path)
+        except (wave.Error, ValueError):
+            pass  # float WAV и прочее читает PyAV
+    from faster_whisper.audio import decode_audio
+    return decode_audio(str(path), sampling_rate=SAMPLE_RATE)
+
+
+def _load_wav(path: str) -> np.ndarray:
+    with wave.open(str(path), 'rb') as f:
+        channels = f.getnchannels()
+        width = f.getsampwidth()
+        rate = f.getframerate()
+        raw = f.readframes(f.getnframes())
+
+    if width == 2:
+        audio = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+    elif width == 4:
+        audio = np.frombuffer(raw, dtype=np.int32).astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f'Неподдерживаемая разрядность WAV: {width * 8} бит')
+
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        target_len = int(len(audio) * SAMPLE_RATE / rate)
+        audio = np.interp(
+            np.linspace(0, len(audio) - 1, target_len),
+            np.arange(len(audio)),
+            audio,
+        ).astype(np.float32)
+    return audio
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in (_WORD_RE.sub('', t.lower()) for t in text.split()) if w]
+
+
+def word_errors(reference: str, hypothesis: str) -> tuple:
+    """(ошибок, слов в эталоне) по расстоянию Левенштейна между словами"""
+    ref = _words(reference)
+    hyp = _words(hypothesis)
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1], len(ref)
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    errors, total = word_errors(reference, hypothesis)
+    if total == 0:
+        return 0.0 if not _words(hypothesis) else 1.0
+    return errors / total
+
+
+def summarize(values: List[float]) -> Optional[Dict[str, float]]:
+    """p50/p95/p99, среднее и максимум"""
+    if not values:
+        return None
+    arr = np.asarray(values, dtype=np.float64)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        'p50': round(float(p50), 1),
+        'p95': round(float(p95), 1),
+        'p99': round(float(p99), 1),
+        'mean': round(float(arr.mean()), 1),
+        'max': round(float(arr.max()), 1),
+        'count': len(values),
+    }
+
+
+class ResourceMonitor:
+    """CPU и пиковый RSS процесса за время прогона (нужен psutil)"""
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        try:
+            import psutil
+            self._process = psutil.Process(os.getpid())
+        except ImportError:
+            logger.warning('[REPLAY] psutil не установлен, CPU/RSS не измеряются')
+            self._process = None
+        self.interval = interval
+        self.rss_peak = 0
+        self._running = False
+        self._thread = None
+
+    def __enter__(self):
+        if self._process is not None:
+            self._cpu_start = self._process.cpu_times()
+            self._wall_start = time.perf_counter()
+            self.rss_peak = self._process.memory_info().rss
+            self._running = True
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        if self._process is not None:
+            cpu = self._process.cpu_times()
+            self._cpu_sec = (cpu.user - self._cpu_start.user) + (cpu.system - self._cpu_start.system)
+            self._wall_sec = time.perf_counter() - self._wall_start
+
+    def _sample(self):
+        while self._running:
+            self.rss_peak = max(self.rss_peak, self._process.memory_info().rss)
+            time.sleep(self.interval)
+
+    def report(self) -> dict:
+        if self._process is None:
+            return {'cpu_percent': None, 'cpu_sec': None, 'rss_peak_mb': None}
+        return {
+            # 100% = одно ядро занято всё время прогона
+            'cpu_percent': round(self._cpu_sec / self._wall_sec * 100, 1) if self._wall_sec else 0.0,
+            'cpu_sec': round(self._cpu_sec, 2),
+            'rss_peak_mb': round(self.rss_peak / 1024 / 1024, 1),
+        }
+
+
+class ReplayRunner:
+    """
+    Прогон файлов через StreamingTranscriber + STTPipeline.
+
+    speed: 1.0 - реальное время, 2.0 - вдвое быстрее, 0 - без пауз.
+    Очередь инференса работает с политикой block, чтобы при ускоренной
+    подаче сегменты не склеивались и не терялись.
+    """
+
+    def __init__(self, transcriber, speed: float = 1.0, chunk_ms: int = REPLAY_CHUNK_MS):
+        if speed < 0:
+            raise ValueError('Скорость подачи не может быть отрицательной')
+        self.transcriber = transcriber
+        self.speed = speed
+        self.chunk_samples = int(SAMPLE_RATE * chunk_ms / 1000)
+
+    def run_file(self, audio: np.ndarray, reference: Optional[str] = None) -> dict:
+        messages = []
+        self.transcriber.clear()
+        pipeline = STTPipeline(self.transcriber, 'replay', messages.append,
+                               overflow_policy='block')
+        pipeline.start()
+        t0 = time.perf_counter()
+        try:
+            self._feed(pipeline, audio)
+            # Хвост тишины закрывает последний сегмент
+            tail = int(SAMPLE_RATE * (SILENCE_TRIGGER_SEC + SPEECH_PAD_SECONDS))
+            self._feed(pipeline, np.zeros(tail, dtype=np.float32), paced=False)
+            if not self._drain(pipeline):
+                logger.warning('[REPLAY] Конвейер не разобрал очередь за отведённое время')
+        finally:
+            pipeline.stop()
+        wall_sec = time.perf_counter() - t0
+
+        finals = [m for m in messages if m.get('type') == 'transcript']
+        hypothesis = ' '.join(m['text'] for m in finals)
+        duration = len(audio) / SAMPLE_RATE
+        decode_sec = sum(m['decode_ms'] for m in finals) / 1000
+
+        result = {
+            'duration_sec': round(duration, 2),
+            'wall_sec': round(wall_sec, 2),
+            'rtf': round(decode_sec / duration, 3) if duration else 0.0,
+            'segments': [
+                {k: m[k] for k in ('text', 'latency_ms', 'queue_ms', 'decode_ms', 'audio_ms')}
+                for m in finals
+            ],
+            'hypothesis': hypothesis,
+            'pipeline': pipeline.get_stats(),
+        }
+        if reference is not None:
+            errors, words = word_errors(reference, hypothesis)
+            result.update(wer=round(errors / words, 4) if words else None,
+                          word_errors=errors, reference_words=words)
+        return result
+
+    def run(self, files: List[str], references: Optional[Dict[str, str]] = None) -> dict:
+        """Прогон набора файлов, итог - словарь для JSON"""
+        references = references or {}
+        per_file = []
+        with ResourceMonitor() as monitor:
+            for path in files:
+                audio = load_audio(path)
+                logger.info(f'[REPLAY] {path}: {len(audio) / SAMPLE_RATE:.1f}с')
+                result = self.run_file(audio, references.get(path))
+                result['file'] = str(path)
+                per_file.append(result)
+
+        segments = [s for r in per_file for s in r['segments']]
+        duration = sum(r['duration_sec'] for r in per_file)
+        decode_ms = [s['decode_ms'] for s in segments]
+        scored = [r for r in per_file if r.get('reference_words')]
+        ref_words = sum(r['reference_words'] for r in scored)
+
+        summary = {
+            'files': len(per_file),
+            'audio_sec': round(duration, 2),
+            'segments': len(segments),
+            'latency_ms': summarize([s['latency_ms'] for s in segments]),
+            'queue_ms': summarize([s['queue_ms'] for s in segments]),
+            'decode_ms': summarize(decode_ms),
+            'rtf': round(sum(decode_ms) / 1000 / duration, 3) if duration else 0.0,
+            'wer': round(sum(r['word_errors'] for r in scored) / ref_words, 4) if ref_words else None,
+        }
+        summary.update(monitor.report())
+        return {'summary': summary, 'files': per_file}
+
+    def _feed(self, pipeline: STTPipeline, audio: np.ndarray, paced: bool = True):
+        step = self.chunk_samples
+        chunk_sec = step / SAMPLE_RATE
+        start = time.perf_counter()
+        for i, offset in enumerate(range(0, len(audio), step)):
+            if paced and self.speed:
+                delay = start + i * chunk_sec / self.speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            # Файл, в отличие от устройства, может подождать: чанки не вытесняются из очереди
+            while len(pipeline.segment_queue) >= pipeline.segment_queue.maxsize - 1:
+                time.sleep(0.005)
+            pipeline.push_audio(audio[offset:offset + step])
+
+    @staticmethod
+    def _drain(pipeline: STTPipeline, timeout: float = DRAIN_TIMEOUT_SEC) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if pipeline.is_idle():
+                return True
+            time.sleep(0.01)
+        return False
+
+
+def load_references(files: List[str], refs_dir: Optional[str] = None) -> Dict[str, str]:
+    """Эталон для audio.wav - audio.txt рядом с файлом или в refs_dir"""
+    references = {}
+    for path in files:
+        stem = Path(path).with_suffix('.txt').name
+        candidate = Path(refs_dir) / stem if refs_dir else Path(path).with_suffix('.txt')
+        if candidate.exists():
+            references[path] = candidate.read_text(encoding='utf-8').strip()
+    return references
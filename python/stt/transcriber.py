@@ -2,15 +2,22 @@
 STT Transcriber - Streaming транскрипция с Whisper
 """
 
+import bisect
 import logging
+import os
 import time
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
 
 import numpy as np
 from faster_whisper import WhisperModel
+from faster_whisper.utils import download_model
 
+from .buffer import AudioRingBuffer, ModelInputBuffer, SEGMENT_DTYPE
+from .vad import FrameVAD, EnergyVAD
 from .latency import LatencyMetrics, filter_banned_phrases
-from metrics import log_stt_transcription, log_error
+from .model_cache import load_model_choice, save_model_choice, forget_model_choice
+from metrics import log_metric, log_stt_transcription, log_error
 
 logger = logging.getLogger('STT')
 
@@ -24,6 +31,23 @@ MODEL_PRIORITY = [
 ]
 DEVICE = 'cuda'
 COMPUTE_TYPE = 'float16'
+# Бэкенды: 'cuda' - только GPU, 'cpu' - только CPU, 'auto' - GPU с откатом на CPU
+DEVICES = ('auto', 'cuda', 'cpu')
+
+# CPU: модели от большей к меньшей (distil-* англоязычные и для ru не подходят)
+CPU_MODEL_PRIORITY = [
+    'small',
+    'base',
+    'tiny'
+]
+CPU_COMPUTE_TYPES = ('int8', 'int8_float32', 'float32')
+CPU_COMPUTE_TYPE = 'int8'
+# Модель годится для CPU, если декодирует быстрее половины реального времени
+CPU_MAX_RTF = 0.5
+# Длина пробного аудио для замера RTF при старте
+CPU_BENCHMARK_SECONDS = 4.0
+# Длина прогревочного декода перед готовностью сервера
+WARMUP_SECONDS = 1.0
 
 # Streaming параметры
 # MIN_CHUNK_SECONDS: минимальная длительность аудио для транскрипции (избегает слишком коротких фрагментов)
@@ -34,24 +58,244 @@ MAX_BUFFER_SECONDS = 4.0
 SILENCE_THRESHOLD = 0.015
 # SILENCE_TRIGGER_SEC: длительность тишины для срабатывания транскрипции после речи
 SILENCE_TRIGGER_SEC = 0.8
+# SPEECH_PAD_SECONDS: тишина, сохраняемая до и после речевых кадров, чтобы не обрезать слова
+SPEECH_PAD_SECONDS = 0.2
+# CUT_SEARCH_SECONDS: окно перед MAX_BUFFER_SECONDS, где ищется самое тихое место для разреза
+CUT_SEARCH_SECONDS = 1.0
+# CUT_FRAME_MS: шаг оценки энергии при поиске разреза
+CUT_FRAME_MS = 20
+# OVERLAP_SECONDS: хвост до разреза, который повторно идёт в начало следующего сегмента
+OVERLAP_SECONDS = 0.5
+# BUFFER_CAPACITY_SECONDS: ёмкость кольцевого буфера (запас над MAX_BUFFER_SECONDS на последний чанк)
+BUFFER_CAPACITY_SECONDS = MAX_BUFFER_SECONDS + 1.0
+
+
+def auto_cpu_threads(num_workers: int = 1) -> int:
+    """Потоков на воркер: доступные ядра поровну между воркерами"""
+    if hasattr(os, 'sched_getaffinity'):
+        cores = len(os.sched_getaffinity(0))
+    else:
+        cores = os.cpu_count() or 1
+    return max(1, cores // max(1, num_workers))
+
+
+def benchmark_audio(seconds: float = CPU_BENCHMARK_SECONDS) -> np.ndarray:
+    """Пробный сигнал, похожий на голос: гармоники основного тона со слоговой огибающей"""
+    t = np.arange(int(SAMPLE_RATE * seconds), dtype=np.float32) / SAMPLE_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    return (0.1 * voice * envelope).astype(np.float32)
+
+
+def _local_model_path(model_name: str) -> Optional[str]:
+    """Путь к модели в локальном кэше HuggingFace без обращения к сети"""
+    try:
+        return download_model(model_name, local_files_only=True)
+    except Exception:
+        return None
+
+
+def measure_rtf(model, audio: Optional[np.ndarray] = None) -> float:
+    """Real-time factor: время декодирования / длительность аудио"""
+    if audio is None:
+        audio = benchmark_audio()
+    t0 = time.perf_counter()
+    segments, info = model.transcribe(
+        audio,
+        language='ru',
+        beam_size=1,
+        temperature=0.0,
+        vad_filter=False,
+        condition_on_previous_text=False,
+    )
+    # Генератор ленивый: декодирование происходит при обходе
+    for _ in segments:
+        pass
+    return (time.perf_counter() - t0) / (len(audio) / SAMPLE_RATE)
+
+
+@dataclass
+class DecodeResult:
+    """Текст сегмента с качеством и таймингом слов (секунды от начала аудио сегмента)"""
+    text: str
+    words: List[Tuple[float, float, str, float]] = field(default_factory=list)
+    avg_logprob: Optional[float] = None
+    no_speech_prob: Optional[float] = None
+
+
+def find_cut_point(audio: np.ndarray, end: int,
+                   search_samples: int = int(SAMPLE_RATE * CUT_SEARCH_SECONDS),
+                   frame_samples: int = SAMPLE_RATE * CUT_FRAME_MS // 1000) -> int:
+    """
+    Точка разреза в окне search_samples перед end: середина самого тихого
+    кадра, чтобы не резать слово посередине.
+    """
+    start = max(end - search_samples, 0)
+    n_frames = (end - start) // frame_samples
+    if n_frames <= 1:
+        return end
+    window = audio[end - n_frames * frame_samples:end].reshape(n_frames, frame_samples)
+    energy = np.einsum('ij,ij->i', window, window, dtype=np.float64)
+    quietest = int(np.argmin(energy))
+    return end - (n_frames - quietest) * frame_samples + frame_samples // 2
+
+
+def timeline_time(timeline: List[Tuple[int, float]], t_sec: float) -> float:
+    """
+    Время захвата для момента t_sec внутри сегмента.
+    timeline - опорные точки (смещение в сэмплах, время захвата): сегмент
+    склеен из речевых кадров, поэтому внутри него бывают разрывы.
+    """
+    offset = t_sec * SAMPLE_RATE
+    idx = bisect.bisect_right([o for o, _ in timeline], offset) - 1
+    base_offset, base_time = timeline[max(idx, 0)]
+    return base_time + (offset - base_offset) / SAMPLE_RATE
 
 
 class StreamingTranscriber:
     """Streaming STT - весь текст подряд, пауза 5+ сек = новое сообщение"""
     
-    def __init__(self):
-        self.model = None
-        self.model_name = None
+    def __init__(self, vad: Optional[FrameVAD] = None, model: Optional[WhisperModel] = None,
+                 model_name: Optional[str] = None, device: str = DEVICE,
+                 compute_type: Optional[str] = None, cpu_threads: int = 0, num_workers: int = 1,
+                 cache_model_choice: bool = False, word_timestamps: bool = False):
+        """
+        Args:
+            vad: детектор речи для этого потока
+            model: уже загруженная модель - поток разделяет её, а не грузит свою
+            model_name: имя переданной модели для логов и метрик
+            device: 'cuda', 'cpu' или 'auto' (GPU, при неудаче - CPU)
+            compute_type: тип вычислений на CPU ('int8', 'int8_float32', 'float32')
+            cpu_threads: потоков на воркер CTranslate2 (0 - подобрать по числу ядер)
+            num_workers: параллельных воркеров модели на CPU
+            cache_model_choice: брать модель из кэша выбора для этой машины и
+                сохранять туда результат перебора
+            word_timestamps: запрашивать у Whisper тайминг слов (дороже декодирование)
+        """
+        if device not in DEVICES:
+            raise ValueError(f'Неизвестное устройство: {device}')
+        if compute_type is not None and compute_type not in CPU_COMPUTE_TYPES:
+            raise ValueError(f'Неподдерживаемый тип вычислений на CPU: {compute_type}')
+        if cpu_threads < 0 or num_workers < 1:
+            raise ValueError('cpu_threads не может быть отрицательным, num_workers - меньше 1')
+        
+        self.device = device
+        self.compute_type = compute_type or CPU_COMPUTE_TYPE
+        self.num_workers = num_workers
+        self.cpu_threads = cpu_threads or auto_cpu_threads(num_workers)
+        self.rtf = None
+        self.cache_model_choice = cache_model_choice
+        self.word_timestamps = word_timestamps
+        # Разбивка времени старта, мс; downloaded - модели не было в локальном кэше
+        self.startup_timings = {'check_ms': 0.0, 'load_ms': 0.0, 'benchmark_ms': 0.0,
+                                'warmup_ms': 0.0, 'cached_choice': False, 'downloaded': False}
+        
+        self.model = model
+        self.model_name = model_name
         self.device_used = None
-        self._load_model()
+        if self.model is None:
+            self._load_model()
         
-        self.audio_buffer = []
-        self.total_samples = 0
+        # Сегмент копится в int16; во float32 он переводится один раз - на входе модели
+        self.audio_buffer = AudioRingBuffer(int(SAMPLE_RATE * BUFFER_CAPACITY_SECONDS), dtype=SEGMENT_DTYPE)
+        self.model_input = ModelInputBuffer(int(SAMPLE_RATE * BUFFER_CAPACITY_SECONDS))
         self.last_sound_time = time.time()
         self.is_speaking = False
         self.metrics = LatencyMetrics()
+        
+        # VAD работает один раз на входном потоке; в модель попадают только речевые кадры
+        self.vad = vad or EnergyVAD(threshold=SILENCE_THRESHOLD)
+        self._pad_samples = int(SAMPLE_RATE * SPEECH_PAD_SECONDS)
+        self._preroll = AudioRingBuffer(max(self._pad_samples, 1), dtype=SEGMENT_DTYPE)
+        self._pending = np.zeros(self.vad.frame_size, dtype=SEGMENT_DTYPE)
+        # Рабочие буферы приведения float чанков (ingest, shm float32) к int16
+        self._chunk_float = np.empty(0, dtype=np.float32)
+        self._chunk_int = np.empty(0, dtype=SEGMENT_DTYPE)
+        self._pending_len = 0
+        self._in_segment = False
+        self.silence_samples = 0
+        
+        # Часы захвата: позиция кадра в потоке и опорные точки сегмента
+        self._stream_pos = 0
+        self._input_samples = 0
+        self._chunk_time = time.time()
+        self._segment_stream_end = -1
+        self._timeline: List[Tuple[int, float]] = []
+        self.last_segment_timeline: List[Tuple[int, float]] = []
+        
+        # Разрез по пределу длины: перекрытие в начале текущего и отданного сегментов, сэмплы
+        self._forced_cut = False
+        self._overlap_samples = 0
+        self.last_segment_overlap = 0.0
+        self.forced_cuts = 0
     
     def _load_model(self):
+        """Загрузка модели: сохранённый выбор, иначе GPU по приоритету, на CPU - по замеру скорости"""
+        if self.cache_model_choice and self._load_cached_model():
+            return
+        
+        if self.device == 'cpu':
+            self._load_cpu_model()
+        else:
+            try:
+                self._load_gpu_model()
+            except RuntimeError:
+                if self.device != 'auto':
+                    raise
+                logger.warning('[CPU] GPU недоступен, переключение на CPU')
+                self._load_cpu_model()
+        
+        if self.cache_model_choice:
+            compute_type = COMPUTE_TYPE if self.device_used == DEVICE else self.compute_type
+            save_model_choice(self.device, self.model_name, self.device_used, compute_type, self.rtf)
+    
+    def _create_model(self, model_name: str, device: str, compute_type: str) -> WhisperModel:
+        """Создание WhisperModel с учётом времени проверки кэша и загрузки"""
+        t0 = time.perf_counter()
+        local_path = _local_model_path(model_name)
+        t1 = time.perf_counter()
+        self.startup_timings['check_ms'] += (t1 - t0) * 1000
+        if local_path is None:
+            # Веса скачает сам WhisperModel - это время попадёт в load_ms
+            self.startup_timings['downloaded'] = True
+        
+        kwargs = {'device': device, 'compute_type': compute_type}
+        if device == 'cpu':
+            kwargs.update(cpu_threads=self.cpu_threads, num_workers=self.num_workers)
+        try:
+            return WhisperModel(local_path or model_name, **kwargs)
+        finally:
+            self.startup_timings['load_ms'] += (time.perf_counter() - t1) * 1000
+    
+    def _load_cached_model(self) -> bool:
+        """Загрузка модели, выбранной на этой машине при прошлом старте"""
+        choice = load_model_choice(self.device)
+        if choice is None:
+            return False
+        
+        on_gpu = choice['device'] == DEVICE
+        compute_type = COMPUTE_TYPE if on_gpu else self.compute_type
+        ladder = MODEL_PRIORITY if on_gpu else CPU_MODEL_PRIORITY
+        if choice['model'] not in ladder or choice.get('compute_type') != compute_type:
+            return False
+        
+        try:
+            self.model = self._create_model(choice['model'], choice['device'], compute_type)
+        except Exception as e:
+            logger.warning(f'[STT] Сохранённая модель {choice["model"]} не загрузилась: {e}')
+            forget_model_choice(self.device)
+            return False
+        
+        self.model_name = choice['model']
+        self.device_used = choice['device']
+        self.rtf = choice.get('rtf')
+        self.startup_timings['cached_choice'] = True
+        logger.info(f'[STT] Модель {self.model_name} ({self.device_used}, {compute_type}) из кэша выбора')
+        return True
+    
+    def _load_gpu_model(self):
         """Загрузка модели - ТОЛЬКО GPU"""
         last_error = None
         
@@ -59,7 +303,7 @@ class StreamingTranscriber:
             logger.info(f'[GPU] Загрузка {model_name} на {DEVICE}...')
             
             try:
-                self.model = WhisperModel(model_name, device=DEVICE, compute_type=COMPUTE_TYPE)
+                self.model = self._create_model(model_name, DEVICE, COMPUTE_TYPE)
                 self.device_used = DEVICE
                 self.model_name = model_name
                 logger.info(f'[GPU] Модель {model_name} загружена')
@@ -72,35 +316,374 @@ class StreamingTranscriber:
         logger.error('[GPU] Все модели недоступны')
         raise RuntimeError(f'GPU недоступен: {last_error}')
     
-    def add_audio(self, audio_chunk: np.ndarray) -> bool:
-        """Добавляет аудио, возвращает True если нужна транскрипция"""
+    def _load_cpu_model(self):
+        """
+        Загрузка на CPU: самая крупная модель лестницы, которая на этой
+        машине держит RTF < CPU_MAX_RTF. Если не держит ни одна - самая
+        маленькая из загрузившихся.
+        """
+        last_error = None
+        fallback = None
+        
+        for model_name in CPU_MODEL_PRIORITY:
+            logger.info(f'[CPU] Загрузка {model_name} ({self.compute_type}, '
+                        f'{self.cpu_threads} потоков x {self.num_workers})...')
+            try:
+                model = self._create_model(model_name, 'cpu', self.compute_type)
+            except Exception as e:
+                last_error = e
+                logger.warning(f'[CPU] Не удалось загрузить {model_name}: {e}')
+                continue
+            
+            t0 = time.perf_counter()
+            rtf = measure_rtf(model)
+            self.startup_timings['benchmark_ms'] += (time.perf_counter() - t0) * 1000
+            logger.info(f'[CPU] {model_name}: RTF {rtf:.2f}')
+            fallback = (model, model_name, rtf)
+            if rtf < CPU_MAX_RTF:
+                break
+        else:
+            if fallback is None:
+                logger.error('[CPU] Все модели недоступны')
+                raise RuntimeError(f'CPU модель недоступна: {last_error}')
+            logger.warning(f'[CPU] Ни одна модель не держит RTF < {CPU_MAX_RTF}, '
+                           f'используется {fallback[1]}')
+        
+        self.model, self.model_name, self.rtf = fallback
+        self.device_used = 'cpu'
+        logger.info(f'[CPU] Модель {self.model_name} загружена (RTF {self.rtf:.2f})')
+    
+    def warmup(self, seconds: float = WARMUP_SECONDS) -> float:
+        """
+        Пробный декод синтетического сигнала до первого реального сегмента:
+        инициализация ядер CUDA/CTranslate2 не ложится на первый транскрипт.
+        Возвращает длительность в мс.
+        """
+        t0 = time.perf_counter()
+        try:
+            self._decode(benchmark_audio(seconds))
+        except Exception as e:
+            logger.warning(f'[STT] Прогрев не удался: {e}')
+        warmup_ms = (time.perf_counter() - t0) * 1000
+        self.startup_timings['warmup_ms'] = warmup_ms
+        return warmup_ms
+    
+    def get_startup_report(self) -> dict:
+        """Разбивка времени старта: проверка кэша, загрузка, замер RTF, прогрев"""
+        report = {k: round(v) if isinstance(v, float) else v for k, v in self.startup_timings.items()}
+        report['total_ms'] = (report['check_ms'] + report['load_ms']
+                              + report['benchmark_ms'] + report['warmup_ms'])
+        report['model'] = self.model_name
+        report['device'] = self.device_used
+        return report
+    
+    def log_startup(self) -> dict:
+        """Пишет разбивку старта в лог и в метрики"""
+        report = self.get_startup_report()
+        load_label = 'download+load' if report['downloaded'] else 'load'
+        logger.info(
+            f'[STT] Старт {report["total_ms"]}ms: check {report["check_ms"]}ms, '
+            f'{load_label} {report["load_ms"]}ms, benchmark {report["benchmark_ms"]}ms, '
+            f'warmup {report["warmup_ms"]}ms (кэш выбора: {"да" if report["cached_choice"] else "нет"})'
+        )
+        log_metric('startup', 'stt', **report)
+        return report
+    
+    def create_stream(self, vad: Optional[FrameVAD] = None) -> 'StreamingTranscriber':
+        """
+        Ещё один поток сегментации поверх уже загруженной модели.
+        Буфер и VAD у потока свои, веса Whisper - общие.
+        """
+        stream = StreamingTranscriber(vad=vad, model=self.model, model_name=self.model_name,
+                                      device=self.device, compute_type=self.compute_type,
+                                      cpu_threads=self.cpu_threads, num_workers=self.num_workers,
+                                      word_timestamps=self.word_timestamps)
+        stream.device_used = self.device_used
+        stream.rtf = self.rtf
+        return stream
+    
+    @property
+    def total_samples(self) -> int:
+        """Количество сэмплов в текущем сегменте"""
+        return len(self.audio_buffer)
+    
+    @property
+    def buffer_fill_level(self) -> float:
+        """Заполненность буфера от 0.0 до 1.0"""
+        return self.audio_buffer.fill_level
+    
+    @property
+    def current_overlap(self) -> float:
+        """Секунды в начале текущего сегмента, уже отданные в прошлом сегменте"""
+        return self._overlap_samples / SAMPLE_RATE
+    
+    def get_buffer_stats(self) -> dict:
+        """Состояние буфера для метрик"""
+        stats = self.audio_buffer.get_stats()
+        stats['duration_sec'] = round(len(self.audio_buffer) / SAMPLE_RATE, 2)
+        return stats
+    
+    def add_audio(self, audio_chunk: np.ndarray, capture_time: Optional[float] = None) -> bool:
+        """
+        Добавляет аудио, возвращает True если нужна транскрипция.
+        capture_time - unix-время захвата последнего сэмпла чанка; без него
+        берётся момент приёма, и тайминг слов отстаёт на время в очередях.
+        """
         self.metrics.audio_received()
+        self._chunk_time = time.time() if capture_time is None else capture_time
+        self._input_samples += len(audio_chunk)
+        audio_chunk = self._to_segment_dtype(audio_chunk)
         
-        rms = np.sqrt(np.mean(audio_chunk ** 2)) if len(audio_chunk) > 0 else 0
-        has_sound = rms > SILENCE_THRESHOLD
+        frame_size = self.vad.frame_size
+        should_transcribe = False
         
-        if has_sound:
-            self.last_sound_time = time.time()
-            self.is_speaking = True
+        # Добираем незавершённый кадр с прошлого чанка
+        if self._pending_len:
+            take = min(frame_size - self._pending_len, len(audio_chunk))
+            self._pending[self._pending_len:self._pending_len + take] = audio_chunk[:take]
+            self._pending_len += take
+            audio_chunk = audio_chunk[take:]
+            if self._pending_len == frame_size:
+                self._pending_len = 0
+                should_transcribe |= self._process_frames(self._pending[np.newaxis, :])
         
-        silence_duration = time.time() - self.last_sound_time
+        n_frames = len(audio_chunk) // frame_size
+        if n_frames:
+            frames = audio_chunk[:n_frames * frame_size].reshape(n_frames, frame_size)
+            should_transcribe |= self._process_frames(frames)
         
-        if has_sound or silence_duration < 2.0:
-            self.audio_buffer.append(audio_chunk)
-            self.total_samples += len(audio_chunk)
+        rest = len(audio_chunk) - n_frames * frame_size
+        if rest:
+            self._pending[self._pending_len:self._pending_len + rest] = audio_chunk[-rest:]
+            self._pending_len += rest
         
-        buffer_duration = self.total_samples / SAMPLE_RATE
+        return should_transcribe
+    
+    def _to_segment_dtype(self, chunk: np.ndarray) -> np.ndarray:
+        """
+        Float чанк → int16 сегментатора в переиспользуемых буферах;
+        int16 от захвата проходит как есть. Результат валиден до
+        следующего чанка - add_audio сразу раскладывает его по буферам.
+        """
+        if chunk.dtype == SEGMENT_DTYPE:
+            return chunk
+        n = len(chunk)
+        if n > len(self._chunk_float):
+            self._chunk_float = np.empty(n, dtype=np.float32)
+            self._chunk_int = np.empty(n, dtype=SEGMENT_DTYPE)
+        scaled = self._chunk_float[:n]
+        np.multiply(chunk, np.float32(32768), out=scaled)
+        np.rint(scaled, out=scaled)
+        np.clip(scaled, -32768, 32767, out=scaled)
+        out = self._chunk_int[:n]
+        np.copyto(out, scaled, casting='unsafe')
+        return out
+    
+    def _process_frames(self, frames: np.ndarray) -> bool:
+        """Сегментация по решениям VAD: речь в буфер, тишина - только в пределах паддинга"""
+        speech = self.vad.classify(frames)
+        frame_size = frames.shape[1]
+        trigger_samples = int(SAMPLE_RATE * SILENCE_TRIGGER_SEC)
+        min_samples = int(SAMPLE_RATE * MIN_CHUNK_SECONDS)
+        max_samples = int(SAMPLE_RATE * MAX_BUFFER_SECONDS)
         should_transcribe = False
         
-        if self.is_speaking and silence_duration >= SILENCE_TRIGGER_SEC and buffer_duration >= MIN_CHUNK_SECONDS:
-            should_transcribe = True
-            self.is_speaking = False
-        
-        if buffer_duration >= MAX_BUFFER_SECONDS:
-            should_transcribe = True
+        for frame, is_speech in zip(frames, speech):
+            if is_speech:
+                if len(self._preroll):
+                    self._write_segment(self._preroll.view(), self._stream_pos - len(self._preroll))
+                    self._preroll.clear()
+                self._write_segment(frame, self._stream_pos)
+                self._in_segment = True
+                self.is_speaking = True
+                self.silence_samples = 0
+                self.last_sound_time = time.time()
+            else:
+                self.silence_samples += frame_size
+                if self._in_segment and self.silence_samples <= self._pad_samples:
+                    self._write_segment(frame, self._stream_pos)
+                else:
+                    self._preroll.write(frame)
+            self._stream_pos += frame_size
+            
+            if (self.is_speaking and self.silence_samples >= trigger_samples
+                    and self.total_samples >= min_samples):
+                should_transcribe = True
+                self.is_speaking = False
+                self._in_segment = False
+            
+            if self.total_samples >= max_samples:
+                should_transcribe = True
+                self._forced_cut = True
         
         return should_transcribe
     
+    def _capture_time(self, stream_pos: int) -> float:
+        """Время захвата сэмпла потока по моменту прихода последнего чанка"""
+        return self._chunk_time - (self._input_samples - stream_pos) / SAMPLE_RATE
+    
+    def _write_segment(self, audio: np.ndarray, stream_pos: int):
+        """Запись в сегмент с опорной точкой времени на каждом разрыве потока"""
+        if not len(self.audio_buffer):
+            self._timeline = []
+        if stream_pos != self._segment_stream_end or not self._timeline:
+            self._timeline.append((len(self.audio_buffer), self._capture_time(stream_pos)))
+        self.audio_buffer.write(audio)
+        self._segment_stream_end = stream_pos + len(audio)
+    
+    def _decode(self, audio: np.ndarray) -> str:
+        """Декодирование аудио моделью в отфильтрованный текст"""
+        return self._decode_result(audio).text
+    
+    def _decode_result(self, audio: np.ndarray) -> DecodeResult:
+        """Декодирование с уверенностью модели и, если включено, таймингом слов"""
+        segments, info = self.model.transcribe(
+            self.model_input.convert(audio),
+            language='ru',
+            beam_size=1,
+            best_of=1,
+            temperature=0.0,
+            # Тишина уже отсечена собственным VAD, повторный проход Silero не нужен
+            vad_filter=False,
+            condition_on_previous_text=False,
+            no_speech_threshold=0.6,
+            compression_ratio_threshold=2.4,
+            initial_prompt=None,
+            word_timestamps=self.word_timestamps,
+        )
+        return self._collect_result(segments)
+    
+    @staticmethod
+    def _collect_result(segments, offset: float = 0.0) -> DecodeResult:
+        """Сборка DecodeResult из сегментов faster-whisper; offset - начало клипа в батче"""
+        text_parts = []
+        words = []
+        logprobs = []
+        no_speech = []
+        for seg in segments:
+            t = seg.text.strip()
+            if t and len(t) > 1:
+                text_parts.append(t)
+                logprobs.append(seg.avg_logprob)
+                no_speech.append(seg.no_speech_prob)
+                for w in seg.words or []:
+                    words.append((float(w.start - offset), float(w.end - offset), w.word.strip(),
+                                  float(w.probability)))
+        
+        text = filter_banned_phrases(' '.join(text_parts))
+        return DecodeResult(
+            text=text,
+            words=words if text else [],
+            avg_logprob=float(sum(logprobs) / len(logprobs)) if logprobs else None,
+            no_speech_prob=float(max(no_speech)) if no_speech else None,
+        )
+    
+    def transcribe_partial(self, audio: Optional[np.ndarray] = None) -> Optional[str]:
+        """
+        Промежуточная гипотеза по текущему сегменту без очистки буфера.
+        Окно начинается с начала сегмента, чтобы соседние гипотезы
+        можно было сравнивать по префиксу.
+        """
+        if audio is None:
+            audio = self.audio_buffer.view()
+        if len(audio) < int(SAMPLE_RATE * MIN_CHUNK_SECONDS):
+            return None
+        
+        try:
+            return self._decode(audio) or None
+        except Exception as e:
+            logger.error(f'[STT] Ошибка partial: {e}')
+            log_error('stt', 'partial_transcription_error', str(e))
+            return None
+    
+    def take_segment(self) -> Optional[np.ndarray]:
+        """
+        Забирает копию готового сегмента и освобождает буфер.
+        Используется конвейером: сегментация продолжает писать в буфер,
+        пока сегмент декодируется в другом потоке.
+        """
+        min_samples = int(SAMPLE_RATE * MIN_CHUNK_SECONDS)
+        if self.total_samples < min_samples:
+            return None
+        if self.total_samples - self._overlap_samples < min_samples:
+            # После перекрытия речи почти нет - всё уже есть в прошлом сегменте
+            self.clear()
+            return None
+        
+        self.last_segment_overlap = self._overlap_samples / SAMPLE_RATE
+        if self._forced_cut:
+            return self._take_forced_cut()
+        
+        audio = self.audio_buffer.view().copy()
+        self.last_segment_timeline = self._timeline
+        self._timeline = []
+        self._overlap_samples = 0
+        self.audio_buffer.clear()
+        return audio
+    
+    def _take_forced_cut(self) -> np.ndarray:
+        """
+        Сегмент упёрся в MAX_BUFFER_SECONDS: разрез в самом тихом месте перед
+        пределом, хвост OVERLAP_SECONDS до разреза и всё после него остаются в
+        буфере началом следующего сегмента.
+        """
+        self._forced_cut = False
+        self.forced_cuts += 1
+        buffered = self.audio_buffer.view()
+        end = min(len(buffered), int(SAMPLE_RATE * MAX_BUFFER_SECONDS))
+        cut = find_cut_point(buffered, end)
+        keep_from = max(cut - int(SAMPLE_RATE * OVERLAP_SECONDS), 0)
+        
+        audio = buffered[:cut].copy()
+        carry = buffered[keep_from:].copy()
+        timeline = self._timeline
+        self.last_segment_timeline = [a for a in timeline if a[0] < cut]
+        self._timeline = ([(0, timeline_time(timeline, keep_from / SAMPLE_RATE))]
+                          + [(o - keep_from, t) for o, t in timeline if o > keep_from]) if timeline else []
+        self._overlap_samples = cut - keep_from
+        
+        self.audio_buffer.clear()
+        self.audio_buffer.write(carry)
+        return audio
+    
+    def transcribe_segment(self, audio: np.ndarray, t_end: Optional[float] = None) -> Optional[str]:
+        """
+        Декодирует отрезанный сегмент. Задержка считается от момента
+        отрезания сегмента (t_end) до готового текста.
+        """
+        result = self.transcribe_segment_result(audio, t_end)
+        return result.text if result else None
+    
+    def transcribe_segment_result(self, audio: np.ndarray,
+                                  t_end: Optional[float] = None) -> Optional[DecodeResult]:
+        """То же, что transcribe_segment, но с уверенностью модели и таймингом слов"""
+        t_start = time.time()
+        try:
+            result = self._decode_result(audio)
+        except Exception as e:
+            logger.error(f'[STT] Ошибка: {e}')
+            log_error('stt', 'transcription_error', str(e))
+            return None
+        
+        if not self.report_segment(result.text, audio, t_end or t_start):
+            return None
+        return result
+    
+    def report_segment(self, result: Optional[str], audio: np.ndarray, t_end: float) -> Optional[str]:
+        """Лог и метрика готового сегмента; общий путь для одиночного и батч-декодирования"""
+        if not result:
+            return None
+        
+        latency_ms = int((time.time() - t_end) * 1000)
+        logger.info(f'[STT] "{result}" (latency: {latency_ms}ms)')
+        log_stt_transcription(
+            text=result,
+            latency_ms=latency_ms,
+            audio_duration_sec=len(audio) / SAMPLE_RATE,
+            model=self.model_name or 'large-v3'
+        )
+        return result
+    
     def transcribe(self) -> Optional[str]:
         """Транскрибирует буфер"""
         if self.total_samples < int(SAMPLE_RATE * MIN_CHUNK_SECONDS):
@@ -109,37 +692,19 @@ class StreamingTranscriber:
         self.metrics.transcribe_started()
         
         try:
-            audio = np.concatenate(self.audio_buffer).astype(np.float32)
+            # Непрерывный срез кольцевого буфера без копирования
+            audio = self.audio_buffer.view()
             duration = len(audio) / SAMPLE_RATE
             
             logger.info(f'[STT] Транскрипция {duration:.1f}с...')
             
-            segments, info = self.model.transcribe(
-                audio,
-                language='ru',
-                beam_size=1,
-                best_of=1,
-                temperature=0.0,
-                vad_filter=True,
-                condition_on_previous_text=False,
-                no_speech_threshold=0.6,
-                compression_ratio_threshold=2.4,
-                initial_prompt=None,
-            )
-            
-            text_parts = []
-            for seg in segments:
-                t = seg.text.strip()
-                if t and len(t) > 1:
-                    text_parts.append(t)
-            
-            result = ' '.join(text_parts)
-            result = filter_banned_phrases(result)
+            result = self._decode(audio)
             
             audio_duration = self.total_samples / SAMPLE_RATE if self.total_samples > 0 else 0
             
-            self.audio_buffer = []
-            self.total_samples = 0
+            self.audio_buffer.clear()
+            self._forced_cut = False
+            self._overlap_samples = 0
             self.metrics.transcribe_done()
             
             if result:
@@ -161,13 +726,20 @@ class StreamingTranscriber:
         except Exception as e:
             logger.error(f'[STT] Ошибка: {e}')
             log_error('stt', 'transcription_error', str(e))
-            self.audio_buffer = []
-            self.total_samples = 0
+            self.audio_buffer.clear()
             return None
     
     def clear(self):
         """Очистка буфера"""
-        self.audio_buffer = []
-        self.total_samples = 0
+        self.audio_buffer.clear()
+        self._timeline = []
+        self._segment_stream_end = -1
+        self._forced_cut = False
+        self._overlap_samples = 0
+        self._preroll.clear()
+        self._pending_len = 0
+        self._in_segment = False
+        self.silence_samples = 0
+        self.vad.reset()
         self.is_speaking = False
         self.metrics.reset()
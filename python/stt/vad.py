@@ -0,0 +1,137 @@
+"""
+STT VAD - покадровое определение речи перед Whisper
+"""
+
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+
+from audio.sources import INT16_SCALE
+
+logger = logging.getLogger('STT')
+
+# 512 сэмплов (32 мс при 16 кГц) - размер кадра Silero VAD
+VAD_FRAME_SIZE = 512
+# Порог RMS для энергетического детектора (0.015 ≈ -36 dB)
+ENERGY_THRESHOLD = 0.015
+# Доля смен знака в кадре, выше которой кадр считается шумом, а не речью
+MAX_ZERO_CROSSING_RATE = 0.4
+# Порог вероятности речи для Silero
+SILERO_THRESHOLD = 0.5
+# Контекст Silero: хвост предыдущего кадра, подаваемый вместе с текущим
+SILERO_CONTEXT_SIZE = 64
+
+
+class FrameVAD:
+    """
+    Базовый детектор речи по кадрам фиксированного размера.
+    Наследники реализуют speech_probs() над матрицей кадров (n, frame_size).
+    """
+
+    frame_size = VAD_FRAME_SIZE
+    threshold = 0.5
+
+    def speech_probs(self, frames: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        """Маска речевых кадров"""
+        if len(frames) == 0:
+            return np.zeros(0, dtype=bool)
+        return self.speech_probs(frames) >= self.threshold
+
+    def reset(self):
+        """Сброс состояния между независимыми потоками"""
+
+
+class EnergyVAD(FrameVAD):
+    """Энергия + частота пересечения нуля, векторно по всем кадрам чанка"""
+
+    name = 'energy'
+
+    def __init__(self, threshold: float = ENERGY_THRESHOLD, max_zcr: float = MAX_ZERO_CROSSING_RATE):
+        self.energy_threshold = threshold
+        self.max_zcr = max_zcr
+
+    def speech_probs(self, frames: np.ndarray) -> np.ndarray:
+        # int16 кадры не переводятся во float: энергия копится в float64, порог - в масштабе int16
+        energy = np.einsum('ij,ij->i', frames, frames, dtype=np.float64) / frames.shape[1]
+        if frames.dtype == np.int16:
+            energy *= INT16_SCALE * INT16_SCALE
+        rms = np.sqrt(energy)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frames.shape[1]
+        return ((rms > self.energy_threshold) & (zcr < self.max_zcr)).astype(np.float32)
+
+
+class SileroVAD(FrameVAD):
+    """
+    Silero VAD через onnxruntime на CPU.
+    Состояние LSTM и контекст переносятся между вызовами, поэтому
+    модель видит поток целиком, а не отдельные чанки.
+    """
+
+    name = 'silero'
+
+    def __init__(self, threshold: float = SILERO_THRESHOLD, model_path: Optional[str] = None):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise RuntimeError('Silero VAD требует пакет onnxruntime') from e
+
+        if model_path is None:
+            from faster_whisper.utils import get_assets_path
+            model_path = os.path.join(get_assets_path(), 'silero_vad_v6.onnx')
+
+        opts = onnxruntime.SessionOptions()
+        opts.inter_op_num_threads = 1
+        opts.intra_op_num_threads = 1
+        opts.enable_cpu_mem_arena = False
+        opts.log_severity_level = 4
+
+        self.session = onnxruntime.InferenceSession(
+            model_path,
+            providers=['CPUExecutionProvider'],
+            sess_options=opts,
+        )
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self._h = np.zeros((1, 1, 128), dtype=np.float32)
+        self._c = np.zeros((1, 1, 128), dtype=np.float32)
+        self._context = np.zeros(SILERO_CONTEXT_SIZE, dtype=np.float32)
+
+    def speech_probs(self, frames: np.ndarray) -> np.ndarray:
+        batch = np.empty((len(frames), SILERO_CONTEXT_SIZE + self.frame_size), dtype=np.float32)
+        body = batch[:, SILERO_CONTEXT_SIZE:]
+        if frames.dtype == np.int16:
+            np.multiply(frames, np.float32(INT16_SCALE), out=body)
+        else:
+            body[:] = frames
+        batch[0, :SILERO_CONTEXT_SIZE] = self._context
+        batch[1:, :SILERO_CONTEXT_SIZE] = body[:-1, -SILERO_CONTEXT_SIZE:]
+
+        probs, self._h, self._c = self.session.run(
+            None, {'input': batch, 'h': self._h, 'c': self._c}
+        )
+        self._context = body[-1, -SILERO_CONTEXT_SIZE:].copy()
+        return np.asarray(probs, dtype=np.float32).reshape(-1)
+
+
+def create_vad(name: str = 'energy') -> FrameVAD:
+    """
+    Фабрика VAD по имени: 'energy' или 'silero'.
+    Если Silero недоступен, используется энергетический детектор.
+    """
+    if name == 'silero':
+        try:
+            return SileroVAD()
+        except Exception as e:
+            logger.warning(f'[VAD] Silero недоступен, используется energy: {e}')
+            return EnergyVAD()
+    if name == 'energy':
+        return EnergyVAD()
+    raise ValueError(f'Неизвестный VAD: {name}')
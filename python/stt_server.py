@@ -5,18 +5,27 @@ STT Server с динамическим захватом аудио
 
 import os
 import sys
+import argparse
 import asyncio
+import contextlib
+import functools
 import json
 import logging
-import time
-import threading
-import queue
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
-import numpy as np
 import websockets
 
-from stt import StreamingTranscriber
+from stt import (
+    StreamingTranscriber, STTPipeline, OVERFLOW_POLICIES, create_vad,
+    BatchedDecoder, SharedInferenceWorker, IngestFormat,
+    ClientFanout, SEND_POLICIES, MessageEncoder,
+)
+from stt.protocol import negotiate
+from stt.fanout import CLIENT_QUEUE_SIZE, DEFAULT_SEND_POLICY, message_key
+from stt.transcriber import DEVICES, CPU_COMPUTE_TYPES
+from audio.resample import Resampler
+from audio.shm import SharedAudioReader, default_shm_name
+from audio.sources import AudioSource, create_audio_source
 from dynamic_audio_capture import DynamicAudioCapture
 from audio_mode_detector import get_audio_mode
 
@@ -32,17 +41,62 @@ logger = logging.getLogger('STT-Dynamic')
 WEBSOCKET_HOST = 'localhost'
 WEBSOCKET_PORT = 8765
 SAMPLE_RATE = 16000
+# 'ingest' - источник без устройства, аудио присылают клиенты бинарными кадрами
+# 'shm' - аудио пишет audio_capture.py --transport=shm в разделяемую память
+SOURCE_MODES = ('loopback', 'microphone', 'ingest', 'shm')
+
+
+def parse_source_spec(spec: str) -> Tuple[str, int]:
+    """Разбор дополнительного источника вида 'microphone:8764'"""
+    mode, sep, port = spec.partition(':')
+    if not sep or mode not in SOURCE_MODES or not port.isdigit():
+        raise argparse.ArgumentTypeError(
+            f'Источник задаётся как <{"|".join(SOURCE_MODES)}>:<порт>, получено: {spec}'
+        )
+    return mode, int(port)
 
 
 class DynamicSTTServer:
     """STT сервер с динамическим захватом аудио"""
     
-    def __init__(self, mode='auto', host=WEBSOCKET_HOST, port=WEBSOCKET_PORT):
+    def __init__(self, mode='auto', host=WEBSOCKET_HOST, port=WEBSOCKET_PORT,
+                 partial_interval_ms: int = 0, vad: str = 'energy',
+                 inference_queue_size: int = 4, overflow_policy: str = 'merge',
+                 extra_sources: Optional[List[Tuple[str, int]]] = None,
+                 device: str = 'auto', compute_type: Optional[str] = None,
+                 cpu_threads: int = 0, num_workers: int = 1,
+                 word_timestamps: bool = False, client_queue_size: int = CLIENT_QUEUE_SIZE,
+                 client_policy: str = DEFAULT_SEND_POLICY,
+                 shm_name: str = default_shm_name('loopback'),
+                 audio_source: Optional[AudioSource] = None):
         """
         Args:
-            mode: 'loopback', 'microphone', или 'auto' для автоматического определения
+            mode: 'loopback', 'microphone', 'ingest' (без устройства, только приём PCM),
+                'shm' (кольцо в разделяемой памяти от audio_capture.py)
+                или 'auto' для автоматического определения
+            partial_interval_ms: период промежуточных декодов (0 - только финальные транскрипты)
+            vad: детектор речи перед Whisper - 'energy' или 'silero'
+            inference_queue_size: сколько сегментов может ждать декодирования
+            overflow_policy: что делать при переполнении очереди инференса
+                ('merge', 'drop_oldest', 'drop_newest', 'block')
+            extra_sources: дополнительные источники [(mode, port)] на той же модели,
+                каждый со своим захватом и своим WebSocket портом
+            device: где работает Whisper - 'cuda', 'cpu' или 'auto'
+            compute_type: тип вычислений на CPU ('int8', 'int8_float32', 'float32')
+            cpu_threads: потоков на воркер на CPU (0 - по числу ядер)
+            num_workers: параллельных воркеров модели на CPU
+            word_timestamps: тайминг слов и уверенность модели в финальных транскриптах
+            client_queue_size: сообщений в очереди отправки одного клиента
+            client_policy: что делать при переполнении очереди клиента
+                ('coalesce', 'drop_oldest', 'drop_newest')
+            shm_name: сегмент разделяемой памяти для источника 'shm'
+            audio_source: откуда захват берёт аудио (по умолчанию звуковые устройства;
+                FileSource и SyntheticSource - прогон без звуковой карты)
         """
-        if mode == 'auto':
+        if mode == 'auto' and audio_source is not None:
+            # Файл или синтетика не говорят, чей это голос: считаем собеседником
+            self.mode = 'loopback'
+        elif mode == 'auto':
             self.mode = get_audio_mode()
             logger.info(f'Auto-detected audio mode: {self.mode}')
         else:
@@ -50,109 +104,299 @@ class DynamicSTTServer:
             
         if not 1 <= port <= 65535:
             raise ValueError('Порт должен быть в диапазоне от 1 до 65535')
+        if partial_interval_ms < 0:
+            raise ValueError('Интервал partial не может быть отрицательным')
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f'Неизвестная политика переполнения: {overflow_policy}')
+        if client_queue_size <= 0:
+            raise ValueError('Очередь клиента должна быть положительной')
 
         self.host = host
         self.port = port
+        self.vad_name = vad
         self.transcriber: Optional[StreamingTranscriber] = None
         self.clients = set()
-        self.audio_capture: Optional[DynamicAudioCapture] = None
         self.running = False
         
+        # Источники: имя (поле source в сообщениях) -> (режим захвата, порт)
+        self.sources: Dict[str, Tuple[str, int]] = {self.mode: (self.mode, port)}
+        for extra_mode, extra_port in extra_sources or []:
+            if not 1 <= extra_port <= 65535:
+                raise ValueError('Порт должен быть в диапазоне от 1 до 65535')
+            if any(p == extra_port for _, p in self.sources.values()):
+                raise ValueError(f'Порт {extra_port} уже занят другим источником')
+            name = extra_mode if extra_mode not in self.sources else f'{extra_mode}-{extra_port}'
+            self.sources[name] = (extra_mode, extra_port)
+        if sum(1 for m, _ in self.sources.values() if m == 'shm') > 1:
+            raise ValueError('Источник shm может быть только один')
+        self.shm_name = shm_name
+        self.audio_source = audio_source
+        self.source_clients: Dict[str, set] = {name: set() for name in self.sources}
+        self.captures: Dict[str, DynamicAudioCapture] = {}
+        self.pipelines: Dict[str, STTPipeline] = {}
+        self.shared_inference: Optional[SharedInferenceWorker] = None
+        # Клиенты, присылающие PCM: websocket -> (формат, конвейер)
+        self.ingests: Dict[object, Tuple[IngestFormat, STTPipeline, Optional[Resampler]]] = {}
+        
+        self.partial_interval_ms = partial_interval_ms
+        self.inference_queue_size = inference_queue_size
+        self.overflow_policy = overflow_policy
+        
+        # Параметры бэкенда Whisper
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        self.word_timestamps = word_timestamps
+        
+        # Рассылка: у каждого клиента своя очередь и своя задача-писатель
+        self.fanout = ClientFanout(maxsize=client_queue_size, policy=client_policy)
+    
+    @property
+    def pipeline(self) -> Optional[STTPipeline]:
+        """Конвейер основного источника"""
+        return self.pipelines.get(self.mode)
+    
+    @property
+    def audio_capture(self) -> Optional[DynamicAudioCapture]:
+        """Захват основного источника"""
+        return self.captures.get(self.mode)
+        
     def init_model(self):
         """Загрузка модели при старте сервера"""
         if self.transcriber is None:
-            self.transcriber = StreamingTranscriber()
-            logger.info(f'Model loaded: {self.transcriber.model_name}')
+            self.transcriber = StreamingTranscriber(
+                vad=create_vad(self.vad_name),
+                device=self.device,
+                compute_type=self.compute_type,
+                cpu_threads=self.cpu_threads,
+                num_workers=self.num_workers,
+                cache_model_choice=True,
+                word_timestamps=self.word_timestamps,
+            )
+            logger.info(f'Model loaded: {self.transcriber.model_name} ({self.transcriber.device_used})')
+            # Прогрев до того, как порт откроется и клиенты начнут слать аудио
+            self.transcriber.warmup()
+            self.transcriber.log_startup()
     
     def start_audio_capture(self):
         """Запустить захват аудио"""
-        if self.audio_capture is None:
-            self.audio_capture = DynamicAudioCapture(mode=self.mode)
-            self.audio_capture.start()
+        if self.pipelines or self.shared_inference:
+            return
+        
+        # Несколько источников (включая клиентов приёма PCM) делят одну модель и один батч-инференс
+        modes = [mode for mode, _ in self.sources.values()]
+        if len(modes) > 1 or 'ingest' in modes:
+            self.shared_inference = SharedInferenceWorker(BatchedDecoder(self.transcriber))
+        
+        for name, (mode, _) in self.sources.items():
+            if mode == 'ingest':
+                # Аудио придёт от клиентов по WebSocket, устройство не открывается
+                continue
+            if mode == 'shm':
+                # Процесс захвата может стартовать позже: читатель подключится сам
+                capture = SharedAudioReader(self.shm_name)
+            else:
+                capture = DynamicAudioCapture(mode=mode, source=self.audio_source)
+            capture.start()
+            self.captures[name] = capture
             
-            # Запускаем поток обработки аудио
-            self.audio_thread = threading.Thread(target=self._audio_processing_loop, daemon=True)
-            self.audio_thread.start()
+            if name == self.mode:
+                transcriber = self.transcriber
+            else:
+                transcriber = self.transcriber.create_stream(vad=create_vad(self.vad_name))
             
-            logger.info(f'Audio capture started (mode={self.mode})')
+            # Конвейер: захват → сегментация → инференс → постобработка, каждая стадия в своём потоке
+            pipeline = STTPipeline(
+                transcriber,
+                source=name,
+                on_message=self._emit,
+                capture=capture,
+                partial_interval_ms=self.partial_interval_ms,
+                inference_queue_size=self.inference_queue_size,
+                overflow_policy=self.overflow_policy,
+                shared_inference=self.shared_inference,
+            )
+            pipeline.start()
+            self.pipelines[name] = pipeline
+            logger.info(f'Audio capture started (source={name}, mode={mode})')
+        
+        if self.shared_inference:
+            self.shared_inference.start()
     
     def stop_audio_capture(self):
         """Остановить захват аудио"""
-        if self.audio_capture:
-            self.audio_capture.stop()
-            self.audio_capture = None
+        for websocket in list(self.ingests):
+            self._stop_ingest(websocket)
+        for pipeline in self.pipelines.values():
+            pipeline.stop()
+        self.pipelines = {}
+        if self.shared_inference:
+            self.shared_inference.stop()
+            self.shared_inference = None
+        if self.captures:
+            for capture in self.captures.values():
+                capture.stop()
+            self.captures = {}
             logger.info('Audio capture stopped')
     
-    def _audio_processing_loop(self):
-        """Поток обработки аудио"""
-        while self.running:
-            if self.audio_capture:
-                chunk = self.audio_capture.get_audio_chunk(timeout=0.1)
-                if chunk is not None and self.transcriber:
-                    # Конвертируем в float32 для транскрибера
-                    audio_float = chunk.astype(np.float32) / 32768.0
-                    
-                    if self.transcriber.add_audio(audio_float):
-                        text = self.transcriber.transcribe()
-                        if text and self.clients:
-                            msg = json.dumps({
-                                'type': 'transcript',
-                                'text': text,
-                                'source': self.mode,
-                                'timestamp': time.time(),
-                                'latency_ms': self.transcriber.metrics.get_latency_ms()
-                            }, ensure_ascii=False)
-                            
-                            # Отправляем всем клиентам
-                            asyncio.run_coroutine_threadsafe(
-                                self._broadcast_to_clients(msg),
-                                self.loop
-                            )
-            
-            if not self.running:
-                break
-    
-    async def _broadcast_to_clients(self, message: str):
-        """Отправить сообщение всем клиентам"""
-        if self.clients:
-            await asyncio.gather(
-                *[client.send(message) for client in self.clients],
-                return_exceptions=True
-            )
+    def _emit(self, payload: dict, route: Optional[str] = None):
+        """Отправка сообщения клиентам источника (route или payload['source']) из рабочего потока"""
+        clients = self.source_clients.get(route or payload.get('source'), self.clients)
+        if not clients:
+            return
+        # Сериализация один раз на формат, в цикл событий уходит только постановка в очереди
+        frames = {key: encoder.encode(payload) for key, encoder in self.fanout.encoders(clients).items()}
+        if not frames:
+            return
+        self.loop.call_soon_threadsafe(self._broadcast_to_clients, frames, clients, message_key(payload))
     
-    async def handle_client(self, websocket, path=None):
-        """Обработчик WebSocket клиента"""
+    def _broadcast_to_clients(self, message, clients: Optional[set] = None,
+                              key: Optional[str] = None):
+        """Поставить сообщение в очереди клиентов (по умолчанию - всех); не ждёт отправки"""
+        clients = self.clients if clients is None else clients
+        if clients:
+            self.fanout.publish(message, clients, key)
+    
+    async def handle_client(self, websocket, path=None, source: Optional[str] = None):
+        """Обработчик WebSocket клиента; source - источник, на порт которого он подключился"""
+        source = source or self.mode
+        mode = self.sources.get(source, (self.mode, self.port))[0]
         self.clients.add(websocket)
-        logger.info(f'[WS] Client connected ({len(self.clients)})')
+        self.source_clients.setdefault(source, set()).add(websocket)
+        self.fanout.add(websocket)
+        logger.info(f'[WS] Client connected to {source} ({len(self.clients)})')
         
         # Отправляем статус
         await websocket.send(json.dumps({
             'type': 'status',
-            'mode': self.mode,
-            'message': f'STT server running in {self.mode} mode'
+            'mode': mode,
+            'source': source,
+            'message': f'STT server running in {mode} mode'
         }, ensure_ascii=False))
         
         try:
             async for message in websocket:
+                # Бинарные кадры - PCM от внешнего захвата после audio_start
+                if isinstance(message, bytes):
+                    await self._ingest_frame(websocket, message)
+                    continue
+                
                 # Обработка команд от клиента
                 try:
                     data = json.loads(message)
                     if data.get('type') == 'get_status':
+                        pipeline = self.pipelines.get(source)
+                        ingest = self.ingests.get(websocket)
                         await websocket.send(json.dumps({
                             'type': 'status',
-                            'mode': self.mode,
+                            'mode': mode,
+                            'source': source,
+                            'sources': list(self.sources),
                             'clients': len(self.clients),
-                            'model': self.transcriber.model_name if self.transcriber else None
+                            'model': self.transcriber.model_name if self.transcriber else None,
+                            'pipeline': pipeline.get_stats() if pipeline else None,
+                            'batching': self.shared_inference.get_stats() if self.shared_inference else None,
+                            'ingest': ingest[1].get_stats() if ingest else None,
+                            'fanout': self.fanout.get_stats()
                         }))
+                    elif data.get('type') == 'hello':
+                        await self._negotiate_protocol(websocket, data)
+                    elif data.get('type') == 'audio_start':
+                        await self._start_ingest(websocket, source, data)
+                    elif data.get('type') == 'audio_stop':
+                        self._stop_ingest(websocket)
                 except json.JSONDecodeError:
                     pass
                     
         except websockets.exceptions.ConnectionClosed:
             pass
         finally:
+            self._stop_ingest(websocket)
             self.clients.discard(websocket)
+            self.source_clients.get(source, set()).discard(websocket)
+            await self.fanout.remove(websocket)
             logger.info(f'[WS] Client disconnected ({len(self.clients)})')
     
+    async def _negotiate_protocol(self, websocket, hello: dict):
+        """Формат сообщений клиенту: JSON или бинарная схема нужной версии"""
+        try:
+            protocol, version = negotiate(hello)
+        except ValueError as e:
+            await websocket.send(json.dumps({'type': 'error', 'message': str(e)}, ensure_ascii=False))
+            return
+        self.fanout.set_encoder(websocket, MessageEncoder(protocol, version))
+        logger.info(f'[WS] Протокол клиента: {protocol} v{version}')
+        await websocket.send(json.dumps({'type': 'hello_ack', 'protocol': protocol, 'version': version}))
+    
+    async def _start_ingest(self, websocket, source: str, handshake: dict):
+        """Рукопожатие приёма PCM: свой поток сегментации на общей модели"""
+        if self.shared_inference is None:
+            # Без общего инференса конвейер клиента декодировал бы той же моделью в обход планировщика
+            await websocket.send(json.dumps({
+                'type': 'error',
+                'message': 'Приём PCM не настроен: запустите сервер с --mode ingest или --extra-source ingest:PORT'
+            }, ensure_ascii=False))
+            return
+        try:
+            fmt = IngestFormat.from_handshake(handshake)
+        except ValueError as e:
+            await websocket.send(json.dumps({'type': 'error', 'message': str(e)}, ensure_ascii=False))
+            return
+        
+        self._stop_ingest(websocket)
+        name = str(handshake.get('source') or source)
+        pipeline = STTPipeline(
+            self.transcriber.create_stream(vad=create_vad(self.vad_name)),
+            source=name,
+            # Транскрипты уходят подписчикам порта, на который пришёл поток
+            on_message=functools.partial(self._emit, route=source),
+            partial_interval_ms=self.partial_interval_ms,
+            inference_queue_size=self.inference_queue_size,
+            overflow_policy=self.overflow_policy,
+            shared_inference=self.shared_inference,
+        )
+        pipeline.start()
+        self.ingests[websocket] = (fmt, pipeline, fmt.create_resampler())
+        
+        # Процессу захвата транскрипты не нужны, если он сам их не попросил
+        if not handshake.get('subscribe'):
+            self.source_clients.get(source, set()).discard(websocket)
+        
+        logger.info(f'[INGEST] {name}: {fmt.sample_rate} Гц, {fmt.dtype}, {fmt.channels} кан.')
+        await websocket.send(json.dumps({
+            'type': 'audio_ack',
+            'source': name,
+            'sample_rate': fmt.sample_rate,
+            'dtype': fmt.dtype,
+            'channels': fmt.channels,
+        }, ensure_ascii=False))
+    
+    async def _ingest_frame(self, websocket, payload: bytes):
+        ingest = self.ingests.get(websocket)
+        if ingest is None:
+            await websocket.send(json.dumps({
+                'type': 'error',
+                'message': 'Бинарные кадры принимаются только после audio_start'
+            }, ensure_ascii=False))
+            return
+        
+        fmt, pipeline, resampler = ingest
+        try:
+            pipeline.push_audio(fmt.decode(payload, resampler))
+        except ValueError as e:
+            logger.warning(f'[INGEST] Кадр отброшен: {e}')
+    
+    def _stop_ingest(self, websocket):
+        ingest = self.ingests.pop(websocket, None)
+        if ingest is None:
+            return
+        _, pipeline, _ = ingest
+        pipeline.stop()
+        if self.shared_inference:
+            self.shared_inference.unregister(pipeline)
+        logger.info(f'[INGEST] {pipeline.source}: поток закрыт')
+    
     async def start_server(self):
         """Запустить сервер"""
         self.running = True
@@ -163,17 +407,19 @@ class DynamicSTTServer:
         self.init_model()
         self.start_audio_capture()
 
-        logger.info(f'Starting STT server on {self.host}:{self.port}')
-
         try:
-            async with websockets.serve(
-                self.handle_client,
-                self.host,
-                self.port,
-                ping_interval=20,
-                ping_timeout=10
-            ):
-                logger.info(f'STT server ready (mode={self.mode})')
+            # Один процесс и одна модель, но у каждого источника свой порт
+            async with contextlib.AsyncExitStack() as stack:
+                for name, (_, port) in self.sources.items():
+                    logger.info(f'Starting STT server on {self.host}:{port} (source={name})')
+                    await stack.enter_async_context(websockets.serve(
+                        functools.partial(self.handle_client, source=name),
+                        self.host,
+                        port,
+                        ping_interval=20,
+                        ping_timeout=10
+                    ))
+                logger.info(f'STT server ready (sources={", ".join(self.sources)})')
                 await self._shutdown_event.wait()
         finally:
             self.running = False
@@ -184,6 +430,7 @@ class DynamicSTTServer:
         self.running = False
         if hasattr(self, '_shutdown_event'):
             self._shutdown_event.set()
+        await self.fanout.close()
         # Graceful shutdown: закрыть все активные WebSocket соединения
         for client in list(self.clients):
             try:
@@ -191,25 +438,69 @@ class DynamicSTTServer:
             except Exception:
                 pass  # Клиент уже отключён
         self.stop_audio_capture()
-        if hasattr(self, 'audio_thread') and self.audio_thread.is_alive():
-            self.audio_thread.join(timeout=2)
         logger.info('STT server stopped')
 
 
 async def main():
     """Главная функция"""
-    import argparse
-    
     parser = argparse.ArgumentParser(description='STT Server with Dynamic Audio Capture')
-    parser.add_argument('--mode', choices=['loopback', 'microphone', 'auto'], default='auto',
-                       help='Audio capture mode')
+    parser.add_argument('--mode', choices=list(SOURCE_MODES) + ['auto'], default='auto',
+                       help='Audio capture mode (ingest: no local device, PCM arrives over WebSocket; '
+                            'shm: shared-memory ring written by audio_capture.py --transport=shm)')
     parser.add_argument('--port', type=int, default=8765,
                        help='WebSocket port')
+    parser.add_argument('--partial-interval-ms', type=int, default=0,
+                       help='Interim transcript period in ms (0 disables partial messages)')
+    parser.add_argument('--vad', choices=['energy', 'silero'], default='energy',
+                       help='Frame VAD in front of Whisper')
+    parser.add_argument('--inference-queue', type=int, default=4,
+                       help='Max segments waiting for decoding')
+    parser.add_argument('--overflow-policy', choices=list(OVERFLOW_POLICIES), default='merge',
+                       help='What to do when inference falls behind')
+    parser.add_argument('--extra-source', type=parse_source_spec, action='append', default=[],
+                       metavar='MODE:PORT',
+                       help='Additional source served by the same model, e.g. microphone:8764')
+    parser.add_argument('--device', choices=list(DEVICES),
+                       default=os.environ.get('LIVE_HINTS_STT_DEVICE', 'auto'),
+                       help='Whisper backend: cuda, cpu or auto (GPU with CPU fallback)')
+    parser.add_argument('--compute-type', choices=list(CPU_COMPUTE_TYPES), default=None,
+                       help='CPU compute type (default int8)')
+    parser.add_argument('--cpu-threads', type=int, default=0,
+                       help='CTranslate2 threads per worker on CPU (0 = auto)')
+    parser.add_argument('--num-workers', type=int, default=1,
+                       help='Parallel model workers on CPU')
+    parser.add_argument('--word-timestamps', action='store_true',
+                       help='Add per-word capture-clock timings to final transcripts')
+    parser.add_argument('--client-queue', type=int, default=CLIENT_QUEUE_SIZE,
+                       help='Max messages queued per WebSocket client')
+    parser.add_argument('--client-policy', choices=list(SEND_POLICIES), default=DEFAULT_SEND_POLICY,
+                       help='What to do when a client falls behind')
+    parser.add_argument('--shm-name', default=default_shm_name('loopback'),
+                       help='Shared-memory segment for the shm source')
+    parser.add_argument('--source', default=None,
+                       help='Audio source for capture: pyaudio, sounddevice, synthetic or file:<wav/flac> '
+                            '(default: sound devices with hot-swap)')
+    parser.add_argument('--source-speed', type=float, default=1.0,
+                       help='Playback speed for file/synthetic sources (0 = as fast as the pipeline reads)')
+    parser.add_argument('--source-loop', action='store_true',
+                       help='Loop the file source')
     
     args = parser.parse_args()
+    audio_source = None
+    if args.source:
+        audio_source = create_audio_source(args.source, speed=args.source_speed, loop=args.source_loop)
     
     # Создаём сервер
-    server = DynamicSTTServer(mode=args.mode, port=args.port)
+    server = DynamicSTTServer(mode=args.mode, port=args.port,
+                              partial_interval_ms=args.partial_interval_ms, vad=args.vad,
+                              inference_queue_size=args.inference_queue,
+                              overflow_policy=args.overflow_policy,
+                              extra_sources=args.extra_source,
+                              device=args.device, compute_type=args.compute_type,
+                              cpu_threads=args.cpu_threads, num_workers=args.num_workers,
+                              word_timestamps=args.word_timestamps,
+                              client_queue_size=args.client_queue, client_policy=args.client_policy,
+                              shm_name=args.shm_name, audio_source=audio_source)
     
     try:
         await server.start_server()
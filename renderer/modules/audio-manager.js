@@ -2,8 +2,9 @@
  * AudioManager - Управление аудио устройствами и WebSocket соединениями
  */
 
-import { SERVERS, TIMEOUTS } from './constants.js';
+import { SERVERS, TIMEOUTS, STT_PROTOCOL } from './constants.js';
 import { logger } from './utils/logger.js';
+import { decodeSTTMessage, helloMessage } from './utils/stt-protocol.js';
 
 export class AudioManager {
   constructor(app) {
@@ -130,10 +131,12 @@ export class AudioManager {
       try {
         logger.info('AudioManager', `Подключение к STT серверу ${SERVERS.STT}...`);
         this.wsConnection = new WebSocket(SERVERS.STT);
+        this.wsConnection.binaryType = 'arraybuffer';
 
         this.wsConnection.onopen = () => {
           if (resolved) return;
           resolved = true;
+          this._negotiateProtocol(this.wsConnection);
           logger.info('AudioManager', 'Подключено к STT серверу');
           resolve();
         };
@@ -173,9 +176,15 @@ export class AudioManager {
     });
   }
 
+  _negotiateProtocol(ws) {
+    if (STT_PROTOCOL !== 'json') {
+      ws.send(helloMessage(STT_PROTOCOL));
+    }
+  }
+
   handleSTTMessage(event) {
     try {
-      const data = JSON.parse(event.data);
+      const data = decodeSTTMessage(event.data);
       logger.debug('STT', 'Получено сообщение:', data.type, data.text?.substring(0, 50));
 
       if (data.type === 'transcript') {
@@ -201,12 +210,7 @@ export class AudioManager {
         this.app.ui.showError(`STT: ${data.message}`);
       }
     } catch (e) {
-      // Может быть бинарные данные
-      if (typeof event.data !== 'string') {
-        logger.debug('STT', 'Получены бинарные данные');
-      } else {
-        logger.error('STT', 'Ошибка парсинга сообщения:', e);
-      }
+      logger.error('STT', 'Ошибка разбора сообщения:', e);
     }
   }
 
@@ -288,15 +292,17 @@ export class AudioManager {
 
     try {
       this.wsMicrophone = new WebSocket(SERVERS.STT_MIC);
+      this.wsMicrophone.binaryType = 'arraybuffer';
 
       this.wsMicrophone.onopen = () => {
         logger.info('MIC', 'WebSocket подключен');
+        this._negotiateProtocol(this.wsMicrophone);
         this.app.ui.showToast('Микрофон подключен', 'success');
       };
 
       this.wsMicrophone.onmessage = (event) => {
         try {
-          const data = JSON.parse(event.data);
+          const data = decodeSTTMessage(event.data);
           if (data.type === 'transcript' && data.text) {
             logger.info('MIC', `Транскрипт: "${data.text}"`);
             this.app.ui.addTranscriptItem(
@@ -20,6 +20,9 @@ export const SERVERS = {
   DASHBOARD: `http://localhost:${PORTS.DASHBOARD}`,
 };
 
+// Формат сообщений STT сервера: 'json' или компактный 'binary' (согласуется через hello)
+export const STT_PROTOCOL = 'json';
+
 // Таймауты (мс)
 export const TIMEOUTS = {
   STT_CONNECTION: 30000,
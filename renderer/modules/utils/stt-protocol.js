@@ -0,0 +1,113 @@
+/**
+ * STT Protocol - разбор сообщений STT сервера
+ * Текстовые кадры - JSON, бинарные - схема v1 из python/stt/protocol.py
+ */
+
+export const STT_PROTOCOL_VERSION = 1;
+
+const KIND_TRANSCRIPT = 1;
+const KIND_PARTIAL = 2;
+const FLAG_TIMING = 0x01;
+const FLAG_WORDS = 0x02;
+const FLAG_EXTRA = 0x04;
+
+const utf8 = new TextDecoder('utf-8');
+
+/**
+ * Сообщение hello для согласования формата (первое сообщение клиента)
+ */
+export function helloMessage(protocol = 'binary') {
+  return JSON.stringify({ type: 'hello', protocol, version: STT_PROTOCOL_VERSION });
+}
+
+/**
+ * Кадр сервера (строка JSON или ArrayBuffer) → объект сообщения
+ */
+export function decodeSTTMessage(data) {
+  if (typeof data === 'string') {
+    return JSON.parse(data);
+  }
+
+  const bytes =
+    data instanceof ArrayBuffer
+      ? new Uint8Array(data)
+      : new Uint8Array(data.buffer, data.byteOffset, data.byteLength);
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  let pos = 0;
+
+  const readStr = (lengthSize) => {
+    let length;
+    if (lengthSize === 1) length = view.getUint8(pos);
+    else if (lengthSize === 2) length = view.getUint16(pos, true);
+    else length = view.getUint32(pos, true);
+    pos += lengthSize;
+    const text = utf8.decode(bytes.subarray(pos, pos + length));
+    pos += length;
+    return text;
+  };
+
+  const version = view.getUint8(0);
+  const kind = view.getUint8(1);
+  const flags = view.getUint8(2);
+  const timestamp = view.getFloat64(4, true);
+  pos = 12;
+  if (version > STT_PROTOCOL_VERSION) {
+    throw new Error(`Кадр версии ${version}, поддерживается до ${STT_PROTOCOL_VERSION}`);
+  }
+
+  const message = {};
+  if (kind === KIND_TRANSCRIPT) {
+    message.type = 'transcript';
+    message.final = true;
+    message.latency_ms = view.getInt32(pos, true);
+    message.queue_ms = view.getInt32(pos + 4, true);
+    message.decode_ms = view.getInt32(pos + 8, true);
+    message.audio_ms = view.getInt32(pos + 12, true);
+    pos += 16;
+    message.source = readStr(1);
+    message.text = readStr(2);
+  } else if (kind === KIND_PARTIAL) {
+    message.type = 'partial';
+    message.source = readStr(1);
+    message.stable = readStr(2);
+    message.unstable = readStr(2);
+    message.text = `${message.stable} ${message.unstable}`.trim();
+  } else {
+    throw new Error(`Неизвестный тип кадра: ${kind}`);
+  }
+  message.timestamp = timestamp;
+
+  if (flags & FLAG_TIMING) {
+    message.audio_start = view.getFloat64(pos, true);
+    message.audio_end = view.getFloat64(pos + 8, true);
+    message.e2e_ms = view.getInt32(pos + 16, true);
+    pos += 20;
+
+    if (flags & FLAG_WORDS) {
+      const avgLogprob = view.getFloat32(pos, true);
+      const noSpeechProb = view.getFloat32(pos + 4, true);
+      const count = view.getUint16(pos + 8, true);
+      pos += 10;
+      const numbersPos = pos;
+      pos += count * 10;
+      const joined = readStr(2);
+      const texts = count ? joined.split('\n') : [];
+      message.avg_logprob = Number.isNaN(avgLogprob) ? null : Math.round(avgLogprob * 1000) / 1000;
+      message.no_speech_prob = Number.isNaN(noSpeechProb) ? null : Math.round(noSpeechProb * 1000) / 1000;
+      message.words = texts.map((word, i) => {
+        const offset = numbersPos + i * 10;
+        return [
+          Math.round((message.audio_start + view.getUint32(offset, true) / 1000) * 1000) / 1000,
+          Math.round((message.audio_start + view.getUint32(offset + 4, true) / 1000) * 1000) / 1000,
+          word,
+          view.getUint16(offset + 8, true) / 1000,
+        ];
+      });
+    }
+  }
+
+  if (flags & FLAG_EXTRA) {
+    Object.assign(message, JSON.parse(readStr(4)));
+  }
+  return message;
+}
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пути аудио от захвата до входа модели: прежний (float64 сведение
+каналов и float32 на каждый чанк) против int16 до сегмента с одним
+масштабированием во float32 на сегмент
+Запуск: python scripts/audio_path_benchmark.py --rate 48000 --block 3072 --seconds 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+from audio.resample import Resampler
+from audio.sources import SourceReader
+from stt.buffer import AudioRingBuffer, ModelInputBuffer
+
+TARGET_RATE = 16000
+# Длина сегмента, который уходит в модель, с
+SEGMENT_SECONDS = 4.0
+
+
+class BytesStream:
+    """Поток устройства поверх готовых байт: frombuffer, как у PyAudio"""
+
+    name = 'bench'
+
+    def __init__(self, raw: bytes, sample_rate: int, channels: int):
+        self.raw = raw
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.pos = 0
+
+    def read(self, frames: int) -> np.ndarray:
+        n = frames * self.channels * 2
+        block = np.frombuffer(self.raw, dtype=np.int16, count=frames * self.channels, offset=self.pos)
+        self.pos += n
+        return block.reshape(-1, self.channels)
+
+
+def old_path(stream: BytesStream, block: int, segment: int):
+    """Прежний путь: mean → int16 → ресемплер → копия в кольцо → float32 на чанк"""
+    resampler = Resampler(stream.sample_rate, TARGET_RATE, dtype=np.int16)
+    buffer = AudioRingBuffer(segment * 2)
+
+    def step():
+        data = stream.read(block)
+        mono = data.mean(axis=1).astype(np.int16)
+        chunk = resampler.process(mono).copy()
+        buffer.write(chunk.astype(np.float32) / 32768.0)
+        if len(buffer) >= segment:
+            audio = buffer.view().copy()
+            buffer.clear()
+            return audio
+        return None
+    return step
+
+
+def new_path(stream: BytesStream, block: int, segment: int):
+    """Новый путь: сведение на месте → int16 в кольце → float32 один раз на сегмент"""
+    reader = SourceReader(stream, block_frames=block)
+    buffer = AudioRingBuffer(segment * 2, dtype=np.int16)
+    model_input = ModelInputBuffer(segment * 2)
+
+    def step():
+        chunk, _ = reader.read()
+        buffer.write(chunk)
+        if len(buffer) >= segment:
+            audio = model_input.convert(buffer.view().copy())
+            buffer.clear()
+            return audio
+        return None
+    return step
+
+
+def measure(path, raw: bytes, rate: int, channels: int, block: int, n_blocks: int, segment: int) -> tuple:
+    """Время на блок и пик временной памяти на блок (tracemalloc видит буферы numpy)"""
+    step = path(BytesStream(raw, rate, channels), block, segment)
+    # Прогрев: рабочие буферы ресемплера и кольца выделяются до замера
+    step()
+
+    outputs = []
+    step = path(BytesStream(raw, rate, channels), block, segment)
+    t0 = time.perf_counter()
+    for _ in range(n_blocks):
+        audio = step()
+        if audio is not None:
+            outputs.append(audio.copy())
+    elapsed = time.perf_counter() - t0
+
+    # Пик по блокам без выдачи сегмента: стоимость обычного 64 мс чанка
+    peak = 0
+    step = path(BytesStream(raw, rate, channels), block, segment)
+    step()
+    tracemalloc.start()
+    for _ in range(n_blocks - 1):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        if step() is None:
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    result = {'us_per_block': round(elapsed / n_blocks * 1e6, 1),
+              'temp_kb_per_block': round(peak / 1024, 1)}
+    return result, np.concatenate(outputs) if outputs else np.zeros(0, dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Capture → model audio path benchmark')
+    parser.add_argument('--rate', type=int, default=48000, help='Device sample rate')
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--block', type=int, default=3072, help='Device frames per read (3072 = 64 ms at 48 kHz)')
+    parser.add_argument('--seconds', type=float, default=20.0)
+    args = parser.parse_args()
+
+    n_blocks = int(args.rate * args.seconds) // args.block
+    t = np.arange(n_blocks * args.block) / args.rate
+    tone = 0.3 * np.sin(2 * np.pi * 440 * t)
+    pcm = np.round(np.stack([tone] * args.channels, axis=1) * 32767).astype('<i2')
+    raw = pcm.tobytes()
+    segment = int(TARGET_RATE * SEGMENT_SECONDS)
+
+    old, old_out = measure(old_path, raw, args.rate, args.channels, args.block, n_blocks, segment)
+    new, new_out = measure(new_path, raw, args.rate, args.channels, args.block, n_blocks, segment)
+    n = min(len(old_out), len(new_out))
+
+    report = {
+        'block_ms': round(args.block / args.rate * 1000, 1),
+        'blocks': n_blocks,
+        'old': old,
+        'new': new,
+        'speedup': round(old['us_per_block'] / max(new['us_per_block'], 1e-9), 2),
+        'max_abs_diff': float(np.abs(old_out[:n] - new_out[:n]).max()) if n else None,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк ресемплинга захвата: полифазный Resampler против np.interp по каждому чанку
+Запуск: python scripts/resample_benchmark.py --chunk 1024 --seconds 10
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+from audio.resample import Resampler
+
+TARGET_RATE = 16000
+
+
+def interp_chunk(audio: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    """Прежний способ: линейная интерполяция каждого чанка отдельно"""
+    new_length = int(len(audio) * to_rate / from_rate)
+    indices = np.linspace(0, len(audio) - 1, new_length)
+    return np.interp(indices, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def run(process, signal: np.ndarray, chunk: int) -> tuple:
+    parts = []
+    t0 = time.perf_counter()
+    for pos in range(0, len(signal) - chunk + 1, chunk):
+        parts.append(np.array(process(signal[pos:pos + chunk])))
+    elapsed = time.perf_counter() - t0
+    return np.concatenate(parts), elapsed / len(parts) * 1e6
+
+
+def quality(out: np.ndarray, freq: float, delay: float, skip: int = 200) -> float:
+    """SNR против идеального тона с учётом задержки (фаза подбирается МНК)"""
+    t = np.arange(len(out)) / TARGET_RATE - delay
+    basis = np.stack([np.sin(2 * np.pi * freq * t), np.cos(2 * np.pi * freq * t)], axis=1)[skip:]
+    target = out[skip:].astype(np.float64)
+    coef, *_ = np.linalg.lstsq(basis, target, rcond=None)
+    noise = target - basis @ coef
+    return round(10 * np.log10(np.mean((basis @ coef) ** 2) / np.mean(noise ** 2)), 1)
+
+
+def alias_db(out: np.ndarray, skip: int = 200) -> float:
+    rms = np.sqrt(np.mean(out[skip:].astype(np.float64) ** 2))
+    return round(20 * np.log10(max(rms, 1e-12) / (0.5 / np.sqrt(2))), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Capture resampling benchmark')
+    parser.add_argument('--chunk', type=int, default=1024, help='Input frames per callback')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--rates', type=int, nargs='+', default=[48000, 44100])
+    args = parser.parse_args()
+
+    report = {}
+    for rate in args.rates:
+        t = np.arange(int(rate * args.seconds)) / rate
+        tone = (0.5 * np.sin(2 * np.pi * 1000 * t)).astype(np.float32)
+        # Выше 8 кГц: после 16 кГц должен исчезнуть, а не завернуться в полосу речи
+        high = (0.5 * np.sin(2 * np.pi * 12000 * t)).astype(np.float32)
+        chunk_ms = args.chunk / rate * 1000
+
+        resampler = Resampler(rate, TARGET_RATE)
+        out, us = run(resampler.process, tone, args.chunk)
+        alias, _ = run(Resampler(rate, TARGET_RATE).process, high, args.chunk)
+        poly = {'us_per_chunk': round(us, 1), 'cpu_pct': round(us / 1000 / chunk_ms * 100, 3),
+                'snr_1k_db': quality(out, 1000, resampler.delay), 'alias_12k_db': alias_db(alias)}
+
+        out, us = run(lambda c: interp_chunk(c, rate, TARGET_RATE), tone, args.chunk)
+        alias, _ = run(lambda c: interp_chunk(c, rate, TARGET_RATE), high, args.chunk)
+        interp = {'us_per_chunk': round(us, 1), 'cpu_pct': round(us / 1000 / chunk_ms * 100, 3),
+                  'snr_1k_db': quality(out, 1000, 0.0), 'alias_12k_db': alias_db(alias)}
+
+        report[f'{rate}->{TARGET_RATE}'] = {'polyphase': poly, 'interp': interp}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
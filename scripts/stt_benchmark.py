@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Офлайн-бенчмарк STT: WAV/FLAC → конвейер STT → задержки, RTF, CPU/RSS, WER в JSON
+Запуск: python scripts/stt_benchmark.py samples/*.wav --speed 0 --output bench.json
+
+Эталон для audio.wav берётся из audio.txt рядом с файлом (или из --refs).
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+from stt import StreamingTranscriber, create_vad
+from stt.replay import ReplayRunner, load_references
+from stt.transcriber import DEVICES, CPU_COMPUTE_TYPES, COMPUTE_TYPE
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def build_transcriber(args) -> StreamingTranscriber:
+    vad = create_vad(args.vad)
+    if args.model is None:
+        return StreamingTranscriber(vad=vad, device=args.device, compute_type=args.compute_type,
+                                    cpu_threads=args.cpu_threads, num_workers=args.num_workers)
+
+    # Конкретная модель для сравнения, без перебора лестницы
+    from faster_whisper import WhisperModel
+    device = 'cpu' if args.device == 'cpu' else 'cuda'
+    kwargs = {'device': device}
+    if device == 'cpu':
+        kwargs.update(compute_type=args.compute_type or 'int8',
+                      cpu_threads=args.cpu_threads, num_workers=args.num_workers)
+    else:
+        kwargs['compute_type'] = COMPUTE_TYPE
+    transcriber = StreamingTranscriber(vad=vad, model=WhisperModel(args.model, **kwargs),
+                                       model_name=args.model)
+    transcriber.device_used = device
+    return transcriber
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline STT replay benchmark')
+    parser.add_argument('files', nargs='+', help='WAV/FLAC files')
+    parser.add_argument('--refs', default=None, help='Directory with reference <name>.txt files')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Playback speed: 1 = real time, 0 = as fast as possible')
+    parser.add_argument('--model', default=None, help='Force a specific Whisper model')
+    parser.add_argument('--device', choices=list(DEVICES), default='auto')
+    parser.add_argument('--compute-type', choices=list(CPU_COMPUTE_TYPES), default=None)
+    parser.add_argument('--cpu-threads', type=int, default=0)
+    parser.add_argument('--num-workers', type=int, default=1)
+    parser.add_argument('--vad', choices=['energy', 'silero'], default='energy')
+    parser.add_argument('--no-warmup', action='store_true', help='Skip warm-up decode')
+    parser.add_argument('--output', default=None, help='Write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        stream=sys.stderr)
+
+    t0 = time.perf_counter()
+    transcriber = build_transcriber(args)
+    if not args.no_warmup:
+        transcriber.warmup()
+    startup_ms = int((time.perf_counter() - t0) * 1000)
+
+    runner = ReplayRunner(transcriber, speed=args.speed)
+    report = runner.run(args.files, load_references(args.files, args.refs))
+    report['config'] = {
+        'commit': git_commit(),
+        'model': transcriber.model_name,
+        'device': transcriber.device_used,
+        'compute_type': args.compute_type,
+        'vad': args.vad,
+        'speed': args.speed,
+        'startup_ms': startup_ms,
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
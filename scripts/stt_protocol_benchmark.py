@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк протокола STT: размер кадра и стоимость кодирования/разбора JSON против бинарной схемы
+Запуск: python scripts/stt_protocol_benchmark.py --iterations 20000 --words 12
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+from stt.protocol import MessageEncoder, decode_message
+
+
+def sample_messages(words: int) -> dict:
+    """partial и финал с таймингом слов, как их отдаёт конвейер"""
+    t0 = 1700000000.0
+    word_list = [[round(t0 + i * 0.3, 3), round(t0 + i * 0.3 + 0.25, 3), f'слово{i}', 0.9]
+                 for i in range(words)]
+    text = ' '.join(w[2] for w in word_list)
+    return {
+        'partial': {
+            'type': 'partial', 'text': text, 'stable': ' '.join(w[2] for w in word_list[:-2]),
+            'unstable': ' '.join(w[2] for w in word_list[-2:]), 'source': 'loopback',
+            'timestamp': t0 + words * 0.3,
+        },
+        'final': {
+            'type': 'transcript', 'final': True, 'text': text, 'source': 'loopback',
+            'timestamp': t0 + words * 0.3 + 0.4, 'latency_ms': 410, 'queue_ms': 2,
+            'decode_ms': 380, 'audio_ms': int(words * 300), 'audio_start': t0,
+            'audio_end': round(t0 + words * 0.3, 3), 'e2e_ms': 512, 'avg_logprob': -0.21,
+            'no_speech_prob': 0.01, 'words': word_list,
+        },
+    }
+
+
+def measure(encoder: MessageEncoder, payload: dict, iterations: int) -> dict:
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        frame = encoder.encode(payload)
+    encode_us = (time.perf_counter() - t0) / iterations * 1e6
+
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        decode_message(frame)
+    decode_us = (time.perf_counter() - t0) / iterations * 1e6
+
+    size = len(frame) if isinstance(frame, bytes) else len(frame.encode('utf-8'))
+    return {'bytes': size, 'encode_us': round(encode_us, 2), 'decode_us': round(decode_us, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='STT WebSocket protocol benchmark')
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--words', type=int, default=12, help='Words per message')
+    args = parser.parse_args()
+
+    report = {}
+    for name, payload in sample_messages(args.words).items():
+        report[name] = {
+            protocol: measure(MessageEncoder(protocol), payload, args.iterations)
+            for protocol in ('json', 'binary')
+        }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
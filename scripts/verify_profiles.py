@@ -27,7 +27,7 @@ for profile in ['job_interview_ru', 'job_interview_en', 'business_meeting', 'dai
         print(f"\n{profile}: ОШИБКА - {e}")
 
 print("\n=== ПРОВЕРКА КЛАССИФИКАЦИИ ===")
-from classification import classify_question, build_contextual_prompt
+from classification import classify_question
 
 test_questions = [
     ("Расскажите о вашем опыте", "experience"),
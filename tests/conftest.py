@@ -1,12 +1,71 @@
 """
-Конфигурация pytest для корректных импортов
+Конфигурация pytest для корректных импортов и общие помощники тестов
 """
 import sys
+import time
 from pathlib import Path
 
+import numpy as np
+
 # Добавляем python/ в PYTHONPATH для импортов
 project_root = Path(__file__).parent.parent
 python_dir = project_root / 'python'
 
 sys.path.insert(0, str(project_root))
 sys.path.insert(0, str(python_dir))
+
+
+def wait_for(predicate, timeout=2.0):
+    """Ждёт выполнения условия фоновыми потоками, False по таймауту"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def audio_device(name, index=None, channels=2, loopback=False, outputs=0, rate=48000.0, host_api=0):
+    """Описание устройства в формате PortAudio (ключи pyaudio)"""
+    device = {'name': name, 'hostApi': host_api, 'defaultSampleRate': rate,
+              'maxInputChannels': channels, 'maxOutputChannels': outputs,
+              'isLoopbackDevice': loopback}
+    if index is not None:
+        device['index'] = index
+    return device
+
+
+class FakeTranscriber:
+    """Транскрибер без модели: сегмент на каждые segment_every чанков"""
+
+    def __init__(self, segment_every=3, decode_delay=0.0, text=None):
+        self.segment_every = segment_every
+        self.decode_delay = decode_delay
+        self.text = text
+        self.is_speaking = False
+        self.total_samples = 0
+        self._chunks = 0
+
+    def clear(self):
+        self.total_samples = 0
+        self._chunks = 0
+
+    def add_audio(self, chunk, capture_time=None):
+        self._chunks += 1
+        self.total_samples += len(chunk)
+        return self._chunks % self.segment_every == 0
+
+    def take_segment(self):
+        audio = np.zeros(self.total_samples, dtype=np.float32)
+        self.total_samples = 0
+        return audio
+
+    def transcribe_segment(self, audio, t_end=None):
+        time.sleep(self.decode_delay)
+        return self.text or f'сегмент {len(audio)}'
+
+    def transcribe_partial(self, audio=None):
+        return 'частичный'
+
+    def report_segment(self, result, audio, t_end):
+        return result
@@ -38,14 +38,19 @@ describe('Безопасный Electron runtime', () => {
     expect(app).toContain('if (requestEpoch !== this.sessionEpoch) return false;');
   });
 
-  test('runtime запускает LLM, основной STT и микрофонный STT по настройке', () => {
+  test('runtime запускает LLM и один STT процесс с микрофоном как доп. источником', () => {
     const ipcHandlers = read('main/ipc-handlers.js');
     const processManager = read('main/process-manager.js');
 
     expect(ipcHandlers).toContain("ipcMain.handle('runtime:start'");
     expect(ipcHandlers).toContain('await processManager.startLLMProcess()');
-    expect(ipcHandlers).toContain("await processManager.startSTTProcess('auto', 8765)");
-    expect(ipcHandlers).toContain("await processManager.startSTTProcess('microphone', 8764)");
+    expect(ipcHandlers).toContain("await processManager.startSTTProcess('auto', 8765, extraSources)");
+    expect(ipcHandlers).toContain("[{ mode: 'microphone', port: 8764 }]");
+    expect(ipcHandlers).not.toContain("startSTTProcess('microphone', 8764)");
+    expect(processManager).toContain("args.push('--extra-source'");
+    // Включение dualAudio при запущенном STT перезапускает его с доп. источником, а не ждёт порт
+    expect(processManager).toContain("currentProcess.sttArgs !== sttArgs.join(' ')");
+    expect(processManager).toContain('await stopProcessAndWait(currentProcess);');
     expect(processManager).toContain("PYTHONIOENCODING: 'utf-8'");
     expect(processManager).toContain("PYTHONUTF8: '1'");
   });
@@ -0,0 +1,43 @@
+/**
+ * Тесты для stt-protocol.js
+ */
+
+import { decodeSTTMessage, helloMessage } from '../../renderer/modules/utils/stt-protocol.js';
+
+// Кадры, закодированные python/stt/protocol.py (MessageEncoder('binary'))
+const PARTIAL_FRAME =
+  '0102040000002040fc54d9410a6d6963726f70686f6e651100d187d182d0be20d182d0b0d0bad0bed0b5040052455354' +
+  '0f0000007b227265766973696f6e223a20327d';
+
+function toArrayBuffer(hex) {
+  const buf = Buffer.from(hex, 'hex');
+  return buf.buffer.slice(buf.byteOffset, buf.byteOffset + buf.length);
+}
+
+describe('decodeSTTMessage', () => {
+  test('разбирает JSON текстовые кадры', () => {
+    expect(decodeSTTMessage('{"type":"status"}')).toEqual({ type: 'status' });
+  });
+
+  test('разбирает бинарный partial с дополнительными полями', () => {
+    const message = decodeSTTMessage(toArrayBuffer(PARTIAL_FRAME));
+    expect(message.type).toBe('partial');
+    expect(message.source).toBe('microphone');
+    expect(message.stable).toBe('что такое');
+    expect(message.unstable).toBe('REST');
+    expect(message.text).toBe('что такое REST');
+    expect(message.revision).toBe(2);
+  });
+
+  test('отклоняет кадры новее поддерживаемой версии', () => {
+    const frame = new Uint8Array(toArrayBuffer(PARTIAL_FRAME));
+    frame[0] = 9;
+    expect(() => decodeSTTMessage(frame.buffer)).toThrow();
+  });
+});
+
+describe('helloMessage', () => {
+  test('запрашивает протокол и версию', () => {
+    expect(JSON.parse(helloMessage())).toEqual({ type: 'hello', protocol: 'binary', version: 1 });
+  });
+});
@@ -0,0 +1,289 @@
+"""
+Модульные тесты для audio/device_probe.py и опроса устройств PortAudio без переинициализации
+"""
+import sys
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from audio.device_probe import DeviceProbe
+from audio.sources import PyAudioSource, SoundDeviceSource, open_stream_count
+from conftest import audio_device
+from device_monitor import AudioDeviceMonitor
+
+
+class FakeStream:
+    def __init__(self):
+        self.closed = False
+
+    def read(self, frames, **kwargs):
+        if self.closed:
+            raise OSError('Stream closed')
+        return bytes(4 * frames)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    stop_stream = stop
+
+    def close(self):
+        self.closed = True
+
+
+class FakeInputStream(FakeStream):
+    def read(self, frames):
+        return np.frombuffer(super().read(frames), dtype=np.int16)[:frames].reshape(-1, 1), False
+
+
+class FakePortAudio:
+    """
+    PortAudio процесса: устройства перечисляются в Pa_Initialize, а
+    последний Pa_Terminate закрывает все открытые потоки.
+    """
+
+    def __init__(self, devices):
+        self.system = list(devices)
+        self.enumerated = []
+        self.count = 0
+        self.inits = 0
+        self.streams = []
+        self.default_input = devices[0]['name']
+        self.default_output = devices[1]['name']
+
+    def _init(self):
+        if self.count == 0:
+            self.enumerated = [dict(d, index=i) for i, d in enumerate(self.system)]
+            self.inits += 1
+        self.count += 1
+
+    def _terminate(self):
+        self.count -= 1
+        if self.count == 0:
+            for stream in self.streams:
+                stream.closed = True
+
+    def _find(self, name, loopback=False):
+        for info in self.enumerated:
+            if info['name'] == name and info['isLoopbackDevice'] == loopback:
+                return info
+        raise LookupError(name)
+
+    def pyaudio_module(self):
+        pa = self
+
+        class PyAudio:
+            def __init__(self):
+                pa._init()
+
+            def terminate(self):
+                pa._terminate()
+
+            def get_device_count(self):
+                return len(pa.enumerated)
+
+            def get_device_info_by_index(self, index):
+                return pa.enumerated[index]
+
+            def get_default_input_device_info(self):
+                return pa._find(pa.default_input)
+
+            def get_default_output_device_info(self):
+                return pa._find(pa.default_output)
+
+            def get_default_wasapi_loopback(self):
+                return pa._find(f'{pa.default_output} [Loopback]', loopback=True)
+
+            def open(self, **kwargs):
+                stream = FakeStream()
+                pa.streams.append(stream)
+                return stream
+
+        return SimpleNamespace(PyAudio=PyAudio, paInt16=8)
+
+    def sounddevice_module(self):
+        pa = self
+        pa._init()
+
+        def query_devices(index=None):
+            devices = [{'name': d['name'], 'default_samplerate': d['defaultSampleRate'],
+                        'max_input_channels': d['maxInputChannels'],
+                        'max_output_channels': d['maxOutputChannels']} for d in pa.enumerated]
+            return devices if index is None else devices[index]
+
+        def input_stream(**kwargs):
+            stream = FakeInputStream()
+            pa.streams.append(stream)
+            return stream
+
+        def terminate():
+            pa._terminate()
+
+        class Default:
+            @property
+            def device(self):
+                # Устройства, которых нет в перечислении процесса, PortAudio отдаёт как -1
+                names = [d['name'] for d in pa.enumerated]
+                return [names.index(name) if name in names else -1
+                        for name in (pa.default_input, pa.default_output)]
+
+        lib = SimpleNamespace(Pa_GetDeviceCount=lambda: len(pa.enumerated))
+        return SimpleNamespace(query_devices=query_devices, InputStream=input_stream, default=Default(), _lib=lib,
+                               _terminate=MagicMock(side_effect=terminate), _initialize=pa._init)
+
+    def probe_fingerprint(self):
+        """Отпечаток зонда: число устройств и устройства по умолчанию свежей инициализации"""
+        return [len(self.system), self.default_input, self.default_output]
+
+    def probe_result(self):
+        """Ответ зонда: свежее перечисление в отдельном процессе"""
+        devices = [dict(d, index=i) for i, d in enumerate(self.system)]
+        by_name = {(d['name'], d['isLoopbackDevice']): d for d in devices}
+        return {'devices': devices, 'defaults': {
+            'microphone': by_name[(self.default_input, False)],
+            'loopback': by_name.get((f'{self.default_output} [Loopback]', True)),
+            'output': by_name[(self.default_output, False)],
+        }}
+
+
+DEVICES = [
+    audio_device('USB Mic', channels=1),
+    audio_device('Speakers', channels=0, outputs=2),
+    audio_device('Speakers [Loopback]', loopback=True),
+]
+HEADSET = [audio_device('Headset', channels=0, outputs=2), audio_device('Headset [Loopback]', loopback=True)]
+
+
+@pytest.fixture
+def portaudio():
+    return FakePortAudio(DEVICES)
+
+
+def _probed(source, portaudio, works=True):
+    source._probe = MagicMock()
+    source._probe.fingerprint.side_effect = portaudio.probe_fingerprint if works else lambda: None
+    source._probe.scan.side_effect = portaudio.probe_result
+    return source
+
+
+class TestDeviceProbe:
+    """Зонд в отдельном процессе"""
+
+    def test_scan_in_child_process(self):
+        probe = DeviceProbe('synthetic')
+        try:
+            fingerprint = probe.fingerprint()
+            pid = probe._proc.pid
+            result = probe.scan()
+            assert probe.fingerprint() == fingerprint
+        finally:
+            probe.close()
+
+        assert fingerprint == [[[0, 'Synthetic Speakers']], 0]
+        assert result['devices'][0]['name'] == 'Synthetic Speakers'
+        assert result['defaults']['loopback']['name'] == 'Synthetic Speakers'
+        assert result['defaults']['output'] is None
+        assert probe.get_stats() == {'kind': 'synthetic', 'fingerprints': 2, 'scans': 1,
+                                     'starts': 1, 'failures': 0}
+        assert probe._proc is None and pid
+
+    def test_failed_probe_returns_none(self):
+        probe = DeviceProbe('unknown')
+        try:
+            assert probe.fingerprint() is None
+        finally:
+            probe.close()
+        assert probe.failures == 1
+
+
+class TestPollKeepsStreams:
+    """Опрос монитора не переинициализирует PortAudio при открытом потоке"""
+
+    @pytest.mark.parametrize('probe_works', [True, False])
+    def test_sounddevice_poll_does_not_close_stream(self, portaudio, probe_works):
+        sd = portaudio.sounddevice_module()
+        with patch.dict(sys.modules, {'sounddevice': sd}):
+            source = _probed(SoundDeviceSource(), portaudio, works=probe_works)
+            stream = source.open_stream(0, 'microphone')
+            monitor = AudioDeviceMonitor(source=source)
+
+            monitor.refresh()
+            portaudio.system += HEADSET
+            portaudio.default_output = 'Headset'
+            monitor.refresh()
+
+            sd._terminate.assert_not_called()
+            assert not portaudio.streams[0].closed
+            assert stream.read(4).shape == (4, 1)
+            stream.close()
+            assert open_stream_count('sounddevice') == 0
+
+            # Без открытых потоков переинициализация снова безопасна
+            monitor.refresh()
+            sd._terminate.assert_called_once()
+
+    def test_pyaudio_hotplug_seen_while_capturing(self, portaudio):
+        with patch.dict(sys.modules, {'pyaudiowpatch': portaudio.pyaudio_module()}):
+            source = _probed(PyAudioSource(), portaudio)
+            monitor = AudioDeviceMonitor(source=source)
+            assert monitor.get_default_device('loopback')[1]['name'] == 'Speakers [Loopback]'
+            stream = source.open_stream(2, 'loopback')
+            inits = portaudio.inits
+
+            portaudio.system += HEADSET
+            portaudio.default_output = 'Headset'
+            assert monitor.refresh()
+
+            # Процесс ещё не видит гарнитуру: поток не трогается, устройство ждёт переинициализации
+            assert monitor.get_default_device('loopback') == (None, None)
+            assert portaudio.inits == inits
+            assert not portaudio.streams[0].closed
+
+            stream.close()
+            assert monitor.refresh()
+            index, info = monitor.get_default_device('loopback')
+            source.close()
+
+        assert info['name'] == 'Headset [Loopback]'
+        assert index == 4
+        assert portaudio.inits == inits + 1
+
+    def test_scan_only_when_fingerprint_changes(self, portaudio):
+        with patch.dict(sys.modules, {'pyaudiowpatch': portaudio.pyaudio_module()}):
+            source = _probed(PyAudioSource(), portaudio)
+            probe = source._probe
+            monitor = AudioDeviceMonitor(source=source)
+            monitor.snapshot()
+            assert not monitor.refresh()
+            assert not monitor.refresh()
+
+            portaudio.default_input = 'Speakers'
+            assert monitor.refresh()
+            assert monitor.get_stats()['probe'] is probe.get_stats.return_value
+            source.close()
+
+        assert (probe.fingerprint.call_count, probe.scan.call_count) == (4, 2)
+        assert (monitor.polls, monitor.scans) == (4, 2)
+        assert portaudio.inits == 1
+
+    def test_known_device_resolved_by_name(self, portaudio):
+        portaudio.system += HEADSET
+        with patch.dict(sys.modules, {'pyaudiowpatch': portaudio.pyaudio_module()}):
+            source = _probed(PyAudioSource(), portaudio)
+            monitor = AudioDeviceMonitor(source=source)
+            monitor.snapshot()
+            stream = source.open_stream(2, 'loopback')
+
+            # В свежем перечислении зонда гарнитура идёт первой - индексы процессов расходятся
+            portaudio.system = HEADSET + DEVICES
+            portaudio.default_output = 'Headset'
+            monitor.refresh()
+            index, info = monitor.get_default_device('loopback')
+            stream.close()
+            source.close()
+
+        assert (index, info['name']) == (4, 'Headset [Loopback]')
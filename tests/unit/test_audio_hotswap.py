@@ -0,0 +1,141 @@
+"""
+Модульные тесты переключения устройств DynamicAudioCapture на виртуальных устройствах
+"""
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from audio.sources import SyntheticDevice, SyntheticSource
+from conftest import wait_for
+from dynamic_audio_capture import DynamicAudioCapture, SAMPLE_RATE
+
+AMPLITUDE = 0.3
+FREQUENCY = 440.0
+# Наибольший шаг синуса между соседними сэмплами 16 кГц
+MAX_STEP = 2 * np.pi * FREQUENCY / SAMPLE_RATE * AMPLITUDE * 32767
+
+
+@pytest.fixture(autouse=True)
+def no_metrics_file():
+    with patch('dynamic_audio_capture.log_metric'):
+        yield
+
+
+def _source(open_delay=0.0):
+    return SyntheticSource({
+        0: SyntheticDevice('Speakers', 48000, 2, FREQUENCY, AMPLITUDE),
+        1: SyntheticDevice('Headset', 44100, 1, FREQUENCY, AMPLITUDE),
+    }, open_delay=open_delay)
+
+
+def _drain(capture):
+    parts = []
+    while True:
+        chunk = capture.ring.read()
+        if chunk is None:
+            return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int16)
+        parts.append(chunk)
+
+
+class TestHotSwap:
+    """Переключение без разрыва"""
+
+    def test_switch_is_gapless(self):
+        source = _source(open_delay=0.3)
+        capture = DynamicAudioCapture(mode='loopback', source=source)
+        capture.start()
+        try:
+            assert wait_for(lambda: len(capture.ring) > 0, timeout=3.0)
+            t0, written = time.monotonic(), capture.ring.written_samples
+            time.sleep(0.3)
+            source.set_default(1)
+            capture.on_device_changed(1, {'name': 'Headset'})
+            assert wait_for(lambda: capture.switches == 1, timeout=3.0)
+            # Старый поток закрыт сразу после склейки, а не при остановке
+            assert source.opened[0].closed
+            time.sleep(0.3)
+        finally:
+            capture.stop()
+        elapsed = time.monotonic() - t0
+        audio = _drain(capture)
+        written = capture.ring.written_samples - written
+
+        stats = capture.get_stats()
+        assert stats['device'] == 'Headset'
+        assert stats['last_switch_gap_ms'] == 0.0
+        assert stats['last_switch_ms'] >= 300
+        # Старое устройство писало, пока открывалось новое: потерь нет
+        assert written > (elapsed - 0.1) * SAMPLE_RATE
+        # Ни щелчка, ни повтора на стыке
+        steps = np.abs(np.diff(audio[200:].astype(np.int32)))
+        assert steps.max() < MAX_STEP * 1.2
+        assert len(source.opened) == 2
+
+    def test_failed_open_keeps_old_device(self):
+        source = _source()
+        capture = DynamicAudioCapture(mode='loopback', source=source)
+        original_open = source.open_stream
+
+        def open_stream(index, mode):
+            if index == 1:
+                raise OSError('устройство занято')
+            return original_open(index, mode)
+
+        source.open_stream = open_stream
+        capture.start()
+        try:
+            assert wait_for(lambda: len(capture.ring) > 0, timeout=3.0)
+            source.set_default(1)
+            capture.on_device_changed(1, {'name': 'Headset'})
+            time.sleep(0.2)
+            before = capture.ring.written_samples
+            time.sleep(0.2)
+        finally:
+            capture.stop()
+
+        assert capture.switches == 0
+        assert capture.current_device_name == 'Speakers'
+        assert capture.ring.written_samples > before
+
+    def test_old_device_lost_reports_gap(self):
+        source = _source(open_delay=0.2)
+        capture = DynamicAudioCapture(mode='loopback', source=source)
+        capture.start()
+        try:
+            assert wait_for(lambda: len(capture.ring) > 0, timeout=3.0)
+            source.set_default(1)
+            capture.on_device_changed(1, {'name': 'Headset'})
+            # Гарнитуру выдернули раньше, чем открылось новое устройство
+            source.opened[0].close()
+            assert wait_for(lambda: capture.switches == 1, timeout=3.0)
+        finally:
+            capture.stop()
+
+        assert capture.current_device_name == 'Headset'
+        assert capture.last_switch_gap_ms > 0
+        assert capture.max_switch_gap_ms == capture.last_switch_gap_ms
+
+    def test_simulated_stream_is_realtime(self):
+        stream = _source().open_stream(0, 'loopback')
+        t0 = time.monotonic()
+        block = stream.read(4800)
+
+        assert block.shape == (4800, 2)
+        assert time.monotonic() - t0 >= 0.09
+
+
+class TestChunkCaptureTime:
+    """Время захвата чанка для тайминга слов"""
+
+    def test_chunk_end_accounts_for_unread_samples(self):
+        capture = DynamicAudioCapture(mode='loopback', source=_source())
+        capture.ring.write(np.zeros(SAMPLE_RATE, dtype=np.int16))
+        capture._last_block_end = time.monotonic() - 1.0
+
+        chunk = capture.get_audio_chunk(timeout=0)
+
+        # За прочитанным чанком в кольце осталось ещё 0.8 с, записанных позже
+        assert len(chunk) == SAMPLE_RATE // 5
+        assert capture.last_chunk_time == pytest.approx(time.time() - 1.8, abs=0.05)
@@ -4,193 +4,150 @@
 import pytest
 import sys
 import os
-from unittest.mock import patch, MagicMock
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
 
+from audio.sources import AudioSource
+from conftest import audio_device
+from device_monitor import AudioDeviceMonitor
+
+
+class StubSource(AudioSource):
+    """Источник с заданным списком устройств"""
+
+    kind = 'stub'
+
+    def __init__(self, devices, output=None, microphone=None, error=None):
+        self.devices = devices
+        self.output = output
+        self.microphone = microphone
+        self.error = error
+        self.scans = 0
+
+    def fingerprint(self):
+        if self.error:
+            raise self.error
+        return len(self.devices), self.output, self.microphone
+
+    def list_devices(self):
+        self.scans += 1
+        return self.devices
+
+    def default_device(self, mode, devices=None):
+        if mode == 'microphone':
+            index = self.microphone
+        else:
+            index = next((d['index'] for d in self.devices if d['isLoopbackDevice']), None)
+        return (index, self.devices[index]) if index is not None else (None, None)
+
+    def default_output(self, devices=None):
+        if self.output is None:
+            return None, None
+        return self.output, self.devices[self.output]
+
+
+def _monitor(*args, **kwargs):
+    return AudioDeviceMonitor(source=StubSource(*args, **kwargs))
+
 
 class TestGetAudioMode:
     """Тесты для get_audio_mode"""
-    
-    @patch('audio_mode_detector.pyaudio')
-    def test_get_audio_mode_loopback(self, mock_pyaudio_module):
+
+    def test_get_audio_mode_loopback(self):
         """Тест определения loopback режима"""
-        mock_pyaudio = MagicMock()
-        mock_pyaudio_module.PyAudio.return_value = mock_pyaudio
-        
-        # Настраиваем mock для loopback устройства
-        mock_default_output = {'name': 'Speaker'}
-        mock_pyaudio.get_default_output_device_info.return_value = mock_default_output
-        
-        mock_loopback_device = {
-            'name': 'Speaker (loopback)',
-            'isLoopbackDevice': True,
-            'maxInputChannels': 2
-        }
-        mock_pyaudio.get_device_count.return_value = 1
-        mock_pyaudio.get_device_info_by_index.return_value = mock_loopback_device
-        
+        monitor = _monitor([
+            audio_device('Speaker', 0, channels=0, outputs=2),
+            audio_device('Speaker (loopback)', 1, loopback=True),
+        ], output=0)
+
         from audio_mode_detector import get_audio_mode
-        result = get_audio_mode()
-        
+        result = get_audio_mode(monitor)
+
         assert result == 'loopback'
-        mock_pyaudio.terminate.assert_called_once()
-    
-    @patch('audio_mode_detector.pyaudio')
-    def test_get_audio_mode_microphone(self, mock_pyaudio_module):
+
+    def test_get_audio_mode_microphone(self):
         """Тест определения микрофонного режима"""
-        mock_pyaudio = MagicMock()
-        mock_pyaudio_module.PyAudio.return_value = mock_pyaudio
-        
-        # Настраиваем mock для микрофона
-        mock_default_output = {'name': 'Speaker'}
-        mock_pyaudio.get_default_output_device_info.return_value = mock_default_output
-        
-        # Нет loopback устройств
-        mock_pyaudio.get_device_count.return_value = 1
-        mock_pyaudio.get_device_info_by_index.return_value = {
-            'name': 'Microphone',
-            'isLoopbackDevice': False,
-            'maxInputChannels': 0
-        }
-        
-        mock_default_input = {
-            'name': 'Microphone',
-            'isLoopbackDevice': False,
-            'maxInputChannels': 1
-        }
-        mock_pyaudio.get_default_input_device_info.return_value = mock_default_input
-        
+        monitor = _monitor([
+            audio_device('Speaker', 0, channels=0, outputs=2),
+            audio_device('Microphone', 1, channels=1),
+        ], output=0, microphone=1)
+
         from audio_mode_detector import get_audio_mode
-        result = get_audio_mode()
-        
+        result = get_audio_mode(monitor)
+
         assert result == 'microphone'
-    
-    @patch('audio_mode_detector.pyaudio')
-    def test_get_audio_mode_fallback_loopback(self, mock_pyaudio_module):
+
+    def test_get_audio_mode_fallback_loopback(self):
         """Тест fallback на loopback устройство"""
-        mock_pyaudio = MagicMock()
-        mock_pyaudio_module.PyAudio.return_value = mock_pyaudio
-        
-        # Ошибка при получении default устройств
-        mock_pyaudio.get_default_output_device_info.side_effect = Exception("Error")
-        
-        # Но есть loopback в списке
-        mock_pyaudio.get_device_count.return_value = 1
-        mock_pyaudio.get_device_info_by_index.return_value = {
-            'name': 'Loopback',
-            'isLoopbackDevice': True,
-            'maxInputChannels': 2
-        }
-        
+        # Нет устройства вывода по умолчанию, но есть loopback в списке
+        monitor = _monitor([audio_device('Loopback', 0, loopback=True)])
+
         from audio_mode_detector import get_audio_mode
-        result = get_audio_mode()
-        
+        result = get_audio_mode(monitor)
+
         assert result == 'loopback'
-    
-    @patch('audio_mode_detector.pyaudio')
-    def test_get_audio_mode_fallback_microphone(self, mock_pyaudio_module):
+
+    def test_get_audio_mode_fallback_microphone(self):
         """Тест fallback на микрофон"""
-        mock_pyaudio = MagicMock()
-        mock_pyaudio_module.PyAudio.return_value = mock_pyaudio
-        
-        # Ошибка при получении default устройств
-        mock_pyaudio.get_default_output_device_info.side_effect = Exception("Error")
-        
         # Нет loopback, но есть микрофон
-        mock_pyaudio.get_device_count.return_value = 1
-        mock_pyaudio.get_device_info_by_index.return_value = {
-            'name': 'Mic',
-            'isLoopbackDevice': False,
-            'maxInputChannels': 2
-        }
-        
+        monitor = _monitor([audio_device('Mic', 0, channels=2)])
+
         from audio_mode_detector import get_audio_mode
-        result = get_audio_mode()
-        
+        result = get_audio_mode(monitor)
+
         assert result == 'microphone'
-    
-    @patch('audio_mode_detector.pyaudio')
-    def test_get_audio_mode_no_devices(self, mock_pyaudio_module):
+
+    def test_get_audio_mode_no_devices(self):
         """Тест когда нет устройств"""
-        mock_pyaudio = MagicMock()
-        mock_pyaudio_module.PyAudio.return_value = mock_pyaudio
-        
-        # Ошибка при получении устройств
-        mock_pyaudio.get_default_output_device_info.side_effect = Exception("Error")
-        mock_pyaudio.get_device_count.return_value = 0
-        
         from audio_mode_detector import get_audio_mode
-        result = get_audio_mode()
-        
+        result = get_audio_mode(_monitor([]))
+
         assert result == 'loopback'  # Default fallback
-    
-    @patch('audio_mode_detector.pyaudio')
-    def test_get_audio_mode_exception(self, mock_pyaudio_module):
-        """Тест при исключении в PyAudio"""
-        mock_pyaudio_module.PyAudio.side_effect = Exception("PyAudio error")
-        
+
+    def test_get_audio_mode_exception(self):
+        """Тест при ошибке драйвера"""
         from audio_mode_detector import get_audio_mode
-        result = get_audio_mode()
-        
+        result = get_audio_mode(_monitor([], error=OSError('PortAudio error')))
+
         assert result == 'loopback'  # Safe default
 
+    def test_reuses_monitor_snapshot(self):
+        """Повторное определение и захват не перечитывают устройства"""
+        source = StubSource([audio_device('Mic', 0, channels=1)], microphone=0)
+        monitor = AudioDeviceMonitor(source=source)
+
+        from audio_mode_detector import get_audio_mode
+        get_audio_mode(monitor)
+        get_audio_mode(monitor)
+        monitor.get_default_input_device()
+
+        assert source.scans == 1
+
 
 class TestListAudioDevices:
     """Тесты для list_audio_devices"""
-    
-    @patch('audio_mode_detector.pyaudio')
-    def test_list_devices_success(self, mock_pyaudio_module):
+
+    def test_list_devices_success(self):
         """Тест успешного получения списка устройств"""
-        mock_pyaudio = MagicMock()
-        mock_pyaudio_module.PyAudio.return_value = mock_pyaudio
-        
-        mock_pyaudio.get_device_count.return_value = 3
-        
-        def side_effect(index):
-            devices = [
-                {
-                    'name': 'Loopback Device',
-                    'isLoopbackDevice': True,
-                    'maxInputChannels': 2,
-                    'maxOutputChannels': 0,
-                    'defaultSampleRate': 48000
-                },
-                {
-                    'name': 'Microphone',
-                    'isLoopbackDevice': False,
-                    'maxInputChannels': 1,
-                    'maxOutputChannels': 0,
-                    'defaultSampleRate': 44100
-                },
-                {
-                    'name': 'Speakers',
-                    'isLoopbackDevice': False,
-                    'maxInputChannels': 0,
-                    'maxOutputChannels': 2,
-                    'defaultSampleRate': 48000
-                }
-            ]
-            return devices[index]
-        
-        mock_pyaudio.get_device_info_by_index.side_effect = side_effect
-        
+        monitor = _monitor([
+            audio_device('Loopback Device', 0, loopback=True),
+            audio_device('Microphone', 1, channels=1, rate=44100),
+            audio_device('Speakers', 2, channels=0, outputs=2),
+        ])
+
         from audio_mode_detector import list_audio_devices
-        loopback, mics = list_audio_devices()
-        
+        loopback, mics = list_audio_devices(monitor)
+
         assert len(loopback) == 1
         assert len(mics) == 1
         assert loopback[0][1]['name'] == 'Loopback Device'
         assert mics[0][1]['name'] == 'Microphone'
-    
-    @patch('audio_mode_detector.pyaudio')
-    def test_list_devices_exception(self, mock_pyaudio_module):
+
+    def test_list_devices_exception(self):
         """Тест при ошибке получения списка"""
-        mock_pyaudio_module.PyAudio.side_effect = Exception("Error")
-        
         from audio_mode_detector import list_audio_devices
-        loopback, mics = list_audio_devices()
-        
+        loopback, mics = list_audio_devices(_monitor([], error=OSError('Error')))
+
         assert loopback == []
         assert mics == []
 
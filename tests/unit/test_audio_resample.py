@@ -0,0 +1,152 @@
+"""
+Модульные тесты для audio/resample.py
+"""
+import numpy as np
+import pytest
+
+from audio.resample import Resampler, design_filter
+
+TARGET_RATE = 16000
+
+
+def _tone(freq: float, rate: int, seconds: float = 1.0, amplitude: float = 0.5) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _chunked(resampler: Resampler, audio: np.ndarray, sizes) -> np.ndarray:
+    parts, pos = [], 0
+    for size in sizes:
+        if pos >= len(audio):
+            break
+        parts.append(resampler.process(audio[pos:pos + size]).copy())
+        pos += size
+    return np.concatenate(parts)
+
+
+def _snr_db(signal: np.ndarray, reference: np.ndarray) -> float:
+    noise = signal - reference
+    return 10 * np.log10(np.mean(reference ** 2) / np.mean(noise ** 2))
+
+
+class TestDesignFilter:
+    """Тесты банка фильтров"""
+
+    @pytest.mark.parametrize('up,down', [(1, 3), (160, 441), (2, 1)])
+    def test_phases_have_unit_gain(self, up, down):
+        bank = design_filter(up, down)
+
+        assert bank.shape[0] == up
+        np.testing.assert_allclose(bank.sum(axis=1), 1.0, atol=1e-12)
+
+    def test_cached_and_read_only(self):
+        bank = design_filter(1, 3)
+
+        assert design_filter(1, 3) is bank
+        assert not bank.flags.writeable
+
+
+class TestResampler:
+    """Тесты потокового ресемплера"""
+
+    @pytest.mark.parametrize('rate', [48000, 44100, 32000, 22050, 8000])
+    def test_chunked_equals_whole(self, rate):
+        """Блоки любого размера дают тот же сигнал, что и целиком"""
+        audio = np.random.default_rng(1).standard_normal(rate).astype(np.float32) * 0.1
+        whole = Resampler(rate, TARGET_RATE).process(audio).copy()
+
+        sizes = np.random.default_rng(2).integers(1, 3000, size=2000)
+        chunked = _chunked(Resampler(rate, TARGET_RATE), audio, sizes)
+
+        assert len(whole) == len(chunked) == TARGET_RATE
+        np.testing.assert_allclose(chunked, whole, atol=1e-6)
+
+    @pytest.mark.parametrize('rate', [48000, 44100])
+    def test_tone_quality(self, rate):
+        """1 кГц проходит без искажений: SNR против идеального тона > 80 дБ"""
+        resampler = Resampler(rate, TARGET_RATE)
+        out = _chunked(resampler, _tone(1000, rate), [1024] * 100)
+
+        t = np.arange(len(out)) / TARGET_RATE - resampler.delay
+        reference = 0.5 * np.sin(2 * np.pi * 1000 * t)
+        # Первые миллисекунды - история, заполненная первым сэмплом
+        assert _snr_db(out[100:], reference[100:]) > 80
+
+    @pytest.mark.parametrize('rate', [48000, 44100])
+    def test_aliasing_suppressed(self, rate):
+        """Тон выше 8 кГц не заворачивается в полосу речи"""
+        out = _chunked(Resampler(rate, TARGET_RATE), _tone(12000, rate), [1024] * 100)
+
+        rms = np.sqrt(np.mean(out[100:].astype(np.float64) ** 2))
+        assert 20 * np.log10(rms / (0.5 / np.sqrt(2))) < -70
+
+    def test_no_click_at_chunk_boundaries(self):
+        """Разница соседних сэмплов на стыках как внутри блоков"""
+        out = _chunked(Resampler(48000, TARGET_RATE), _tone(440, 48000), [1024] * 50)
+
+        diff = np.abs(np.diff(out[100:]))
+        assert diff.max() < 2 * np.pi * 440 * 0.5 / TARGET_RATE * 1.01
+
+    def test_constant_passes_from_first_sample(self):
+        """Без переходного процесса в начале потока"""
+        out = Resampler(44100, TARGET_RATE).process(np.full(4410, 0.25, dtype=np.float32))
+
+        assert len(out) == 1600
+        np.testing.assert_allclose(out, 0.25)
+
+    def test_int16_output(self):
+        resampler = Resampler(48000, TARGET_RATE, dtype=np.int16)
+        pcm = np.full(3072, 30000, dtype=np.int16)
+
+        out = resampler.process(pcm)
+
+        assert out.dtype == np.int16
+        assert len(out) == 1024
+        assert np.all(out == 30000)
+
+    def test_writes_into_given_buffer(self):
+        resampler = Resampler(48000, TARGET_RATE)
+        out = np.zeros(resampler.output_length(960), dtype=np.float32)
+
+        result = resampler.process(np.ones(960, dtype=np.float32), out)
+
+        assert np.shares_memory(result, out)
+        np.testing.assert_allclose(out, 1.0)
+
+    def test_short_buffer_rejected(self):
+        resampler = Resampler(48000, TARGET_RATE)
+        with pytest.raises(ValueError):
+            resampler.process(np.ones(960, dtype=np.float32), np.empty(10, dtype=np.float32))
+
+    def test_output_length_tracks_phase(self):
+        """44.1k → 16k: дробные блоки в сумме дают точное число сэмплов"""
+        resampler = Resampler(44100, TARGET_RATE)
+        total = 0
+        for _ in range(441):
+            expected = resampler.output_length(100)
+            total += len(resampler.process(np.zeros(100, dtype=np.float32)))
+            assert expected >= 36
+
+        assert total == 16000
+
+    def test_passthrough(self):
+        resampler = Resampler(TARGET_RATE, TARGET_RATE)
+        audio = np.arange(512, dtype=np.float32)
+
+        np.testing.assert_array_equal(resampler.process(audio), audio)
+        assert resampler.delay == 0.0
+
+    def test_reset_starts_new_stream(self):
+        resampler = Resampler(44100, TARGET_RATE)
+        audio = _tone(1000, 44100, seconds=0.1)
+        first = resampler.process(audio).copy()
+
+        resampler.reset()
+
+        np.testing.assert_array_equal(resampler.process(audio), first)
+
+    def test_buffers_grow_for_large_blocks(self):
+        audio = _tone(1000, 48000, seconds=2.0)
+        out = Resampler(48000, TARGET_RATE).process(audio)
+
+        assert len(out) == 32000
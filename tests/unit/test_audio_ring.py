@@ -0,0 +1,164 @@
+"""
+Модульные тесты для audio/ring.py
+"""
+import threading
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from audio.ring import SPSCRingBuffer
+
+
+class TestSPSCRingBuffer:
+    """Тесты кольцевого буфера один писатель / один читатель"""
+
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            SPSCRingBuffer(0)
+
+    def test_peek_is_contiguous_across_wrap(self):
+        ring = SPSCRingBuffer(8, dtype=np.int16)
+        ring.write(np.arange(6, dtype=np.int16))
+        ring.advance(5)
+        ring.write(np.arange(6, 12, dtype=np.int16))
+
+        view = ring.peek()
+
+        np.testing.assert_array_equal(view, np.arange(5, 12))
+        assert not view.flags['OWNDATA']
+
+    def test_overrun_drops_newest(self):
+        """Отставший читатель не теряет уже записанное, отбрасывается хвост"""
+        ring = SPSCRingBuffer(10)
+        assert ring.write(np.arange(8, dtype=np.float32)) == 8
+        assert ring.write(np.arange(8, 13, dtype=np.float32)) == 2
+
+        np.testing.assert_array_equal(ring.read(), np.arange(10))
+        stats = ring.get_stats()
+        assert stats['overruns'] == 1
+        assert stats['dropped_samples'] == 3
+        assert stats['high_water'] == 10
+        assert stats['written_samples'] == 10
+
+    def test_full_buffer_write_returns_zero(self):
+        ring = SPSCRingBuffer(4)
+        ring.write(np.ones(4, dtype=np.float32))
+
+        assert ring.write(np.ones(2, dtype=np.float32)) == 0
+        assert ring.overruns == 1
+
+    def test_read_limits_and_copies(self):
+        ring = SPSCRingBuffer(16)
+        ring.write(np.arange(10, dtype=np.float32))
+
+        chunk = ring.read(max_samples=4)
+        ring.write(np.full(6, -1, dtype=np.float32))
+
+        np.testing.assert_array_equal(chunk, np.arange(4))
+        assert chunk.flags['OWNDATA']
+        assert len(ring) == 12
+
+    def test_read_into_buffer(self):
+        ring = SPSCRingBuffer(16)
+        ring.write(np.arange(10, dtype=np.float32))
+        out = np.zeros(6, dtype=np.float32)
+
+        result = ring.read(out=out)
+
+        assert np.shares_memory(result, out)
+        np.testing.assert_array_equal(out, np.arange(6))
+        assert len(ring) == 4
+
+    def test_read_timeout_when_empty(self):
+        ring = SPSCRingBuffer(16)
+
+        assert ring.read(timeout=0.01) is None
+        assert not ring.wait(0.01)
+
+    def test_high_water_tracks_peak_fill(self):
+        ring = SPSCRingBuffer(100)
+        ring.write(np.zeros(30, dtype=np.float32))
+        ring.write(np.zeros(40, dtype=np.float32))
+        ring.read()
+        ring.write(np.zeros(10, dtype=np.float32))
+
+        assert ring.high_water == 70
+        assert len(ring) == 10
+
+    def test_discard(self):
+        ring = SPSCRingBuffer(16)
+        ring.write(np.ones(10, dtype=np.float32))
+        ring.discard()
+
+        assert len(ring) == 0
+        assert ring.free_space == 16
+
+    def test_threads_preserve_order(self):
+        """Писатель и читатель в разных потоках: ни потерь, ни перестановок"""
+        ring = SPSCRingBuffer(4096, dtype=np.int32)
+        total = 200_000
+        received = []
+
+        def producer():
+            pos = 0
+            while pos < total:
+                n = min(1024, total - pos)
+                pos += ring.write(np.arange(pos, pos + n, dtype=np.int32))
+
+        def consumer():
+            count = 0
+            while count < total:
+                chunk = ring.read(timeout=1.0)
+                if chunk is None:
+                    break
+                received.append(chunk)
+                count += len(chunk)
+
+        threads = [threading.Thread(target=producer), threading.Thread(target=consumer)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=10)
+
+        np.testing.assert_array_equal(np.concatenate(received), np.arange(total))
+        assert ring.written_samples == total
+
+
+class TestCaptureRing:
+    """Буфер между захватом устройства и конвейером STT"""
+
+    @pytest.fixture
+    def capture(self):
+        with patch('dynamic_audio_capture.get_device_monitor', return_value=MagicMock()):
+            from dynamic_audio_capture import DynamicAudioCapture
+            yield DynamicAudioCapture(mode='microphone', ring_seconds=1.0)
+
+    def test_chunks_are_joined_on_read(self, capture):
+        for i in range(5):
+            capture.ring.write(np.full(341, i, dtype=np.int16))
+
+        chunk = capture.get_audio_chunk(timeout=0.01)
+
+        assert chunk.dtype == np.int16
+        assert len(chunk) == 5 * 341
+        assert capture.get_audio_chunk(timeout=0.01) is None
+
+    def test_read_is_bounded(self, capture):
+        capture.ring.write(np.zeros(16000, dtype=np.int16))
+
+        chunk = capture.get_audio_chunk(timeout=0.01)
+
+        assert len(chunk) == 3200
+        assert len(capture.ring) == 12800
+
+    def test_pipeline_reports_ring(self, capture):
+        from stt.pipeline import STTPipeline
+
+        capture.ring.write(np.zeros(1000, dtype=np.int16))
+        pipeline = STTPipeline(MagicMock(), 'microphone', MagicMock(), capture=capture)
+
+        stats = pipeline.get_stats()['capture']
+
+        assert stats['depth'] == 1000
+        assert stats['ring']['capacity'] == 16000
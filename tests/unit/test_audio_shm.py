@@ -0,0 +1,156 @@
+"""
+Модульные тесты для audio/shm.py
+"""
+import os
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from audio.shm import SharedAudioReader, SharedAudioWriter
+
+
+@pytest.fixture
+def name():
+    return f'lh_test_{os.getpid()}_{np.random.randint(1 << 30)}'
+
+
+@pytest.fixture
+def writer(name):
+    w = SharedAudioWriter(name, 16000, seconds=0.5)
+    yield w
+    w.close()
+
+
+@pytest.fixture
+def reader(name):
+    r = SharedAudioReader(name)
+    yield r
+    r.stop()
+
+
+class TestSharedAudioRing:
+    """Тесты транспорта через разделяемую память"""
+
+    def test_roundtrip(self, writer, reader):
+        assert reader.attach()
+        writer.write(np.arange(500, dtype=np.float32) / 1000)
+
+        chunk = reader.get_audio_chunk(timeout=0.1)
+
+        np.testing.assert_allclose(chunk, np.arange(500) / 1000)
+        assert reader.sample_rate == 16000
+        assert len(reader) == 0
+
+    def test_block_is_zero_copy_with_capture_time(self, writer, reader):
+        reader.attach()
+        writer.write(np.ones(1600, dtype=np.float32), capture_time=100.0)
+        writer.write(np.zeros(800, dtype=np.float32), capture_time=100.05)
+
+        block, t_end = reader.read_block(max_samples=1600)
+
+        assert not block.flags['OWNDATA']
+        np.testing.assert_array_equal(block, 1.0)
+        # Конец первого блока - на 800 сэмплов раньше последнего записанного
+        assert t_end == pytest.approx(100.0)
+        reader.advance(len(block))
+        del block
+        assert len(reader) == 800
+
+    def test_chunk_keeps_capture_time(self, writer, reader):
+        reader.attach()
+        writer.write(np.ones(800, dtype=np.float32), capture_time=100.0)
+
+        reader.get_audio_chunk(timeout=0.1)
+
+        assert reader.last_chunk_time == pytest.approx(100.0)
+
+    def test_wraps_contiguously(self, writer, reader):
+        reader.attach()
+        for i in range(20):
+            writer.write(np.full(700, i, dtype=np.float32))
+            chunk = reader.get_audio_chunk(timeout=0.1)
+            np.testing.assert_array_equal(chunk, i)
+
+    def test_overrun_counted_in_header(self, writer, reader):
+        reader.attach()
+        accepted = writer.write(np.zeros(9000, dtype=np.float32))
+
+        stats = reader.get_stats()
+
+        assert accepted == 8000
+        assert stats['overruns'] == 1
+        assert stats['dropped_samples'] == 1000
+        assert stats['samples'] == 8000
+
+    def test_reader_waits_for_writer(self, name):
+        reader = SharedAudioReader(name)
+        try:
+            assert reader.get_audio_chunk(timeout=0.01) is None
+            assert not reader.attached
+
+            writer = SharedAudioWriter(name, 16000, seconds=0.1)
+            try:
+                assert reader.attach()
+                writer.write(np.ones(100, dtype=np.float32))
+                assert len(reader.get_audio_chunk(timeout=0.1)) == 100
+            finally:
+                writer.close()
+        finally:
+            reader.stop()
+
+    def test_reattach_after_writer_restart(self, name, reader):
+        first = SharedAudioWriter(name, 16000, seconds=0.1)
+        reader.attach()
+        first.close()
+
+        second = SharedAudioWriter(name, 16000, seconds=0.1)
+        try:
+            second.write(np.full(50, 2.0, dtype=np.float32))
+            # Подключение к новому сегменту начинается с текущего места
+            assert reader.get_audio_chunk(timeout=0.05) is None
+            second.write(np.full(50, 3.0, dtype=np.float32))
+            np.testing.assert_array_equal(reader.get_audio_chunk(timeout=0.1), 3.0)
+            assert reader.attaches == 2
+        finally:
+            second.close()
+
+    def test_reattach_after_writer_crash(self, name, reader):
+        first = SharedAudioWriter(name, 16000, seconds=0.1)
+        reader.attach()
+        # Прежний писатель упал без close: closed не выставлен, сегмент пересоздаётся
+        second = SharedAudioWriter(name, 16000, seconds=0.1)
+        try:
+            assert second.epoch != first.epoch
+            assert reader.get_audio_chunk(timeout=0.02) is None
+            second.write(np.full(50, 3.0, dtype=np.float32))
+            np.testing.assert_array_equal(reader.get_audio_chunk(timeout=0.1), 3.0)
+            assert reader.attaches == 2
+        finally:
+            second.close()
+            first.close()
+
+    def test_int16_ring(self, name):
+        writer = SharedAudioWriter(name, 16000, seconds=0.1, dtype=np.int16)
+        reader = SharedAudioReader(name)
+        try:
+            reader.attach()
+            writer.write(np.array([1, -2, 3], dtype=np.int16))
+            chunk = reader.get_audio_chunk(timeout=0.1)
+            assert chunk.dtype == np.int16
+            np.testing.assert_array_equal(chunk, [1, -2, 3])
+        finally:
+            reader.stop()
+            writer.close()
+
+    def test_pipeline_reports_shm(self, writer, reader):
+        from stt.pipeline import STTPipeline
+
+        reader.attach()
+        writer.write(np.zeros(300, dtype=np.float32))
+        pipeline = STTPipeline(MagicMock(), 'shm', MagicMock(), capture=reader)
+
+        stats = pipeline.get_stats()['capture']
+
+        assert stats['depth'] == 300
+        assert stats['shm']['attached'] is True
@@ -0,0 +1,301 @@
+"""
+Модульные тесты для audio/sources.py
+"""
+import importlib
+import sys
+import time
+import wave
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from audio.sources import (
+    DEVICE_BLOCK_FRAMES, SURROUND_GAIN, FileSource, PyAudioSource, SourceReader,
+    SyntheticDevice, SyntheticSource, create_audio_source, stereo_downmix_matrix,
+)
+from conftest import audio_device
+
+
+def _write_wav(path, audio: np.ndarray, sample_rate: int):
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(audio.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(audio.astype('<i2').tobytes())
+
+
+@pytest.fixture
+def stereo_wav(tmp_path):
+    """0.5 с стерео 48 кГц: левый канал - рампа, правый - её отрицание"""
+    left = (np.arange(24000) % 2000).astype(np.int16)
+    audio = np.stack([left, -left], axis=1)
+    path = tmp_path / 'speech.wav'
+    _write_wav(path, audio, 48000)
+    return path, audio
+
+
+def _read_all(stream, frames=1000):
+    blocks = []
+    while True:
+        try:
+            blocks.append(stream.read(frames))
+        except EOFError:
+            return np.concatenate(blocks)
+
+
+class TestFileSource:
+    """Воспроизведение файла"""
+
+    def test_fast_playback_returns_file(self, stereo_wav):
+        path, audio = stereo_wav
+        source = FileSource(str(path), speed=0)
+
+        index, info = source.default_device('loopback')
+        stream = source.open_stream(index, 'loopback')
+
+        assert info['defaultSampleRate'] == 48000
+        assert stream.channels == 2
+        assert not stream.paced
+        np.testing.assert_array_equal(_read_all(stream), audio)
+
+    def test_loop_rewinds(self, stereo_wav):
+        path, audio = stereo_wav
+        stream = FileSource(str(path), speed=0, loop=True).open_stream(0, 'loopback')
+
+        stream.read(len(audio))
+        block = stream.read(10)
+
+        np.testing.assert_array_equal(block, audio[:10])
+
+    def test_realtime_playback_is_paced(self, stereo_wav):
+        path, _ = stereo_wav
+        stream = FileSource(str(path)).open_stream(0, 'loopback')
+        t0 = time.monotonic()
+
+        stream.read(4800)
+
+        assert time.monotonic() - t0 >= 0.09
+
+
+class TestSourceReader:
+    """Приведение потока к моно 16 кГц"""
+
+    def test_int16_output(self, stereo_wav):
+        path, _ = stereo_wav
+        stream = FileSource(str(path), speed=0).open_stream(0, 'loopback')
+        reader = SourceReader(stream, block_frames=4800)
+
+        audio, _ = reader.read()
+
+        assert audio.dtype == np.int16
+        assert len(audio) == 1600
+        # Каналы в противофазе: моно - тишина
+        assert np.abs(audio).max() <= 1
+
+    def test_downmix_reuses_buffer(self):
+        """Сведение каналов пишется на месте в один буфер на все блоки"""
+        stream = SyntheticSource({0: SyntheticDevice('Tone', 16000, 2)}, speed=0).open_stream(0, 'loopback')
+        reader = SourceReader(stream, dtype=np.float32)
+        block = np.array([[100, 300], [-32768, -32768]], dtype=np.int16)
+
+        first = reader.downmix(block)
+        np.testing.assert_allclose(first, [200 / 32768, -1.0])
+        second = reader.downmix(block[:1])
+
+        assert np.shares_memory(first, second)
+
+    def test_float32_output_is_scaled(self):
+        source = SyntheticSource({0: SyntheticDevice('Tone', 16000, 1, amplitude=0.5)}, speed=0)
+        reader = SourceReader(source.open_stream(0, 'microphone'), dtype=np.float32)
+
+        audio, _ = reader.read()
+
+        assert audio.dtype == np.float32
+        assert 0.45 < np.abs(audio).max() <= 0.5
+
+
+class TestSyntheticSource:
+    """Виртуальные устройства"""
+
+    def test_signals(self):
+        source = SyntheticSource({
+            0: SyntheticDevice('Noise', signal='noise', amplitude=0.1),
+            1: SyntheticDevice('Silence', signal='silence'),
+        }, speed=0)
+
+        noise = source.open_stream(0, 'loopback').read(4800)
+        silence = source.open_stream(1, 'loopback').read(4800)
+
+        assert noise.shape == (4800, 2)
+        assert 0 < np.abs(noise).max() <= 0.1 * 32767 + 1
+        assert not silence.any()
+
+    def test_list_devices(self):
+        source = SyntheticSource({0: SyntheticDevice('A'), 3: SyntheticDevice('B')})
+
+        assert [d['index'] for d in source.list_devices()] == [0, 3]
+        assert source.default_device('microphone')[1]['isLoopbackDevice'] is False
+
+
+class TestCreateAudioSource:
+    """Выбор источника по описанию из командной строки"""
+
+    def test_file_and_synthetic(self, stereo_wav):
+        path, _ = stereo_wav
+
+        file_source = create_audio_source(f'file:{path}', speed=0, loop=True)
+        synthetic = create_audio_source('synthetic', speed=2.0)
+
+        assert isinstance(file_source, FileSource)
+        assert file_source.loop and file_source.speed == 0
+        assert isinstance(synthetic, SyntheticSource)
+        assert synthetic.speed == 2.0
+
+    def test_unknown_source(self):
+        with pytest.raises(ValueError):
+            create_audio_source('file:')
+        with pytest.raises(ValueError):
+            create_audio_source('alsa')
+
+    def test_auto_without_backends(self):
+        with patch('audio.sources.importlib.util.find_spec', return_value=None):
+            with pytest.raises(RuntimeError):
+                create_audio_source('auto')
+
+
+class _FakePyAudio:
+    """PyAudio с заданным списком устройств и записью открытых потоков"""
+
+    def __init__(self, devices, wasapi_loopback=None):
+        self.devices = devices
+        self.wasapi_loopback = wasapi_loopback
+        self.opened = []
+
+    def module(self):
+        fake = self
+
+        class PyAudio:
+            def get_device_count(self):
+                return len(fake.devices)
+
+            def get_device_info_by_index(self, index):
+                return fake.devices[index]
+
+            def get_default_wasapi_loopback(self):
+                if fake.wasapi_loopback is None:
+                    raise LookupError('no default loopback')
+                return fake.devices[fake.wasapi_loopback]
+
+            def open(self, **kwargs):
+                fake.opened.append(kwargs)
+                stream = MagicMock()
+                frames = np.tile(np.arange(kwargs['channels'], dtype=np.int16) * 1000,
+                                 (DEVICE_BLOCK_FRAMES, 1))
+                stream.read.return_value = frames.tobytes()
+                return stream
+
+            def terminate(self):
+                pass
+
+        return MagicMock(PyAudio=PyAudio, paInt16=8)
+
+
+DEVICES = [
+    audio_device('Microsoft Sound Mapper - Input', 0),
+    audio_device('Default Input (Realtek Microphone)', 1, channels=1),
+    audio_device('Speakers (Realtek) [Loopback]', 2, loopback=True),
+    audio_device('Home Theater 7.1 [Loopback]', 3, channels=8, loopback=True),
+]
+
+
+class TestPyAudioSource:
+    """Выбор loopback и открытие потока pyaudiowpatch"""
+
+    @pytest.mark.parametrize('wasapi_loopback, expected', [(3, 3), (None, 2)])
+    def test_loopback_ignores_mme_inputs(self, wasapi_loopback, expected):
+        """Sound Mapper и 'Default...' - микрофонные входы, loopback берётся только явный"""
+        fake = _FakePyAudio(DEVICES, wasapi_loopback)
+        with patch.dict(sys.modules, {'pyaudiowpatch': fake.module()}):
+            index, info = PyAudioSource().default_device('loopback')
+
+        assert index == expected
+        assert info['isLoopbackDevice']
+
+    def test_surround_loopback_opened_with_device_channels(self):
+        fake = _FakePyAudio(DEVICES, 3)
+        with patch.dict(sys.modules, {'pyaudiowpatch': fake.module()}):
+            stream = PyAudioSource().open_stream(3, 'loopback')
+            block = stream.read(DEVICE_BLOCK_FRAMES)
+
+        assert fake.opened[0]['channels'] == 8
+        assert stream.channels == 2
+        assert block.shape == (DEVICE_BLOCK_FRAMES, 2)
+        # Левый: FL (0) + центр, тыл и боковой слева; LFE (3000) не попадает
+        assert block[0, 0] == pytest.approx(SURROUND_GAIN * (2000 + 4000 + 6000), abs=1)
+        assert block[0, 1] == pytest.approx(1000 + SURROUND_GAIN * (2000 + 5000 + 7000), abs=1)
+
+    def test_stereo_downmix_matrix(self):
+        np.testing.assert_allclose(stereo_downmix_matrix(4),
+                                   [[1, 0], [0, 1], [SURROUND_GAIN, 0], [0, SURROUND_GAIN]])
+        six = stereo_downmix_matrix(6)
+        np.testing.assert_allclose(six[2], [SURROUND_GAIN, SURROUND_GAIN])
+        np.testing.assert_array_equal(six[3], [0, 0])
+
+
+class TestHeadless:
+    """Захват и определение режима без pyaudiowpatch"""
+
+    def test_modules_import_without_pyaudiowpatch(self):
+        import audio_mode_detector
+        import device_monitor
+        with patch.dict(sys.modules, {'pyaudiowpatch': None, 'sounddevice': None}):
+            try:
+                importlib.reload(device_monitor)
+                importlib.reload(audio_mode_detector)
+
+                assert audio_mode_detector.get_audio_mode() == 'loopback'
+                assert audio_mode_detector.list_audio_devices() == ([], [])
+            finally:
+                importlib.reload(device_monitor)
+                importlib.reload(audio_mode_detector)
+
+    def test_device_monitor_uses_source(self):
+        from device_monitor import AudioDeviceMonitor
+
+        source = SyntheticSource({0: SyntheticDevice('Speakers'), 1: SyntheticDevice('Headset')})
+        changes = []
+        monitor = AudioDeviceMonitor(callback=lambda i, info: changes.append(info['name']),
+                                     source=source)
+
+        monitor.check_device_change()
+        source.set_default(1)
+        monitor.check_device_change()
+
+        assert changes == ['Speakers', 'Headset']
+
+    def test_file_capture_waits_for_consumer(self, tmp_path):
+        """Файл без пауз не теряет блоки на маленьком буфере захвата"""
+        from dynamic_audio_capture import DynamicAudioCapture
+
+        audio = np.full((32000, 1), 1000, dtype=np.int16)
+        path = tmp_path / 'long.wav'
+        _write_wav(path, audio, 16000)
+        capture = DynamicAudioCapture(mode='loopback', ring_seconds=0.25,
+                                      source=FileSource(str(path), speed=0))
+
+        capture.start()
+        received = 0
+        try:
+            deadline = time.monotonic() + 5
+            while not capture.finished or len(capture.ring):
+                assert time.monotonic() < deadline
+                chunk = capture.get_audio_chunk(timeout=0.05)
+                if chunk is not None:
+                    received += len(chunk)
+        finally:
+            capture.stop()
+
+        assert received == 32000
+        assert capture.ring.overruns == 0
+        assert capture.get_stats()['source'] == 'file'
@@ -5,7 +5,7 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
 
-from classification import classify_question, build_contextual_prompt
+from classification import classify_question
 
 
 def test_classify_experience_question():
@@ -31,66 +31,6 @@ def test_classify_general_question():
     assert classify_question('Понятно') == 'general'
 
 
-def test_build_contextual_prompt_experience():
-    """Тест построения промпта для вопросов про опыт"""
-    context = 'Python разработчик, 3 года опыта'
-    
-    prompt = build_contextual_prompt('experience', context)
-    assert 'резюме' in prompt.lower()
-    assert context in prompt
-    assert 'проект' in prompt.lower()
-    assert 'технологии' in prompt.lower()
-
-
-def test_build_contextual_prompt_technical():
-    """Тест построения промпта для технических вопросов"""
-    context = 'Python разработчик, 3 года опыта'
-    
-    prompt = build_contextual_prompt('technical', context)
-    # Technical промпт должен содержать инструкции по формату
-    assert len(prompt) > 100
-    # Technical промпт теперь включает краткий контекст кандидата
-    assert 'контекст' in prompt.lower() or 'кандидат' in prompt.lower()
-
-
-def test_build_contextual_prompt_general():
-    """Тест построения промпта для общих вопросов"""
-    context = 'Python разработчик, 3 года опыта'
-    
-    prompt = build_contextual_prompt('general', context)
-    assert context in prompt
-    assert 'ассистент' in prompt.lower()
-
-
-def test_build_contextual_prompt_short():
-    """Тест что промпты разумного размера"""
-    context = 'X' * 2000  # Длинный контекст
-    
-    # Technical теперь включает контекст (до 500 символов)
-    tech_prompt = build_contextual_prompt('technical', context)
-    assert len(tech_prompt) < 2000  # увеличен лимит
-    
-    # Experience должен обрезать контекст (до 2000 символов)
-    exp_prompt = build_contextual_prompt('experience', context)
-    assert len(exp_prompt) < 4000
-    
-    # General должен обрезать контекст (до 800 символов)
-    gen_prompt = build_contextual_prompt('general', context)
-    assert len(gen_prompt) < 2000
-
-
-def test_build_contextual_prompt_with_vacancy():
-    """Тест разделения контекста с вакансией (строки 70-72)"""
-    context = """Опыт работы с Python 5 лет
-## Вакансия:
-Требуется Senior Python Developer с опытом Django"""
-    
-    # Для вопросов про опыт должен разделить контекст
-    prompt = build_contextual_prompt('experience', context)
-    assert 'Python 5 лет' in prompt
-    assert 'Senior Python Developer' in prompt
-
-
 def test_get_max_tokens_for_type():
     """Тест get_max_tokens_for_type"""
     from classification import get_max_tokens_for_type
@@ -109,3 +49,36 @@ def test_get_temperature_for_type():
     assert get_temperature_for_type('technical') == 0.5
     assert get_temperature_for_type('general') == 0.7
     assert get_temperature_for_type('unknown') == 0.7  # fallback
+
+
+def test_build_profile_prefix_does_not_depend_on_question():
+    """Статичный префикс одинаков для всех типов вопросов, формат ответа отдельно"""
+    from classification import build_profile_prefix, build_type_instructions
+
+    context = 'Python разработчик, Django, FastAPI\n\n## Вакансия:\nBackend Developer'
+    prefix = build_profile_prefix(context, 'job_interview_ru')
+
+    assert 'Django' in prefix
+    assert 'Backend Developer' in prefix
+    assert prefix == build_profile_prefix(context, 'job_interview_ru')
+    assert 'STAR' in build_type_instructions('experience')
+    assert 'STAR' not in prefix
+    assert build_type_instructions('technical') != build_type_instructions('general')
+
+
+def test_build_type_instructions_static_profile():
+    """У профилей не собеседований формат уже в системном промпте"""
+    from classification import build_type_instructions
+
+    assert build_type_instructions('experience', 'business_meeting') == ''
+
+
+def test_build_profile_prefix_truncates_resume():
+    """Резюме в префиксе обрезается, вакансия идёт целиком"""
+    from classification import build_profile_prefix
+
+    prefix = build_profile_prefix('X' * 3000 + '\n## Вакансия:\nSenior Python Developer')
+
+    assert 'X' * 2000 in prefix and 'X' * 2001 not in prefix
+    assert 'Senior Python Developer' in prefix
+    assert 'ассистент' in prefix.lower()
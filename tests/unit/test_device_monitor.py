@@ -0,0 +1,184 @@
+"""
+Модульные тесты для device_monitor.py
+"""
+import time
+from unittest.mock import patch
+
+import pytest
+
+from audio.sources import SyntheticDevice, SyntheticSource
+from conftest import wait_for
+from device_monitor import AudioDeviceMonitor
+
+
+class CountingSource(SyntheticSource):
+    """Виртуальные устройства со счётчиком полных обходов и сменным loopback"""
+
+    hot_swap = True
+
+    def __init__(self):
+        super().__init__({
+            0: SyntheticDevice('Speakers'),
+            1: SyntheticDevice('Headset'),
+            2: SyntheticDevice('USB Mic', channels=1),
+        })
+        self.loopback = 0
+        self.scans = 0
+
+    def fingerprint(self):
+        return super().fingerprint(), self.loopback
+
+    def list_devices(self):
+        self.scans += 1
+        return super().list_devices()
+
+    def default_device(self, mode, devices=None):
+        if mode == 'loopback':
+            return self.loopback, self._info(self.loopback, mode)
+        return super().default_device(mode, devices)
+
+
+@pytest.fixture
+def source():
+    return CountingSource()
+
+
+class TestEnumerationCache:
+    """Полный обход устройств только при смене отпечатка"""
+
+    def test_same_fingerprint_skips_scan(self, source):
+        monitor = AudioDeviceMonitor(source=source)
+
+        monitor.snapshot()
+        assert not monitor.refresh()
+        monitor.get_default_input_device()
+        monitor.get_default_loopback_device()
+
+        assert source.scans == 1
+        stats = monitor.get_stats()
+        assert stats['polls'] == 2
+        assert stats['fingerprint_hits'] == 1
+        assert stats['devices'] == 3
+
+    def test_changed_fingerprint_rescans(self, source):
+        monitor = AudioDeviceMonitor(source=source)
+        monitor.snapshot()
+
+        source.set_default(2)
+
+        assert monitor.refresh()
+        assert source.scans == 2
+        assert monitor.get_default_input_device()[1]['name'] == 'USB Mic'
+
+    def test_scan_timings_are_reported(self, source):
+        monitor = AudioDeviceMonitor(source=source)
+        monitor.refresh()
+
+        stats = monitor.get_stats()
+
+        assert stats['scans'] == 1
+        assert stats['last_scan_ms'] >= 0
+        assert stats['max_scan_ms'] == stats['last_scan_ms']
+
+
+class TestChangeDetection:
+    """Смена микрофона и loopback"""
+
+    def test_loopback_change_notifies_subscribers(self, source):
+        mic_changes, loopback_changes = [], []
+        monitor = AudioDeviceMonitor(callback=lambda i, info: mic_changes.append(info['name']),
+                                     source=source)
+        monitor.subscribe('loopback', lambda i, info: loopback_changes.append(info['name']))
+        monitor.check_device_change()
+
+        source.loopback = 1
+        assert monitor.check_device_change()
+
+        assert loopback_changes == ['Speakers', 'Headset']
+        assert mic_changes == ['Speakers']
+        assert monitor.current['loopback'][0] == 1
+
+    def test_unchanged_devices_report_no_change(self, source):
+        monitor = AudioDeviceMonitor(source=source)
+        monitor.check_device_change()
+
+        assert not monitor.check_device_change()
+        assert monitor.get_stats()['changes'] == 2
+
+    def test_failing_listener_does_not_stop_others(self, source):
+        received = []
+        monitor = AudioDeviceMonitor(source=source)
+        monitor.subscribe('microphone', lambda i, info: 1 / 0)
+        monitor.subscribe('microphone', lambda i, info: received.append(i))
+
+        monitor.check_device_change()
+
+        assert received == [0]
+
+    def test_unsubscribe_counts_remaining(self, source):
+        monitor = AudioDeviceMonitor(source=source)
+
+        def listener(i, info):
+            pass
+
+        monitor.subscribe('loopback', listener)
+        monitor.subscribe('microphone', listener)
+
+        assert monitor.unsubscribe('loopback', listener) == 1
+        assert monitor.unsubscribe('microphone', listener) == 0
+
+
+class TestAdaptivePolling:
+    """Интервал растёт без изменений и сбрасывается при изменении"""
+
+    def test_backoff_and_poke(self, source):
+        monitor = AudioDeviceMonitor(source=source, check_interval=0.01,
+                                     max_interval=0.05, backoff=2.0)
+        monitor.start_monitoring()
+        try:
+            assert wait_for(lambda: monitor.interval == 0.05)
+            polls = monitor.polls
+
+            monitor.poke()
+            assert wait_for(lambda: monitor.polls > polls)
+            # Изменение сбрасывает интервал к минимальному
+            source.set_default(1)
+            monitor.poke()
+            assert wait_for(lambda: monitor.current['microphone'][0] == 1)
+        finally:
+            monitor.stop_monitoring()
+
+        assert monitor.scans == 2
+        assert monitor.fingerprint_hits >= 2
+
+    def test_stop_does_not_wait_for_interval(self, source):
+        monitor = AudioDeviceMonitor(source=source, check_interval=5.0)
+        monitor.start_monitoring()
+        t0 = time.monotonic()
+
+        monitor.stop_monitoring()
+
+        assert time.monotonic() - t0 < 1.0
+
+
+class TestCaptureIntegration:
+    """DynamicAudioCapture берёт устройство из снимка монитора"""
+
+    def test_capture_switches_on_loopback_change(self, source):
+        from dynamic_audio_capture import DynamicAudioCapture
+
+        with patch('dynamic_audio_capture.log_metric'):
+            capture = DynamicAudioCapture(mode='loopback', source=source)
+            capture.device_monitor.check_interval = 0.02
+            capture.start()
+            try:
+                assert wait_for(lambda: capture.current_device_name == 'Speakers')
+                source.loopback = 1
+                capture.device_monitor.poke()
+                assert wait_for(lambda: capture.switches == 1)
+            finally:
+                capture.stop()
+
+        assert capture.current_device_name == 'Headset'
+        assert not capture.device_monitor.running
+        assert capture.get_stats()['monitor']['changes'] == 1
@@ -0,0 +1,262 @@
+"""
+Модульные тесты для llm/cancellation.py и отмены стримов /hint/stream
+"""
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from aiohttp import web
+
+from llm.cancellation import CANCEL_DISCONNECT, CANCEL_SUPERSEDED, GenerationRegistry
+from llm.http_pool import OllamaHTTP
+from llm.ollama_client import OllamaClient
+
+
+@pytest.fixture(autouse=True)
+def no_metrics_file():
+    with patch('llm.cancellation.log_hint_cancelled') as logged:
+        yield logged
+
+
+async def _tokens(n, delay, closed=None):
+    """Источник токенов; closed фиксирует, что генерацию прервали"""
+    try:
+        for i in range(n):
+            await asyncio.sleep(delay)
+            yield f't{i}'
+    finally:
+        if closed is not None:
+            closed.append(True)
+
+
+class TestGenerationRegistry:
+    """Отмена генераций и счётчики"""
+
+    @pytest.mark.asyncio
+    async def test_completed_generation(self, no_metrics_file):
+        registry = GenerationRegistry()
+        handle = registry.begin('s1')
+
+        chunks = [c async for c in registry.run(handle, _tokens(3, 0))]
+
+        assert chunks == ['t0', 't1', 't2']
+        assert not handle.cancelled
+        assert registry.get_stats()['completed'] == 1
+        assert registry.get_stats()['in_flight'] == 0
+        no_metrics_file.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_new_request_supersedes_session(self, no_metrics_file):
+        registry = GenerationRegistry()
+        closed = []
+        first = registry.begin('s1')
+        consumer = asyncio.create_task(
+            _collect(registry.run(first, _tokens(100, 0.01, closed))))
+        await asyncio.sleep(0.05)
+
+        second = registry.begin('s1')
+        chunks = await asyncio.wait_for(consumer, timeout=1)
+
+        assert first.reason == CANCEL_SUPERSEDED
+        assert closed == [True]
+        assert 0 < len(chunks) < 100
+        assert not second.cancelled
+        assert registry.in_flight('s1') == 1
+        stats = registry.get_stats()
+        assert stats['cancelled'] == {CANCEL_DISCONNECT: 0, CANCEL_SUPERSEDED: 1}
+        assert stats['cancelled_chunks'] == len(chunks)
+        no_metrics_file.assert_called_once()
+        assert no_metrics_file.call_args[0][0] == CANCEL_SUPERSEDED
+
+    @pytest.mark.asyncio
+    async def test_other_session_and_opt_out_keep_running(self):
+        registry = GenerationRegistry()
+        first = registry.begin('s1')
+        registry.begin('s2')
+        registry.begin('s1', latest_wins=False)
+        registry.begin(None)
+
+        assert not first.cancelled
+        assert registry.in_flight('s1') == 2
+
+    @pytest.mark.asyncio
+    async def test_superseded_before_start(self):
+        registry = GenerationRegistry()
+        closed = []
+        first = registry.begin('s1')
+        registry.begin('s1')
+
+        chunks = await _collect(registry.run(first, _tokens(5, 0.01, closed)))
+
+        assert chunks == []
+        assert first.reason == CANCEL_SUPERSEDED
+
+    @pytest.mark.asyncio
+    async def test_disconnect_detected_by_polling(self):
+        registry = GenerationRegistry(poll_interval=0.01)
+        closed = []
+        gone = asyncio.Event()
+
+        async def is_disconnected():
+            return gone.is_set()
+
+        handle = registry.begin()
+        consumer = asyncio.create_task(
+            _collect(registry.run(handle, _tokens(100, 0.01, closed), is_disconnected)))
+        await asyncio.sleep(0.03)
+        gone.set()
+        await asyncio.wait_for(consumer, timeout=1)
+
+        assert handle.reason == CANCEL_DISCONNECT
+        assert closed == [True]
+        assert registry.get_stats()['cancelled'][CANCEL_DISCONNECT] == 1
+
+    @pytest.mark.asyncio
+    async def test_closed_response_counts_as_disconnect(self):
+        registry = GenerationRegistry()
+        closed = []
+        handle = registry.begin()
+        stream = registry.run(handle, _tokens(100, 0.01, closed))
+
+        assert await stream.__anext__() == 't0'
+        await stream.aclose()
+        await asyncio.sleep(0.01)
+
+        assert handle.reason == CANCEL_DISCONNECT
+        assert closed == [True]
+
+    @pytest.mark.asyncio
+    async def test_source_error_propagates(self):
+        registry = GenerationRegistry()
+
+        async def broken():
+            yield 'a'
+            raise RuntimeError('boom')
+
+        handle = registry.begin()
+        with pytest.raises(RuntimeError):
+            await _collect(registry.run(handle, broken()))
+        assert registry.get_stats()['completed'] == 1
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+class TestUpstreamAbort:
+    """Отмена закрывает соединение к Ollama, а не только SSE-ответ"""
+
+    @pytest.mark.asyncio
+    async def test_cancel_closes_ollama_request(self):
+        aborted = asyncio.Event()
+
+        async def chat(request):
+            await request.json()
+            resp = web.StreamResponse()
+            resp.content_type = 'application/x-ndjson'
+            await resp.prepare(request)
+            try:
+                for i in range(200):
+                    await asyncio.sleep(0.01)
+                    await resp.write(json.dumps({'message': {'content': f't{i}'}}).encode() + b'\n')
+            except (ConnectionResetError, asyncio.CancelledError):
+                aborted.set()
+                raise
+            return resp
+
+        app = web.Application()
+        app.router.add_post('/api/chat', chat)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        url = f'http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}'
+
+        cache = MagicMock()
+        cache.get.return_value = None
+        semantic = MagicMock()
+        semantic.get.return_value = (None, 0)
+        rag = MagicMock()
+        rag.build_request_notes.return_value = 'notes'
+        rag.get_adaptive_context.return_value = []
+        http = OllamaHTTP()
+        client = OllamaClient(url, 'qwen', cache, http=http)
+        registry = GenerationRegistry()
+        try:
+            with patch('llm.ollama_client.get_semantic_cache', return_value=semantic), \
+                    patch('llm.ollama_client.get_advanced_rag', return_value=rag), \
+                    patch('llm.ollama_client.log_llm_request'), \
+                    patch('llm.ollama_client.log_llm_response'):
+                handle = registry.begin('s1')
+                stream = registry.run(handle, client.generate_stream('Что такое GIL?', []))
+                assert await stream.__anext__() == 't0'
+                registry.begin('s1')
+                rest = await _collect(stream)
+                await asyncio.wait_for(aborted.wait(), timeout=1)
+        finally:
+            await http.close()
+            await runner.cleanup()
+
+        assert handle.reason == CANCEL_SUPERSEDED
+        assert len(rest) < 199
+
+
+class TestStreamEndpoint:
+    """Политика latest-wins в /hint/stream"""
+
+    def test_second_request_cancels_first(self):
+        from fastapi.testclient import TestClient
+        from llm_server import app, generations
+
+        started = threading.Event()
+        closed = []
+
+        async def fake_stream(text, context, params, **kwargs):
+            if text.startswith('Первый'):
+                started.set()
+                async for chunk in _tokens(500, 0.01, closed):
+                    yield chunk
+            else:
+                yield 'новый'
+
+        db = MagicMock()
+        db.get_instant_answer.return_value = None
+        before = generations.get_stats()['cancelled'][CANCEL_SUPERSEDED]
+        first_events = []
+
+        def first_request():
+            with TestClient(app).stream('POST', '/hint/stream', json={
+                    'text': 'Первый вопрос про GIL', 'session_id': 'call-1'}) as response:
+                for line in response.iter_lines():
+                    if line.startswith('data: '):
+                        first_events.append(json.loads(line[6:]))
+
+        with patch('llm_server.get_vector_db', return_value=db), \
+                patch('llm_server.hint_cache.get', return_value=None), \
+                patch('llm_server.ollama.generate_stream', side_effect=fake_stream):
+            thread = threading.Thread(target=first_request)
+            thread.start()
+            assert started.wait(timeout=2)
+            t0 = time.monotonic()
+            second = TestClient(app).post('/hint/stream', json={
+                'text': 'Второй вопрос про GIL', 'session_id': 'call-1'})
+            thread.join(timeout=2)
+
+        assert not thread.is_alive()
+        assert time.monotonic() - t0 < 2
+        assert closed == [True]
+        assert first_events[-1] == {'done': True, 'cancelled': CANCEL_SUPERSEDED}
+        assert '"chunk": "новый"' in second.text
+        assert generations.get_stats()['cancelled'][CANCEL_SUPERSEDED] == before + 1
+
+    def test_extra_fields_still_rejected(self):
+        from fastapi.testclient import TestClient
+        from llm_server import app
+
+        response = TestClient(app).post('/hint/stream', json={
+            'text': 'Что такое GIL?', 'session_id': 'call-1', 'unknown': 1})
+
+        assert response.status_code == 400
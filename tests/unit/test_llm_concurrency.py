@@ -0,0 +1,132 @@
+"""
+Модульные тесты для llm/concurrency.py и параллельных запросов llm_server
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from llm.concurrency import ModelSlots
+
+
+class TestModelSlots:
+    """Семафор на модель"""
+
+    @pytest.mark.asyncio
+    async def test_same_model_waits_for_slot(self):
+        slots = ModelSlots(limit=1)
+        order = []
+
+        async def job(name, delay):
+            async with slots.hold('qwen'):
+                order.append(f'{name}+')
+                await asyncio.sleep(delay)
+                order.append(f'{name}-')
+
+        await asyncio.gather(job('a', 0.05), job('b', 0))
+
+        assert order == ['a+', 'a-', 'b+', 'b-']
+        assert slots.get_stats()['waited'] == 1
+        assert slots.active('qwen') == 0
+
+    @pytest.mark.asyncio
+    async def test_other_model_does_not_wait(self):
+        slots = ModelSlots(limit=1)
+        await slots.acquire('qwen')
+
+        await asyncio.wait_for(slots.acquire('gemma'), timeout=0.5)
+
+        assert slots.active('qwen') == 1
+        assert slots.active('gemma') == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_passes_slot_on(self):
+        slots = ModelSlots(limit=1)
+        await slots.acquire('qwen')
+        cancelled = asyncio.create_task(slots.acquire('qwen'))
+        waiting = asyncio.create_task(slots.acquire('qwen'))
+        await asyncio.sleep(0)
+
+        cancelled.cancel()
+        slots.release('qwen')
+        await asyncio.wait_for(waiting, timeout=0.5)
+
+        assert cancelled.cancelled()
+        assert slots.active('qwen') == 1
+        assert slots.waiting('qwen') == 0
+
+    @pytest.mark.asyncio
+    async def test_release_from_worker_thread(self):
+        slots = ModelSlots(limit=1)
+        await slots.acquire('qwen')
+        waiter = asyncio.create_task(slots.acquire('qwen'))
+        await asyncio.sleep(0)
+
+        threading.Thread(target=slots.release, args=('qwen',)).start()
+
+        await asyncio.wait_for(waiter, timeout=0.5)
+        assert slots.active('qwen') == 1
+
+    def test_invalid_limit(self):
+        with pytest.raises(ValueError):
+            ModelSlots(limit=0)
+
+
+class TestConcurrentHints:
+    """Запросы с разными моделями и профилями идут параллельно"""
+
+    def test_requests_do_not_share_client_state(self):
+        from fastapi.testclient import TestClient
+        from llm_server import app, ollama
+
+        seen = []
+        barrier = threading.Barrier(2, timeout=2)
+
+        def fake_generate(text, context, max_tokens, temperature, params):
+            # Оба запроса одновременно внутри генерации: глобальной блокировки нет
+            barrier.wait()
+            seen.append((params.model, params.profile))
+            return f'{params.model}/{params.profile}'
+
+        original = (ollama.model, ollama.profile)
+        client = TestClient(app)
+        results = {}
+
+        def post(model, profile):
+            response = client.post('/hint', json={'text': 'Расскажите про GIL', 'model': model,
+                                                  'profile': profile})
+            results[model] = response.json()['hint']
+
+        with patch('llm_server.ollama.generate', side_effect=fake_generate):
+            threads = [threading.Thread(target=post, args=args)
+                       for args in (('qwen3:8b', 'interview'), ('gemma3:4b', 'business_meeting'))]
+            t0 = time.monotonic()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(timeout=5)
+
+        assert time.monotonic() - t0 < 2
+        assert results == {'qwen3:8b': 'qwen3:8b/interview', 'gemma3:4b': 'gemma3:4b/business_meeting'}
+        assert (ollama.model, ollama.profile) == original
+
+    def test_stream_reports_request_question_type(self):
+        from fastapi.testclient import TestClient
+        from llm_server import app
+
+        async def fake_stream(text, context, params, **kwargs):
+            params.question_type = 'technical'
+            params.metrics.request_started()
+            yield 'ответ'
+
+        db = MagicMock()
+        db.get_instant_answer.return_value = None
+        with patch('llm_server.get_vector_db', return_value=db), \
+                patch('llm_server.hint_cache.get', return_value=None), \
+                patch('llm_server.ollama.generate_stream', side_effect=fake_stream):
+            response = TestClient(app).post('/hint/stream', json={'text': 'Что такое GIL в Python?'})
+
+        events = [line for line in response.text.split('\n') if line.startswith('data: ')]
+        assert '"question_type": "technical"' in events[-1]
@@ -0,0 +1,162 @@
+"""
+Модульные тесты для llm/http_pool.py и стрима OllamaClient через общий пул
+"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+
+import pytest
+from aiohttp import web
+
+from llm.http_pool import OllamaHTTP, PhaseTimeouts
+from llm.ollama_client import OllamaClient
+
+
+def _chat_app(delays=(0, 0)):
+    """Мини-Ollama: /api/chat стримит два токена с заданными паузами"""
+
+    async def chat(request):
+        await request.json()
+        resp = web.StreamResponse()
+        resp.content_type = 'application/x-ndjson'
+        await resp.prepare(request)
+        for i, delay in enumerate(delays):
+            await asyncio.sleep(delay)
+            await resp.write(json.dumps({'message': {'content': f't{i}'}}).encode() + b'\n')
+        await resp.write(json.dumps({'message': {'content': ''}, 'done': True}).encode() + b'\n')
+        await resp.write_eof()
+        return resp
+
+    app = web.Application()
+    app.router.add_post('/api/chat', chat)
+    return app
+
+
+async def _serve(app):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}'
+
+
+def _client(url, http):
+    cache = MagicMock()
+    cache.get.return_value = None
+    return OllamaClient(url, 'qwen', cache, http=http)
+
+
+@pytest.fixture
+def no_side_effects():
+    semantic = MagicMock()
+    semantic.get.return_value = (None, 0)
+    rag = MagicMock()
+    rag.build_request_notes.return_value = 'notes'
+    rag.get_adaptive_context.return_value = []
+    with patch('llm.ollama_client.get_semantic_cache', return_value=semantic), \
+            patch('llm.ollama_client.get_advanced_rag', return_value=rag), \
+            patch('llm.ollama_client.log_llm_request'), \
+            patch('llm.ollama_client.log_llm_response'), \
+            patch('llm.ollama_client.log_error'):
+        yield
+
+
+class TestAsyncPool:
+    """Стримы идут через одно keep-alive соединение"""
+
+    @pytest.mark.asyncio
+    async def test_streams_reuse_connection(self, no_side_effects):
+        runner, url = await _serve(_chat_app())
+        http = OllamaHTTP()
+        client = _client(url, http)
+        try:
+            for _ in range(3):
+                chunks = [c async for c in client.generate_stream('Что такое GIL?', [])]
+                assert chunks == ['t0', 't1']
+        finally:
+            await http.close()
+            await runner.cleanup()
+
+        stats = http.get_stats()['async']
+        assert stats == {'requests': 3, 'connections': 1, 'reused': 2, 'sessions': 1}
+
+    @pytest.mark.asyncio
+    async def test_inter_token_timeout(self, no_side_effects):
+        runner, url = await _serve(_chat_app(delays=(0, 0.5)))
+        http = OllamaHTTP(PhaseTimeouts(inter_token=0.1))
+        client = _client(url, http)
+        try:
+            chunks = [c async for c in client.generate_stream('Что такое GIL?', [])]
+        finally:
+            await http.close()
+            await runner.cleanup()
+
+        assert chunks[0] == 't0'
+        assert 'токены' in chunks[1]
+
+    @pytest.mark.asyncio
+    async def test_first_byte_timeout(self, no_side_effects):
+        runner, url = await _serve(_chat_app(delays=(0.5, 0)))
+        http = OllamaHTTP(PhaseTimeouts(first_byte=0.1))
+        client = _client(url, http)
+        try:
+            chunks = [c async for c in client.generate_stream('Что такое GIL?', [])]
+        finally:
+            await http.close()
+            await runner.cleanup()
+
+        assert len(chunks) == 1
+        assert 'ожидания ответа' in chunks[0]
+
+    def test_new_event_loop_gets_new_session(self):
+        http = OllamaHTTP()
+
+        async def open_and_check():
+            session = await http.open()
+            assert await http.open() is session
+            return session
+
+        first = asyncio.run(open_and_check())
+        second = asyncio.run(open_and_check())
+
+        assert first is not second
+        assert http.get_stats()['async']['sessions'] == 2
+
+
+class _TagsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({'models': []}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSyncPool:
+    """Синхронные вызовы через requests.Session"""
+
+    def test_sync_calls_reuse_connection(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _TagsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        http = OllamaHTTP()
+        client = _client(f'http://127.0.0.1:{server.server_address[1]}', http)
+        try:
+            assert client._check_available()
+            assert client.list_models() == []
+            assert client._check_available()
+            stats = http.get_stats()['sync']
+        finally:
+            http.close_sync()
+            server.shutdown()
+            server.server_close()
+
+        assert stats == {'requests': 3, 'connections': 1, 'reused': 2}
@@ -0,0 +1,150 @@
+"""
+Модульные тесты для llm/prompt_layout.py и стабильного префикса промпта OllamaClient
+"""
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from aiohttp import web
+
+from llm.http_pool import OllamaHTTP
+from llm.ollama_client import OllamaClient
+from llm.prompt_layout import PrefixCacheStats, build_prompt_layout
+from prompts import get_few_shot_examples
+
+FEW_SHOT = [{'user': 'Расскажите о себе', 'assistant': 'Я Python разработчик'}]
+
+
+class TestBuildPromptLayout:
+    """Префикс не зависит от материала запроса"""
+
+    def test_prefix_is_stable_across_requests(self):
+        first = build_prompt_layout('SYSTEM', FEW_SHOT, ['Интервьюер: привет'], 'Что такое GIL?',
+                                    instructions='## Формат: кратко', notes='RAG: Django')
+        second = build_prompt_layout('SYSTEM', FEW_SHOT, [], 'Расскажите про проект',
+                                     instructions='## Формат: STAR', notes='Темы: python')
+
+        assert first.prefix_hash == second.prefix_hash
+        assert first.prefix_messages == second.prefix_messages == 3
+        assert first.messages[:3] == second.messages[:3]
+        assert first.messages[3]['content'] == 'Контекст разговора:\nИнтервьюер: привет'
+        assert first.messages[-1]['content'] == '## Формат: кратко\n\nRAG: Django\n\n## Вопрос:\nЧто такое GIL?'
+
+    def test_prefix_changes_with_system_prompt(self):
+        base = build_prompt_layout('SYSTEM', FEW_SHOT, [], 'Вопрос')
+        custom = build_prompt_layout('CUSTOM\n\nSYSTEM', FEW_SHOT, [], 'Вопрос')
+        no_few_shot = build_prompt_layout('SYSTEM', [], [], 'Вопрос')
+
+        assert len({base.prefix_hash, custom.prefix_hash, no_few_shot.prefix_hash}) == 3
+
+    def test_plain_question_without_notes(self):
+        layout = build_prompt_layout('SYSTEM', [], [], 'Вопрос')
+
+        assert layout.messages == [{'role': 'system', 'content': 'SYSTEM'},
+                                   {'role': 'user', 'content': 'Вопрос'}]
+
+
+class TestPrefixCacheStats:
+    """Учёт повторного префикса по моделям"""
+
+    def test_reuse_is_tracked_per_model(self):
+        stats = PrefixCacheStats()
+
+        assert not stats.observe('qwen', 'a')
+        assert stats.observe('qwen', 'a')
+        assert not stats.observe('gemma', 'a')
+        assert not stats.observe('qwen', 'b')
+
+        assert stats.get_stats()['requests'] == 4
+        assert stats.get_stats()['prefix_reused'] == 1
+
+    def test_prompt_eval_averages(self):
+        stats = PrefixCacheStats(history=3)
+        stats.record('qwen', 'interview', 'a', False, 1800, 900)
+        stats.record('qwen', 'interview', 'a', True, 60, 30)
+        stats.record('qwen', 'interview', 'a', True, 80, 40)
+        stats.record('qwen', 'interview', 'a', True, None, None)
+
+        result = stats.get_stats()
+        assert len(result['recent']) == 3
+        assert result['prompt_eval_count'] == {'avg_reused': 70, 'avg_changed': None}
+
+
+class TestClientPrefix:
+    """OllamaClient отправляет одинаковый префикс и пишет prompt_eval_count"""
+
+    @pytest.mark.asyncio
+    async def test_stream_requests_share_prefix(self):
+        payloads = []
+
+        async def chat(request):
+            payload = await request.json()
+            payloads.append(payload)
+            resp = web.StreamResponse()
+            resp.content_type = 'application/x-ndjson'
+            await resp.prepare(request)
+            await resp.write(json.dumps({'message': {'content': 'ответ'}}).encode() + b'\n')
+            # Повторный префикс: Ollama пересчитывает только хвост
+            count = 1500 if len(payloads) == 1 else 90
+            await resp.write(json.dumps({'message': {'content': ''}, 'done': True,
+                                         'prompt_eval_count': count,
+                                         'prompt_eval_duration': count * 1_000_000}).encode() + b'\n')
+            await resp.write_eof()
+            return resp
+
+        app = web.Application()
+        app.router.add_post('/api/chat', chat)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        url = f'http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}'
+
+        cache = MagicMock()
+        cache.get.return_value = None
+        semantic = MagicMock()
+        semantic.get.return_value = (None, 0)
+        rag = MagicMock()
+        rag.build_request_notes.side_effect = lambda text, context, qt: f'RAG для {text}'
+        rag.get_adaptive_context.side_effect = lambda context, text: context
+        http = OllamaHTTP()
+        client = OllamaClient(url, 'qwen', cache, 'Python разработчик, Django', 'job_interview_ru', http=http)
+        results = []
+        try:
+            with patch('llm.ollama_client.get_semantic_cache', return_value=semantic), \
+                    patch('llm.ollama_client.get_advanced_rag', return_value=rag), \
+                    patch('llm.ollama_client.log_llm_request'), \
+                    patch('llm.ollama_client.log_llm_response'):
+                for text, context in (('Что такое GIL?', []),
+                                      ('Расскажите про ваш последний проект', ['Интервьюер: Что такое GIL?'])):
+                    params = client.request_params()
+                    [c async for c in client.generate_stream(text, context, params=params)]
+                    results.append(params)
+        finally:
+            await http.close()
+            await runner.cleanup()
+
+        first, second = (p['messages'] for p in payloads)
+        n = 1 + 2 * len(get_few_shot_examples('job_interview_ru'))
+        assert first[0] == second[0]
+        assert first[:n] == second[:n]
+        assert 'Что такое GIL?' in first[-1]['content']
+        assert 'RAG для Расскажите' in second[-1]['content']
+        assert 'STAR' in second[-1]['content'] and 'STAR' not in second[0]['content']
+
+        assert results[0].prefix_hash == results[1].prefix_hash
+        assert (results[0].prefix_reused, results[1].prefix_reused) == (False, True)
+        assert (results[0].prompt_eval_count, results[1].prompt_eval_count) == (1500, 90)
+        stats = client.prompt_cache.get_stats()
+        assert stats['reuse_rate'] == 0.5
+        assert stats['recent'][-1]['prompt_eval_ms'] == 90
+
+
+def test_prompt_cache_endpoint():
+    from fastapi.testclient import TestClient
+    from llm_server import app
+
+    response = TestClient(app).get('/hint/prompt-cache')
+
+    assert response.status_code == 200
+    assert {'requests', 'prefix_reused', 'reuse_rate', 'prompt_eval_count', 'recent'} <= set(response.json())
@@ -80,7 +80,7 @@ class TestLoadUserContext:
 class TestPreloadModel:
     """Тесты для preload_model"""
     
-    @patch('llm_server.requests.post')
+    @patch('requests.Session.post')
     def test_preload_success(self, mock_post):
         """Успешная предзагрузка"""
         mock_post.return_value.status_code = 200
@@ -90,7 +90,7 @@ class TestPreloadModel:
         
         mock_post.assert_called_once()
     
-    @patch('llm_server.requests.post')
+    @patch('requests.Session.post')
     def test_preload_failure(self, mock_post):
         """Ошибка предзагрузки"""
         mock_post.return_value.status_code = 500
@@ -98,7 +98,7 @@ class TestPreloadModel:
         from llm_server import preload_model
         preload_model('test-model')  # Не должно бросать исключение
     
-    @patch('llm_server.requests.post')
+    @patch('requests.Session.post')
     def test_preload_exception(self, mock_post):
         """Exception при предзагрузке"""
         mock_post.side_effect = Exception('Connection refused')
@@ -141,7 +141,7 @@ class TestHintEndpoint:
     """Тесты для /hint endpoint"""
     
     @patch('llm_server.ollama.generate')
-    @patch('llm_server.ollama.metrics.get_stats')
+    @patch('llm.ollama_client.HintMetrics.get_stats')
     def test_hint_success(self, mock_stats, mock_generate):
         """Успешная генерация подсказки"""
         mock_generate.return_value = 'Test hint'
@@ -166,6 +166,11 @@ class TestHintEndpoint:
         assert response.status_code == 200
         assert response.json()['hint'] == 'Test hint'
         assert response.json()['latency_ms'] == 1000
+        # Профиль запроса передаётся в параметрах, общий клиент не меняется
+        params = mock_generate.call_args.kwargs['params']
+        assert params.profile == 'interview'
+        from llm_server import ollama
+        assert params.model == ollama.model
     
     def test_hint_short_text(self):
         """Ошибка для короткого текста"""
@@ -237,7 +242,7 @@ class TestCacheClearEndpoint:
 class TestModelsEndpoint:
     """Тесты для /models endpoint"""
     
-    @patch('llm_server.requests.get')
+    @patch('requests.Session.get')
     def test_list_models_success(self, mock_get):
         """Успешное получение списка моделей"""
         mock_get.return_value.status_code = 200
@@ -261,7 +266,7 @@ class TestModelsEndpoint:
         assert response.status_code == 200
         assert len(response.json()['models']) == 1
     
-    @patch('llm_server.requests.get')
+    @patch('requests.Session.get')
     def test_list_models_error(self, mock_get):
         """Ошибка получения моделей"""
         mock_get.side_effect = Exception('Connection refused')
@@ -0,0 +1,250 @@
+"""
+Модульные тесты для llm/speculation.py и /hint/speculate
+"""
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from aiohttp import web
+
+from llm.http_pool import OllamaHTTP
+from llm.ollama_client import OllamaClient
+from llm.speculation import Speculator
+
+KEY = ('qwen', 'interview', 500, 0.8, None, None)
+
+
+@pytest.fixture(autouse=True)
+def no_metrics_file():
+    with patch('llm.speculation.log_hint_speculation') as logged:
+        yield logged
+
+
+async def _tokens(n, delay, closed=None):
+    try:
+        for i in range(n):
+            await asyncio.sleep(delay)
+            yield f't{i}'
+    finally:
+        if closed is not None:
+            closed.append(True)
+
+
+def _similar(a, b):
+    return 1.0 if 'GIL' in a and 'GIL' in b else 0.1
+
+
+class TestSpeculator:
+    """Продвижение и отбрасывание спекуляций"""
+
+    @pytest.mark.asyncio
+    async def test_close_text_is_promoted(self, no_metrics_file):
+        speculator = Speculator(similarity=_similar)
+        speculator.start('s1', 'Расскажите про GIL', [], KEY, _tokens(3, 0.01))
+        await asyncio.sleep(0.05)
+
+        speculation = await speculator.claim('s1', 'Расскажите про GIL в Python', [], KEY)
+        chunks = [c async for c in speculation.follow()]
+
+        assert chunks == ['t0', 't1', 't2']
+        assert speculation.saved_ttft_ms >= 10
+        assert speculation.stats_since_claim()['ttft_ms'] == 0
+        stats = speculator.get_stats()
+        assert stats['promoted'] == 1
+        assert stats['hit_rate'] == 1.0
+        assert stats['saved_ttft_ms']['total'] == speculation.saved_ttft_ms
+        assert no_metrics_file.call_args[0][0] == 'promoted'
+
+    @pytest.mark.asyncio
+    async def test_follow_catches_up_with_live_tokens(self):
+        speculator = Speculator(similarity=_similar)
+        speculator.start('s1', 'Что такое GIL?', [], KEY, _tokens(5, 0.02))
+
+        speculation = await speculator.claim('s1', 'Что такое GIL?', [], KEY)
+        chunks = [c async for c in speculation.follow()]
+
+        assert chunks == ['t0', 't1', 't2', 't3', 't4']
+        assert speculation.stats_since_claim()['ttft_ms'] > 0
+
+    @pytest.mark.asyncio
+    async def test_different_text_is_discarded(self, no_metrics_file):
+        speculator = Speculator(similarity=_similar)
+        closed = []
+        speculator.start('s1', 'Расскажите про GIL', [], KEY, _tokens(100, 0.01, closed))
+        await asyncio.sleep(0.03)
+
+        assert await speculator.claim('s1', 'Как устроен Docker?', [], KEY) is None
+        await asyncio.sleep(0.01)
+
+        assert closed == [True]
+        stats = speculator.get_stats()
+        assert (stats['promoted'], stats['discarded'], stats['hit_rate']) == (0, 1, 0.0)
+        assert no_metrics_file.call_args[0][:2] == ('discarded', 0.1)
+
+    @pytest.mark.asyncio
+    async def test_other_params_or_context_are_discarded(self):
+        similarity = MagicMock(return_value=1.0)
+        speculator = Speculator(similarity=similarity)
+        speculator.start('s1', 'Что такое GIL?', ['a'], KEY, _tokens(3, 0))
+        speculator.start('s2', 'Что такое GIL?', ['a'], KEY, _tokens(3, 0))
+
+        assert await speculator.claim('s1', 'Что такое GIL?', ['a'], ('gemma',) + KEY[1:]) is None
+        assert await speculator.claim('s2', 'Что такое GIL?', ['b'], KEY) is None
+        similarity.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_newer_interim_replaces_older(self):
+        speculator = Speculator(similarity=_similar)
+        closed = []
+        speculator.start('s1', 'Расскажите про', [], KEY, _tokens(100, 0.01, closed))
+        await asyncio.sleep(0.02)
+        speculator.start('s1', 'Расскажите про GIL', [], KEY, _tokens(1, 0))
+        await asyncio.sleep(0.01)
+
+        assert closed == [True]
+        assert speculator.get_stats()['replaced'] == 1
+        assert (await speculator.claim('s1', 'Расскажите про GIL', [], KEY)).text == 'Расскажите про GIL'
+
+    @pytest.mark.asyncio
+    async def test_unclaimed_speculation_expires(self):
+        speculator = Speculator(ttl=0.02, similarity=_similar)
+        closed = []
+        speculator.start('s1', 'Что такое GIL?', [], KEY, _tokens(100, 0.01, closed))
+        await asyncio.sleep(0.05)
+
+        assert closed == [True]
+        assert speculator.get_stats()['expired'] == 1
+        assert await speculator.claim('s1', 'Что такое GIL?', [], KEY) is None
+
+    @pytest.mark.asyncio
+    async def test_closing_promoted_stream_cancels_generation(self):
+        speculator = Speculator(similarity=_similar)
+        closed = []
+        speculator.start('s1', 'Что такое GIL?', [], KEY, _tokens(100, 0.01, closed))
+        speculation = await speculator.claim('s1', 'Что такое GIL?', [], KEY)
+
+        stream = speculation.follow()
+        assert await stream.__anext__() == 't0'
+        await stream.aclose()
+        await asyncio.sleep(0.01)
+
+        assert closed == [True]
+
+
+class TestSpeculativeAnswerMemory:
+    """Ответ спекуляции не пишется под промежуточным текстом"""
+
+    @pytest.mark.asyncio
+    async def test_speculative_stream_defers_caches(self):
+        async def chat(request):
+            await request.json()
+            resp = web.StreamResponse()
+            resp.content_type = 'application/x-ndjson'
+            await resp.prepare(request)
+            for data in ({'message': {'content': 'GIL - блокировка'}}, {'message': {'content': ''}, 'done': True}):
+                await resp.write(json.dumps(data).encode() + b'\n')
+            await resp.write_eof()
+            return resp
+
+        app = web.Application()
+        app.router.add_post('/api/chat', chat)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        url = f'http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}'
+
+        cache = MagicMock()
+        cache.get.return_value = None
+        semantic = MagicMock()
+        semantic.get.return_value = (None, 0)
+        rag = MagicMock()
+        rag.build_request_notes.return_value = ''
+        rag.get_adaptive_context.return_value = []
+        http = OllamaHTTP()
+        client = OllamaClient(url, 'qwen', cache, http=http)
+        params = client.request_params()
+        params.remember = False
+        try:
+            with patch('llm.ollama_client.get_semantic_cache', return_value=semantic), \
+                    patch('llm.ollama_client.get_advanced_rag', return_value=rag), \
+                    patch('llm.ollama_client.log_llm_request'), \
+                    patch('llm.ollama_client.log_llm_response'):
+                chunks = [c async for c in client.generate_stream('Что такое GIL', [], params=params)]
+                cache.set.assert_not_called()
+                semantic.set.assert_not_called()
+                rag.consolidate_memory.assert_not_called()
+
+                client.remember('Что такое GIL в Python?', [], params.answer, params.question_type)
+        finally:
+            await http.close()
+            await runner.cleanup()
+
+        assert chunks == ['GIL - блокировка']
+        assert params.answer == 'GIL - блокировка'
+        cache.set.assert_called_once_with('Что такое GIL в Python?', [], 'GIL - блокировка')
+        semantic.set.assert_called_once_with('Что такое GIL в Python?', [], 'GIL - блокировка')
+        rag.consolidate_memory.assert_called_once_with('Что такое GIL в Python?', 'GIL - блокировка', 'technical')
+
+
+class TestSpeculateEndpoint:
+    """/hint/speculate и продвижение в /hint/stream"""
+
+    def _run(self, final_text):
+        from fastapi.testclient import TestClient
+        from llm_server import app
+
+        calls = []
+
+        async def fake_stream(text, context, params, **kwargs):
+            calls.append((text, params.remember))
+            params.question_type = 'technical'
+            for chunk in ('GIL ', 'это блокировка'):
+                await asyncio.sleep(0.01)
+                yield chunk
+            params.answer = 'GIL это блокировка'
+
+        db = MagicMock()
+        db.get_instant_answer.return_value = None
+        speculator = Speculator(similarity=_similar)
+        with patch('llm_server.speculator', speculator), \
+                patch('llm_server.get_vector_db', return_value=db), \
+                patch('llm_server.hint_cache.get', return_value=None), \
+                patch('llm_server.ollama.generate_stream', side_effect=fake_stream), \
+                patch('llm_server.ollama.remember') as remember, \
+                TestClient(app) as client:
+            started = client.post('/hint/speculate', json={'text': 'Что такое GIL', 'session_id': 'call-1'})
+            response = client.post('/hint/stream', json={'text': final_text, 'session_id': 'call-1'})
+            stats = client.get('/hint/speculation').json()
+
+        events = [json.loads(line[6:]) for line in response.text.split('\n') if line.startswith('data: ')]
+        return started.json(), events, calls, stats, remember
+
+    def test_final_text_promotes_speculation(self):
+        started, events, calls, stats, remember = self._run('Что такое GIL в Python?')
+
+        assert started == {'status': 'started', 'session_id': 'call-1'}
+        assert calls == [('Что такое GIL', False)]
+        # Продвинутый ответ запоминается под финальным вопросом, а не под промежуточным
+        remember.assert_called_once_with('Что такое GIL в Python?', [], 'GIL это блокировка', 'technical')
+        assert ''.join(e.get('chunk', '') for e in events) == 'GIL это блокировка'
+        assert events[-1]['speculative'] is True
+        assert events[-1]['question_type'] == 'technical'
+        assert stats['promoted'] == 1
+
+    def test_other_question_generates_anew(self):
+        _, events, calls, stats, remember = self._run('Как устроен Docker?')
+
+        assert calls == [('Что такое GIL', False), ('Как устроен Docker?', True)]
+        remember.assert_not_called()
+        assert 'speculative' not in events[-1]
+        assert stats['discarded'] == 1
+
+    def test_speculate_requires_session(self):
+        from fastapi.testclient import TestClient
+        from llm_server import app
+
+        response = TestClient(app).post('/hint/speculate', json={'text': 'Что такое GIL?'})
+
+        assert response.status_code == 400
@@ -202,6 +202,50 @@ class TestLogError:
                 assert len(data['data']['message']) == 500
 
 
+class TestLogHintCancelled:
+    """Тесты для log_hint_cancelled"""
+
+    def test_logs_and_counts_by_reason(self, tmp_path):
+        """Логирует отмену и считает её в статистике по причинам"""
+        metrics_file = tmp_path / 'metrics.jsonl'
+
+        with patch('metrics.METRICS_DIR', tmp_path):
+            with patch('metrics.METRICS_FILE', metrics_file):
+                from metrics import get_metrics_stats, log_hint_cancelled
+
+                log_hint_cancelled('superseded', 1200, 14)
+                log_hint_cancelled('superseded', 300, 0)
+                log_hint_cancelled('disconnect', 800, 5)
+
+                data = json.loads(metrics_file.read_text().splitlines()[0])
+                assert data['event_type'] == 'hint_cancelled'
+                assert data['data']['elapsed_ms'] == 1200
+                assert get_metrics_stats()['llm']['cancelled'] == {'superseded': 2, 'disconnect': 1}
+
+
+class TestLogHintSpeculation:
+    """Тесты для log_hint_speculation"""
+
+    def test_hit_rate_and_saved_ttft(self, tmp_path):
+        """Считает долю продвинутых спекуляций и сэкономленный TTFT"""
+        metrics_file = tmp_path / 'metrics.jsonl'
+
+        with patch('metrics.METRICS_DIR', tmp_path):
+            with patch('metrics.METRICS_FILE', metrics_file):
+                from metrics import get_metrics_stats, log_hint_speculation
+
+                log_hint_speculation('promoted', 0.93, 1200)
+                log_hint_speculation('promoted', 1.0, 800)
+                log_hint_speculation('discarded', 0.41)
+                log_hint_speculation('expired', 0.0)
+
+                speculation = get_metrics_stats()['llm']['speculation']
+                assert speculation['promoted'] == 2
+                assert speculation['discarded'] == 1
+                assert speculation['hit_rate'] == 66.7
+                assert speculation['saved_ttft_ms']['avg'] == 1000
+
+
 class TestGetMetricsStats:
     """Тесты для get_metrics_stats"""
     
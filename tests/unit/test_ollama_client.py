@@ -166,7 +166,7 @@ class TestOllamaClient:
         assert client.model == 'llama3'
         assert client.user_context == 'user context'
     
-    @patch('llm.ollama_client.requests.get')
+    @patch('llm.ollama_client.requests.Session.get')
     @patch('llm.ollama_client.HintCache')
     def test_check_available_success(self, mock_cache, mock_get):
         """_check_available возвращает True если Ollama доступен"""
@@ -179,7 +179,7 @@ class TestOllamaClient:
         
         assert result is True
     
-    @patch('llm.ollama_client.requests.get')
+    @patch('llm.ollama_client.requests.Session.get')
     @patch('llm.ollama_client.HintCache')
     def test_check_available_failure(self, mock_cache, mock_get):
         """_check_available возвращает False при ошибке"""
@@ -192,7 +192,7 @@ class TestOllamaClient:
         
         assert result is False
     
-    @patch('llm.ollama_client.requests.get')
+    @patch('llm.ollama_client.requests.Session.get')
     @patch('llm.ollama_client.HintCache')
     def test_list_models_success(self, mock_cache, mock_get):
         """list_models возвращает список моделей"""
@@ -221,7 +221,7 @@ class TestOllamaClient:
         assert result[0]['size'] == '4.7GB'
         assert result[0]['family'] == 'llama'
     
-    @patch('llm.ollama_client.requests.get')
+    @patch('llm.ollama_client.requests.Session.get')
     @patch('llm.ollama_client.HintCache')
     def test_list_models_error(self, mock_cache, mock_get):
         """list_models бросает исключение при ошибке"""
@@ -234,9 +234,9 @@ class TestOllamaClient:
         with pytest.raises(Exception):
             client.list_models()
     
-    @patch('llm.ollama_client.requests.post')
+    @patch('llm.ollama_client.requests.Session.post')
     @patch('llm.ollama_client.classify_question')
-    @patch('llm.ollama_client.build_contextual_prompt')
+    @patch('llm.ollama_client.build_profile_prefix')
     @patch('llm.ollama_client.get_few_shot_examples')
     def test_generate_cache_hit(self, mock_few_shot, mock_prompt, mock_classify, mock_post):
         """generate возвращает кэшированный результат"""
@@ -251,9 +251,9 @@ class TestOllamaClient:
         assert result == 'Cached hint'
         mock_post.assert_not_called()
     
-    @patch('llm.ollama_client.requests.post')
+    @patch('llm.ollama_client.requests.Session.post')
     @patch('llm.ollama_client.classify_question')
-    @patch('llm.ollama_client.build_contextual_prompt')
+    @patch('llm.ollama_client.build_profile_prefix')
     @patch('llm.ollama_client.get_few_shot_examples')
     def test_generate_success(self, mock_few_shot, mock_prompt, mock_classify, mock_post):
         """generate успешно генерирует подсказку"""
@@ -281,9 +281,9 @@ class TestOllamaClient:
         assert result == 'Generated hint'
         cache.set.assert_called_once()
     
-    @patch('llm.ollama_client.requests.post')
+    @patch('llm.ollama_client.requests.Session.post')
     @patch('llm.ollama_client.classify_question')
-    @patch('llm.ollama_client.build_contextual_prompt')
+    @patch('llm.ollama_client.build_profile_prefix')
     @patch('llm.ollama_client.get_few_shot_examples')
     def test_generate_connection_error(self, mock_few_shot, mock_prompt, mock_classify, mock_post):
         """generate обрабатывает ConnectionError"""
@@ -302,9 +302,9 @@ class TestOllamaClient:
         
         assert 'Ollama не запущен' in result
     
-    @patch('llm.ollama_client.requests.post')
+    @patch('llm.ollama_client.requests.Session.post')
     @patch('llm.ollama_client.classify_question')
-    @patch('llm.ollama_client.build_contextual_prompt')
+    @patch('llm.ollama_client.build_profile_prefix')
     @patch('llm.ollama_client.get_few_shot_examples')
     def test_generate_api_error(self, mock_few_shot, mock_prompt, mock_classify, mock_post):
         """generate обрабатывает ошибки API"""
@@ -487,7 +487,7 @@ class TestGenerateStreamNoCache:
     @patch('llm.ollama_client.get_temperature_for_type')
     @patch('llm.ollama_client.log_llm_request')
     @patch('llm.ollama_client.get_advanced_rag')
-    @patch('llm.ollama_client.build_contextual_prompt')
+    @patch('llm.ollama_client.build_profile_prefix')
     @patch('llm.ollama_client.get_few_shot_examples')
     async def test_stream_builds_prompt(
         self, mock_few_shot, mock_prompt, mock_rag, mock_log_req,
@@ -508,7 +508,7 @@ class TestGenerateStreamNoCache:
         mock_few_shot.return_value = []
         
         rag = MagicMock()
-        rag.build_enhanced_prompt.return_value = 'Enhanced prompt'
+        rag.build_request_notes.return_value = 'RAG notes'
         rag.get_adaptive_context.return_value = []
         mock_rag.return_value = rag
         
@@ -536,7 +536,7 @@ class TestGenerateStreamNoCache:
     @patch('llm.ollama_client.get_temperature_for_type')
     @patch('llm.ollama_client.log_llm_request')
     @patch('llm.ollama_client.get_advanced_rag')
-    @patch('llm.ollama_client.build_contextual_prompt')
+    @patch('llm.ollama_client.build_profile_prefix')
     @patch('llm.ollama_client.get_few_shot_examples')
     async def test_stream_with_custom_prompt(
         self, mock_few_shot, mock_prompt, mock_rag, mock_log_req,
@@ -556,7 +556,7 @@ class TestGenerateStreamNoCache:
         mock_few_shot.return_value = []
         
         rag = MagicMock()
-        rag.build_enhanced_prompt.return_value = 'Enhanced'
+        rag.build_request_notes.return_value = 'RAG'
         rag.get_adaptive_context.return_value = []
         mock_rag.return_value = rag
         
@@ -582,9 +582,9 @@ class TestGenerateStreamNoCache:
 class TestOllamaClientGenerate:
     """Дополнительные тесты для generate"""
     
-    @patch('llm.ollama_client.requests.post')
+    @patch('llm.ollama_client.requests.Session.post')
     @patch('llm.ollama_client.classify_question')
-    @patch('llm.ollama_client.build_contextual_prompt')
+    @patch('llm.ollama_client.build_profile_prefix')
     @patch('llm.ollama_client.get_few_shot_examples')
     def test_generate_timeout(self, mock_few_shot, mock_prompt, mock_classify, mock_post):
         """generate обрабатывает Timeout"""
@@ -603,9 +603,9 @@ class TestOllamaClientGenerate:
         
         assert 'Ollama' in result or 'Ошибка' in result
     
-    @patch('llm.ollama_client.requests.post')
+    @patch('llm.ollama_client.requests.Session.post')
     @patch('llm.ollama_client.classify_question')
-    @patch('llm.ollama_client.build_contextual_prompt')
+    @patch('llm.ollama_client.build_profile_prefix')
     @patch('llm.ollama_client.get_few_shot_examples')
     def test_generate_with_custom_params(self, mock_few_shot, mock_prompt, mock_classify, mock_post):
         """generate с кастомными параметрами"""
@@ -268,3 +268,22 @@ class TestAdvancedRagSecurity:
         assert rag.chroma_client is None
         assert rag.collection is None
         assert rag.fallback_documents == []
+
+
+class TestAdvancedRagPrompt:
+    """Материал запроса AdvancedRAG"""
+
+    def test_request_notes_follow_base_prompt(self):
+        """Материал запроса идёт после базового промпта и не меняет его"""
+        from advanced_rag import AdvancedRAG, RetrievedChunk, SessionMemory
+
+        rag = AdvancedRAG.__new__(AdvancedRAG)
+        rag.session_memory = SessionMemory(discussed_topics=['python'])
+        rag.retrieve = MagicMock(return_value=[RetrievedChunk(text='Django, 3 года', score=0.9, source='resume')])
+
+        notes = rag.build_request_notes('Расскажите про Django', [], 'experience')
+        enhanced = rag.build_enhanced_prompt('Расскажите про Django', [], 'experience', 'BASE')
+
+        assert enhanced == 'BASE\n\n' + notes
+        assert 'Django, 3 года' in notes
+        assert 'python' in notes
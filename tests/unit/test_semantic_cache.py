@@ -37,6 +37,20 @@ class TestSemanticCache:
         assert pytest.approx(cache._cosine_similarity(v1, v3), 0.001) == 0.0
         assert cache._cosine_similarity(v1, zero) == 0.0
 
+    def test_text_similarity(self):
+        """Сходство двух текстов: exact match без модели, иначе по embeddings"""
+        cache = SemanticCache()
+        cache._model_loaded = False
+        cache.model = None
+
+        assert cache.similarity("Что такое GIL?", " что такое gil?") == 1.0
+        assert cache.similarity("Что такое GIL?", "Что такое GIL в Python?") is None
+
+        cache._model_loaded = True
+        cache._get_embedding = lambda text: np.array([1.0, 0.0]) if "GIL" in text else np.array([0.0, 1.0])
+        assert cache.similarity("Что такое GIL?", "Что такое GIL в Python?") == pytest.approx(1.0)
+        assert cache.similarity("Что такое GIL?", "Что такое Docker?") == pytest.approx(0.0)
+
     def test_context_hash(self):
         """Проверка хэширования контекста"""
         cache = SemanticCache()
@@ -0,0 +1,144 @@
+"""
+Модульные тесты для stt/batching.py
+"""
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from stt.batching import BatchedDecoder, SharedInferenceWorker
+from stt.pipeline import STTPipeline, Segment
+from conftest import FakeTranscriber, wait_for
+
+SAMPLE_RATE = 16000
+
+
+class FakeBatchPipeline:
+    """BatchedInferencePipeline: по сегменту на клип, начало - смещение клипа"""
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, clip_timestamps=None, batch_size=None, **kwargs):
+        self.calls.append((audio, clip_timestamps, batch_size, kwargs))
+        segments = [
+            SimpleNamespace(start=round(c['start'], 3), text=f' клип {i} ', avg_logprob=-0.1 * (i + 1),
+                            no_speech_prob=0.0,
+                            words=[SimpleNamespace(start=c['start'] + 0.1, end=c['start'] + 0.3,
+                                                   word=' клип', probability=0.9)])
+            for i, c in enumerate(clip_timestamps)
+        ]
+        return iter(segments), None
+
+
+class TestBatchedDecoder:
+    """Тесты батч-декодера"""
+
+    def test_batch_maps_text_to_clips(self):
+        """Тексты возвращаются в порядке входных сегментов"""
+        batch = FakeBatchPipeline()
+        decoder = BatchedDecoder(MagicMock(), batch_pipeline=batch)
+        audios = [np.zeros(SAMPLE_RATE, dtype=np.float32),
+                  np.zeros(SAMPLE_RATE // 2, dtype=np.float32)]
+
+        texts = decoder.decode(audios)
+
+        assert texts == ['клип 0', 'клип 1']
+        audio, clips, batch_size, kwargs = batch.calls[0]
+        assert len(audio) == SAMPLE_RATE + SAMPLE_RATE // 2
+        assert clips == [{'start': 0.0, 'end': 1.0}, {'start': 1.0, 'end': 1.5}]
+        assert batch_size == 2
+        assert kwargs['vad_filter'] is False
+
+    def test_batch_word_times_relative_to_clip(self):
+        """Тайминг слов пересчитывается от начала своего клипа"""
+        transcriber = MagicMock(word_timestamps=True)
+        batch = FakeBatchPipeline()
+        decoder = BatchedDecoder(transcriber, batch_pipeline=batch)
+
+        results = decoder.decode_results([np.zeros(SAMPLE_RATE, dtype=np.float32),
+                                          np.zeros(SAMPLE_RATE, dtype=np.float32)])
+
+        assert batch.calls[0][3]['word_timestamps'] is True
+        assert [r.words[0][:2] for r in results] == [pytest.approx((0.1, 0.3))] * 2
+        assert results[1].avg_logprob == -0.2
+
+    def test_single_segment_uses_regular_decode(self):
+        """Одиночный сегмент идёт обычным путём без батча"""
+        transcriber = MagicMock()
+        transcriber._decode.return_value = 'текст'
+        batch = FakeBatchPipeline()
+        decoder = BatchedDecoder(transcriber, batch_pipeline=batch)
+
+        assert decoder.decode([np.zeros(SAMPLE_RATE, dtype=np.float32)]) == ['текст']
+        assert batch.calls == []
+
+
+class FakeDecoder:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def decode(self, audios):
+        self.batch_sizes.append(len(audios))
+        return [f'сегмент {len(a)}' for a in audios]
+
+
+class TestSharedInferenceWorker:
+    """Тесты общего инференса для нескольких источников"""
+
+    def test_two_sources_decoded_in_one_batch(self):
+        """Готовые сегменты обоих источников уходят одним батчем"""
+        decoder = FakeDecoder()
+        worker = SharedInferenceWorker(decoder)
+        messages = []
+        loopback = STTPipeline(FakeTranscriber(segment_every=2), 'loopback', messages.append, shared_inference=worker)
+        microphone = STTPipeline(FakeTranscriber(segment_every=2), 'microphone', messages.append, shared_inference=worker)
+
+        loopback.inference_queue.put(Segment(np.zeros(1000, dtype=np.float32), 'loopback', time.time()))
+        microphone.inference_queue.put(Segment(np.zeros(2000, dtype=np.float32), 'microphone', time.time()))
+
+        for pipeline in (loopback, microphone):
+            pipeline.start()
+        worker.start()
+        try:
+            assert wait_for(lambda: len(messages) == 2)
+        finally:
+            worker.stop()
+            for pipeline in (loopback, microphone):
+                pipeline.stop()
+
+        assert decoder.batch_sizes == [2]
+        by_source = {m['source']: m['text'] for m in messages}
+        assert by_source == {'loopback': 'сегмент 1000', 'microphone': 'сегмент 2000'}
+        assert worker.get_stats()['max_batch'] == 2
+        assert loopback.stats['inference'].processed == 1
+
+    def test_pipeline_without_own_inference_thread(self):
+        """Конвейер с общим инференсом не запускает свой поток декодирования"""
+        worker = SharedInferenceWorker(FakeDecoder())
+        pipeline = STTPipeline(FakeTranscriber(segment_every=2), 'loopback', lambda m: None, shared_inference=worker)
+        pipeline.start()
+        try:
+            assert len(pipeline._threads) == 2
+            assert pipeline.inference_queue.listener is worker._ready
+        finally:
+            pipeline.stop()
+
+    def test_stream_flows_through_shared_worker(self):
+        """Чанки из push_audio доходят до сообщений через общий воркер"""
+        worker = SharedInferenceWorker(FakeDecoder())
+        messages = []
+        pipeline = STTPipeline(FakeTranscriber(segment_every=2), 'microphone', messages.append, shared_inference=worker)
+        pipeline.start()
+        worker.start()
+        try:
+            for _ in range(4):
+                pipeline.push_audio(np.zeros(512, dtype=np.float32))
+            assert wait_for(lambda: len(messages) == 2)
+        finally:
+            worker.stop()
+            pipeline.stop()
+
+        assert all(m['source'] == 'microphone' for m in messages)
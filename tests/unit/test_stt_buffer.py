@@ -0,0 +1,112 @@
+"""
+Модульные тесты для stt/buffer.py
+"""
+import pytest
+import numpy as np
+
+from stt.buffer import AudioRingBuffer, ModelInputBuffer
+
+
+class TestAudioRingBuffer:
+    """Тесты кольцевого буфера аудио"""
+
+    def test_init(self):
+        """Буфер создаётся пустым с заданной ёмкостью"""
+        buf = AudioRingBuffer(100)
+        assert len(buf) == 0
+        assert buf.capacity == 100
+        assert buf.fill_level == 0.0
+        assert buf.view().size == 0
+
+    def test_invalid_capacity(self):
+        """Нулевая ёмкость недопустима"""
+        with pytest.raises(ValueError):
+            AudioRingBuffer(0)
+
+    def test_write_and_view(self):
+        """Записанные данные доступны в исходном порядке"""
+        buf = AudioRingBuffer(10)
+        buf.write(np.arange(4, dtype=np.float32))
+        buf.write(np.arange(4, 7, dtype=np.float32))
+
+        np.testing.assert_array_equal(buf.view(), np.arange(7, dtype=np.float32))
+        np.testing.assert_array_equal(buf.view(3), [4, 5, 6])
+        assert buf.fill_level == pytest.approx(0.7)
+
+    def test_view_is_contiguous_after_wrap(self):
+        """После перехода через границу срез остаётся непрерывным и без копии"""
+        buf = AudioRingBuffer(8)
+        buf.write(np.arange(6, dtype=np.float32))
+        buf.consume(6)
+        buf.write(np.arange(10, 15, dtype=np.float32))
+
+        view = buf.view()
+        np.testing.assert_array_equal(view, [10, 11, 12, 13, 14])
+        assert view.flags['C_CONTIGUOUS']
+        assert np.shares_memory(view, buf._data)
+
+    def test_overflow_drops_oldest(self):
+        """При переполнении вытесняются самые старые сэмплы"""
+        buf = AudioRingBuffer(5)
+        buf.write(np.arange(4, dtype=np.float32))
+        dropped = buf.write(np.arange(4, 7, dtype=np.float32))
+
+        assert dropped == 2
+        assert buf.dropped_samples == 2
+        np.testing.assert_array_equal(buf.view(), [2, 3, 4, 5, 6])
+
+    def test_chunk_larger_than_capacity(self):
+        """Чанк больше ёмкости сохраняет только хвост"""
+        buf = AudioRingBuffer(4)
+        buf.write(np.arange(10, dtype=np.float32))
+
+        np.testing.assert_array_equal(buf.view(), [6, 7, 8, 9])
+        assert buf.dropped_samples == 6
+
+    def test_clear_keeps_memory(self):
+        """clear не пересоздаёт массив"""
+        buf = AudioRingBuffer(16)
+        data = buf._data
+        buf.write(np.ones(8, dtype=np.float32))
+        buf.clear()
+
+        assert len(buf) == 0
+        assert buf._data is data
+
+    def test_get_stats(self):
+        """Статистика содержит заполненность и потери"""
+        buf = AudioRingBuffer(4)
+        buf.write(np.ones(2, dtype=np.float32))
+
+        stats = buf.get_stats()
+        assert stats == {'samples': 2, 'capacity': 4, 'fill_level': 0.5, 'dropped_samples': 0}
+
+
+class TestModelInputBuffer:
+    """Тесты входа модели"""
+
+    def test_int16_scaled_into_reused_buffer(self):
+        """int16 масштабируется к [-1, 1) в один и тот же буфер"""
+        buf = ModelInputBuffer(8)
+
+        first = buf.convert(np.array([16384, -32768], dtype=np.int16))
+        np.testing.assert_allclose(first, [0.5, -1.0])
+        second = buf.convert(np.array([8192], dtype=np.int16))
+
+        assert second.dtype == np.float32
+        assert np.shares_memory(first, second)
+        assert buf.conversions == 2
+
+    def test_float32_passes_without_copy(self):
+        """float32 сегмент уходит в модель как есть"""
+        audio = np.ones(4, dtype=np.float32)
+
+        assert ModelInputBuffer().convert(audio) is audio
+
+    def test_concat_grows_buffer(self):
+        """Клипы батча лежат подряд, буфер растёт под суммарную длину"""
+        buf = ModelInputBuffer(2)
+
+        out = buf.concat([np.full(3, 16384, dtype=np.int16), np.full(2, 0.25, dtype=np.float32)])
+
+        np.testing.assert_allclose(out, [0.5, 0.5, 0.5, 0.25, 0.25])
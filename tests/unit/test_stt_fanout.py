@@ -0,0 +1,81 @@
+"""
+Модульные тесты для stt/fanout.py
+"""
+import asyncio
+
+import pytest
+
+from stt.fanout import ClientFanout, ClientSender, message_key
+
+
+class RecordingClient:
+    """Клиент, который отправляет только после разрешения"""
+
+    def __init__(self):
+        self.sent = []
+        self.gate = asyncio.Event()
+
+    async def send(self, message):
+        await self.gate.wait()
+        self.sent.append(message)
+
+
+class TestClientSender:
+    """Тесты очереди клиента"""
+
+    @pytest.mark.asyncio
+    async def test_coalesce_replaces_stale_partial(self):
+        """Новая гипотеза partial заменяет ожидающую и встаёт после финала"""
+        client = RecordingClient()
+        sender = ClientSender(client, maxsize=8)
+        sender.push('partial 1', key='partial:loopback')
+        sender.push('final')
+        sender.push('partial 2', key='partial:loopback')
+
+        client.gate.set()
+        sender.start()
+        await asyncio.sleep(0.01)
+        await sender.stop()
+
+        assert client.sent == ['final', 'partial 2']
+        assert sender.coalesced == 1
+
+    def test_overflow_evicts_partial_before_final(self):
+        sender = ClientSender(RecordingClient(), maxsize=2)
+        sender.push('final 1')
+        sender.push('partial', key='partial:loopback')
+        sender.push('final 2')
+
+        assert [item[1] for item in sender._items] == ['final 1', 'final 2']
+        assert sender.dropped == 1
+
+    def test_drop_newest(self):
+        sender = ClientSender(RecordingClient(), maxsize=1, policy='drop_newest')
+        assert sender.push('a')
+        assert not sender.push('b')
+        assert sender.get_stats()['dropped'] == 1
+
+    def test_invalid_policy(self):
+        with pytest.raises(ValueError):
+            ClientSender(RecordingClient(), policy='ignore')
+
+    @pytest.mark.asyncio
+    async def test_lag_recorded(self):
+        client = RecordingClient()
+        client.gate.set()
+        fanout = ClientFanout()
+        fanout.add(client)
+
+        assert fanout.publish('msg', [client]) == 1
+        await asyncio.sleep(0.01)
+        stats = fanout.get_stats()[0]
+        await fanout.close()
+
+        assert stats['sent'] == 1
+        assert stats['lag_ms'] >= 0
+        assert fanout.senders == {}
+
+
+def test_message_key():
+    assert message_key({'type': 'partial', 'source': 'microphone'}) == 'partial:microphone'
+    assert message_key({'type': 'transcript', 'source': 'microphone'}) is None
@@ -0,0 +1,62 @@
+"""
+Модульные тесты для stt/ingest.py
+"""
+import numpy as np
+import pytest
+
+from stt.ingest import IngestFormat
+
+
+class TestIngestFormat:
+    """Тесты формата бинарных кадров"""
+
+    def test_defaults(self):
+        fmt = IngestFormat.from_handshake({'type': 'audio_start'})
+        assert fmt == IngestFormat(16000, 'float32', 1)
+
+    @pytest.mark.parametrize('handshake', [
+        {'dtype': 'float64'},
+        {'sample_rate': 100},
+        {'channels': 0},
+        {'channels': 'two'},
+    ])
+    def test_invalid_handshake(self, handshake):
+        with pytest.raises(ValueError):
+            IngestFormat.from_handshake(handshake)
+
+    def test_mono_16k_is_zero_copy(self):
+        """Моно 16 кГц - представление над байтами кадра без копирования"""
+        payload = np.arange(512, dtype=np.float32).tobytes()
+        audio = IngestFormat().decode(payload)
+
+        assert audio.dtype == np.float32
+        assert len(audio) == 512
+        assert not audio.flags['OWNDATA']
+
+    def test_int16_stereo_48k(self):
+        """int16 стерео 48 кГц приводится к моно float32 16 кГц"""
+        fmt = IngestFormat(48000, 'int16', 2)
+        pcm = np.tile(np.array([16384, 0], dtype=np.int16), 4800)
+
+        audio = fmt.decode(pcm.tobytes())
+
+        assert audio.dtype == np.float32
+        assert len(audio) == 1600
+        np.testing.assert_allclose(audio, 0.25)
+
+    def test_partial_frame_rejected(self):
+        with pytest.raises(ValueError):
+            IngestFormat(16000, 'int16', 2).decode(b'\x00' * 6)
+
+    def test_connection_resampler_joins_frames(self):
+        """Ресемплер соединения: кадры подряд дают тот же сигнал, что и один большой"""
+        fmt = IngestFormat(44100, 'float32', 1)
+        audio = np.sin(np.arange(4410) * 0.05).astype(np.float32)
+
+        whole = fmt.decode(audio.tobytes(), fmt.create_resampler())
+        resampler = fmt.create_resampler()
+        frames = [fmt.decode(audio[i:i + 441].tobytes(), resampler) for i in range(0, 4410, 441)]
+
+        assert IngestFormat().create_resampler() is None
+        assert not np.shares_memory(frames[0], frames[1])
+        np.testing.assert_allclose(np.concatenate(frames), whole, atol=1e-6)
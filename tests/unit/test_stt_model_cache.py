@@ -0,0 +1,51 @@
+"""
+Модульные тесты для stt/model_cache.py
+"""
+import json
+
+from stt.model_cache import (
+    host_key,
+    load_model_choice,
+    save_model_choice,
+    forget_model_choice,
+)
+
+
+class TestModelCache:
+    """Тесты кэша выбора модели"""
+
+    def test_roundtrip(self, tmp_path):
+        """Сохранённый выбор читается для того же устройства"""
+        path = tmp_path / 'stt_model_cache.json'
+        save_model_choice('auto', 'small', 'cpu', 'int8', rtf=0.31234, path=path)
+
+        choice = load_model_choice('auto', path=path)
+
+        assert choice == {'model': 'small', 'device': 'cpu', 'compute_type': 'int8', 'rtf': 0.312}
+        assert load_model_choice('cuda', path=path) is None
+
+    def test_entries_per_host(self, tmp_path):
+        """Записи разных машин и бэкендов не перетирают друг друга"""
+        path = tmp_path / 'stt_model_cache.json'
+        path.write_text(json.dumps({'other-host|x86_64|auto': {'model': 'medium', 'device': 'cuda'}}))
+
+        save_model_choice('auto', 'base', 'cpu', 'int8', path=path)
+
+        data = json.loads(path.read_text())
+        assert 'other-host|x86_64|auto' in data
+        assert data[host_key('auto')]['model'] == 'base'
+
+    def test_forget(self, tmp_path):
+        path = tmp_path / 'stt_model_cache.json'
+        save_model_choice('cpu', 'tiny', 'cpu', 'int8', path=path)
+
+        forget_model_choice('cpu', path=path)
+
+        assert load_model_choice('cpu', path=path) is None
+
+    def test_corrupted_file_ignored(self, tmp_path):
+        """Повреждённый файл не мешает старту"""
+        path = tmp_path / 'stt_model_cache.json'
+        path.write_text('{not json')
+
+        assert load_model_choice('auto', path=path) is None
@@ -0,0 +1,29 @@
+"""
+Модульные тесты для stt/overlap.py
+"""
+from stt.overlap import dedupe_overlap, overlap_word_limit
+
+
+class TestDedupeOverlap:
+    """Удаление повтора на стыке сегментов"""
+
+    def test_removes_repeated_prefix(self):
+        text, dropped = dedupe_overlap('что такое рест апи', 'Рест апи, и зачем он', 0.5)
+        assert text == 'и зачем он'
+        assert dropped == 2
+
+    def test_no_overlap_keeps_text(self):
+        assert dedupe_overlap('что такое', 'такое дело', 0.0) == ('такое дело', 0)
+
+    def test_mismatch_keeps_text(self):
+        assert dedupe_overlap('что такое', 'расскажите о себе', 0.5) == ('расскажите о себе', 0)
+
+    def test_word_timing_limits_search(self):
+        """Слово, начавшееся после перекрытия, не считается повтором"""
+        words = [(0.1, 0.3, 'да', 0.9), (0.9, 1.1, 'да', 0.9)]
+        text, dropped = dedupe_overlap('да да', 'да да', 0.5, words)
+        assert (text, dropped) == ('да', 1)
+
+    def test_limit_without_words(self):
+        assert overlap_word_limit(0.5) == 2
+        assert overlap_word_limit(0.0) == 0
@@ -0,0 +1,55 @@
+"""
+Модульные тесты для stt/partial.py
+"""
+from stt.partial import PartialStabilizer
+
+
+class TestPartialStabilizer:
+    """Тесты стабилизации промежуточных гипотез"""
+
+    def test_first_hypothesis_is_unstable(self):
+        """Первая гипотеза целиком нестабильна"""
+        stabilizer = PartialStabilizer()
+        stable, unstable = stabilizer.update('расскажите о')
+
+        assert stable == ''
+        assert unstable == 'расскажите о'
+
+    def test_agreement_confirms_prefix(self):
+        """Совпадающий префикс двух декодов становится стабильным"""
+        stabilizer = PartialStabilizer()
+        stabilizer.update('расскажите о себе')
+        stable, unstable = stabilizer.update('расскажите о своём опыте')
+
+        assert stable == 'расскажите о'
+        assert unstable == 'своём опыте'
+
+    def test_comparison_ignores_case_and_punctuation(self):
+        """Регистр и пунктуация не ломают согласование"""
+        stabilizer = PartialStabilizer()
+        stabilizer.update('Привет, как дела')
+        stable, _ = stabilizer.update('привет как дела?')
+
+        assert stable == 'привет как дела?'
+
+    def test_stable_prefix_never_shrinks(self):
+        """Подтверждённый префикс не откатывается при расхождении"""
+        stabilizer = PartialStabilizer()
+        stabilizer.update('что такое декоратор')
+        stabilizer.update('что такое декоратор в')
+        stable, unstable = stabilizer.update('что это')
+
+        assert stable == 'что такое декоратор'
+        assert unstable == ''
+
+    def test_reset(self):
+        """reset очищает историю и префикс"""
+        stabilizer = PartialStabilizer()
+        stabilizer.update('один два')
+        stabilizer.update('один два три')
+        stabilizer.reset()
+
+        assert stabilizer.stable_text == ''
+        stable, unstable = stabilizer.update('новый сегмент')
+        assert stable == ''
+        assert unstable == 'новый сегмент'
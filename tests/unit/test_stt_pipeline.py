@@ -0,0 +1,248 @@
+"""
+Модульные тесты для stt/pipeline.py
+"""
+import time
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+import numpy as np
+
+from stt.pipeline import (
+    StageQueue,
+    StageStats,
+    Segment,
+    STTPipeline,
+)
+from stt.transcriber import DecodeResult
+from conftest import FakeTranscriber, wait_for
+
+SAMPLE_RATE = 16000
+
+
+def _segment(seconds=1.0, source='loopback', kind='final'):
+    return Segment(np.ones(int(SAMPLE_RATE * seconds), dtype=np.float32), source, time.time(), kind=kind)
+
+
+class TestStageQueue:
+    """Тесты очереди между стадиями"""
+
+    def test_fifo_and_depth(self):
+        """Очередь сохраняет порядок и считает глубину"""
+        stats = StageStats('inference')
+        q = StageQueue(4, 'drop_oldest', stats)
+        q.put(1)
+        q.put(2)
+
+        assert stats.depth == 2
+        assert q.get(timeout=0) == 1
+        assert q.get(timeout=0) == 2
+        assert q.get(timeout=0) is None
+        assert stats.max_depth == 2
+
+    def test_drop_oldest(self):
+        """drop_oldest вытесняет самый старый элемент"""
+        stats = StageStats('inference')
+        q = StageQueue(2, 'drop_oldest', stats)
+        for i in range(3):
+            q.put(i)
+
+        assert stats.dropped == 1
+        assert [q.get(timeout=0), q.get(timeout=0)] == [1, 2]
+
+    def test_drop_newest(self):
+        """drop_newest отбрасывает новый элемент"""
+        stats = StageStats('inference')
+        q = StageQueue(1, 'drop_newest', stats)
+        assert q.put('a')
+        assert not q.put('b')
+
+        assert stats.dropped == 1
+        assert q.get(timeout=0) == 'a'
+
+    def test_merge_same_source(self):
+        """merge склеивает новый сегмент с последним ожидающим"""
+        stats = StageStats('inference')
+        q = StageQueue(1, 'merge', stats)
+        q.put(_segment(1.0))
+        q.put(_segment(0.5))
+
+        merged = q.get(timeout=0)
+        assert len(merged.audio) == int(SAMPLE_RATE * 1.5)
+        assert merged.merged == 2
+        assert stats.merged == 1
+        assert stats.dropped == 0
+
+    def test_merge_falls_back_to_drop_for_other_source(self):
+        """Сегмент другого источника не склеивается"""
+        stats = StageStats('inference')
+        q = StageQueue(1, 'merge', stats)
+        q.put(_segment(source='loopback'))
+        q.put(_segment(source='microphone'))
+
+        assert stats.dropped == 1
+        assert q.get(timeout=0).source == 'microphone'
+
+    def test_block_waits_for_consumer(self):
+        """block ждёт, пока потребитель освободит место"""
+        stats = StageStats('inference')
+        q = StageQueue(1, 'block', stats)
+        q.put('a')
+
+        threading.Timer(0.05, lambda: q.get(timeout=0)).start()
+        assert q.put('b', timeout=1.0)
+        assert q.get(timeout=0) == 'b'
+
+    def test_merge_shifts_timeline(self):
+        """При склейке опорные точки второго сегмента сдвигаются на длину первого"""
+        stats = StageStats('inference')
+        q = StageQueue(1, 'merge', stats)
+        first = _segment(1.0)
+        first.timeline = [(0, 100.0)]
+        second = _segment(0.5)
+        second.timeline = [(0, 105.0)]
+        q.put(first)
+        q.put(second)
+
+        assert q.get(timeout=0).timeline == [(0, 100.0), (SAMPLE_RATE, 105.0)]
+
+    def test_merge_drops_overlap(self):
+        """Перекрытие второго сегмента не дублируется в склейке"""
+        stats = StageStats('inference')
+        q = StageQueue(1, 'merge', stats)
+        q.put(_segment(1.0))
+        second = _segment(1.0)
+        second.overlap = 0.5
+        q.put(second)
+
+        assert len(q.get(timeout=0).audio) == int(SAMPLE_RATE * 1.5)
+
+    def test_invalid_policy(self):
+        with pytest.raises(ValueError):
+            StageQueue(1, 'ignore', StageStats('x'))
+
+
+class TestSTTPipeline:
+    """Тесты конвейера"""
+
+    def test_segments_flow_to_messages(self):
+        """Чанки проходят все стадии и превращаются в transcript"""
+        messages = []
+        pipeline = STTPipeline(FakeTranscriber(), 'loopback', messages.append)
+        pipeline.start()
+        try:
+            for _ in range(6):
+                pipeline.push_audio(np.zeros(1024, dtype=np.int16))
+            assert wait_for(lambda: len(messages) == 2)
+        finally:
+            pipeline.stop()
+
+        assert messages[0]['type'] == 'transcript'
+        assert messages[0]['final'] is True
+        assert messages[0]['text'] == 'сегмент 3072'
+        assert messages[0]['source'] == 'loopback'
+        assert messages[0]['latency_ms'] >= 0
+
+        assert wait_for(pipeline.is_idle)
+        stats = pipeline.get_stats()
+        assert stats['inference']['enqueued'] == 2
+        assert messages[0]['decode_ms'] >= 0
+        assert messages[0]['audio_ms'] == 192
+        assert stats['capture']['processed'] == 6
+        assert stats['segmenter']['processed'] == 6
+        assert stats['inference']['processed'] == 2
+        assert stats['postprocess']['processed'] == 2
+
+    def test_capture_not_blocked_by_slow_inference(self):
+        """Медленный инференс не останавливает приём чанков"""
+        messages = []
+        pipeline = STTPipeline(FakeTranscriber(decode_delay=0.2), 'loopback', messages.append,
+                               inference_queue_size=1, overflow_policy='drop_oldest')
+        pipeline.start()
+        try:
+            t0 = time.perf_counter()
+            for _ in range(30):
+                pipeline.push_audio(np.zeros(1024, dtype=np.float32))
+            assert time.perf_counter() - t0 < 0.2
+            assert wait_for(lambda: pipeline.stats['segmenter'].processed == 30)
+        finally:
+            pipeline.stop()
+
+        assert pipeline.stats['inference'].dropped > 0
+
+    def test_int16_chunks_pass_unconverted(self):
+        """int16 чанки идут в сегментатор как есть, без приведения к float32"""
+        pipeline = STTPipeline(FakeTranscriber(), 'loopback', lambda m: None)
+        chunk = np.array([16384, -32768], dtype=np.int16)
+
+        pipeline.push_audio(chunk)
+
+        assert pipeline.segment_queue.get(timeout=0)[0] is chunk
+
+    def test_capture_time_reaches_segmenter(self):
+        """Время захвата чанка доходит до add_audio, а не заменяется временем в сегментаторе"""
+        transcriber = FakeTranscriber()
+        transcriber.add_audio = MagicMock(return_value=False)
+        capture = MagicMock()
+        capture.get_audio_chunk.side_effect = lambda timeout: np.zeros(160, dtype=np.int16)
+        capture.last_chunk_time = 1000.0
+        pipeline = STTPipeline(transcriber, 'loopback', lambda m: None, capture=capture)
+        pipeline.start()
+        try:
+            assert wait_for(lambda: transcriber.add_audio.call_count > 0)
+        finally:
+            pipeline.stop()
+
+        assert transcriber.add_audio.call_args.args[1] == 1000.0
+
+    def test_partial_messages_stabilized(self):
+        """Partial проходят через стабилизатор, финал сбрасывает его"""
+        pipeline = STTPipeline(FakeTranscriber(), 'microphone', lambda m: None, partial_interval_ms=100)
+
+        first = pipeline._build_message(_segment(kind='partial'), 'что такое', 0, 1)
+        second = pipeline._build_message(_segment(kind='partial'), 'что такое REST', 0, 1)
+        final = pipeline._build_message(_segment(), 'что такое REST API', 0, 1)
+
+        assert first['type'] == 'partial'
+        assert second['stable'] == 'что такое'
+        assert second['unstable'] == 'REST'
+        assert final['type'] == 'transcript'
+        assert pipeline.stabilizer.stable_text == ''
+
+    def test_final_message_has_capture_clock_words(self):
+        """Слова и границы сегмента приходят во времени захвата"""
+        pipeline = STTPipeline(FakeTranscriber(), 'loopback', lambda m: None)
+        segment = _segment(1.0)
+        # Вторая половина сегмента записана через 3 с после первой
+        segment.timeline = [(0, 100.0), (SAMPLE_RATE // 2, 103.5)]
+        segment.result = DecodeResult('привет мир', [(0.1, 0.3, 'привет', 0.91), (0.6, 0.9, 'мир', 0.8)],
+                                      avg_logprob=-0.25, no_speech_prob=0.01)
+
+        message = pipeline._build_message(segment, 'привет мир', 104.0, 104.2)
+
+        assert message['audio_start'] == 100.0
+        assert message['audio_end'] == 104.0
+        assert message['e2e_ms'] == 200
+        assert message['words'] == [[100.1, 100.3, 'привет', 0.91], [103.6, 103.9, 'мир', 0.8]]
+        assert message['avg_logprob'] == -0.25
+        assert message['no_speech_prob'] == 0.01
+
+    def test_final_message_without_timeline_unchanged(self):
+        """Без часов захвата сообщение прежнего формата"""
+        pipeline = STTPipeline(FakeTranscriber(), 'loopback', lambda m: None)
+
+        message = pipeline._build_message(_segment(), 'текст', 0, 1)
+
+        assert 'words' not in message and 'audio_start' not in message
+
+    def test_final_overlap_words_deduped(self):
+        """Слова перекрытия, уже отправленные в прошлом финале, не повторяются"""
+        pipeline = STTPipeline(FakeTranscriber(), 'loopback', lambda m: None)
+        pipeline._build_message(_segment(), 'расскажите про микросервисы', 0, 1)
+        segment = _segment()
+        segment.overlap = 0.5
+
+        message = pipeline._build_message(segment, 'Микросервисы и их плюсы', 1, 2)
+
+        assert message['text'] == 'и их плюсы'
+        assert pipeline.get_stats()['overlap']['deduped_words'] == 1
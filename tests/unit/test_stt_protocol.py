@@ -0,0 +1,95 @@
+"""
+Модульные тесты для stt/protocol.py
+"""
+import json
+
+import pytest
+
+from stt.protocol import MessageEncoder, decode_message, negotiate, PROTOCOL_VERSION
+
+FINAL = {
+    'type': 'transcript',
+    'final': True,
+    'text': 'Расскажите про REST',
+    'source': 'loopback',
+    'timestamp': 1700000000.125,
+    'latency_ms': 420,
+    'queue_ms': 3,
+    'decode_ms': 380,
+    'audio_ms': 2100,
+    'audio_start': 1699999997.5,
+    'audio_end': 1699999999.6,
+    'e2e_ms': 525,
+    'avg_logprob': -0.213,
+    'no_speech_prob': 0.012,
+    'words': [[1699999997.62, 1699999998.1, 'Расскажите', 0.941],
+              [1699999998.15, 1699999998.4, 'про', 0.88],
+              [1699999998.5, 1699999999.1, 'REST', 0.702]],
+}
+PARTIAL = {
+    'type': 'partial',
+    'text': 'что такое REST',
+    'stable': 'что такое',
+    'unstable': 'REST',
+    'source': 'microphone',
+    'timestamp': 1700000000.5,
+}
+
+
+class TestBinaryProtocol:
+    """Тесты бинарной схемы v1"""
+
+    @pytest.mark.parametrize('payload', [FINAL, PARTIAL])
+    def test_roundtrip(self, payload):
+        frame = MessageEncoder('binary').encode(payload)
+
+        assert isinstance(frame, bytes)
+        assert _same(decode_message(frame), payload)
+
+    def test_binary_smaller_than_json(self):
+        binary = MessageEncoder('binary').encode(FINAL)
+        text = MessageEncoder('json').encode(FINAL)
+        assert len(binary) < len(text.encode('utf-8')) / 2
+
+    def test_unknown_fields_kept(self):
+        payload = dict(PARTIAL, revision=7)
+        assert decode_message(MessageEncoder('binary').encode(payload))['revision'] == 7
+
+    def test_other_messages_stay_json(self):
+        frame = MessageEncoder('binary').encode({'type': 'status', 'mode': 'loopback'})
+        assert json.loads(frame) == {'type': 'status', 'mode': 'loopback'}
+
+    def test_newer_frame_rejected(self):
+        frame = bytearray(MessageEncoder('binary').encode(PARTIAL))
+        frame[0] = PROTOCOL_VERSION + 1
+        with pytest.raises(ValueError):
+            decode_message(bytes(frame))
+
+
+class TestNegotiate:
+    def test_version_capped_by_server(self):
+        assert negotiate({'protocol': 'binary', 'version': 99}) == ('binary', PROTOCOL_VERSION)
+
+    def test_json_default(self):
+        assert negotiate({})[0] == 'json'
+
+    @pytest.mark.parametrize('hello', [{'protocol': 'msgpack'}, {'protocol': 'binary', 'version': 0}])
+    def test_invalid(self, hello):
+        with pytest.raises(ValueError):
+            negotiate(hello)
+
+
+def _same(decoded, payload):
+    assert decoded.keys() == payload.keys()
+    for key, value in payload.items():
+        if key == 'words':
+            for got, want in zip(decoded[key], value):
+                assert got[2] == want[2]
+                assert got[0] == pytest.approx(want[0], abs=1e-3)
+                assert got[1] == pytest.approx(want[1], abs=1e-3)
+                assert got[3] == pytest.approx(want[3], abs=1e-3)
+        elif isinstance(value, float):
+            assert decoded[key] == pytest.approx(value, abs=1e-3)
+        else:
+            assert decoded[key] == value
+    return True
@@ -0,0 +1,95 @@
+"""
+Модульные тесты для stt/replay.py
+"""
+import wave
+
+import numpy as np
+import pytest
+
+from stt.replay import (
+    ReplayRunner,
+    load_audio,
+    load_references,
+    summarize,
+    word_error_rate,
+    word_errors,
+)
+from conftest import FakeTranscriber
+
+SAMPLE_RATE = 16000
+
+
+class TestMetrics:
+    """Тесты WER и перцентилей"""
+
+    def test_wer_ignores_case_and_punctuation(self):
+        assert word_error_rate('Привет, мир!', 'привет мир') == 0.0
+
+    def test_wer_counts_edits(self):
+        """Замена и удаление считаются по словам"""
+        assert word_errors('раз два три четыре', 'раз пять три') == (2, 4)
+        assert word_error_rate('раз два', '') == 1.0
+
+    def test_summarize_percentiles(self):
+        stats = summarize(list(range(1001)))
+
+        assert stats['p50'] == 500
+        assert stats['p95'] == 950
+        assert stats['p99'] == 990
+        assert stats['max'] == 1000
+        assert summarize([]) is None
+
+
+class TestLoadAudio:
+    """Тесты загрузки файлов"""
+
+    def test_wav_resampled_to_mono_16k(self, tmp_path):
+        """Стерео 8 кГц приводится к моно 16 кГц float32"""
+        path = tmp_path / 'stereo.wav'
+        pcm = np.full((8000, 2), 16384, dtype=np.int16)
+        with wave.open(str(path), 'wb') as f:
+            f.setnchannels(2)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            f.writeframes(pcm.tobytes())
+
+        audio = load_audio(str(path))
+
+        assert audio.dtype == np.float32
+        assert len(audio) == SAMPLE_RATE
+        np.testing.assert_allclose(audio, 0.5)
+
+    def test_references_next_to_files(self, tmp_path):
+        (tmp_path / 'a.txt').write_text('эталон\n', encoding='utf-8')
+        files = [str(tmp_path / 'a.wav'), str(tmp_path / 'b.wav')]
+
+        assert load_references(files) == {files[0]: 'эталон'}
+
+
+class TestReplayRunner:
+    """Тесты прогона через конвейер"""
+
+    def test_run_reports_segments_and_wer(self, tmp_path):
+        """Ускоренный прогон выдаёт сегменты, RTF и WER в одном отчёте"""
+        path = tmp_path / 'speech.wav'
+        with wave.open(str(path), 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(SAMPLE_RATE)
+            f.writeframes(np.zeros(SAMPLE_RATE * 2, dtype=np.int16).tobytes())
+
+        runner = ReplayRunner(FakeTranscriber(segment_every=8, text='привет мир'), speed=0)
+        report = runner.run([str(path)], {str(path): 'привет мир'})
+
+        summary = report['summary']
+        assert summary['files'] == 1
+        assert summary['audio_sec'] == 2.0
+        assert summary['segments'] == len(report['files'][0]['segments']) > 0
+        assert summary['latency_ms']['p99'] >= summary['latency_ms']['p50']
+        assert summary['rtf'] >= 0
+        assert 'rss_peak_mb' in summary
+        assert report['files'][0]['pipeline']['segmenter']['dropped'] == 0
+
+    def test_negative_speed_rejected(self):
+        with pytest.raises(ValueError):
+            ReplayRunner(FakeTranscriber(segment_every=8, text='привет мир'), speed=-1)
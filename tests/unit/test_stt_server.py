@@ -57,6 +57,140 @@ class TestSTTServer:
         assert server.port == 8764
         assert server.mode == 'loopback'
 
+    @patch('stt_server.get_audio_mode')
+    @patch('stt_server.DynamicAudioCapture')
+    @patch('stt_server.StreamingTranscriber')
+    def test_audio_source_is_passed_to_capture(self, mock_transcriber, mock_capture, mock_audio_mode):
+        """Файловый источник: режим не определяется по устройствам, захват получает источник"""
+        from stt_server import DynamicSTTServer
+        from audio.sources import SyntheticSource
+
+        source = SyntheticSource()
+        mock_capture.return_value.get_audio_chunk.return_value = None
+        server = DynamicSTTServer(mode='auto', audio_source=source)
+        server.init_model()
+        server.start_audio_capture()
+        server.stop_audio_capture()
+
+        assert server.mode == 'loopback'
+        mock_audio_mode.assert_not_called()
+        mock_capture.assert_called_once_with(mode='loopback', source=source)
+
+    @patch('stt_server.DynamicAudioCapture')
+    @patch('stt_server.StreamingTranscriber')
+    def test_start_audio_capture_builds_pipeline(self, mock_transcriber, mock_capture):
+        """Захват запускается через конвейер с настройками сервера"""
+        from stt_server import DynamicSTTServer
+
+        mock_capture.return_value.get_audio_chunk.return_value = None
+        server = DynamicSTTServer(mode='loopback', partial_interval_ms=300,
+                                  inference_queue_size=2, overflow_policy='drop_oldest')
+        server.init_model()
+        server.start_audio_capture()
+        try:
+            assert server.pipeline is not None
+            assert server.pipeline.capture is mock_capture.return_value
+            assert server.pipeline.partial_interval == 0.3
+            assert server.pipeline.inference_queue.maxsize == 2
+            assert server.pipeline.inference_queue.policy == 'drop_oldest'
+        finally:
+            server.stop_audio_capture()
+        assert server.pipeline is None
+
+    @patch('stt_server.BatchedDecoder')
+    @patch('stt_server.DynamicAudioCapture')
+    @patch('stt_server.StreamingTranscriber')
+    def test_extra_source_shares_model(self, mock_transcriber, mock_capture, mock_decoder):
+        """Дополнительный источник использует ту же модель и общий инференс"""
+        from stt_server import DynamicSTTServer
+
+        mock_capture.return_value.get_audio_chunk.return_value = None
+        server = DynamicSTTServer(mode='loopback', extra_sources=[('microphone', 8764)])
+        server.init_model()
+        server.start_audio_capture()
+        try:
+            assert set(server.pipelines) == {'loopback', 'microphone'}
+            assert server.shared_inference is not None
+            assert server.pipelines['microphone'].shared_inference is server.shared_inference
+            server.transcriber.create_stream.assert_called_once()
+            mock_transcriber.assert_called_once()
+            assert mock_capture.call_count == 2
+        finally:
+            server.stop_audio_capture()
+        assert server.pipelines == {}
+        assert server.shared_inference is None
+
+    def test_extra_source_port_conflict_rejected(self):
+        """Источник на уже занятом порту отклоняется"""
+        from stt_server import DynamicSTTServer
+
+        with pytest.raises(ValueError):
+            DynamicSTTServer(mode='loopback', port=8765, extra_sources=[('microphone', 8765)])
+
+    def test_emit_routes_by_source(self):
+        """Сообщение уходит только клиентам своего источника"""
+        from stt_server import DynamicSTTServer
+
+        server = DynamicSTTServer(mode='loopback', extra_sources=[('microphone', 8764)])
+        from stt.fanout import ClientSender
+
+        mic_client = MagicMock()
+        server.source_clients['microphone'].add(mic_client)
+        server.fanout.senders[mic_client] = ClientSender(mic_client)
+        server.loop = MagicMock()
+
+        server._emit({'type': 'transcript', 'text': 'привет', 'source': 'loopback'})
+        server.loop.call_soon_threadsafe.assert_not_called()
+        server._emit({'type': 'transcript', 'text': 'привет', 'source': 'microphone'})
+        server.loop.call_soon_threadsafe.assert_called_once()
+        assert server.loop.call_soon_threadsafe.call_args.args[2] == {mic_client}
+
+    @pytest.mark.asyncio
+    async def test_slow_client_does_not_block_others(self):
+        """Зависший клиент копит свою очередь, остальные получают сообщения сразу"""
+        from stt_server import DynamicSTTServer
+
+        server = DynamicSTTServer(mode='loopback')
+        stalled = asyncio.Event()
+
+        class StalledClient:
+            async def send(self, message):
+                await stalled.wait()
+
+        fast, slow = FakeWebSocket([]), StalledClient()
+        server.fanout.add(fast)
+        server.fanout.add(slow)
+        for i in range(3):
+            server._broadcast_to_clients(json.dumps({'type': 'transcript', 'text': str(i)}), {fast, slow})
+        await asyncio.sleep(0.01)
+
+        assert [m['text'] for m in fast.sent] == ['0', '1', '2']
+        assert server.fanout.senders[slow].get_stats()['depth'] == 2
+        await server.fanout.close()
+
+    def test_parse_source_spec(self):
+        """Разбор аргумента --extra-source"""
+        import argparse
+        from stt_server import parse_source_spec
+
+        assert parse_source_spec('microphone:8764') == ('microphone', 8764)
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_source_spec('speaker:8764')
+
+    def test_unknown_overflow_policy_rejected(self):
+        """Неизвестная политика переполнения отклоняется"""
+        from stt_server import DynamicSTTServer
+
+        with pytest.raises(ValueError):
+            DynamicSTTServer(mode='loopback', overflow_policy='ignore')
+
+    def test_negative_partial_interval_rejected(self):
+        """Отрицательный интервал partial отклоняется"""
+        from stt_server import DynamicSTTServer
+
+        with pytest.raises(ValueError):
+            DynamicSTTServer(mode='loopback', partial_interval_ms=-1)
+
     @pytest.mark.asyncio
     @patch('stt_server.StreamingTranscriber')
     @patch('stt_server.websockets.serve')
@@ -87,6 +221,160 @@ class TestSTTServer:
     
 
 
+class FakeWebSocket:
+    """WebSocket клиента с заранее заданными входящими сообщениями"""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(json.loads(message))
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for message in self.messages:
+            yield message
+
+
+class TestBinaryIngest:
+    """Тесты приёма PCM по WebSocket"""
+
+    @pytest.mark.asyncio
+    @patch('stt_server.STTPipeline')
+    async def test_handshake_then_frames(self, mock_pipeline):
+        """После audio_start бинарные кадры уходят в конвейер клиента"""
+        import numpy as np
+        from stt_server import DynamicSTTServer
+
+        server = DynamicSTTServer(mode='microphone', port=8764)
+        server.transcriber = MagicMock()
+        server.shared_inference = MagicMock()
+        ws = FakeWebSocket([
+            json.dumps({'type': 'audio_start', 'sample_rate': 16000, 'dtype': 'int16', 'channels': 1}),
+            np.zeros(1024, dtype=np.int16).tobytes(),
+        ])
+
+        await server.handle_client(ws)
+
+        ack = ws.sent[1]
+        assert ack['type'] == 'audio_ack'
+        assert ack['dtype'] == 'int16'
+        assert mock_pipeline.call_args.kwargs['source'] == 'microphone'
+        pipeline = mock_pipeline.return_value
+        chunk = pipeline.push_audio.call_args.args[0]
+        assert chunk.dtype == np.int16 and len(chunk) == 1024
+        # Клиент отключился - конвейер остановлен
+        pipeline.stop.assert_called_once()
+        assert server.ingests == {}
+
+    @pytest.mark.asyncio
+    async def test_frames_without_handshake_rejected(self):
+        from stt_server import DynamicSTTServer
+
+        server = DynamicSTTServer(mode='microphone', port=8764)
+        ws = FakeWebSocket([b'\x00' * 64])
+
+        await server.handle_client(ws)
+
+        assert ws.sent[-1]['type'] == 'error'
+
+    @pytest.mark.asyncio
+    async def test_invalid_handshake_reported(self):
+        from stt_server import DynamicSTTServer
+
+        server = DynamicSTTServer(mode='microphone', port=8764)
+        server.shared_inference = MagicMock()
+        ws = FakeWebSocket([json.dumps({'type': 'audio_start', 'dtype': 'float64'})])
+
+        await server.handle_client(ws)
+
+        assert ws.sent[-1]['type'] == 'error'
+        assert server.ingests == {}
+
+    @pytest.mark.asyncio
+    @patch('stt_server.STTPipeline')
+    async def test_ingest_client_not_subscribed_by_default(self, mock_pipeline):
+        """Процесс захвата не получает транскрипты, если не подписался"""
+        from stt_server import DynamicSTTServer
+
+        server = DynamicSTTServer(mode='microphone', port=8764)
+        server.transcriber = MagicMock()
+        server.shared_inference = MagicMock()
+        subscribed = []
+
+        class Probe(FakeWebSocket):
+            async def _iter(inner):
+                yield json.dumps({'type': 'audio_start'})
+                subscribed.append(inner in server.source_clients['microphone'])
+
+        await server.handle_client(Probe([]))
+
+        assert subscribed == [False]
+
+
+    @pytest.mark.asyncio
+    @patch('stt_server.STTPipeline')
+    async def test_single_device_server_rejects_ingest(self, mock_pipeline):
+        """Без общего инференса конвейер клиента не создаётся"""
+        from stt_server import DynamicSTTServer
+
+        server = DynamicSTTServer(mode='microphone', port=8764)
+        server.transcriber = MagicMock()
+        ws = FakeWebSocket([json.dumps({'type': 'audio_start'})])
+
+        await server.handle_client(ws)
+
+        assert ws.sent[-1]['type'] == 'error'
+        assert '--extra-source ingest' in ws.sent[-1]['message']
+        mock_pipeline.assert_not_called()
+        assert server.ingests == {}
+
+
+class TestProtocol:
+    """Тесты согласования формата сообщений"""
+
+    @pytest.mark.asyncio
+    async def test_hello_switches_client_to_binary(self):
+        """После hello транскрипты клиенту уходят бинарными кадрами"""
+        from stt_server import DynamicSTTServer
+        from stt.protocol import decode_message
+
+        server = DynamicSTTServer(mode='loopback')
+        server.loop = asyncio.get_running_loop()
+        received = []
+
+        class Client(FakeWebSocket):
+            async def send(inner, message):
+                received.append(message)
+
+            async def _iter(inner):
+                yield json.dumps({'type': 'hello', 'protocol': 'binary', 'version': 3})
+                server._emit({'type': 'transcript', 'final': True, 'text': 'привет',
+                              'source': 'loopback', 'timestamp': 1.0})
+                await asyncio.sleep(0.01)
+
+        await server.handle_client(Client([]))
+
+        ack = json.loads(received[1])
+        assert ack == {'type': 'hello_ack', 'protocol': 'binary', 'version': 1}
+        assert isinstance(received[2], bytes)
+        assert decode_message(received[2])['text'] == 'привет'
+
+    @pytest.mark.asyncio
+    async def test_unknown_protocol_rejected(self):
+        from stt_server import DynamicSTTServer
+
+        server = DynamicSTTServer(mode='loopback')
+        ws = FakeWebSocket([json.dumps({'type': 'hello', 'protocol': 'xml'})])
+
+        await server.handle_client(ws)
+
+        assert ws.sent[-1]['type'] == 'error'
+
+
 class TestMain:
     """Тесты для main функции"""
     
@@ -0,0 +1,107 @@
+"""
+Модульные тесты для stt/vad.py
+"""
+import pytest
+import numpy as np
+
+from stt.vad import (
+    EnergyVAD,
+    SileroVAD,
+    create_vad,
+    VAD_FRAME_SIZE,
+)
+
+SAMPLE_RATE = 16000
+
+
+def _frames(signal):
+    n = len(signal) // VAD_FRAME_SIZE
+    return signal[:n * VAD_FRAME_SIZE].reshape(n, VAD_FRAME_SIZE).astype(np.float32)
+
+
+class TestEnergyVAD:
+    """Тесты энергетического детектора"""
+
+    def test_silence_is_not_speech(self):
+        """Нули не считаются речью"""
+        vad = EnergyVAD()
+        mask = vad.classify(np.zeros((4, VAD_FRAME_SIZE), dtype=np.float32))
+        assert not mask.any()
+
+    def test_tone_is_speech(self):
+        """Громкий низкочастотный тон считается речью"""
+        t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+        tone = 0.3 * np.sin(2 * np.pi * 200 * t)
+        mask = EnergyVAD().classify(_frames(tone))
+        assert mask.all()
+
+    def test_white_noise_rejected_by_zcr(self):
+        """Громкий широкополосный шум отсекается по частоте пересечения нуля"""
+        rng = np.random.default_rng(0)
+        noise = rng.uniform(-0.5, 0.5, SAMPLE_RATE)
+        mask = EnergyVAD().classify(_frames(noise))
+        assert not mask.any()
+
+    def test_mixed_frames(self):
+        """Решение принимается для каждого кадра отдельно"""
+        frames = np.zeros((3, VAD_FRAME_SIZE), dtype=np.float32)
+        frames[1] = 0.1
+        mask = EnergyVAD().classify(frames)
+        assert mask.tolist() == [False, True, False]
+
+    def test_int16_frames_match_float(self):
+        """int16 кадры классифицируются так же, как их float-масштаб"""
+        t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+        signal = np.concatenate((0.3 * np.sin(2 * np.pi * 200 * t), np.full(SAMPLE_RATE, 0.005)))
+        frames = _frames(signal)
+        pcm = np.round(frames * 32767).astype(np.int16)
+
+        mask = EnergyVAD().classify(pcm)
+
+        assert mask.tolist() == EnergyVAD().classify(frames).tolist()
+        assert mask.any() and not mask.all()
+
+    def test_empty_input(self):
+        """Пустой вход даёт пустую маску"""
+        mask = EnergyVAD().classify(np.zeros((0, VAD_FRAME_SIZE), dtype=np.float32))
+        assert mask.shape == (0,)
+
+
+class TestSileroVAD:
+    """Тесты Silero VAD (требуется onnxruntime)"""
+
+    def test_streaming_state_is_kept(self):
+        """Состояние и контекст переносятся между вызовами"""
+        pytest.importorskip('onnxruntime')
+        pytest.importorskip('faster_whisper')
+        vad = SileroVAD()
+        probs = vad.speech_probs(np.zeros((2, VAD_FRAME_SIZE), dtype=np.float32))
+
+        assert probs.shape == (2,)
+        assert np.all((probs >= 0) & (probs <= 1))
+        vad.reset()
+        assert not vad._context.any()
+
+
+class TestCreateVad:
+    """Тесты фабрики VAD"""
+
+    def test_energy(self):
+        assert isinstance(create_vad('energy'), EnergyVAD)
+
+    def test_unknown(self):
+        with pytest.raises(ValueError):
+            create_vad('webrtc')
+
+    def test_silero_fallback(self, monkeypatch):
+        """Без onnxruntime фабрика возвращает энергетический детектор"""
+        import builtins
+        real_import = builtins.__import__
+
+        def fake_import(name, *args, **kwargs):
+            if name == 'onnxruntime':
+                raise ImportError('no onnxruntime')
+            return real_import(name, *args, **kwargs)
+
+        monkeypatch.setattr(builtins, '__import__', fake_import)
+        assert isinstance(create_vad('silero'), EnergyVAD)
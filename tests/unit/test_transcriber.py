@@ -12,6 +12,13 @@ from stt.transcriber import (
     MAX_BUFFER_SECONDS,
     SILENCE_THRESHOLD,
     SILENCE_TRIGGER_SEC,
+    SPEECH_PAD_SECONDS,
+    CPU_MODEL_PRIORITY,
+    auto_cpu_threads,
+    measure_rtf,
+    timeline_time,
+    find_cut_point,
+    OVERLAP_SECONDS,
 )
 
 
@@ -42,7 +49,8 @@ class TestStreamingTranscriber:
 
         assert not should_transcribe
         assert not transcriber.is_speaking
-        assert transcriber.total_samples == len(silent_chunk)
+        # Тишина без речи не попадает в сегмент
+        assert transcriber.total_samples == 0
 
     @patch("stt.transcriber.WhisperModel")
     def test_add_audio_speech_and_silence_trigger(self, mock_whisper):
@@ -55,13 +63,40 @@ class TestStreamingTranscriber:
         transcriber.add_audio(speech_chunk)
         assert transcriber.is_speaking
 
-        # Имитируем паузу после речи > SILENCE_TRIGGER_SEC
-        transcriber.last_sound_time -= 1.0
-        silent_chunk = np.zeros(SAMPLE_RATE // 4, dtype=np.float32)
+        # Пауза после речи > SILENCE_TRIGGER_SEC (время потока, а не часы)
+        silent_chunk = np.zeros(int(SAMPLE_RATE * (SILENCE_TRIGGER_SEC + 0.1)), dtype=np.float32)
         should_transcribe = transcriber.add_audio(silent_chunk)
 
         assert should_transcribe
         assert not transcriber.is_speaking
+        # В сегмент попал только паддинг тишины после речи
+        assert transcriber.total_samples < SAMPLE_RATE + int(SAMPLE_RATE * SPEECH_PAD_SECONDS) + 512
+
+    @patch("stt.transcriber.WhisperModel")
+    def test_add_audio_short_pause_keeps_segment(self, mock_whisper):
+        """Короткая пауза не завершает сегмент, длинная тишина в середине сжимается"""
+        mock_whisper.return_value = MagicMock()
+        transcriber = StreamingTranscriber()
+
+        speech_chunk = np.ones(SAMPLE_RATE // 2, dtype=np.float32) * 0.1
+        transcriber.add_audio(speech_chunk)
+        assert not transcriber.add_audio(np.zeros(SAMPLE_RATE // 2, dtype=np.float32))
+        transcriber.add_audio(speech_chunk)
+
+        assert transcriber.is_speaking
+        pad = int(SAMPLE_RATE * SPEECH_PAD_SECONDS)
+        assert transcriber.total_samples <= SAMPLE_RATE + 2 * pad + 1024
+
+    @patch("stt.transcriber.WhisperModel")
+    def test_add_audio_unaligned_chunks(self, mock_whisper):
+        """Чанки не кратные кадру VAD собираются без потерь"""
+        mock_whisper.return_value = MagicMock()
+        transcriber = StreamingTranscriber()
+
+        for _ in range(10):
+            transcriber.add_audio(np.ones(300, dtype=np.float32) * 0.1)
+
+        assert transcriber.total_samples + transcriber._pending_len == 3000
 
     @patch("stt.transcriber.WhisperModel")
     def test_add_audio_max_buffer_trigger(self, mock_whisper):
@@ -81,7 +116,7 @@ class TestStreamingTranscriber:
         transcriber = StreamingTranscriber()
 
         # Меньше MIN_CHUNK_SECONDS
-        transcriber.total_samples = 100
+        transcriber.audio_buffer.write(np.zeros(100, dtype=np.float32))
         result = transcriber.transcribe()
         assert result is None
 
@@ -101,9 +136,47 @@ class TestStreamingTranscriber:
 
         result = transcriber.transcribe()
         assert result == "Привет мир"
+        assert mock_model.transcribe.call_args.kwargs['vad_filter'] is False
         assert transcriber.total_samples == 0
         assert len(transcriber.audio_buffer) == 0
 
+        # Сегмент копится в int16, в модель уходит float32 из переиспользуемого входа
+        audio_arg = mock_model.transcribe.call_args.args[0]
+        assert transcriber.audio_buffer.dtype == np.int16
+        assert audio_arg.dtype == np.float32
+        assert audio_arg.flags['C_CONTIGUOUS']
+        assert np.shares_memory(audio_arg, transcriber.model_input._data)
+        np.testing.assert_allclose(audio_arg, 0.05, atol=1 / 32768)
+
+    @patch("stt.transcriber.WhisperModel")
+    def test_buffer_stats(self, mock_whisper):
+        """Статистика заполненности буфера"""
+        mock_whisper.return_value = MagicMock()
+        transcriber = StreamingTranscriber()
+
+        # 32 кадра VAD по 512 сэмплов
+        transcriber.add_audio(np.ones(16384, dtype=np.float32) * 0.1)
+        stats = transcriber.get_buffer_stats()
+
+        assert stats['samples'] == 16384
+        assert stats['duration_sec'] == 1.02
+        assert 0 < transcriber.buffer_fill_level < 1
+
+    @patch("stt.transcriber.WhisperModel")
+    def test_transcribe_partial_keeps_buffer(self, mock_whisper):
+        """Промежуточная транскрипция не очищает сегмент"""
+        mock_model = MagicMock()
+        seg = MagicMock()
+        seg.text = "Расскажите о"
+        mock_model.transcribe.return_value = ([seg], MagicMock())
+        mock_whisper.return_value = mock_model
+
+        transcriber = StreamingTranscriber()
+        transcriber.add_audio(np.ones(16384, dtype=np.float32) * 0.05)
+
+        assert transcriber.transcribe_partial() == "Расскажите о"
+        assert transcriber.total_samples == 16384
+
     @patch("stt.transcriber.WhisperModel")
     def test_clear(self, mock_whisper):
         """Проверка сброса состояния буфера"""
@@ -117,3 +190,293 @@ class TestStreamingTranscriber:
         assert transcriber.total_samples == 0
         assert len(transcriber.audio_buffer) == 0
         assert not transcriber.is_speaking
+
+    @patch("stt.transcriber.WhisperModel")
+    def test_create_stream_shares_model(self, mock_whisper):
+        """Второй поток использует ту же модель, но свой буфер"""
+        mock_whisper.return_value = MagicMock()
+        transcriber = StreamingTranscriber()
+
+        stream = transcriber.create_stream()
+        stream.add_audio(np.ones(16384, dtype=np.float32) * 0.1)
+
+        mock_whisper.assert_called_once()
+        assert stream.model is transcriber.model
+        assert stream.model_name == transcriber.model_name
+        assert stream.total_samples == 16384
+        assert transcriber.total_samples == 0
+
+    @patch("stt.transcriber.WhisperModel")
+    def test_int16_chunks_stay_int16(self, mock_whisper):
+        """int16 захвата копится без приведения, в модель уходит один float32 перевод"""
+        mock_model = MagicMock()
+        mock_model.transcribe.return_value = ([], MagicMock())
+        mock_whisper.return_value = mock_model
+        transcriber = StreamingTranscriber()
+
+        speech = np.full(SAMPLE_RATE, 3277, dtype=np.int16)
+        silence = np.zeros(SAMPLE_RATE, dtype=np.int16)
+        assert transcriber.add_audio(np.concatenate((speech, silence)))
+        audio = transcriber.take_segment()
+        transcriber.transcribe_segment(audio)
+
+        assert audio.dtype == np.int16
+        assert (audio[:SAMPLE_RATE // 2] == 3277).all()
+        model_audio = mock_model.transcribe.call_args.args[0]
+        np.testing.assert_allclose(model_audio[:len(audio)], audio / 32768, rtol=1e-6)
+        assert transcriber.model_input.conversions == 1
+
+
+class TestSegmentTiming:
+    """Часы захвата и тайминг слов"""
+
+    @patch("stt.transcriber.WhisperModel")
+    def test_timeline_maps_segment_to_capture_clock(self, mock_whisper):
+        """Начало речи в сегменте переводится во время захвата"""
+        mock_whisper.return_value = MagicMock()
+        transcriber = StreamingTranscriber()
+
+        silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+        speech = np.ones(SAMPLE_RATE, dtype=np.float32) * 0.1
+        assert transcriber.add_audio(np.concatenate((silence, speech, silence)))
+        audio = transcriber.take_segment()
+        timeline = transcriber.last_segment_timeline
+
+        onset = int(np.argmax(audio > 0)) / SAMPLE_RATE
+        # Речь началась за 2 с до конца поданного чанка
+        assert timeline_time(timeline, onset) == pytest.approx(transcriber._chunk_time - 2.0, abs=1e-3)
+        assert transcriber._timeline == []
+
+    @patch("stt.transcriber.WhisperModel")
+    def test_timeline_uses_capture_time_of_chunk(self, mock_whisper):
+        """Время захвата от источника заменяет момент приёма чанка"""
+        mock_whisper.return_value = MagicMock()
+        transcriber = StreamingTranscriber()
+
+        silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+        speech = np.ones(SAMPLE_RATE, dtype=np.float32) * 0.1
+        assert transcriber.add_audio(np.concatenate((silence, speech, silence)), capture_time=1000.0)
+        audio = transcriber.take_segment()
+
+        onset = int(np.argmax(audio > 0)) / SAMPLE_RATE
+        assert timeline_time(transcriber.last_segment_timeline, onset) == pytest.approx(998.0, abs=1e-3)
+
+    @patch("stt.transcriber.WhisperModel")
+    def test_timeline_anchors_skipped_silence(self, mock_whisper):
+        """Выброшенная из сегмента тишина не сдвигает время последующих слов"""
+        mock_whisper.return_value = MagicMock()
+        transcriber = StreamingTranscriber()
+
+        speech = np.ones(SAMPLE_RATE // 2, dtype=np.float32) * 0.1
+        silence = np.zeros(SAMPLE_RATE // 2, dtype=np.float32)
+        transcriber.add_audio(np.concatenate((speech, silence, speech)))
+        timeline = transcriber._timeline
+
+        assert len(timeline) == 2
+        # Последний кадр сегмента - последний целый кадр VAD чанка
+        end = timeline_time(timeline, transcriber.total_samples / SAMPLE_RATE)
+        expected = transcriber._chunk_time - transcriber._pending_len / SAMPLE_RATE
+        assert end == pytest.approx(expected, abs=1e-3)
+
+    @patch("stt.transcriber.WhisperModel")
+    def test_segment_result_has_words_and_confidence(self, mock_whisper):
+        """С word_timestamps результат содержит слова и уверенность модели"""
+        word = MagicMock(start=0.1, end=0.4, word=' Привет', probability=0.9)
+        seg = MagicMock(text='Привет мир', avg_logprob=-0.2, no_speech_prob=0.05, words=[word])
+        mock_model = MagicMock()
+        mock_model.transcribe.return_value = ([seg], MagicMock())
+        mock_whisper.return_value = mock_model
+
+        transcriber = StreamingTranscriber(word_timestamps=True)
+        result = transcriber.transcribe_segment_result(np.ones(SAMPLE_RATE, dtype=np.float32) * 0.05)
+
+        assert mock_model.transcribe.call_args.kwargs['word_timestamps'] is True
+        assert result.text == 'Привет мир'
+        assert result.words == [(0.1, 0.4, 'Привет', 0.9)]
+        assert result.avg_logprob == pytest.approx(-0.2)
+        assert result.no_speech_prob == pytest.approx(0.05)
+        assert transcriber.create_stream().word_timestamps is True
+
+
+class TestForcedCut:
+    """Разрез по пределу длины сегмента"""
+
+    def test_find_cut_point_picks_quietest_frame(self):
+        audio = np.ones(SAMPLE_RATE * 2, dtype=np.float32) * 0.1
+        audio[int(SAMPLE_RATE * 1.5):int(SAMPLE_RATE * 1.52)] = 0.0
+
+        cut = find_cut_point(audio, len(audio))
+
+        assert int(SAMPLE_RATE * 1.5) <= cut < int(SAMPLE_RATE * 1.52)
+
+    @patch("stt.transcriber.WhisperModel")
+    def test_forced_cut_carries_overlap(self, mock_whisper):
+        """Разрез в тихом месте, хвост до разреза остаётся началом следующего сегмента"""
+        mock_whisper.return_value = MagicMock()
+        transcriber = StreamingTranscriber()
+
+        speech = np.ones(int(SAMPLE_RATE * MAX_BUFFER_SECONDS), dtype=np.float32) * 0.1
+        dip = int(SAMPLE_RATE * (MAX_BUFFER_SECONDS - 0.5))
+        speech[dip:dip + 640] = 0.02
+        assert transcriber.add_audio(speech)
+
+        audio = transcriber.take_segment()
+        overlap = int(SAMPLE_RATE * OVERLAP_SECONDS)
+
+        assert dip <= len(audio) < dip + 640
+        assert transcriber.last_segment_overlap == 0.0
+        assert transcriber.current_overlap == OVERLAP_SECONDS
+        assert transcriber.total_samples == len(speech) - len(audio) + overlap
+        assert transcriber.forced_cuts == 1
+        # Время начала остатка совпадает со временем соответствующего места в отданном сегменте
+        assert timeline_time(transcriber._timeline, 0) == pytest.approx(
+            timeline_time(transcriber.last_segment_timeline, (len(audio) - overlap) / SAMPLE_RATE))
+
+        transcriber.add_audio(np.ones(SAMPLE_RATE // 2, dtype=np.float32) * 0.1)
+        transcriber.add_audio(np.zeros(SAMPLE_RATE, dtype=np.float32))
+        assert transcriber.take_segment() is not None
+        assert transcriber.last_segment_overlap == OVERLAP_SECONDS
+        assert transcriber.current_overlap == 0.0
+
+    @patch("stt.transcriber.WhisperModel")
+    def test_overlap_only_segment_dropped(self, mock_whisper):
+        """Остаток из одного перекрытия не декодируется повторно"""
+        mock_whisper.return_value = MagicMock()
+        transcriber = StreamingTranscriber()
+
+        transcriber.add_audio(np.ones(int(SAMPLE_RATE * MAX_BUFFER_SECONDS), dtype=np.float32) * 0.1)
+        audio = transcriber.take_segment()
+        # Весь остаток после разреза - это перекрытие
+        transcriber.audio_buffer.consume(transcriber.total_samples - int(SAMPLE_RATE * OVERLAP_SECONDS))
+
+        assert audio is not None
+        assert transcriber.take_segment() is None
+        assert transcriber.total_samples == 0
+
+
+class TestCPUBackend:
+    """Тесты CPU бэкенда"""
+
+    @patch("stt.transcriber.measure_rtf", side_effect=[0.9, 0.3])
+    @patch("stt.transcriber.WhisperModel")
+    def test_cpu_picks_largest_realtime_model(self, mock_whisper, mock_rtf):
+        """Выбирается самая крупная модель с RTF < 0.5"""
+        transcriber = StreamingTranscriber(device='cpu', cpu_threads=4, num_workers=2)
+
+        assert transcriber.model_name == CPU_MODEL_PRIORITY[1]
+        assert transcriber.device_used == 'cpu'
+        assert transcriber.rtf == 0.3
+        kwargs = mock_whisper.call_args.kwargs
+        assert kwargs['device'] == 'cpu'
+        assert kwargs['compute_type'] == 'int8'
+        assert kwargs['cpu_threads'] == 4
+        assert kwargs['num_workers'] == 2
+
+    @patch("stt.transcriber.measure_rtf", return_value=2.0)
+    @patch("stt.transcriber.WhisperModel")
+    def test_cpu_falls_back_to_smallest(self, mock_whisper, mock_rtf):
+        """Если ни одна модель не успевает, берётся самая маленькая"""
+        transcriber = StreamingTranscriber(device='cpu')
+
+        assert transcriber.model_name == CPU_MODEL_PRIORITY[-1]
+        assert mock_whisper.call_count == len(CPU_MODEL_PRIORITY)
+
+    @patch("stt.transcriber.measure_rtf", return_value=0.1)
+    @patch("stt.transcriber.WhisperModel")
+    def test_auto_falls_back_to_cpu(self, mock_whisper, mock_rtf):
+        """auto переходит на CPU, когда GPU недоступен"""
+        def load(name, device, **kwargs):
+            if device == 'cuda':
+                raise RuntimeError('CUDA driver not found')
+            return MagicMock()
+        mock_whisper.side_effect = load
+
+        transcriber = StreamingTranscriber(device='auto')
+
+        assert transcriber.device_used == 'cpu'
+        assert transcriber.model_name == CPU_MODEL_PRIORITY[0]
+
+    @patch("stt.transcriber.WhisperModel", side_effect=RuntimeError('CUDA driver not found'))
+    def test_cuda_without_gpu_raises(self, mock_whisper):
+        """Режим cuda не откатывается на CPU"""
+        with pytest.raises(RuntimeError):
+            StreamingTranscriber(device='cuda')
+
+    def test_invalid_compute_type(self):
+        with pytest.raises(ValueError):
+            StreamingTranscriber(device='cpu', compute_type='float16')
+
+    def test_auto_cpu_threads_split_between_workers(self):
+        """Потоки делятся между воркерами, но не меньше одного"""
+        assert auto_cpu_threads(1) >= 1
+        assert auto_cpu_threads(1000) == 1
+
+    def test_measure_rtf(self):
+        """RTF считается по полному обходу сегментов"""
+        model = MagicMock()
+        model.transcribe.return_value = (iter([]), MagicMock())
+
+        rtf = measure_rtf(model, np.zeros(SAMPLE_RATE, dtype=np.float32))
+
+        assert 0 <= rtf < 1
+        assert model.transcribe.call_args.kwargs['vad_filter'] is False
+
+
+class TestStartup:
+    """Тесты кэша выбора модели и прогрева"""
+
+    @patch("stt.transcriber.save_model_choice")
+    @patch("stt.transcriber.load_model_choice", return_value={
+        'model': CPU_MODEL_PRIORITY[1], 'device': 'cpu', 'compute_type': 'int8', 'rtf': 0.2})
+    @patch("stt.transcriber.measure_rtf")
+    @patch("stt.transcriber.WhisperModel")
+    def test_cached_choice_skips_ladder(self, mock_whisper, mock_rtf, mock_load, mock_save):
+        """Сохранённая модель грузится сразу, без перебора и замера"""
+        transcriber = StreamingTranscriber(device='cpu', cache_model_choice=True)
+
+        mock_whisper.assert_called_once()
+        mock_rtf.assert_not_called()
+        mock_save.assert_not_called()
+        assert transcriber.model_name == CPU_MODEL_PRIORITY[1]
+        assert transcriber.rtf == 0.2
+        assert transcriber.get_startup_report()['cached_choice'] is True
+
+    @patch("stt.transcriber.forget_model_choice")
+    @patch("stt.transcriber.save_model_choice")
+    @patch("stt.transcriber.load_model_choice", return_value={
+        'model': 'large-v3', 'device': 'cuda', 'compute_type': 'float16'})
+    @patch("stt.transcriber.WhisperModel")
+    def test_broken_cached_choice_falls_back(self, mock_whisper, mock_load, mock_save, mock_forget):
+        """Если сохранённая модель не грузится, запись удаляется и идёт обычный перебор"""
+        mock_whisper.side_effect = [RuntimeError('missing'), MagicMock()]
+
+        transcriber = StreamingTranscriber(device='cuda', cache_model_choice=True)
+
+        mock_forget.assert_called_once_with('cuda')
+        assert transcriber.model_name == 'large-v3-turbo'
+        mock_save.assert_called_once_with('cuda', 'large-v3-turbo', 'cuda', 'float16', None)
+
+    @patch("stt.transcriber.WhisperModel")
+    def test_warmup_records_timing(self, mock_whisper):
+        """Прогрев декодирует синтетический сигнал и попадает в отчёт"""
+        mock_model = MagicMock()
+        mock_model.transcribe.return_value = ([], MagicMock())
+        mock_whisper.return_value = mock_model
+        transcriber = StreamingTranscriber()
+
+        transcriber.warmup()
+        report = transcriber.get_startup_report()
+
+        mock_model.transcribe.assert_called_once()
+        assert report['warmup_ms'] >= 0
+        assert report['model'] == 'large-v3-turbo'
+        assert report['total_ms'] >= report['load_ms']
+
+    @patch("stt.transcriber.WhisperModel")
+    def test_warmup_failure_is_not_fatal(self, mock_whisper):
+        mock_model = MagicMock()
+        mock_model.transcribe.side_effect = RuntimeError('CUDA error')
+        mock_whisper.return_value = mock_model
+
+        transcriber = StreamingTranscriber()
+        assert transcriber.warmup() >= 0